@@ -2,8 +2,9 @@
 
 import json
 import os
+import struct
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from functools import wraps
 
 import redis
@@ -1440,6 +1441,62 @@ def get_redis():
     return redis.from_url(REDIS_URL, decode_responses=True)
 
 
+# Must match app.services.campaign_graph.CAMPAIGN_GRAPH_VERSION_KEY in the backend
+CAMPAIGN_GRAPH_VERSION_KEY = "campaign:graph_version"
+
+
+def invalidates_campaign_graph(f):
+    """Bump the campaign graph version after a successful campaign edit.
+
+    Backend workers cache the chapter/level structure per genre and rebuild
+    it when this version changes.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = f(*args, **kwargs)
+        status = response[1] if isinstance(response, tuple) else 200
+        if status < 400:
+            try:
+                get_redis().incr(CAMPAIGN_GRAPH_VERSION_KEY)
+            except Exception:
+                pass  # Backend graph cache also expires on its own TTL
+        return response
+
+    return decorated_function
+
+
+# Must match app.services.template_pool.CARD_POOL_CHANNEL in the backend
+CARD_POOL_CHANNEL = "card_pool:invalidate"
+# Must match app.services.genre_stats in the backend
+GENRE_USERS_KEY = "genre_stats:users"
+GENRE_TEMPLATES_KEY = "genre_stats:templates"
+
+
+def invalidates_card_pool(f):
+    """Tell backend workers to reload card templates after a successful edit.
+
+    Backend workers keep the active templates of each genre in memory for
+    card drops and drop them when a message arrives on this channel. The
+    template counters are dropped too and get recounted on the next read.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = f(*args, **kwargs)
+        status = response[1] if isinstance(response, tuple) else 200
+        if status < 400:
+            try:
+                r = get_redis()
+                r.delete(GENRE_TEMPLATES_KEY)
+                r.publish(CARD_POOL_CHANNEL, "*")
+            except Exception:
+                pass  # Backend pool also expires on its own TTL
+        return response
+
+    return decorated_function
+
+
 @app.route("/ai-cache")
 @login_required
 def ai_cache():
@@ -1937,6 +1994,25 @@ def give_card_to_user(user_id: int):
             },
         )
         card_id = result.fetchone()[0]
+
+        # Keep denormalized card count in sync (friends ranking)
+        db.session.execute(
+            text("""
+                INSERT INTO user_card_stats
+                    (user_id, deck_power, active_cards_count, updated_at)
+                SELECT :user_id,
+                       COALESCE(SUM(CASE WHEN is_in_deck THEN hp + attack ELSE 0 END), 0),
+                       COUNT(id),
+                       NOW()
+                FROM user_cards
+                WHERE user_id = :user_id AND is_destroyed = false
+                ON CONFLICT (user_id) DO UPDATE SET
+                    deck_power = EXCLUDED.deck_power,
+                    active_cards_count = EXCLUDED.active_cards_count,
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {"user_id": user_id},
+        )
         db.session.commit()
 
         # Send Telegram notification to the user
@@ -2132,48 +2208,30 @@ def realtime_metrics():
 @login_required
 def user_activity_heatmap(user_id: int):
     """Get user activity data for GitHub-style heatmap."""
-    # Get completions for the last 365 days
+    # Completions for the last 365 days, from the per-year day count arrays
+    # the backend keeps (366 big-endian uint16 values, January 1st first),
+    # keyed by UTC days
     try:
-        task_completions = db.session.execute(
-            text(
-                """
-                SELECT DATE(completed_at) as completion_date, COUNT(*) as count
-                FROM tasks
-                WHERE user_id = :uid
-                    AND status = 'completed'
-                    AND completed_at >= CURRENT_DATE - INTERVAL '365 days'
-                GROUP BY DATE(completed_at)
-                """
-            ),
-            {"uid": user_id},
-        ).fetchall()
-
-        subtask_completions = db.session.execute(
+        today = datetime.utcnow().date()
+        since = today - timedelta(days=365)
+        years = db.session.execute(
             text(
                 """
-                SELECT DATE(s.completed_at) as completion_date, COUNT(*) as count
-                FROM subtasks s
-                JOIN tasks t ON s.task_id = t.id
-                WHERE t.user_id = :uid
-                    AND s.status = 'completed'
-                    AND s.completed_at >= CURRENT_DATE - INTERVAL '365 days'
-                GROUP BY DATE(s.completed_at)
+                SELECT year, counts
+                FROM user_activity_years
+                WHERE user_id = :uid AND year BETWEEN :first AND :last
                 """
             ),
-            {"uid": user_id},
+            {"uid": user_id, "first": since.year, "last": today.year},
         ).fetchall()
 
-        # Combine into a single dict
         activity = {}
-        for row in task_completions:
-            if row[0]:
-                date_str = str(row[0])
-                activity[date_str] = activity.get(date_str, 0) + row[1]
-
-        for row in subtask_completions:
-            if row[0]:
-                date_str = str(row[0])
-                activity[date_str] = activity.get(date_str, 0) + row[1]
+        for year, counts in years:
+            first_day = date(year, 1, 1)
+            for i, (count,) in enumerate(struct.iter_unpack(">H", bytes(counts))):
+                day = first_day + timedelta(days=i)
+                if count and since <= day <= today:
+                    activity[day.isoformat()] = count
 
         return jsonify({"success": True, "activity": activity})
     except Exception as e:
@@ -2582,6 +2640,7 @@ def upload_monster_image(monster_id: int):
 
 @app.route("/cards/templates/<int:template_id>/upload-image", methods=["POST"])
 @login_required
+@invalidates_card_pool
 def upload_card_template_image(template_id: int):
     """Upload image for a card template."""
     import uuid
@@ -3033,6 +3092,7 @@ def campaign():
 
 @app.route("/campaign/chapters/new", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def create_chapter():
     """Create a new campaign chapter."""
     data = request.json
@@ -3147,6 +3207,7 @@ def chapter_detail(chapter_id: int):
 
 @app.route("/campaign/chapters/<int:chapter_id>/update", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def update_chapter(chapter_id: int):
     """Update chapter details."""
     data = request.json
@@ -3194,6 +3255,7 @@ def update_chapter(chapter_id: int):
 
 @app.route("/campaign/chapters/<int:chapter_id>/delete", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def delete_chapter(chapter_id: int):
     """Delete a campaign chapter and its levels."""
     try:
@@ -3240,6 +3302,7 @@ def delete_chapter(chapter_id: int):
 
 @app.route("/campaign/chapters/renumber/<genre>", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def renumber_chapters(genre: str):
     """Renumber chapters in a genre to be sequential starting from 1."""
     try:
@@ -3272,6 +3335,7 @@ def renumber_chapters(genre: str):
 
 @app.route("/campaign/chapters/<int:chapter_id>/levels/new", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def create_level(chapter_id: int):
     """Create a new level in a chapter."""
     data = request.json
@@ -3336,6 +3400,7 @@ def create_level(chapter_id: int):
 
 @app.route("/campaign/levels/<int:level_id>/update", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def update_level(level_id: int):
     """Update level details."""
     data = request.json
@@ -3387,6 +3452,7 @@ def update_level(level_id: int):
 
 @app.route("/campaign/levels/<int:level_id>/delete", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def delete_level(level_id: int):
     """Delete a level."""
     try:
@@ -3974,6 +4040,7 @@ def export_level_json(level_id: int):
 
 @app.route("/campaign/levels/<int:level_id>/import", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def import_level_json(level_id: int):
     """Import level data from JSON (monster, dialogues, title)."""
     data = request.json
@@ -4058,6 +4125,7 @@ def import_level_json(level_id: int):
 
 @app.route("/campaign/chapters/<int:chapter_id>/levels/bulk-import", methods=["POST"])
 @login_required
+@invalidates_campaign_graph
 def bulk_import_levels(chapter_id: int):
     """Import multiple levels from JSON array. Creates new levels in order."""
     data = request.json
@@ -4292,18 +4360,68 @@ RARITY_POOL_FACTORS = {
 }
 
 
+def get_genre_stats() -> tuple[dict[str, int], dict[str, dict[str, int]]]:
+    """Users per genre and active/inactive templates per genre.
+
+    Read from the backend's genre counters in Redis; counted with one
+    GROUP BY each when the counters are missing or Redis is down.
+    """
+    users_counters, template_counters = {}, {}
+    try:
+        r = get_redis()
+        users_counters = r.hgetall(GENRE_USERS_KEY)
+        template_counters = r.hgetall(GENRE_TEMPLATES_KEY)
+    except Exception:
+        pass  # Count from the database below
+
+    if users_counters:
+        users = {genre: int(count) for genre, count in users_counters.items()}
+    else:
+        rows = db.session.execute(
+            text(
+                """
+                SELECT favorite_genre, COUNT(*) FROM user_profiles
+                WHERE favorite_genre IS NOT NULL
+                GROUP BY favorite_genre
+            """
+            )
+        ).fetchall()
+        users = {genre: count for genre, count in rows}
+
+    templates: dict[str, dict[str, int]] = {}
+    if template_counters:
+        # Fields are "genre:rarity:active|inactive"
+        for key, count in template_counters.items():
+            genre, _, state = key.rsplit(":", 2)
+            counts = templates.setdefault(genre, {"active": 0, "inactive": 0})
+            counts[state] += int(count)
+    else:
+        rows = db.session.execute(
+            text(
+                """
+                SELECT genre, is_active, COUNT(*) FROM card_templates
+                GROUP BY genre, is_active
+            """
+            )
+        ).fetchall()
+        for genre, is_active, count in rows:
+            counts = templates.setdefault(genre, {"active": 0, "inactive": 0})
+            counts["active" if is_active else "inactive"] += count
+
+    return users, templates
+
+
 @app.route("/card-pool")
 @login_required
 def card_pool():
     """Card pool management page."""
-    # Get general stats
-    total_templates = db.session.execute(
-        text("SELECT COUNT(*) FROM card_templates")
-    ).scalar() or 0
+    users_by_genre, templates_by_genre = get_genre_stats()
 
-    active_templates = db.session.execute(
-        text("SELECT COUNT(*) FROM card_templates WHERE is_active = true")
-    ).scalar() or 0
+    # Get general stats
+    active_templates = sum(c["active"] for c in templates_by_genre.values())
+    total_templates = active_templates + sum(
+        c["inactive"] for c in templates_by_genre.values()
+    )
 
     total_user_cards = db.session.execute(
         text("SELECT COUNT(*) FROM user_cards WHERE is_destroyed = false")
@@ -4321,22 +4439,10 @@ def card_pool():
     # Genre data
     genres_data = {}
     for genre in GENRES:
-        # Count users in genre
-        users_count = db.session.execute(
-            text("SELECT COUNT(*) FROM user_profiles WHERE favorite_genre = :genre"),
-            {"genre": genre},
-        ).scalar() or 0
-
-        # Count templates
-        active_count = db.session.execute(
-            text("SELECT COUNT(*) FROM card_templates WHERE genre = :genre AND is_active = true"),
-            {"genre": genre},
-        ).scalar() or 0
-
-        inactive_count = db.session.execute(
-            text("SELECT COUNT(*) FROM card_templates WHERE genre = :genre AND is_active = false"),
-            {"genre": genre},
-        ).scalar() or 0
+        users_count = users_by_genre.get(genre, 0)
+        template_counts = templates_by_genre.get(genre, {})
+        active_count = template_counts.get("active", 0)
+        inactive_count = template_counts.get("inactive", 0)
 
         # Rarity requirements
         rarity_status = {}
@@ -4423,6 +4529,7 @@ def card_pool_templates(genre: str):
 
 @app.route("/card-pool/template/<int:template_id>/toggle", methods=["POST"])
 @login_required
+@invalidates_card_pool
 def toggle_card_template(template_id: int):
     """Toggle template active status."""
     template = db.session.execute(
@@ -4450,6 +4557,7 @@ def toggle_card_template(template_id: int):
 
 @app.route("/card-pool/<genre>/generate", methods=["POST"])
 @login_required
+@invalidates_card_pool
 def generate_card_template(genre: str):
     """Generate a new card template."""
     import random
@@ -4577,6 +4685,7 @@ def get_card_template(template_id: int):
 
 @app.route("/card-pool/template/<int:template_id>", methods=["PUT"])
 @login_required
+@invalidates_card_pool
 def update_card_template(template_id: int):
     """Update a card template."""
     template = db.session.execute(
@@ -4625,6 +4734,16 @@ def update_card_template(template_id: int):
         update_fields.append("is_active = :is_active")
         params["is_active"] = bool(data["is_active"])
 
+    if "weight" in data:
+        try:
+            weight = float(data["weight"])
+        except (TypeError, ValueError):
+            weight = -1
+        if weight < 0:
+            return jsonify({"success": False, "error": "weight must be a non-negative number"}), 400
+        update_fields.append("weight = :weight")
+        params["weight"] = weight
+
     if "rarity" in data:
         # Allow NULL for universal templates, or valid rarity value
         rarity_value = data["rarity"]
@@ -4673,6 +4792,7 @@ def update_card_template(template_id: int):
 
 @app.route("/card-pool/template/<int:template_id>/set-image", methods=["POST"])
 @login_required
+@invalidates_card_pool
 def set_template_image_from_gallery(template_id: int):
     """Set template image from gallery or media URL."""
     data = request.json or {}
@@ -4697,6 +4817,7 @@ def set_template_image_from_gallery(template_id: int):
 
 @app.route("/card-pool/template/<int:template_id>", methods=["DELETE"])
 @login_required
+@invalidates_card_pool
 def delete_card_template(template_id: int):
     """Delete a card template (if not used by any user cards)."""
     # Check if template is used
@@ -4759,6 +4880,7 @@ def export_card_template_format():
 
 @app.route("/card-pool/bulk-import", methods=["POST"])
 @login_required
+@invalidates_card_pool
 def bulk_import_card_templates():
     """Bulk import card templates from JSON."""
     data = request.json
@@ -57,6 +57,21 @@ def create_app(config_name: str | None = None) -> Flask:
 
     setup_logging(app)
 
+    # Opt-in SQL statement counting and N+1 detection (after logging)
+    from app.sql_instrumentation import setup_sql_instrumentation
+
+    setup_sql_instrumentation(app)
+
+    # Activity counters follow task/subtask/focus/mood changes in every session
+    from app.services import daily_counters
+
+    daily_counters.install_listeners()
+
+    # Prometheus RED metrics and /metrics endpoint
+    from app.metrics import setup_metrics
+
+    setup_metrics(app)
+
     # CORS
     CORS(app, origins=app.config["CORS_ORIGINS"], supports_credentials=True)
 
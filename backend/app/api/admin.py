@@ -2,19 +2,27 @@
 
 import logging
 
-from flask import request
+from flask import current_app, request
 
 from app import db
 from app.api import api_bp
 from app.models.card import CardRarity, CardTemplate, UserCard
 from app.models.user import User
-from app.models.user_profile import UserProfile
+from app.services.card_pool_service import CardPoolService
 from app.services.card_service import (
     BASE_TEMPLATES_COUNT,
     GENRE_CARD_EMOJIS,
     RARITY_POOL_FACTORS,
     CardService,
+    get_required_templates,
 )
+from app.services.genre_stats import (
+    TemplateCounts,
+    get_template_counts,
+    get_templates_by_genre,
+    get_users_by_genre,
+)
+from app.services.template_pool import invalidate_template_pool
 from app.utils.auth import admin_required
 from app.utils.response import error_response, success_response
 
@@ -32,25 +40,15 @@ def get_card_pool_status():
 
     Returns templates count, required count, and user count per genre.
     """
+    users_by_genre = get_users_by_genre()
+    templates_by_genre = get_templates_by_genre()
     result = {}
 
     for genre in GENRES:
-        # Count users in genre
-        users_count = (
-            db.session.query(db.func.count(UserProfile.id))
-            .filter(UserProfile.favorite_genre == genre)
-            .scalar()
-        ) or 0
-
-        # Count active templates
-        active_templates = CardTemplate.query.filter_by(
-            genre=genre, is_active=True
-        ).count()
-
-        # Count inactive templates
-        inactive_templates = CardTemplate.query.filter_by(
-            genre=genre, is_active=False
-        ).count()
+        users_count = users_by_genre.get(genre, 0)
+        template_counts = templates_by_genre.get(genre) or TemplateCounts()
+        active_templates = template_counts.active_total
+        inactive_templates = template_counts.inactive_total
 
         # Calculate required templates for each rarity
         rarity_status = {}
@@ -75,6 +73,7 @@ def get_card_pool_status():
             "active_templates": active_templates,
             "inactive_templates": inactive_templates,
             "total_templates": active_templates + inactive_templates,
+            "templates_by_rarity": template_counts.active,
             "rarity_requirements": rarity_status,
         }
 
@@ -133,6 +132,7 @@ def toggle_template_active(template_id: int):
 
     template.is_active = not template.is_active
     db.session.commit()
+    invalidate_template_pool(template.genre)
 
     logger.info(
         f"Admin toggled template {template_id} ({template.name}) "
@@ -222,6 +222,7 @@ def generate_template(genre: str):
 
     db.session.add(template)
     db.session.commit()
+    invalidate_template_pool(genre)
 
     logger.info(f"Admin generated template: {template.name} ({genre}, {rarity.value})")
 
@@ -272,6 +273,7 @@ def generate_template_image(template_id: int):
     if image_url:
         template.image_url = image_url
         db.session.commit()
+        invalidate_template_pool(template.genre)
 
         logger.info(f"Admin generated image for template {template_id}: {image_url}")
 
@@ -295,35 +297,32 @@ def get_generation_schedule():
     - Current template count
     - Required template count
     - How many more users needed before next card generation
+    - Legendary reserve fill (pre-generated by the pool replenisher)
     """
+    pool_service = CardPoolService()
+    reserve_target = current_app.config.get("LEGENDARY_RESERVE_SIZE", 5)
+    users_by_genre = get_users_by_genre()
     result = {}
 
     for genre in GENRES:
-        # Count users in genre
-        users_count = (
-            db.session.query(db.func.count(UserProfile.id))
-            .filter(UserProfile.favorite_genre == genre)
-            .scalar()
-        ) or 0
-
-        # Count active templates
-        templates_count = CardTemplate.query.filter_by(
-            genre=genre, is_active=True
-        ).count()
+        users_count = users_by_genre.get(genre, 0)
+        templates_count = get_template_counts(genre).active_total
 
         rarity_schedule = {}
         for rarity in CardRarity:
             factor = RARITY_POOL_FACTORS.get(rarity)
 
             if factor is None:
-                # Legendary - always unique
+                # Legendary - always unique, served from the pre-generated reserve
                 rarity_schedule[rarity.value] = {
                     "status": "always_new",
                     "message": "Всегда генерируется новая карта",
+                    "reserve": pool_service.get_legendary_reserve_count(genre),
+                    "reserve_target": reserve_target,
                 }
                 continue
 
-            required = BASE_TEMPLATES_COUNT + int(users_count * factor)
+            required = get_required_templates(users_count, rarity)
 
             if templates_count >= required:
                 # How many more users needed to trigger new generation?
@@ -385,10 +384,8 @@ def get_admin_stats():
         cards_by_rarity[rarity.value] = count
 
     # Users by genre
-    users_by_genre = {}
-    for genre in GENRES:
-        count = UserProfile.query.filter_by(favorite_genre=genre).count()
-        users_by_genre[genre] = count
+    genre_users = get_users_by_genre()
+    users_by_genre = {genre: genre_users.get(genre, 0) for genre in GENRES}
 
     return success_response(
         {
@@ -3,24 +3,45 @@
 from datetime import datetime
 
 import structlog
-from flask import request
+from flask import current_app, request
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
 
 from app import db
 from app.api import api_bp
 from app.extensions import limiter
 from app.models import User, UserActivityLog
-from app.models.card import Friendship, PendingReferralReward
+from app.models.card import Friendship
 from app.utils import (
-    parse_telegram_user,
     success_response,
     unauthorized,
-    validate_telegram_data,
     validation_error,
+    verify_init_data,
 )
+from app.utils.identity import get_user
+from app.utils.telegram import get_init_data_session, remember_init_data_session
 
 logger = structlog.get_logger()
 
+# User fields synced from Telegram on every login
+PROFILE_FIELDS = ("username", "first_name", "last_name", "photo_url")
+
+
+def _queue_referral(user_id: int, referrer_id: int) -> bool:
+    """Queue an invite-link referral of an existing user for Celery.
+
+    Returns False if referrals are not deferred or queueing failed.
+    """
+    if not current_app.config.get("DEFER_REFERRALS"):
+        return False
+    try:
+        from app.tasks.friend_tasks import process_referral_async
+
+        process_referral_async.delay(user_id, referrer_id)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to queue referral, processing inline: {e}")
+        return False
+
 
 @api_bp.route("/auth/telegram", methods=["POST"])
 @limiter.limit("10 per minute")
@@ -74,15 +95,29 @@ def authenticate_telegram():
 
     init_data = data["init_data"]
 
-    # Validate Telegram data
-    if not validate_telegram_data(init_data):
+    # Validate Telegram data and parse user from initData
+    init = verify_init_data(init_data)
+    if init is None:
         return unauthorized("Invalid Telegram authentication data")
 
-    # Parse user from initData
-    telegram_user = parse_telegram_user(init_data)
+    telegram_user = init.user
     if not telegram_user or not telegram_user.get("id"):
         return validation_error({"user": "Could not parse user data"})
 
+    # Same initData presented again (app reload): issue a token for the user
+    # it was exchanged for, without repeating login side effects
+    session_user_id = get_init_data_session(init)
+    if session_user_id:
+        user = get_user(session_user_id)
+        if user and user.telegram_id == telegram_user["id"]:
+            return success_response(
+                {
+                    "user": user.to_dict(),
+                    "token": create_access_token(identity=str(user.id)),
+                    "is_new_user": False,
+                }
+            )
+
     telegram_id = telegram_user["id"]
 
     # Find or create user
@@ -90,93 +125,24 @@ def authenticate_telegram():
     is_new_user = user is None
     referrer_id = data.get("referrer_id")
     friendship_created = False
-    referral_rewards = {}
+    referral_pending = False
 
     if user:
-        # Update user info
-        user.username = telegram_user.get("username")
-        user.first_name = telegram_user.get("first_name")
-        user.last_name = telegram_user.get("last_name")
-        user.photo_url = telegram_user.get("photo_url")
+        # Update user info (only fields that changed)
+        for field in PROFILE_FIELDS:
+            value = telegram_user.get(field)
+            if getattr(user, field) != value:
+                setattr(user, field, value)
 
-        # Handle referral for existing user
+        # Handle referral for existing user (friendship and reward cards)
         if referrer_id and referrer_id != user.id:
-            referrer = User.query.get(referrer_id)
-            if referrer:
-                # Check if friendship already exists
-                existing_friendship = Friendship.query.filter(
-                    db.or_(
-                        db.and_(
-                            Friendship.user_id == referrer_id,
-                            Friendship.friend_id == user.id,
-                        ),
-                        db.and_(
-                            Friendship.user_id == user.id,
-                            Friendship.friend_id == referrer_id,
-                        ),
-                    )
-                ).first()
+            if _queue_referral(user.id, referrer_id):
+                referral_pending = True
+            else:
+                from app.services.friend_service import FriendService
 
-                if not existing_friendship:
-                    # Create new friendship
-                    friendship = Friendship(
-                        user_id=referrer_id,
-                        friend_id=user.id,
-                        status="accepted",
-                        accepted_at=datetime.utcnow(),
-                    )
-                    db.session.add(friendship)
-                    friendship_created = True
-                    logger.info(
-                        f"Created friendship between {referrer_id} and {user.id} via invite link"
-                    )
-
-                    # Give rewards to both users
-                    try:
-                        from app.services.card_service import CardService
-
-                        card_service = CardService()
-
-                        # Give rare+ card to referrer
-                        referrer_card = card_service.generate_referral_reward(
-                            referrer_id
-                        )
-                        if referrer_card:
-                            referral_rewards["referrer_rewarded"] = True
-                            referral_rewards["referrer_card"] = referrer_card.to_dict()
-
-                            # Store pending reward for referrer to show on next login
-                            invitee_name = user.first_name or user.username or "друг"
-                            pending_reward = PendingReferralReward(
-                                user_id=referrer_id,
-                                friend_id=user.id,
-                                friend_name=invitee_name,
-                                card_id=referrer_card.id,
-                                is_referrer=True,
-                            )
-                            db.session.add(pending_reward)
-
-                            logger.info(
-                                f"Gave referral reward to user {referrer_id}: "
-                                f"{referrer_card.name} ({referrer_card.rarity})"
-                            )
-
-                        # Give starter deck to invitee (3 cards, max rare)
-                        starter_deck = card_service.generate_starter_deck(user.id)
-                        if starter_deck:
-                            referral_rewards["invitee_starter_deck"] = [
-                                c.to_dict() for c in starter_deck
-                            ]
-                            # Store friend name for invitee modal
-                            referral_rewards["referrer_name"] = (
-                                referrer.first_name or referrer.username or "друг"
-                            )
-                            logger.info(
-                                f"Gave starter deck to user {user.id}: "
-                                f"{len(starter_deck)} cards"
-                            )
-                    except Exception as e:
-                        logger.error(f"Failed to give referral rewards: {e}")
+                result = FriendService().accept_referral(user.id, referrer_id)
+                friendship_created = result["success"]
     else:
         # Create new user
         # Validate referrer exists
@@ -274,6 +240,7 @@ def authenticate_telegram():
             logger.error(f"Failed to level up companion: {e}")
 
     db.session.commit()
+    remember_init_data_session(init, user.id)
 
     # Create JWT token (identity must be a string for Flask-JWT-Extended)
     access_token = create_access_token(identity=str(user.id))
@@ -287,8 +254,9 @@ def authenticate_telegram():
     if friendship_created:
         response_data["friendship_created"] = True
 
-    if referral_rewards:
-        response_data["referral_rewards"] = referral_rewards
+    if referral_pending:
+        # Rewards show up in the pending referral rewards
+        response_data["referral_pending"] = True
 
     if comeback_card:
         response_data["comeback_card"] = comeback_card.to_dict()
@@ -327,7 +295,7 @@ def get_current_user():
         description: Unauthorized
     """
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    user = get_user(user_id)
 
     if not user:
         return unauthorized("User not found")
@@ -1,7 +1,5 @@
 """Card system API endpoints."""
 
-from datetime import date
-
 from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
@@ -14,18 +12,38 @@ from app.models.card import (
     PendingReferralReward,
     UserCard,
 )
-from app.models.task import Task, TaskStatus
 from app.models.user import User
 from app.models.user_profile import UserProfile
+from app.services import daily_counters
+from app.services.card_batch_service import CardBatchService
 from app.services.card_service import CardService
-from app.utils import get_lang, not_found, success_response, validation_error
+from app.services.card_stats_service import CardStatsService
+from app.services.jobs import JobLimitExceeded, enqueue, jobs_enabled
+from app.utils import (
+    get_lang,
+    not_found,
+    success_response,
+    too_many_jobs,
+    validation_error,
+)
 from app.utils.auth import admin_required
+from app.utils.identity import get_profile, get_user
 from app.utils.notifications import notify_trade_received
 
 # Healing requirements: tasks needed per heal
 # First heal = 3 tasks, second = 5 tasks (cumulative)
 HEAL_REQUIREMENTS = [0, 3]  # tasks required for 1st (free), 2nd heal
 
+TRADE_ERROR_MESSAGES = {
+    "not_friends": "Вы можете обмениваться только с друзьями",
+    "sender_card_invalid": "Одна или несколько ваших карт недоступны для обмена",
+    "receiver_card_invalid": "Одна или несколько карт получателя недоступны",
+    "no_sender_cards": "Не выбрано ни одной карты для обмена",
+    "card_listed": "Карта выставлена на маркетплейс",
+    "card_in_battle": "Карта участвует в бою",
+}
+
+
 # ============ Card Collection ============
 
 
@@ -81,9 +99,31 @@ def get_card_details(card_id: int):
 @api_bp.route("/cards/<int:card_id>/generate-image", methods=["POST"])
 @jwt_required()
 def generate_card_image(card_id: int):
-    """Generate image for a card (async, called after card is shown to user)."""
+    """Generate image for a card (async, called after card is shown to user).
+
+    With async jobs enabled, returns 202 with {"job": {...}} when an image
+    has to be generated; poll GET /jobs/<id> for the result.
+    """
     user_id = int(get_jwt_identity())
 
+    if jobs_enabled():
+        card = UserCard.query.filter_by(id=card_id, user_id=user_id).first()
+        if card and not card.image_url:
+            from app.tasks.card_tasks import generate_card_image_async
+
+            try:
+                job = enqueue(
+                    generate_card_image_async,
+                    card_id,
+                    user_id,
+                    owner=user_id,
+                    kind="card_image",
+                )
+            except JobLimitExceeded:
+                return too_many_jobs()
+            if job:
+                return success_response({"job": job}, status_code=202)
+
     service = CardService()
     result = service.generate_card_image_async(card_id, user_id)
 
@@ -112,7 +152,7 @@ def get_deck():
     """Get user's active battle deck."""
     user_id = int(get_jwt_identity())
 
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     max_size = get_max_deck_size(user.level if user else 1)
 
     service = CardService()
@@ -156,7 +196,7 @@ def add_to_deck():
     if not card_id:
         return validation_error({"card_id": "Card ID is required"})
 
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     max_size = get_max_deck_size(user.level if user else 1)
 
     service = CardService()
@@ -215,7 +255,7 @@ def get_heal_status():
     user_id = int(get_jwt_identity())
 
     # Get or create profile
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = get_profile(user_id)
     if not profile:
         profile = UserProfile(user_id=user_id)
         db.session.add(profile)
@@ -239,13 +279,8 @@ def get_heal_status():
 
 
 def get_tasks_completed_today(user_id: int) -> int:
-    """Count tasks completed today."""
-    today = date.today()
-    return Task.query.filter(
-        Task.user_id == user_id,
-        Task.status == TaskStatus.COMPLETED.value,
-        db.func.date(Task.updated_at) == today,
-    ).count()
+    """Tasks completed today."""
+    return daily_counters.get_today(user_id)["tasks_completed"]
 
 
 def get_heal_requirement(heals_today: int) -> int:
@@ -256,20 +291,8 @@ def get_heal_requirement(heals_today: int) -> int:
     return HEAL_REQUIREMENTS[heals_today]
 
 
-@api_bp.route("/cards/<int:card_id>/heal", methods=["POST"])
-@jwt_required()
-def heal_card(card_id: int):
-    """Heal a specific card to full HP."""
-    user_id = int(get_jwt_identity())
-
-    # Get or create profile to track heals
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
-    if not profile:
-        profile = UserProfile(user_id=user_id)
-        db.session.add(profile)
-        db.session.flush()
-
-    # Check healing requirements
+def check_heal_requirement(user_id: int, profile: UserProfile):
+    """Error response if the user's next heal needs more completed tasks."""
     heals_today = profile.get_heals_today()
     required_tasks = get_heal_requirement(heals_today)
 
@@ -287,6 +310,26 @@ def heal_card(card_id: int):
                     "heals_today": heals_today,
                 }
             )
+    return None
+
+
+@api_bp.route("/cards/<int:card_id>/heal", methods=["POST"])
+@jwt_required()
+def heal_card(card_id: int):
+    """Heal a specific card to full HP."""
+    user_id = int(get_jwt_identity())
+
+    # Get or create profile to track heals
+    profile = get_profile(user_id)
+    if not profile:
+        profile = UserProfile(user_id=user_id)
+        db.session.add(profile)
+        db.session.flush()
+
+    # Check healing requirements
+    heal_error = check_heal_requirement(user_id, profile)
+    if heal_error:
+        return heal_error
 
     service = CardService()
     result = service.heal_card(card_id, user_id, lang=get_lang())
@@ -320,30 +363,16 @@ def heal_all_cards():
     user_id = int(get_jwt_identity())
 
     # Get or create profile to track heals
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = get_profile(user_id)
     if not profile:
         profile = UserProfile(user_id=user_id)
         db.session.add(profile)
         db.session.flush()
 
     # Check healing requirements
-    heals_today = profile.get_heals_today()
-    required_tasks = get_heal_requirement(heals_today)
-
-    if required_tasks > 0:
-        tasks_completed = get_tasks_completed_today(user_id)
-        if tasks_completed < required_tasks:
-            heal_number = heals_today + 1
-            return validation_error(
-                {
-                    "error": "not_enough_tasks",
-                    "message": f"Для {heal_number}-го лечения за сегодня нужно "
-                    f"закрыть {required_tasks} задач. Выполнено: {tasks_completed}.",
-                    "required_tasks": required_tasks,
-                    "completed_tasks": tasks_completed,
-                    "heals_today": heals_today,
-                }
-            )
+    heal_error = check_heal_requirement(user_id, profile)
+    if heal_error:
+        return heal_error
 
     service = CardService()
     healed_count = service.heal_all_cards(user_id)
@@ -362,6 +391,82 @@ def heal_all_cards():
     )
 
 
+# ============ Batch Card Operations ============
+
+
+@api_bp.route("/cards/batch", methods=["POST"])
+@jwt_required()
+def apply_card_operations():
+    """
+    Apply several deck and healing operations atomically.
+
+    Request body:
+    {
+        "operations": [
+            {"op": "deck_remove", "card_ids": [3]},
+            {"op": "deck_add", "card_ids": [7, 9]},
+            {"op": "deck_order", "card_ids": [9, 1, 7]},
+            {"op": "heal", "card_ids": [1, 7]}  // no card_ids heals all cards
+        ]
+    }
+
+    Heal operations together count as one heal action.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    operations = data.get("operations")
+
+    user = get_user(user_id)
+    max_size = get_max_deck_size(user.level if user else 1)
+
+    profile = None
+    heals = isinstance(operations, list) and any(
+        isinstance(op, dict) and op.get("op") == "heal" for op in operations
+    )
+    if heals:
+        # Get or create profile to track heals
+        profile = get_profile(user_id)
+        if not profile:
+            profile = UserProfile(user_id=user_id)
+            db.session.add(profile)
+            db.session.flush()
+
+        heal_error = check_heal_requirement(user_id, profile)
+        if heal_error:
+            return heal_error
+
+    result = CardBatchService().apply(user_id, operations, max_deck_size=max_size)
+    if not result["success"]:
+        db.session.rollback()
+        error_messages = {
+            "card_not_found": "Карта не найдена",
+            "card_destroyed": "Карта уничтожена",
+            "already_in_deck": "Карта уже в колоде",
+            "not_in_deck": "Карты нет в колоде",
+            "deck_order_mismatch": "Порядок должен включать все карты колоды",
+            "deck_full": f"Колода полная (максимум {max_size} карт)",
+        }
+        details = {k: v for k, v in result.items() if k != "success"}
+        details["message"] = error_messages.get(result["error"], result["error"])
+        return validation_error(details)
+
+    if profile is not None and result["healed_count"] > 0:
+        profile.record_heal()
+    db.session.commit()
+
+    lang = get_lang()
+    deck = CardService().get_user_deck(user_id)
+    response = {
+        "deck": [c.to_dict(lang) for c in deck],
+        "size": len(deck),
+        "max_size": max_size,
+        "healed_count": result["healed_count"],
+    }
+    if profile is not None:
+        response["heals_today"] = profile.heals_today
+    return success_response(response)
+
+
 # ============ Pending Referral Rewards ============
 
 
@@ -700,7 +805,7 @@ def connect_referral():
     rewards = {}
     try:
         service = CardService()
-        current_user = User.query.get(user_id)
+        current_user = get_user(user_id)
         invitee_name = current_user.first_name or current_user.username or "друг"
         referrer_name = referrer.first_name or referrer.username or "друг"
 
@@ -834,19 +939,13 @@ def create_trade():
     )
 
     if not result["success"]:
-        error_messages = {
-            "not_friends": "Вы можете обмениваться только с друзьями",
-            "sender_card_invalid": "Одна или несколько ваших карт недоступны для обмена",
-            "receiver_card_invalid": "Одна или несколько карт получателя недоступны",
-            "no_sender_cards": "Не выбрано ни одной карты для обмена",
-        }
         return validation_error(
-            {"error": error_messages.get(result["error"], result["error"])}
+            {"error": TRADE_ERROR_MESSAGES.get(result["error"], result["error"])}
         )
 
     # Send notification to receiver
     try:
-        sender = User.query.get(user_id)
+        sender = get_user(user_id)
         receiver = User.query.get(receiver_id)
         if sender and receiver and receiver.telegram_id:
             sender_name = sender.first_name or sender.username or "Пользователь"
@@ -885,7 +984,14 @@ def accept_trade(trade_id: int):
     result = service.accept_trade(user_id, trade_id)
 
     if not result["success"]:
-        return not_found("Предложение не найдено")
+        if result["error"] == "trade_not_found":
+            return not_found("Предложение не найдено")
+        return validation_error(
+            {
+                "error": TRADE_ERROR_MESSAGES.get(result["error"], result["error"]),
+                "card_ids": result.get("card_ids", []),
+            }
+        )
 
     return success_response(
         {
@@ -1233,61 +1339,13 @@ def get_friend_profile(friend_id: int):
 @api_bp.route("/friends/ranking", methods=["GET"])
 @jwt_required()
 def get_friends_ranking():
-    """Get friends sorted by total deck power."""
-    user_id = int(get_jwt_identity())
+    """Get friends sorted by total deck power.
 
-    service = CardService()
-    friends = service.get_friends(user_id)
-
-    # Calculate deck power for each friend
-    ranking = []
-    for friend_info in friends:
-        fid = friend_info["friend_id"]
-        friend_user = User.query.get(fid)
-        if not friend_user:
-            continue
-
-        deck = service.get_user_deck(fid)
-        deck_power = sum(c.hp + c.attack for c in deck)
-
-        ranking.append(
-            {
-                "user_id": fid,
-                "username": friend_user.username,
-                "first_name": friend_user.first_name,
-                "level": friend_user.level,
-                "deck_power": deck_power,
-                "cards_count": UserCard.query.filter_by(
-                    user_id=fid, is_destroyed=False
-                ).count(),
-            }
-        )
-
-    # Add current user
-    current_user = User.query.get(user_id)
-    if current_user:
-        my_deck = service.get_user_deck(user_id)
-        my_power = sum(c.hp + c.attack for c in my_deck)
-        ranking.append(
-            {
-                "user_id": user_id,
-                "username": current_user.username,
-                "first_name": current_user.first_name,
-                "level": current_user.level,
-                "deck_power": my_power,
-                "cards_count": UserCard.query.filter_by(
-                    user_id=user_id, is_destroyed=False
-                ).count(),
-                "is_me": True,
-            }
-        )
-
-    # Sort by deck power descending
-    ranking.sort(key=lambda x: x["deck_power"], reverse=True)
+    Served from the denormalized ``user_card_stats`` table in one query.
+    """
+    user_id = int(get_jwt_identity())
 
-    # Add rank
-    for i, entry in enumerate(ranking):
-        entry["rank"] = i + 1
+    ranking = CardStatsService().get_friends_ranking(user_id)
 
     return success_response({"ranking": ranking})
 
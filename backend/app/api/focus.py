@@ -8,14 +8,20 @@ from sqlalchemy import func
 
 from app import db
 from app.api import api_bp
-from app.models import FocusSession, Subtask, Task, User, UserActivityLog
+from app.models import FocusSession, Subtask, Task, UserActivityLog
 from app.models.card import CardRarity
 from app.models.focus_session import FocusSessionStatus
 from app.models.subtask import SubtaskStatus
 from app.models.task import TaskStatus
-from app.services import AchievementChecker, XPCalculator
+from app.services import (
+    AchievementChecker,
+    XPCalculator,
+    focus_timers,
+    productivity_patterns,
+)
 from app.services.card_service import CardService
 from app.utils import conflict, not_found, success_response, validation_error
+from app.utils.identity import get_user
 
 
 @api_bp.route("/focus/start", methods=["POST"])
@@ -110,6 +116,7 @@ def start_focus_session():
 
     db.session.add(session)
     db.session.commit()
+    focus_timers.track(session)
 
     try:
         UserActivityLog.log(
@@ -132,18 +139,14 @@ def get_active_session():
     """Get all active focus sessions."""
     user_id = int(get_jwt_identity())
 
-    sessions = FocusSession.query.filter(
-        FocusSession.user_id == user_id,
-        FocusSession.status.in_(
-            [FocusSessionStatus.ACTIVE.value, FocusSessionStatus.PAUSED.value]
-        ),
-    ).all()
+    # Served from the Redis snapshots kept by focus_timers
+    sessions = focus_timers.get_open_sessions(user_id)
 
     return success_response(
         {
-            "sessions": [s.to_dict() for s in sessions],
+            "sessions": sessions,
             # Keep backward compatibility
-            "session": sessions[0].to_dict() if sessions else None,
+            "session": sessions[0] if sessions else None,
         }
     )
 
@@ -190,7 +193,7 @@ def complete_focus_session():
     session.complete(complete_subtask=complete_subtask)
 
     # Calculate XP
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     xp_earned = XPCalculator.focus_session_completed(
         session.actual_duration_minutes or 0
     )
@@ -272,6 +275,8 @@ def complete_focus_session():
         pass
 
     db.session.commit()
+    focus_timers.untrack(session)
+    productivity_patterns.refresh_quietly(user_id)
 
     # Send Telegram notification about focus completion
     try:
@@ -398,6 +403,8 @@ def cancel_focus_session():
             task.status = TaskStatus.PENDING.value
 
     db.session.commit()
+    focus_timers.untrack(session)
+    productivity_patterns.refresh_quietly(user_id)
 
     return success_response({"session": session.to_dict()})
 
@@ -422,8 +429,13 @@ def pause_focus_session():
     if not session:
         return not_found("No active session found")
 
+    # The timer may have fired already; then the bot is completing it
+    if not focus_timers.stop_timer(session):
+        return conflict("Session already finished")
+
     session.pause()
     db.session.commit()
+    focus_timers.track(session)
 
     return success_response({"session": session.to_dict()})
 
@@ -450,6 +462,7 @@ def resume_focus_session():
 
     session.resume()
     db.session.commit()
+    focus_timers.track(session)
 
     return success_response({"session": session.to_dict()})
 
@@ -562,5 +575,6 @@ def extend_focus_session():
     # Extend duration
     session.planned_duration_minutes += minutes
     db.session.commit()
+    focus_timers.track(session)
 
     return success_response({"session": session.to_dict()})
@@ -4,27 +4,30 @@ from datetime import date, datetime, timedelta
 
 from flask import current_app, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import func
 
 from app import db
 from app.api import api_bp
 from app.extensions import cache, limiter
 from app.models import (
     Achievement,
-    FocusSession,
-    MoodCheck,
-    Subtask,
     Task,
     User,
     UserAchievement,
 )
 from app.models.achievement import get_level_name
 from app.models.character import GENRE_THEMES, get_genre_info
-from app.models.focus_session import FocusSessionStatus
-from app.models.subtask import SubtaskStatus
-from app.models.task import TaskStatus
 from app.models.user_profile import UserProfile
-from app.utils import get_lang, not_found, success_response, validation_error
+from app.services import activity_heatmap, daily_counters, productivity_patterns
+from app.services.genre_stats import record_genre_change
+from app.services.jobs import ADMIN_OWNER, JobLimitExceeded, enqueue, jobs_enabled
+from app.utils import (
+    get_lang,
+    not_found,
+    success_response,
+    too_many_jobs,
+    validation_error,
+)
+from app.utils.identity import get_profile, get_user
 
 
 @api_bp.route("/user/stats", methods=["GET"])
@@ -32,70 +35,9 @@ from app.utils import get_lang, not_found, success_response, validation_error
 def get_user_stats():
     """Get user statistics and progress."""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-
-    # Total completed tasks
-    total_tasks = Task.query.filter_by(
-        user_id=user_id, status=TaskStatus.COMPLETED.value
-    ).count()
-
-    # Total completed subtasks
-    total_subtasks = (
-        db.session.query(func.count(Subtask.id))
-        .join(Task)
-        .filter(
-            Task.user_id == user_id, Subtask.status == SubtaskStatus.COMPLETED.value
-        )
-        .scalar()
-    )
-
-    # Total focus minutes
-    total_focus_minutes = (
-        db.session.query(
-            func.coalesce(func.sum(FocusSession.actual_duration_minutes), 0)
-        )
-        .filter(
-            FocusSession.user_id == user_id,
-            FocusSession.status == FocusSessionStatus.COMPLETED.value,
-        )
-        .scalar()
-    )
-
-    # Today's stats
-    today_start = datetime.combine(date.today(), datetime.min.time())
-
-    today_tasks = Task.query.filter(
-        Task.user_id == user_id,
-        Task.status == TaskStatus.COMPLETED.value,
-        Task.completed_at >= today_start,
-    ).count()
-
-    today_subtasks = (
-        db.session.query(func.count(Subtask.id))
-        .join(Task)
-        .filter(
-            Task.user_id == user_id,
-            Subtask.status == SubtaskStatus.COMPLETED.value,
-            Subtask.completed_at >= today_start,
-        )
-        .scalar()
-    )
-
-    today_focus_minutes = (
-        db.session.query(
-            func.coalesce(func.sum(FocusSession.actual_duration_minutes), 0)
-        )
-        .filter(
-            FocusSession.user_id == user_id,
-            FocusSession.status == FocusSessionStatus.COMPLETED.value,
-            FocusSession.started_at >= today_start,
-        )
-        .scalar()
-    )
-
-    today_mood_checks = MoodCheck.query.filter(
-        MoodCheck.user_id == user_id, MoodCheck.created_at >= today_start
-    ).count()
+    user = get_user(user_id)
+    totals = daily_counters.get_totals(user_id)
+    today = daily_counters.get_today(user_id)
 
     lang = get_lang()
     return success_response(
@@ -108,14 +50,14 @@ def get_user_stats():
             "xp_progress_percent": user.xp_progress_percent,
             "streak_days": user.streak_days,
             "longest_streak": user.longest_streak,
-            "total_tasks_completed": total_tasks,
-            "total_subtasks_completed": total_subtasks or 0,
-            "total_focus_minutes": total_focus_minutes or 0,
+            "total_tasks_completed": totals["tasks_completed"],
+            "total_subtasks_completed": totals["subtasks_completed"],
+            "total_focus_minutes": totals["focus_minutes"],
             "today": {
-                "tasks_completed": today_tasks,
-                "subtasks_completed": today_subtasks or 0,
-                "focus_minutes": today_focus_minutes or 0,
-                "mood_checks": today_mood_checks,
+                "tasks_completed": today["tasks_completed"],
+                "subtasks_completed": today["subtasks_completed"],
+                "focus_minutes": today["focus_minutes"],
+                "mood_checks": today["mood_checks"],
             },
         }
     )
@@ -172,39 +114,10 @@ def get_daily_goals():
     """Get daily goals progress."""
     user_id = int(get_jwt_identity())
 
-    today_start = datetime.combine(date.today(), datetime.min.time())
-
-    # Focus minutes goal (60 min)
-    focus_minutes = (
-        db.session.query(
-            func.coalesce(func.sum(FocusSession.actual_duration_minutes), 0)
-        )
-        .filter(
-            FocusSession.user_id == user_id,
-            FocusSession.status == FocusSessionStatus.COMPLETED.value,
-            FocusSession.started_at >= today_start,
-        )
-        .scalar()
-        or 0
-    )
-
-    # Subtasks goal (5 subtasks)
-    subtasks_completed = (
-        db.session.query(func.count(Subtask.id))
-        .join(Task)
-        .filter(
-            Task.user_id == user_id,
-            Subtask.status == SubtaskStatus.COMPLETED.value,
-            Subtask.completed_at >= today_start,
-        )
-        .scalar()
-        or 0
-    )
-
-    # Mood check goal (1 check)
-    mood_checks = MoodCheck.query.filter(
-        MoodCheck.user_id == user_id, MoodCheck.created_at >= today_start
-    ).count()
+    today = daily_counters.get_today(user_id)
+    focus_minutes = today["focus_minutes"]  # Goal: 60 min
+    subtasks_completed = today["subtasks_completed"]  # Goal: 5 subtasks
+    mood_checks = today["mood_checks"]  # Goal: 1 check
 
     goals = [
         {
@@ -246,7 +159,7 @@ def get_daily_goals():
 def claim_daily_bonus():
     """Claim daily login bonus."""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    user = get_user(user_id)
 
     today = date.today()
 
@@ -292,7 +205,7 @@ def claim_daily_bonus():
 def get_daily_bonus_status():
     """Check if daily bonus is available."""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    user = get_user(user_id)
 
     today = date.today()
     can_claim = user.last_daily_bonus_date != today
@@ -426,48 +339,22 @@ def get_productivity_patterns():
     """
     user_id = int(get_jwt_identity())
 
-    # Get completed focus sessions from last 30 days
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-
-    completed_sessions = FocusSession.query.filter(
-        FocusSession.user_id == user_id,
-        FocusSession.status == FocusSessionStatus.COMPLETED.value,
-        FocusSession.started_at >= thirty_days_ago,
-    ).all()
-
-    all_sessions = FocusSession.query.filter(
-        FocusSession.user_id == user_id,
-        FocusSession.started_at >= thirty_days_ago,
-    ).all()
-
-    # Analyze hour distribution (0-23)
-    hour_stats = {}
-    for hour in range(24):
-        hour_stats[hour] = {"completed": 0, "total": 0, "total_minutes": 0}
-
-    for session in all_sessions:
-        hour = session.started_at.hour
-        hour_stats[hour]["total"] += 1
-        if session.status == FocusSessionStatus.COMPLETED.value:
-            hour_stats[hour]["completed"] += 1
-            hour_stats[hour]["total_minutes"] += session.actual_duration_minutes or 0
+    # Histograms of the last 30 days, refreshed when focus sessions end
+    patterns = productivity_patterns.get_patterns(user_id)
+    hour_stats = dict(enumerate(patterns.hours))
 
     # Find best hours (hours with highest completion rate and activity)
     best_hours = []
     for hour, stats in hour_stats.items():
-        if stats["total"] >= 2:  # At least 2 sessions to be significant
-            success_rate = (
-                stats["completed"] / stats["total"] if stats["total"] > 0 else 0
-            )
+        if stats["sessions"] >= 2:  # At least 2 sessions to be significant
+            success_rate = stats["completed"] / stats["sessions"]
             avg_minutes = (
-                stats["total_minutes"] / stats["completed"]
-                if stats["completed"] > 0
-                else 0
+                stats["minutes"] / stats["completed"] if stats["completed"] > 0 else 0
             )
             best_hours.append(
                 {
                     "hour": hour,
-                    "sessions": stats["total"],
+                    "sessions": stats["sessions"],
                     "completed": stats["completed"],
                     "success_rate": round(success_rate * 100),
                     "avg_minutes": round(avg_minutes),
@@ -476,8 +363,7 @@ def get_productivity_patterns():
 
     best_hours.sort(key=lambda x: (x["success_rate"], x["sessions"]), reverse=True)
 
-    # Analyze day of week distribution (0=Monday, 6=Sunday)
-    day_stats = {}
+    # Day of week distribution (0=Monday, 6=Sunday)
     lang = get_lang()
     day_names = (
         [
@@ -500,27 +386,19 @@ def get_productivity_patterns():
             "Воскресенье",
         ]
     )
-    for day in range(7):
-        day_stats[day] = {"completed": 0, "total": 0, "total_minutes": 0}
-
-    for session in all_sessions:
-        day = session.started_at.weekday()
-        day_stats[day]["total"] += 1
-        if session.status == FocusSessionStatus.COMPLETED.value:
-            day_stats[day]["completed"] += 1
-            day_stats[day]["total_minutes"] += session.actual_duration_minutes or 0
-
     day_distribution = []
-    for day, stats in day_stats.items():
-        success_rate = stats["completed"] / stats["total"] if stats["total"] > 0 else 0
+    for day, stats in enumerate(patterns.weekdays):
+        success_rate = (
+            stats["completed"] / stats["sessions"] if stats["sessions"] > 0 else 0
+        )
         avg_minutes = (
-            stats["total_minutes"] / stats["completed"] if stats["completed"] > 0 else 0
+            stats["minutes"] / stats["completed"] if stats["completed"] > 0 else 0
         )
         day_distribution.append(
             {
                 "day": day,
                 "day_name": day_names[day],
-                "sessions": stats["total"],
+                "sessions": stats["sessions"],
                 "completed": stats["completed"],
                 "success_rate": round(success_rate * 100),
                 "avg_minutes": round(avg_minutes),
@@ -535,9 +413,9 @@ def get_productivity_patterns():
     )
 
     # Overall statistics
-    total_sessions = len(all_sessions)
-    total_completed = len(completed_sessions)
-    total_minutes = sum(s.actual_duration_minutes or 0 for s in completed_sessions)
+    total_sessions = sum(stats["sessions"] for stats in patterns.hours)
+    total_completed = sum(stats["completed"] for stats in patterns.hours)
+    total_minutes = sum(stats["minutes"] for stats in patterns.hours)
     overall_success_rate = total_completed / total_sessions if total_sessions > 0 else 0
     avg_session_duration = total_minutes / total_completed if total_completed > 0 else 0
 
@@ -556,7 +434,7 @@ def get_productivity_patterns():
 
     return success_response(
         {
-            "period_days": 30,
+            "period_days": patterns.period_days,
             "total_sessions": total_sessions,
             "total_completed": total_completed,
             "total_focus_minutes": total_minutes,
@@ -569,11 +447,14 @@ def get_productivity_patterns():
             "hour_distribution": [
                 {
                     "hour": h,
-                    "sessions": hour_stats[h]["total"],
+                    "sessions": hour_stats[h]["sessions"],
                     "completed": hour_stats[h]["completed"],
                 }
                 for h in range(24)
             ],
+            "time_slots": patterns.time_slots,
+            "best_time_slot": patterns.best_time_slot,
+            "computed_at": patterns.computed_at.isoformat(),
         }
     )
 
@@ -610,13 +491,15 @@ def set_genre():
             {"genre": f"Invalid genre. Choose from: {list(GENRE_THEMES.keys())}"}
         )
 
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = get_profile(user_id)
     if not profile:
         profile = UserProfile(user_id=user_id)
         db.session.add(profile)
 
+    old_genre = profile.favorite_genre
     profile.favorite_genre = genre
     db.session.commit()
+    record_genre_change(old_genre, genre)
 
     lang = get_lang()
     return success_response(
@@ -689,7 +572,7 @@ def get_character():
     character = service.get_or_create_character(user_id)
 
     # Get genre-specific stat names
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = get_profile(user_id)
     genre = profile.favorite_genre if profile else "fantasy"
     if not genre:
         genre = "fantasy"
@@ -954,6 +837,9 @@ def get_battle_history():
 def generate_monster_image(monster_id: int):
     """
     Generate image for a monster that doesn't have one yet.
+
+    With async jobs enabled, returns 202 with {"job": {...}}; poll
+    GET /jobs/<id> for the result.
     """
     from app.models.character import Monster
 
@@ -970,132 +856,96 @@ def generate_monster_image(monster_id: int):
             }
         )
 
-    from app.services.card_battle_service import CardBattleService
+    if jobs_enabled():
+        from app.tasks.card_tasks import generate_monster_image_async
 
-    service = CardBattleService()
-    sprite_url = service._generate_monster_image(monster, monster.genre)
+        try:
+            job = enqueue(
+                generate_monster_image_async,
+                monster_id,
+                owner=int(get_jwt_identity()),
+                kind="monster_image",
+            )
+        except JobLimitExceeded:
+            return too_many_jobs()
+        if job:
+            return success_response({"job": job}, status_code=202)
 
-    if sprite_url:
-        monster.sprite_url = sprite_url
-        db.session.commit()
-        return success_response(
-            {
-                "success": True,
-                "sprite_url": sprite_url,
-            }
-        )
+    from app.services.card_battle_service import CardBattleService
 
-    return success_response({"success": False, "error": "generation_failed"})
+    result = CardBattleService().generate_missing_monster_image(monster_id)
+    return success_response(result)
 
 
-@api_bp.route("/arena/monsters/generate-all-images", methods=["POST"])
-@jwt_required()
-def generate_all_monster_images():
-    """
-    Generate images for all monsters that don't have images yet.
-    This is an admin-like endpoint for batch image generation.
-    """
+def _generate_all_monster_images(owner):
     from app.models.character import Monster
 
-    # Get monsters without images
-    monsters = Monster.query.filter(
+    missing = Monster.query.filter(
         (Monster.sprite_url.is_(None)) | (Monster.sprite_url == "")
-    ).all()
-
-    if not monsters:
+    ).count()
+    if not missing:
         return success_response(
             {
                 "success": True,
                 "message": "All monsters already have images",
                 "generated": 0,
+                "total": 0,
             }
         )
 
+    if jobs_enabled():
+        from app.tasks.card_tasks import generate_monster_images_async
+
+        try:
+            job = enqueue(
+                generate_monster_images_async, owner=owner, kind="monster_images"
+            )
+        except JobLimitExceeded:
+            return too_many_jobs()
+        if job:
+            return success_response({"job": job}, status_code=202)
+
     from app.services.card_battle_service import CardBattleService
 
-    service = CardBattleService()
-    generated = 0
-    failed = 0
-
-    for monster in monsters:
-        sprite_url = service._generate_monster_image(monster, monster.genre)
-        if sprite_url:
-            monster.sprite_url = sprite_url
-            generated += 1
-        else:
-            failed += 1
+    result = CardBattleService().generate_missing_monster_images()
+    return success_response({"success": True, **result})
 
-    db.session.commit()
 
-    return success_response(
-        {
-            "success": True,
-            "generated": generated,
-            "failed": failed,
-            "total": len(monsters),
-        }
-    )
+@api_bp.route("/arena/monsters/generate-all-images", methods=["POST"])
+@jwt_required()
+def generate_all_monster_images():
+    """
+    Generate images for all monsters that don't have images yet.
+    This is an admin-like endpoint for batch image generation.
+
+    With async jobs enabled, returns 202 with {"job": {...}}; the job
+    reports {"done", "total"} progress.
+    """
+    return _generate_all_monster_images(int(get_jwt_identity()))
 
 
 # ============ Monster Image Generation (Admin) ============
 
 
+def _is_bot_request() -> bool:
+    bot_secret = request.headers.get("X-Bot-Secret")
+    expected_secret = current_app.config.get("BOT_SECRET", "")
+    return bool(expected_secret) and bot_secret == expected_secret
+
+
 @api_bp.route("/arena/monsters/generate-images-admin", methods=["POST"])
 def generate_all_monster_images_admin():
     """
     Generate images for all monsters that don't have images yet.
     Protected by BOT_SECRET header for admin panel use.
-    """
-    from flask import request
-
-    # Verify bot secret
-    bot_secret = request.headers.get("X-Bot-Secret")
-    expected_secret = current_app.config.get("BOT_SECRET", "")
 
-    if not expected_secret or bot_secret != expected_secret:
+    With async jobs enabled, returns 202 with {"job": {...}}; poll
+    GET /jobs/<id> with the same header.
+    """
+    if not _is_bot_request():
         return validation_error({"error": "unauthorized"})
 
-    from app.models.character import Monster
-
-    # Get monsters without images
-    monsters = Monster.query.filter(
-        (Monster.sprite_url.is_(None)) | (Monster.sprite_url == "")
-    ).all()
-
-    if not monsters:
-        return success_response(
-            {
-                "success": True,
-                "message": "All monsters already have images",
-                "generated": 0,
-                "total": 0,
-            }
-        )
-
-    from app.services.card_battle_service import CardBattleService
-
-    service = CardBattleService()
-    generated = 0
-    failed = 0
-
-    for monster in monsters:
-        sprite_url = service._generate_monster_image(monster, monster.genre)
-        if sprite_url:
-            monster.sprite_url = sprite_url
-            generated += 1
-        else:
-            failed += 1
-
-    db.session.commit()
-
-    return success_response(
-        {
-            "success": True,
-            "generated": generated,
-            "failed": failed,
-            "total": len(monsters),
-        }
-    )
+    return _generate_all_monster_images(ADMIN_OWNER)
 
 
 @api_bp.route("/arena/monsters/<int:monster_id>/generate-image-admin", methods=["POST"])
@@ -1103,24 +953,20 @@ def generate_single_monster_image_admin(monster_id: int):
     """
     Generate image for a single monster.
     Protected by BOT_SECRET header for admin panel use.
-    """
-    from flask import request
 
-    # Verify bot secret
-    bot_secret = request.headers.get("X-Bot-Secret")
-    expected_secret = current_app.config.get("BOT_SECRET", "")
-
-    if not expected_secret or bot_secret != expected_secret:
+    Runs synchronously: the admin panel paces these calls itself.
+    """
+    if not _is_bot_request():
         return validation_error({"error": "unauthorized"})
 
     from app.models.character import Monster
+    from app.services.card_battle_service import CardBattleService
 
     monster = Monster.query.get(monster_id)
     if not monster:
         return validation_error({"error": "monster_not_found"})
 
-    from app.services.card_battle_service import CardBattleService
-
+    # Regenerates even if the monster already has a sprite
     service = CardBattleService()
     sprite_url = service._generate_monster_image(monster, monster.genre)
 
@@ -1406,8 +1252,15 @@ def preview_card_merge():
 
     from app.models.card import UserCard
 
-    card1 = UserCard.query.filter_by(id=card1_id, user_id=user_id).first()
-    card2 = UserCard.query.filter_by(id=card2_id, user_id=user_id).first()
+    # The only DB access: chances come from the precomputed tables
+    cards = {
+        card.id: card
+        for card in UserCard.query.filter(
+            UserCard.id.in_([card1_id, card2_id]), UserCard.user_id == user_id
+        )
+    }
+    card1 = cards.get(card1_id)
+    card2 = cards.get(card2_id)
 
     if not card1 or not card2:
         return not_found("Card not found")
@@ -1507,7 +1360,7 @@ def get_boss_task_info(task_id: int):
     is_boss = total_time >= 60 or subtask_count >= 5
 
     # Get genre-specific boss info
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = get_profile(user_id)
     genre = profile.favorite_genre if profile else "fantasy"
     if not genre:
         genre = "fantasy"
@@ -1542,54 +1395,11 @@ def get_user_activity_heatmap(user_id: int):
     """
     get_jwt_identity()  # Verify authenticated
 
-    # Get completions for the last 365 days
-    start_date = date.today() - timedelta(days=365)
-
-    # Query completed tasks grouped by completion date
-    task_completions = (
-        db.session.query(
-            func.date(Task.completed_at).label("completion_date"),
-            func.count(Task.id).label("count"),
-        )
-        .filter(
-            Task.user_id == user_id,
-            Task.status == TaskStatus.COMPLETED,
-            Task.completed_at >= start_date,
-        )
-        .group_by(func.date(Task.completed_at))
-        .all()
-    )
-
-    # Query completed subtasks grouped by completion date
-    subtask_completions = (
-        db.session.query(
-            func.date(Subtask.completed_at).label("completion_date"),
-            func.count(Subtask.id).label("count"),
-        )
-        .join(Task, Subtask.task_id == Task.id)
-        .filter(
-            Task.user_id == user_id,
-            Subtask.status == SubtaskStatus.COMPLETED,
-            Subtask.completed_at >= start_date,
-        )
-        .group_by(func.date(Subtask.completed_at))
-        .all()
-    )
-
-    # Combine into a single dict
-    activity = {}
-    for row in task_completions:
-        if row.completion_date:
-            date_str = row.completion_date.isoformat()
-            activity[date_str] = activity.get(date_str, 0) + row.count
-
-    for row in subtask_completions:
-        if row.completion_date:
-            date_str = row.completion_date.isoformat()
-            activity[date_str] = activity.get(date_str, 0) + row.count
+    # Completions for the last 365 days
+    activity = activity_heatmap.get_activity(user_id)
 
     # Get user info
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         return not_found("User not found")
 
@@ -0,0 +1,47 @@
+"""Async job status API."""
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from app.api import api_bp
+from app.services.jobs import ADMIN_OWNER, get_job
+from app.utils import not_found, success_response, unauthorized
+
+
+@api_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id: str):
+    """
+    Get the state of a background job started by an endpoint (202 responses).
+
+    Requires the JWT of the user who started it, or the X-Bot-Secret header
+    for admin jobs.
+
+    Returns:
+    {
+        "job": {
+            "id": "...",
+            "kind": "decompose|card_image|monster_image|monster_images",
+            "status": "queued|running|succeeded|failed",
+            "progress": {"done": 3, "total": 10},  // running jobs that report it
+            "result": {...},  // succeeded: the payload the sync endpoint returns
+            "error": "..."  // failed
+        }
+    }
+    """
+    bot_secret = request.headers.get("X-Bot-Secret")
+    expected_secret = current_app.config.get("BOT_SECRET", "")
+
+    if expected_secret and bot_secret == expected_secret:
+        owner = ADMIN_OWNER
+    else:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity is None:
+            return unauthorized()
+        owner = int(identity)
+
+    job = get_job(job_id, owner)
+    if not job:
+        return not_found("Job not found")
+
+    return success_response({"job": job})
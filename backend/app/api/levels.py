@@ -6,9 +6,8 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app import db
 from app.api import api_bp
-from app.models.user import User
-from app.models.user_profile import UserProfile
 from app.services.level_service import LevelService
+from app.utils.identity import get_profile, get_user
 from app.utils.response import success_response
 
 logger = logging.getLogger(__name__)
@@ -42,7 +41,7 @@ def catch_up_level_rewards():
     Also handles retroactive energy limit increases.
     """
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         return success_response({"has_rewards": False, "rewards": [], "new_level": 1})
 
@@ -69,7 +68,7 @@ def catch_up_level_rewards():
 
     # Check if user needs retroactive energy limit increase
     try:
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if profile:
             db.session.refresh(profile)  # Get fresh data after grant_level_rewards
         if profile and (profile.energy_limit_updated_to_level or 0) < current_level:
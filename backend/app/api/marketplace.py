@@ -4,9 +4,9 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app.api import api_bp
-from app.models import User
 from app.services.marketplace_service import MarketplaceService
 from app.utils import not_found, success_response, validation_error
+from app.utils.identity import get_user
 
 # ============ Listings ============
 
@@ -206,7 +206,7 @@ def get_marketplace_balance():
     """Get user's Sparks balance."""
     user_id = int(get_jwt_identity())
 
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         return not_found("Пользователь не найден")
 
@@ -4,13 +4,14 @@ from datetime import date, datetime, timedelta
 
 from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import func
 
 from app import db
 from app.api import api_bp
-from app.models import MoodCheck, User, UserActivityLog
+from app.models import MoodCheck, UserActivityLog
 from app.services import AchievementChecker, XPCalculator
+from app.services.mood_stats_service import BUCKETS, MoodStatsService
 from app.utils import success_response, validation_error
+from app.utils.identity import get_user
 
 
 @api_bp.route("/mood", methods=["POST"])
@@ -57,9 +58,10 @@ def create_mood_check():
     )
 
     db.session.add(mood_check)
+    MoodStatsService().record_check(mood_check)
 
     # Award XP
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     xp_info = user.add_xp(XPCalculator.mood_check())
     user.update_streak()
 
@@ -132,37 +134,23 @@ def get_mood_history():
         .all()
     )
 
-    # Group by date
-    history = {}
+    # Group by date; daily averages come from the rollups
+    checks_by_day: dict[str, list] = {}
     for check in mood_checks:
-        check_date = check.created_at.date().isoformat()
-        if check_date not in history:
-            history[check_date] = {
-                "date": check_date,
-                "checks": [],
-                "mood_sum": 0,
-                "energy_sum": 0,
-                "count": 0,
-            }
-
-        history[check_date]["checks"].append(check.to_dict())
-        history[check_date]["mood_sum"] += check.mood
-        history[check_date]["energy_sum"] += check.energy
-        history[check_date]["count"] += 1
-
-    # Calculate averages
-    result = []
-    for day_data in history.values():
-        count = day_data["count"]
-        result.append(
-            {
-                "date": day_data["date"],
-                "checks": day_data["checks"],
-                "average_mood": round(day_data["mood_sum"] / count, 1),
-                "average_energy": round(day_data["energy_sum"] / count, 1),
-            }
+        checks_by_day.setdefault(check.created_at.date().isoformat(), []).append(
+            check.to_dict()
         )
 
+    result = [
+        {
+            "date": rollup.day.isoformat(),
+            "checks": checks_by_day.get(rollup.day.isoformat(), []),
+            "average_mood": rollup.average_mood,
+            "average_energy": rollup.average_energy,
+        }
+        for rollup in MoodStatsService().get_daily_rollups(user_id, start_date.date())
+    ]
+
     # Sort by date descending
     result.sort(key=lambda x: x["date"], reverse=True)
 
@@ -175,41 +163,39 @@ def get_mood_stats():
     """Get mood statistics."""
     user_id = int(get_jwt_identity())
 
-    # Overall averages
-    overall = (
-        db.session.query(
-            func.avg(MoodCheck.mood).label("avg_mood"),
-            func.avg(MoodCheck.energy).label("avg_energy"),
-            func.count(MoodCheck.id).label("total_checks"),
-        )
-        .filter(MoodCheck.user_id == user_id)
-        .first()
-    )
+    return success_response(MoodStatsService().get_stats(user_id))
 
-    # Last 7 days averages
-    week_ago = datetime.combine(date.today() - timedelta(days=6), datetime.min.time())
 
-    weekly = (
-        db.session.query(
-            func.avg(MoodCheck.mood).label("avg_mood"),
-            func.avg(MoodCheck.energy).label("avg_energy"),
-            func.count(MoodCheck.id).label("total_checks"),
-        )
-        .filter(MoodCheck.user_id == user_id, MoodCheck.created_at >= week_ago)
-        .first()
-    )
+@api_bp.route("/mood/series", methods=["GET"])
+@jwt_required()
+def get_mood_series():
+    """
+    Get mood and energy as a time series.
+
+    Query params:
+    - bucket: day, week or month (default day)
+    - days: number of days to include, ending today (default 30, max 730)
+    """
+    user_id = int(get_jwt_identity())
+
+    bucket = request.args.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return validation_error({"bucket": f"Bucket must be one of {list(BUCKETS)}"})
+    try:
+        days = max(1, min(int(request.args.get("days", 30)), 730))
+    except ValueError:
+        return validation_error({"days": "days must be an integer"})
+
+    # Rollups are keyed by UTC day
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    series = MoodStatsService().get_series(user_id, bucket, start, end)
 
     return success_response(
         {
-            "overall": {
-                "average_mood": round(float(overall.avg_mood or 0), 1),
-                "average_energy": round(float(overall.avg_energy or 0), 1),
-                "total_checks": overall.total_checks or 0,
-            },
-            "weekly": {
-                "average_mood": round(float(weekly.avg_mood or 0), 1),
-                "average_energy": round(float(weekly.avg_energy or 0), 1),
-                "total_checks": weekly.total_checks or 0,
-            },
+            "bucket": bucket,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "series": series,
         }
     )
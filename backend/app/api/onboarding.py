@@ -1,20 +1,13 @@
 """Onboarding API endpoints."""
 
-import logging
-from datetime import datetime
-
 from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app import db
 from app.api import api_bp
-from app.models import ActivityType, User, UserActivityLog
 from app.models.user_profile import UserProfile
-from app.services.card_service import CardService
-from app.services.profile_analyzer import ProfileAnalyzer
-from app.utils import not_found, success_response, validation_error
-
-logger = logging.getLogger(__name__)
+from app.services import onboarding_service
+from app.utils import identity, not_found, success_response, validation_error
 
 
 @api_bp.route("/onboarding/status", methods=["GET"])
@@ -23,7 +16,7 @@ def get_onboarding_status():
     """Check if user has completed onboarding."""
     user_id = int(get_jwt_identity())
 
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = identity.get_profile(user_id)
 
     return success_response(
         {
@@ -54,105 +47,29 @@ def complete_onboarding():
     if not data:
         return validation_error({"body": "Request body is required"})
 
-    # Get or create profile
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
-    if not profile:
-        profile = UserProfile(user_id=user_id)
-        db.session.add(profile)
+    # Rule-based profile now; GPT analysis and cards come with the welcome
+    # bundle (poll /onboarding/welcome-bundle while it is "pending")
+    profile = onboarding_service.complete_onboarding(user_id, data)
 
-    # Analyze with GPT
-    analyzer = ProfileAnalyzer()
-    analysis = analyzer.analyze_onboarding(data, user_id=user_id)
+    return success_response(onboarding_service.get_welcome_bundle(profile))
 
-    # Update profile
-    profile.productivity_type = analysis.get("productivity_type")
-    profile.preferred_time = analysis.get("preferred_time", data.get("productive_time"))
-    profile.work_style = analysis.get("work_style")
-    profile.favorite_task_types = analysis.get(
-        "favorite_task_types", data.get("favorite_tasks")
-    )
-    profile.main_challenges = analysis.get("main_challenges", data.get("challenges"))
-    profile.productivity_goals = data.get("goals")
-    profile.gpt_analysis = analysis
-    profile.preferred_session_duration = analysis.get(
-        "recommended_session_duration", 25
-    )
-    profile.onboarding_completed = True
-    profile.onboarding_completed_at = datetime.utcnow()
-
-    # Log activity
-    UserActivityLog.log(
-        user_id=user_id,
-        action_type=ActivityType.ONBOARDING_COMPLETE,
-        action_details=f"Type: {profile.productivity_type}, Style: {profile.work_style}",
-    )
 
-    db.session.commit()
-
-    # Generate onboarding companion card
-    onboarding_card = None
-    try:
-        card_service = CardService()
-        onboarding_card = card_service.generate_onboarding_card(user_id)
-    except Exception as e:
-        logger.error(f"Failed to generate onboarding card: {e}")
-
-    # Handle referral rewards
-    referral_rewards = {}
-    user = User.query.get(user_id)
-
-    if user and user.referred_by and not user.referral_reward_given:
-        try:
-            card_service = CardService()
-
-            # Give starter deck to new user (3 cards, max rare)
-            starter_deck = card_service.generate_starter_deck(user_id)
-            if starter_deck:
-                referral_rewards["starter_deck"] = [c.to_dict() for c in starter_deck]
-                logger.info(
-                    f"Gave starter deck to user {user_id}: {len(starter_deck)} cards"
-                )
-
-            # Give rare+ card to referrer
-            referrer_card = card_service.generate_referral_reward(user.referred_by)
-            if referrer_card:
-                referral_rewards["referrer_rewarded"] = True
-                referral_rewards["referrer_card_rarity"] = referrer_card.rarity
-                logger.info(
-                    f"Gave referral reward to user {user.referred_by}: "
-                    f"{referrer_card.name} ({referrer_card.rarity})"
-                )
-
-            # Mark reward as given
-            user.referral_reward_given = True
-            db.session.commit()
-        except Exception as e:
-            logger.error(f"Failed to give referral rewards: {e}")
-
-    # Generate personalized message
-    welcome_message = analyzer.get_personalized_message(analysis)
-
-    response_data = {
-        "profile": profile.to_dict(),
-        "analysis": {
-            "productivity_type": analysis.get("productivity_type"),
-            "work_style": analysis.get("work_style"),
-            "personalized_tips": analysis.get("personalized_tips", []),
-            "motivation_style": analysis.get("motivation_style", "gentle"),
-            "recommended_session_duration": analysis.get(
-                "recommended_session_duration", 25
-            ),
-        },
-        "welcome_message": welcome_message,
-    }
+@api_bp.route("/onboarding/welcome-bundle", methods=["GET"])
+@jwt_required()
+def get_welcome_bundle():
+    """
+    Get the welcome bundle built after onboarding.
 
-    if onboarding_card:
-        response_data["onboarding_card"] = onboarding_card.to_dict()
+    ``welcome_bundle_status`` is "pending" until the GPT analysis and the
+    welcome cards are ready; the cards are included once it is "ready".
+    """
+    user_id = int(get_jwt_identity())
 
-    if referral_rewards:
-        response_data["referral_rewards"] = referral_rewards
+    profile = identity.get_profile(user_id)
+    if not profile or not profile.onboarding_completed:
+        return not_found("Onboarding not completed")
 
-    return success_response(response_data)
+    return success_response(onboarding_service.get_welcome_bundle(profile))
 
 
 @api_bp.route("/onboarding/profile", methods=["GET"])
@@ -161,7 +78,7 @@ def get_profile():
     """Get user's productivity profile."""
     user_id = int(get_jwt_identity())
 
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = identity.get_profile(user_id)
     if not profile:
         return not_found("Profile not found. Please complete onboarding.")
 
@@ -188,7 +105,7 @@ def update_profile():
     user_id = int(get_jwt_identity())
     data = request.get_json() or {}
 
-    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    profile = identity.get_profile(user_id)
     if not profile:
         profile = UserProfile(user_id=user_id)
         db.session.add(profile)
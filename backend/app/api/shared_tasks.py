@@ -10,6 +10,7 @@ from app import db
 from app.models import Friendship, SharedTask, SharedTaskStatus, Task, User
 from app.models.task import TaskStatus
 from app.utils import not_found, success_response, validation_error
+from app.utils.identity import get_user
 from app.utils.notifications import send_telegram_message
 
 logger = logging.getLogger(__name__)
@@ -79,7 +80,7 @@ def share_task(task_id: int):
 
     # Send Telegram notification
     try:
-        owner = User.query.get(user_id)
+        owner = get_user(user_id)
         friend = User.query.get(friend_id)
         if friend and friend.telegram_id:
             owner_name = owner.first_name or "Друг"
@@ -182,7 +183,7 @@ def decline_shared_task(shared_id: int):
 
     # Notify owner
     try:
-        assignee = User.query.get(user_id)
+        assignee = get_user(user_id)
         owner = User.query.get(shared.owner_id)
         if owner and owner.telegram_id:
             name = assignee.first_name or "Друг"
@@ -216,7 +217,7 @@ def ping_shared_task(shared_id: int):
 
     # Notify owner via Telegram
     try:
-        assignee = User.query.get(user_id)
+        assignee = get_user(user_id)
         owner = User.query.get(shared.owner_id)
         if owner and owner.telegram_id:
             name = assignee.first_name or "Друг"
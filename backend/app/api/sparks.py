@@ -8,7 +8,8 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app import db
 from app.api import api_bp
-from app.models import SPARKS_PACKS, SparksTransaction, TonDeposit, User
+from app.models import SPARKS_PACKS, SparksTransaction, TonDeposit
+from app.utils.identity import get_user
 from app.utils.response import error_response, success_response
 
 
@@ -49,7 +50,7 @@ def create_invoice_link(
 def get_user_sparks_balance():
     """Get user's sparks balance and recent transactions."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -95,7 +96,7 @@ def get_sparks_packs():
 def buy_sparks_pack():
     """Create invoice link for buying sparks pack with Telegram Stars."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -128,7 +129,7 @@ def buy_sparks_pack():
 def save_wallet_address():
     """Save user's TON wallet address."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -158,7 +159,7 @@ def save_wallet_address():
 def disconnect_wallet():
     """Disconnect user's TON wallet."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -173,7 +174,7 @@ def disconnect_wallet():
 def get_deposit_info():
     """Get information for making a TON deposit."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -200,7 +201,7 @@ def get_deposit_info():
 def get_deposits():
     """Get user's TON deposit history."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -219,7 +220,7 @@ def get_deposits():
 def get_sparks_transactions():
     """Get user's sparks transaction history."""
     user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+    current_user = get_user(user_id)
     if not current_user:
         return error_response("User not found", 404)
 
@@ -252,7 +253,7 @@ def credit_sparks(
     reference_id: int = None,
 ) -> SparksTransaction:
     """Helper function to credit sparks to a user."""
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         raise ValueError(f"User {user_id} not found")
 
@@ -281,7 +282,7 @@ def debit_sparks(
     reference_id: int = None,
 ) -> SparksTransaction | None:
     """Helper function to debit sparks from a user. Returns None if insufficient."""
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         raise ValueError(f"User {user_id} not found")
 
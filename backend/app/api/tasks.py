@@ -1,43 +1,47 @@
 """Tasks API endpoints."""
 
+import json
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 
-from flask import request
+from flask import Response, request, stream_with_context
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app import db
 from app.api import api_bp
 from app.models import (
     FriendActivityLog,
-    MoodCheck,
     PostponeLog,
     SharedTask,
     SharedTaskStatus,
     Subtask,
     Task,
-    User,
     UserActivityLog,
-    UserProfile,
 )
 from app.models.card import CardRarity
 from app.models.subtask import SubtaskStatus
-from app.models.task import TaskPriority, TaskStatus
-from app.services import AchievementChecker, AIDecomposer, TaskClassifier, XPCalculator
+from app.models.task import TaskEnrichmentStatus, TaskPriority, TaskStatus
+from app.services import AchievementChecker, TaskClassifier, XPCalculator
 from app.services.card_service import (
     COMPANION_XP_BY_DIFFICULTY,
     CardService,
     get_rarity_odds,
 )
+from app.services.jobs import JobLimitExceeded, enqueue, jobs_enabled
+from app.services.productivity_patterns import get_best_time_slot
 from app.services.streak_service import StreakService
+from app.services.task_enrichment import queue_enrichment
 from app.services.task_service import (
     MIN_TASK_TIME_FOR_CARD,
     auto_postpone_overdue_tasks,
     calculate_task_score,
+    decompose_into_subtasks,
     get_current_time_slot,
     should_skip_time_check_for_card,
+    stream_decomposition,
 )
-from app.utils import not_found, success_response, validation_error
+from app.utils import not_found, success_response, too_many_jobs, validation_error
+from app.utils.identity import get_profile, get_user
 
 logger = logging.getLogger(__name__)
 
@@ -114,18 +118,21 @@ def get_tasks():
         all_tasks = query.all()
 
         # Get user profile for favorite task types
-        user_profile = UserProfile.query.filter_by(user_id=user_id).first()
+        user_profile = get_profile(user_id)
         favorite_types = user_profile.favorite_task_types if user_profile else None
 
-        # Get current time slot and today's date
+        # Get current time slot, the user's most productive one and today's date
         current_time_slot = get_current_time_slot()
+        productive_slot = get_best_time_slot(user_id)
         today = date.today()
 
         # Sort by score (desc), due_date (asc), created_at (desc - newer first)
         sorted_tasks = sorted(
             all_tasks,
             key=lambda t: (
-                -calculate_task_score(t, current_time_slot, favorite_types, today),
+                -calculate_task_score(
+                    t, current_time_slot, favorite_types, today, productive_slot
+                ),
                 t.due_date or date.max,
                 -t.created_at.timestamp() if t.created_at else 0,
             ),
@@ -155,7 +162,10 @@ def create_task():
         "due_date": "YYYY-MM-DD"  // optional, defaults to today
     }
 
-    Note: If priority is not provided, AI will analyze the task and set difficulty automatically.
+    Note: The task is created with a keyword/heuristic classification (type,
+    preferred time and, if priority is not provided, difficulty) and
+    enrichment_status "pending". The AI classification is patched in by a
+    background job; poll GET /tasks/changes or refetch the task to get it.
     """
     user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -172,40 +182,20 @@ def create_task():
 
     description = data.get("description")
 
-    # Combined AI call: classify task type, preferred time, AND difficulty
-    priority = data.get("priority")
-    ai_difficulty = None
-    ai_task_type = None
-    ai_preferred_time = None
-
-    try:
-        classifier = TaskClassifier()
-        classification = classifier.classify_and_rate_task(
-            title, description, user_id=user_id
-        )
-        ai_difficulty = classification["difficulty"]
-        ai_task_type = classification.get("task_type")
-        ai_preferred_time = classification.get("preferred_time")
-    except Exception:
-        ai_difficulty = "medium"
+    # Instant heuristic classification; the AI one is patched in afterwards
+    classifier = TaskClassifier()
+    heuristic = classifier.heuristic_classify(title, description)
+    difficulty = heuristic["difficulty"]
+    # Fields still holding heuristic values that the AI may replace
+    replaceable = ["task_type"]
 
+    priority = data.get("priority")
     if not priority or priority not in [p.value for p in TaskPriority]:
-        # Map AI difficulty to priority
-        difficulty_to_priority = {
-            "easy": TaskPriority.LOW.value,
-            "medium": TaskPriority.MEDIUM.value,
-            "hard": TaskPriority.HIGH.value,
-            "very_hard": TaskPriority.HIGH.value,
-        }
-        priority = difficulty_to_priority.get(ai_difficulty, TaskPriority.MEDIUM.value)
+        priority = TaskClassifier.DIFFICULTY_TO_PRIORITY[difficulty]
+        replaceable += ["difficulty", "priority"]
     else:
         # Map user-provided priority to difficulty for card generation
-        priority_to_difficulty = {
-            TaskPriority.LOW.value: "easy",
-            TaskPriority.MEDIUM.value: "medium",
-            TaskPriority.HIGH.value: "hard",
-        }
-        ai_difficulty = priority_to_difficulty.get(priority, "medium")
+        difficulty = TaskClassifier.PRIORITY_TO_DIFFICULTY[priority]
 
     # Parse due_date (allow null for tasks without deadline)
     due_date_value = None
@@ -237,9 +227,10 @@ def create_task():
         except ValueError:
             pass
 
-    # Use AI-classified preferred_time if user didn't provide one
-    if not preferred_time and ai_preferred_time:
-        preferred_time = ai_preferred_time
+    # Use the classified preferred_time if user didn't provide one
+    if not preferred_time:
+        preferred_time = heuristic["preferred_time"]
+        replaceable.append("preferred_time")
 
     task = Task(
         user_id=user_id,
@@ -250,13 +241,19 @@ def create_task():
         original_due_date=due_date_value,
         preferred_time=preferred_time,
         scheduled_at=scheduled_at,
-        difficulty=ai_difficulty,
-        task_type=ai_task_type,
+        difficulty=difficulty,
+        task_type=heuristic["task_type"],
+        enrichment_status=(
+            TaskEnrichmentStatus.PENDING.value if classifier.client else None
+        ),
     )
 
     db.session.add(task)
     db.session.commit()
 
+    if task.enrichment_status:
+        queue_enrichment(task, heuristic, replaceable)
+
     try:
         UserActivityLog.log(
             user_id=user_id,
@@ -272,12 +269,59 @@ def create_task():
     return success_response(
         {
             "task": task.to_dict(),
-            "ai_difficulty": ai_difficulty,
+            "ai_difficulty": task.difficulty,
         },
         status_code=201,
     )
 
 
+@api_bp.route("/tasks/changes", methods=["GET"])
+@jwt_required()
+def get_task_changes():
+    """
+    Change feed: tasks of current user updated after a point in time.
+
+    Used to pick up background updates such as the AI classification of new
+    tasks (enrichment_status "pending" -> "done").
+
+    Query params:
+    - since: ISO timestamp, usually the cursor of the previous response
+    - limit: max results (default 100, max 500)
+
+    Returns tasks oldest change first and a cursor for the next call.
+    """
+    user_id = int(get_jwt_identity())
+
+    since_str = request.args.get("since")
+    if not since_str:
+        return validation_error({"since": "since is required"})
+    try:
+        since = datetime.fromisoformat(since_str.replace("Z", "+00:00"))
+    except ValueError:
+        return validation_error({"since": "Invalid ISO timestamp"})
+    if since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    limit = min(request.args.get("limit", 100, type=int), 500)
+
+    tasks = (
+        Task.query.filter(Task.user_id == user_id, Task.updated_at > since)
+        .order_by(Task.updated_at)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+
+    return success_response(
+        {
+            "tasks": [t.to_dict() for t in tasks],
+            "cursor": (tasks[-1].updated_at if tasks else since).isoformat(),
+            "has_more": has_more,
+        }
+    )
+
+
 @api_bp.route("/tasks/<int:task_id>", methods=["GET"])
 @jwt_required()
 def get_task(task_id: int):
@@ -423,7 +467,7 @@ def update_task(task_id: int):
         ).all():
             st.complete()
 
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         xp_info = user.add_xp(XPCalculator.task_completed())
         user.update_streak()
 
@@ -454,7 +498,6 @@ def update_task(task_id: int):
         except Exception:
             # Card generation is optional, don't fail task completion
             companion_xp_result = None
-            pass
 
         db.session.commit()
 
@@ -589,6 +632,9 @@ def decompose_task(task_id: int):
     {
         "mood_id": 5  // optional, uses latest mood if not provided
     }
+
+    With async jobs enabled, returns 202 with {"job": {...}}; poll
+    GET /jobs/<id> for the result.
     """
     user_id = int(get_jwt_identity())
 
@@ -597,81 +643,66 @@ def decompose_task(task_id: int):
         return not_found("Task not found")
 
     data = request.get_json() or {}
-
-    # Get mood check
     mood_id = data.get("mood_id")
-    if mood_id:
-        mood_check = MoodCheck.query.filter_by(id=mood_id, user_id=user_id).first()
-    else:
-        mood_check = (
-            MoodCheck.query.filter_by(user_id=user_id)
-            .order_by(MoodCheck.created_at.desc())
-            .first()
-        )
 
-    if not mood_check:
-        # Use default strategy if no mood
-        strategy = "standard"
-        mood_value = None
-        energy_value = None
-    else:
-        strategy = mood_check.decomposition_strategy
-        mood_value = mood_check.mood
-        energy_value = mood_check.energy
-
-    # Count existing subtasks
-    existing_subtasks = Subtask.query.filter_by(task_id=task.id).all()
-    existing_count = len(existing_subtasks)
-
-    # Decompose task with type context and user state
-    decomposer = AIDecomposer()
-    result = decomposer.decompose_task(
-        task.title,
-        task.description,
-        strategy,
-        task.task_type,
-        mood=mood_value,
-        energy=energy_value,
-        existing_subtasks_count=existing_count,
-        user_id=user_id,
-    )
+    if jobs_enabled():
+        from app.tasks.ai_tasks import decompose_task_async
 
-    # Handle no_new_steps response
-    if result.get("no_new_steps"):
-        return success_response(
-            {
-                "subtasks": [s.to_dict() for s in existing_subtasks],
-                "strategy": strategy,
-                "no_new_steps": True,
-                "message": result.get(
-                    "reason", "Задача уже разбита на достаточное количество шагов"
-                ),
-            }
-        )
+        try:
+            job = enqueue(
+                decompose_task_async,
+                task.id,
+                user_id,
+                mood_id,
+                owner=user_id,
+                kind="decompose",
+            )
+        except JobLimitExceeded:
+            return too_many_jobs()
+        if job:
+            return success_response({"job": job}, status_code=202)
 
-    # Clear existing subtasks and create new ones
-    Subtask.query.filter_by(task_id=task.id).delete()
-
-    # Create subtasks
-    subtasks = []
-    for subtask_info in result["subtasks"]:
-        subtask = Subtask(
-            task_id=task.id,
-            title=subtask_info["title"],
-            estimated_minutes=subtask_info["estimated_minutes"],
-            order=subtask_info["order"],
-        )
-        db.session.add(subtask)
-        subtasks.append(subtask)
+    return success_response(decompose_into_subtasks(task, user_id, mood_id))
 
-    db.session.commit()
 
-    return success_response(
-        {
-            "subtasks": [s.to_dict() for s in subtasks],
-            "strategy": strategy,
-            "message": decomposer.get_strategy_message(strategy),
-        }
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@api_bp.route("/tasks/<int:task_id>/decompose/stream", methods=["POST"])
+@jwt_required()
+def decompose_task_stream(task_id: int):
+    """
+    AI-decompose a task, streaming subtasks as server-sent events.
+
+    Same request body as /tasks/<id>/decompose. Events:
+    - subtask: a saved subtask, as soon as the model has written it
+    - done: {"strategy", "message"} (plus "no_new_steps" and the existing
+      "subtasks" if the task needs no more steps)
+    - error: {"message"} if decomposition failed midway
+    """
+    user_id = int(get_jwt_identity())
+
+    task = Task.query.filter_by(id=task_id, user_id=user_id).first()
+    if not task:
+        return not_found("Task not found")
+
+    mood_id = (request.get_json(silent=True) or {}).get("mood_id")
+
+    def generate():
+        try:
+            for event, payload in stream_decomposition(task, user_id, mood_id):
+                yield _sse(event, payload)
+        except Exception as e:
+            logger.error(f"Streaming decomposition failed for task {task_id}: {e}")
+            db.session.rollback()
+            yield _sse("error", {"message": "Decomposition failed"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Disable nginx response buffering for this stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -871,7 +902,7 @@ def update_subtask(subtask_id: int):
     )
 
     if was_completed:
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         xp_earned = XPCalculator.subtask_completed()
         task = subtask.task
 
@@ -910,7 +941,6 @@ def update_subtask(subtask_id: int):
             except Exception:
                 # Card generation is optional, don't fail task completion
                 companion_xp_result = None
-                pass
 
         xp_info = user.add_xp(xp_earned)
         user.update_streak()
@@ -1066,7 +1096,7 @@ def get_task_suggestions():
     include_subtasks = request.args.get("include_subtasks", "true").lower() != "false"
 
     # Get user profile for preferences
-    user_profile = UserProfile.query.filter_by(user_id=user_id).first()
+    user_profile = get_profile(user_id)
     favorite_types = user_profile.favorite_task_types if user_profile else None
     current_time_slot = get_current_time_slot()
     today = date.today()
@@ -1,8 +1,18 @@
 """Celery application configuration."""
 
 import os
+import time
 
 from celery import Celery
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_revoked,
+    task_success,
+    worker_process_shutdown,
+    worker_ready,
+)
 
 # Create Celery app
 celery = Celery(
@@ -13,6 +23,9 @@ celery = Celery(
         "app.tasks.ai_tasks",
         "app.tasks.notification_tasks",
         "app.tasks.card_tasks",
+        "app.tasks.friend_tasks",
+        "app.tasks.onboarding_tasks",
+        "app.tasks.stats_tasks",
     ],
 )
 
@@ -31,12 +44,103 @@ celery.conf.update(
     task_reject_on_worker_lost=True,
     result_expires=3600,  # Results expire after 1 hour
     broker_connection_retry_on_startup=True,
+    beat_schedule={
+        "replenish-card-pool": {
+            "task": "app.tasks.card_tasks.replenish_card_pool",
+            "schedule": 300.0,  # Every 5 minutes
+        },
+        "reconcile-genre-stats": {
+            "task": "app.tasks.card_tasks.reconcile_genre_stats",
+            "schedule": 3600.0,  # Hourly
+        },
+        "reconcile-daily-counters": {
+            "task": "app.tasks.stats_tasks.reconcile_daily_counters",
+            "schedule": 6 * 3600.0,  # Every 6 hours
+        },
+        "refresh-productivity-patterns": {
+            "task": "app.tasks.stats_tasks.refresh_productivity_patterns",
+            "schedule": 900.0,  # Every 15 minutes
+        },
+    },
 )
 
+# task_id -> start time, for task duration metrics
+_task_start_times: dict[str, float] = {}
+
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_start_times[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    from app.metrics import CELERY_TASK_DURATION
+
+    started = _task_start_times.pop(task_id, None)
+    if started is None or task is None:
+        return
+    CELERY_TASK_DURATION.labels(task=task.name, state=state or "UNKNOWN").observe(
+        time.perf_counter() - started
+    )
+
+
+def _release_job_slot(task_id: str | None) -> None:
+    """Free the owner's job slot once a job reached a final state."""
+    if not task_id:
+        return
+    from app.services.jobs import release
+
+    release(task_id)
+
+
+# Only final states: an attempt ending in self.retry() keeps the slot
+@task_success.connect
+def _release_on_success(sender=None, **kwargs):
+    _release_job_slot(sender.request.id if sender else None)
+
+
+@task_failure.connect
+def _release_on_failure(task_id=None, **kwargs):
+    _release_job_slot(task_id)
+
+
+@task_revoked.connect
+def _release_on_revoked(request=None, **kwargs):
+    _release_job_slot(request.id if request else None)
+
+
+@worker_ready.connect
+def _start_metrics_server(**kwargs):
+    """Serve worker metrics for Prometheus (aggregated over pool processes)."""
+    port = os.environ.get("CELERY_METRICS_PORT")
+    if not port:
+        return
+    from prometheus_client import start_http_server
+
+    from app.metrics import build_registry
+
+    start_http_server(int(port), registry=build_registry())
+
+
+@worker_process_shutdown.connect
+def _mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
+
 
 def init_celery(app):
     """Initialize Celery with Flask app context."""
-    celery.conf.update(app.config)
+    # Only the Celery settings: the uppercase Flask keys would clash with
+    # Celery's own setting names
+    celery.conf.update(
+        broker_url=app.config.get("CELERY_BROKER_URL", celery.conf.broker_url),
+        result_backend=app.config.get(
+            "CELERY_RESULT_BACKEND", celery.conf.result_backend
+        ),
+    )
 
     class ContextTask(celery.Task):
         """Task that runs within Flask app context."""
@@ -204,6 +204,24 @@ def translate_json_dialogues(dialogues, translate_func):
     return dialogues
 
 
+@click.group()
+def activity():
+    """Activity heatmap commands."""
+    pass
+
+
+@activity.command()
+@click.option("--user-id", type=int, help="Only rebuild this user's heatmap")
+@with_appcontext
+def backfill(user_id):
+    """Rebuild year activity heatmaps from the daily activity counters."""
+    from app.services import activity_heatmap
+
+    rows = activity_heatmap.backfill(user_id)
+    click.echo(f"Wrote {rows} activity year rows")
+
+
 def init_app(app):
     """Register CLI commands with the app."""
     app.cli.add_command(translate)
+    app.cli.add_command(activity)
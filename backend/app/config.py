@@ -58,12 +58,47 @@ class Config:
     ADMIN_TELEGRAM_IDS = [
         int(x) for x in os.environ.get("ADMIN_IDS", "").split(",") if x.strip()
     ]
+    # initData older than this is rejected (seconds, 0 = no limit)
+    TELEGRAM_AUTH_MAX_AGE = int(os.environ.get("TELEGRAM_AUTH_MAX_AGE", 86400))
+    # Invite-link referrals of existing users are processed in Celery
+    DEFER_REFERRALS = True
+    # New tasks get a heuristic classification; the AI one is patched in by Celery
+    DEFER_TASK_ENRICHMENT = True
+    # Onboarding saves a rule-based profile; GPT analysis and cards follow in Celery
+    DEFER_WELCOME_BUNDLE = True
+    # Slow endpoints (decomposition, image generation) return a job id
+    ASYNC_JOBS = os.environ.get("ASYNC_JOBS", "1").lower() in ("1", "true")
+    JOBS_MAX_ACTIVE = int(os.environ.get("JOBS_MAX_ACTIVE", 3))  # Per user
 
     # Error alerting
     ERROR_ALERT_THRESHOLD = 10  # Alert after 10 5xx errors
     ERROR_ALERT_WINDOW = 300  # Within 5 minutes
     ERROR_ALERT_COOLDOWN = 600  # Don't alert more than once per 10 minutes
 
+    # SQL instrumentation (per-request statement counts, N+1 detection)
+    SQL_INSTRUMENTATION = os.environ.get("SQL_INSTRUMENTATION", "").lower() in (
+        "1",
+        "true",
+    )
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
+
+    # Card pool pre-warming: drops are served from stock while the Celery
+    # replenisher grows template pools and the legendary reserve
+    CARD_POOL_PREWARM = os.environ.get("CARD_POOL_PREWARM", "1").lower() in (
+        "1",
+        "true",
+    )
+    CARD_POOL_BATCH_SIZE = int(os.environ.get("CARD_POOL_BATCH_SIZE", 5))
+    LEGENDARY_RESERVE_SIZE = int(os.environ.get("LEGENDARY_RESERVE_SIZE", 5))
+
+    # Daily monster generation: worker pool and per-provider limits
+    MONSTER_GENERATION_WORKERS = int(os.environ.get("MONSTER_GENERATION_WORKERS", 6))
+    MONSTER_GENERATION_ATTEMPTS = 2  # Per OpenAI/Stability call
+    MONSTER_OPENAI_CONCURRENCY = int(os.environ.get("MONSTER_OPENAI_CONCURRENCY", 3))
+    MONSTER_OPENAI_PER_MINUTE = None  # None = no spacing between calls
+    MONSTER_IMAGE_CONCURRENCY = int(os.environ.get("MONSTER_IMAGE_CONCURRENCY", 2))
+    MONSTER_IMAGE_PER_MINUTE = int(os.environ.get("MONSTER_IMAGE_PER_MINUTE", 60))
+
     # Bot secret for cron job authentication
     BOT_SECRET = os.environ.get("BOT_SECRET", "")
 
@@ -113,6 +148,11 @@ class TestingConfig(Config):
     STATIC_FOLDER = "/tmp/moodsprint_test_static"
     CACHE_TYPE = "NullCache"  # Disable cache for testing
     RATELIMIT_ENABLED = False  # Disable rate limiting for tests
+    CARD_POOL_PREWARM = False  # No replenisher worker in tests
+    DEFER_REFERRALS = False  # No Celery worker in tests
+    DEFER_TASK_ENRICHMENT = False
+    DEFER_WELCOME_BUNDLE = False
+    ASYNC_JOBS = False
 
 
 config = {
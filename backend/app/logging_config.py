@@ -164,13 +164,19 @@ def setup_logging(app):
             duration_ms = (time.time() - g.request_start_time) * 1000
 
             # Skip health checks from logging
-            if request.path not in ("/health", "/ready"):
+            if request.path not in ("/health", "/ready", "/metrics"):
+                extra = {}
+                # Duplicate user/profile lookups served by app.utils.identity
+                if g.get("identity_lookups_saved"):
+                    extra["identity_lookups_saved"] = g.identity_lookups_saved
+
                 logger = structlog.get_logger()
                 logger.info(
                     "request_completed",
                     status_code=response.status_code,
                     duration_ms=round(duration_ms, 2),
                     content_length=response.content_length,
+                    **extra,
                 )
 
             # Track 5xx errors for alerting
@@ -0,0 +1,238 @@
+"""Prometheus application metrics.
+
+RED metrics per route (rate, errors, duration), OpenAI call latency and cost,
+Celery task durations and queue depth, cache hit/miss counts and SQLAlchemy
+pool usage.
+
+Gunicorn runs several worker processes, so with ``PROMETHEUS_MULTIPROC_DIR``
+set every process writes its samples to that directory and ``/metrics``
+aggregates them on scrape (see gunicorn.conf.py for dead-worker cleanup).
+Without it (dev, tests) the default in-process registry is served.
+"""
+
+import logging
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUESTS = Counter(
+    "moodsprint_http_requests_total",
+    "HTTP requests by route and status",
+    ["method", "endpoint", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "moodsprint_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OPENAI_REQUEST_DURATION = Histogram(
+    "moodsprint_openai_request_duration_seconds",
+    "OpenAI call latency by tracked endpoint",
+    ["endpoint", "model"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120),
+)
+OPENAI_COST = Counter(
+    "moodsprint_openai_cost_usd_total",
+    "Estimated OpenAI spend in USD by tracked endpoint",
+    ["endpoint", "model"],
+)
+OPENAI_TOKENS = Counter(
+    "moodsprint_openai_tokens_total",
+    "OpenAI tokens by tracked endpoint",
+    ["endpoint", "model", "kind"],
+)
+OPENAI_ERRORS = Counter(
+    "moodsprint_openai_errors_total",
+    "Failed OpenAI calls by tracked endpoint",
+    ["endpoint", "model"],
+)
+
+CELERY_TASK_DURATION = Histogram(
+    "moodsprint_celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+CACHE_REQUESTS = Counter(
+    "moodsprint_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+
+TASK_CLASSIFICATIONS = Counter(
+    "moodsprint_task_classifications_total",
+    "AI task classifications by field and whether the heuristic agreed",
+    ["field", "result"],
+)
+
+# Summed over live workers in multiprocess mode
+DB_POOL_CHECKED_OUT = Gauge(
+    "moodsprint_db_pool_checked_out",
+    "SQLAlchemy connections currently checked out",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "moodsprint_db_pool_size",
+    "SQLAlchemy pool size (connections kept open)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "moodsprint_db_pool_overflow",
+    "SQLAlchemy connections opened beyond pool_size",
+    multiprocess_mode="livesum",
+)
+
+# Celery queues to report depth for (Redis broker lists)
+CELERY_QUEUES = ("celery",)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_classification_agreement(field: str, agreed: bool) -> None:
+    """Count whether the heuristic classification matched the AI one."""
+    TASK_CLASSIFICATIONS.labels(
+        field=field, result="agree" if agreed else "disagree"
+    ).inc()
+
+
+def record_openai_call(
+    endpoint: str,
+    model: str,
+    duration: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cost_usd: float = 0.0,
+) -> None:
+    """Record one OpenAI call made through tracked_openai_call."""
+    OPENAI_REQUEST_DURATION.labels(endpoint=endpoint, model=model).observe(duration)
+    OPENAI_TOKENS.labels(endpoint=endpoint, model=model, kind="prompt").inc(
+        prompt_tokens
+    )
+    OPENAI_TOKENS.labels(endpoint=endpoint, model=model, kind="completion").inc(
+        completion_tokens
+    )
+    OPENAI_COST.labels(endpoint=endpoint, model=model).inc(cost_usd)
+
+
+class CeleryQueueCollector:
+    """Reads Celery queue depth from the Redis broker at scrape time."""
+
+    def __init__(self, broker_url: str):
+        self.broker_url = broker_url
+        self._client = None
+
+    def collect(self):
+        depth = GaugeMetricFamily(
+            "moodsprint_celery_queue_depth",
+            "Messages waiting in the Celery broker queue",
+            labels=["queue"],
+        )
+        try:
+            if self._client is None:
+                import redis
+
+                self._client = redis.from_url(self.broker_url)
+            for queue in CELERY_QUEUES:
+                depth.add_metric([queue], self._client.llen(queue))
+        except Exception as e:
+            logger.warning(f"Celery queue depth read error: {e}")
+        yield depth
+
+
+def _update_pool_gauges(engine) -> None:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return  # e.g. SQLite StaticPool / NullPool
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def build_registry(broker_url: str | None = None) -> CollectorRegistry:
+    """Registry served on /metrics (multiprocess-aware)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY
+
+        registry = CollectorRegistry()
+        registry.register(_DefaultRegistryProxy(REGISTRY))
+
+    if broker_url and broker_url.startswith("redis"):
+        registry.register(CeleryQueueCollector(broker_url))
+    return registry
+
+
+class _DefaultRegistryProxy:
+    """Expose the process-global registry inside a per-app registry."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def collect(self):
+        return self.registry.collect()
+
+
+def setup_metrics(app):
+    """Record RED metrics for every request and serve them on /metrics."""
+    from flask import Response, g, request
+
+    from app import db
+    from app.extensions import limiter
+
+    registry = build_registry(app.config.get("CELERY_BROKER_URL"))
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start_time = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get("metrics_start_time")
+        if started is None or request.path == "/metrics":
+            return response
+
+        # Route name, not the raw path, to keep label cardinality bounded
+        endpoint = request.endpoint or "unmatched"
+        HTTP_REQUESTS.labels(
+            method=request.method, endpoint=endpoint, status=response.status_code
+        ).inc()
+        HTTP_REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(
+            time.perf_counter() - started
+        )
+
+        try:
+            _update_pool_gauges(db.engine)
+        except Exception as e:
+            logger.warning(f"DB pool metrics error: {e}")
+
+        return response
+
+    @app.route("/metrics")
+    @limiter.exempt
+    def metrics():
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+    return app
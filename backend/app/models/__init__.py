@@ -18,8 +18,10 @@ from app.models.card import (
     CoopBattle,
     CoopBattleParticipant,
     Friendship,
+    LegendaryCardReserve,
     MergeLog,
     UserCard,
+    UserCardStats,
 )
 from app.models.character import (
     ActiveBattle,
@@ -30,6 +32,7 @@ from app.models.character import (
     Monster,
     MonsterCard,
 )
+from app.models.counters import UserActivityYear, UserCounters, UserDailyCounters
 from app.models.event import EventMonster, EventType, SeasonalEvent, UserEventProgress
 from app.models.focus_session import FocusSession
 from app.models.friend_activity_log import FriendActivityLog
@@ -43,8 +46,9 @@ from app.models.guild import (
 )
 from app.models.level_reward import LevelReward
 from app.models.marketplace import MarketListing, StarsTransaction, UserStarsBalance
-from app.models.mood import MoodCheck
+from app.models.mood import MoodCheck, MoodDailyRollup, UserMoodStats
 from app.models.postpone_log import PostponeLog
+from app.models.productivity import ProductivityPatterns
 from app.models.quest import DailyQuest
 from app.models.shared_task import SharedTask, SharedTaskStatus
 from app.models.sparks import SPARKS_PACKS, SparksTransaction, TonDeposit
@@ -58,7 +62,13 @@ __all__ = [
     "Task",
     "Subtask",
     "MoodCheck",
+    "MoodDailyRollup",
+    "UserMoodStats",
+    "UserDailyCounters",
+    "UserCounters",
+    "UserActivityYear",
     "FocusSession",
+    "ProductivityPatterns",
     "Achievement",
     "UserAchievement",
     "UserActivityLog",
@@ -83,6 +93,8 @@ __all__ = [
     "CardTrade",
     "CoopBattle",
     "CoopBattleParticipant",
+    "UserCardStats",
+    "LegendaryCardReserve",
     # Events
     "SeasonalEvent",
     "EventMonster",
@@ -59,8 +59,11 @@ class CampaignChapter(db.Model):
         cascade="all, delete-orphan",
     )
 
-    def to_dict(self, lang: str = "ru") -> dict:
-        """Convert to dictionary with optional language selection."""
+    def to_dict(self, lang: str = "ru", levels_count: int | None = None) -> dict:
+        """Convert to dictionary with optional language selection.
+
+        Pass ``levels_count`` when it is already known to skip the COUNT query.
+        """
         # Use English if available and requested
         use_en = lang == "en"
         return {
@@ -97,7 +100,9 @@ class CampaignChapter(db.Model):
             "required_power": self.required_power,
             "xp_reward": self.xp_reward,
             "guaranteed_card_rarity": self.guaranteed_card_rarity,
-            "levels_count": self.levels.count(),
+            "levels_count": (
+                levels_count if levels_count is not None else self.levels.count()
+            ),
         }
 
 
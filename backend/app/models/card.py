@@ -157,6 +157,9 @@ class CardTemplate(db.Model):
     # NULL = universal template (can be any rarity)
     rarity = db.Column(db.String(20), nullable=True)
 
+    # Relative drop weight within its (genre, rarity) pool
+    weight = db.Column(db.Float, default=1.0, nullable=False, server_default="1")
+
     # Archetype tier for genre/level unlocking
     unlock_level = db.Column(
         db.Integer, default=1, nullable=False
@@ -190,6 +193,7 @@ class CardTemplate(db.Model):
             "image_url": self.image_url,
             "emoji": self.emoji,
             "rarity": self.rarity,
+            "weight": self.weight,
             "unlock_level": self.unlock_level or 1,
             "archetype_tier": self.archetype_tier,
         }
@@ -253,6 +257,7 @@ class UserCard(db.Model):
 
     # Status
     is_in_deck = db.Column(db.Boolean, default=False)  # In active battle deck
+    deck_position = db.Column(db.Integer, nullable=True)  # Order within the deck
     is_tradeable = db.Column(db.Boolean, default=True)
     is_destroyed = db.Column(db.Boolean, default=False)  # Lost in battle (legacy)
 
@@ -384,6 +389,7 @@ class UserCard(db.Model):
             "is_showcase": self.is_showcase or False,
             "showcase_slot": self.showcase_slot,
             "is_in_deck": self.is_in_deck,
+            "deck_position": self.deck_position,
             "is_tradeable": self.is_tradeable,
             "is_alive": self.is_alive,
             "is_on_cooldown": self.is_on_cooldown(),
@@ -746,3 +752,59 @@ class PendingReferralReward(db.Model):
             "is_claimed": self.is_claimed,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+class UserCardStats(db.Model):
+    """Denormalized per-user card aggregates for rankings and profiles.
+
+    Maintained by ``card_stats_service.refresh_card_stats`` whenever a user's
+    deck or collection changes, so friend rankings don't have to load decks.
+    """
+
+    __tablename__ = "user_card_stats"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    # Sum of hp + attack over active (non-destroyed) cards in the deck
+    deck_power = db.Column(db.Integer, default=0, nullable=False)
+    # Number of non-destroyed cards in the collection
+    active_cards_count = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary."""
+        return {
+            "user_id": self.user_id,
+            "deck_power": self.deck_power,
+            "active_cards_count": self.active_cards_count,
+        }
+
+
+class LegendaryCardReserve(db.Model):
+    """Pre-generated unique legendary cards waiting to be dropped.
+
+    Filled ahead of demand by the card pool replenisher; a legendary drop
+    claims (and deletes) one entry instead of calling OpenAI/Stability.
+    """
+
+    __tablename__ = "legendary_card_reserve"
+
+    id = db.Column(db.Integer, primary_key=True)
+    genre = db.Column(db.String(50), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    emoji = db.Column(db.String(10), default="🃏")
+    image_url = db.Column(db.String(512), nullable=True)
+
+    # Base stats (rarity and level multipliers are applied on drop)
+    base_hp = db.Column(db.Integer, default=50, nullable=False)
+    base_attack = db.Column(db.Integer, default=15, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
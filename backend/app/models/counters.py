@@ -0,0 +1,86 @@
+"""Per-user activity counters (completed work and check-ins)."""
+
+from datetime import datetime
+
+from app import db
+
+COUNTER_FIELDS = (
+    "tasks_completed",
+    "subtasks_completed",
+    "focus_sessions",
+    "focus_minutes",
+    "mood_checks",
+)
+
+
+class ActivityCounters:
+    """Completed tasks, subtasks and focus sessions, focus minutes, mood checks."""
+
+    tasks_completed = db.Column(db.Integer, default=0, nullable=False)
+    subtasks_completed = db.Column(db.Integer, default=0, nullable=False)
+    focus_sessions = db.Column(db.Integer, default=0, nullable=False)
+    focus_minutes = db.Column(db.Integer, default=0, nullable=False)
+    mood_checks = db.Column(db.Integer, default=0, nullable=False)
+
+    def counters(self) -> dict[str, int]:
+        return {field: getattr(self, field) or 0 for field in COUNTER_FIELDS}
+
+
+class UserDailyCounters(ActivityCounters, db.Model):
+    """Activity of one user on one (UTC) day.
+
+    Maintained by app.services.daily_counters in the transaction that
+    completes the work; daily goals, heal status and today's stats read it.
+    """
+
+    __tablename__ = "user_daily_counters"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day = db.Column(db.Date, primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<UserDailyCounters {self.user_id} {self.day}>"
+
+
+class UserCounters(ActivityCounters, db.Model):
+    """All-time activity of one user."""
+
+    __tablename__ = "user_counters"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self) -> str:
+        return f"<UserCounters {self.user_id}>"
+
+
+class UserActivityYear(db.Model):
+    """Completed tasks and subtasks of one user per day of one year.
+
+    ``counts`` packs 366 big-endian uint16 values, one per day of the year
+    (January 1st is slot 0), so a year heatmap is a single 732-byte read.
+    Encoded and maintained by app.services.activity_heatmap.
+    """
+
+    __tablename__ = "user_activity_years"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    year = db.Column(db.Integer, primary_key=True)
+    counts = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UserActivityYear {self.user_id} {self.year}>"
@@ -89,3 +89,61 @@ class MoodCheck(db.Model):
 
     def __repr__(self) -> str:
         return f"<MoodCheck {self.id}: mood={self.mood}, energy={self.energy}>"
+
+
+class MoodAggregate:
+    """Count, sum, min and max of mood and energy over a set of checks."""
+
+    checks = db.Column(db.Integer, default=0, nullable=False)
+    mood_sum = db.Column(db.Integer, default=0, nullable=False)
+    mood_min = db.Column(db.SmallInteger, nullable=True)
+    mood_max = db.Column(db.SmallInteger, nullable=True)
+    energy_sum = db.Column(db.Integer, default=0, nullable=False)
+    energy_min = db.Column(db.SmallInteger, nullable=True)
+    energy_max = db.Column(db.SmallInteger, nullable=True)
+
+    @property
+    def average_mood(self) -> float:
+        return round(self.mood_sum / self.checks, 1) if self.checks else 0.0
+
+    @property
+    def average_energy(self) -> float:
+        return round(self.energy_sum / self.checks, 1) if self.checks else 0.0
+
+
+class MoodDailyRollup(MoodAggregate, db.Model):
+    """Mood checks of one user on one (UTC) day.
+
+    Maintained by ``MoodStatsService.record_check`` when a check is logged;
+    mood history, stats and time series are served from these rows.
+    """
+
+    __tablename__ = "mood_daily_rollups"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day = db.Column(db.Date, primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<MoodDailyRollup {self.user_id} {self.day}: {self.checks}>"
+
+
+class UserMoodStats(MoodAggregate, db.Model):
+    """All mood checks of one user (constant-time overall stats)."""
+
+    __tablename__ = "user_mood_stats"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self) -> str:
+        return f"<UserMoodStats {self.user_id}: {self.checks}>"
@@ -0,0 +1,36 @@
+"""Per-user focus productivity patterns (hour / weekday / time slot)."""
+
+from datetime import datetime
+
+from app import db
+
+
+class ProductivityPatterns(db.Model):
+    """Focus session histograms of one user over the last 30 days.
+
+    Each bucket is ``{"sessions", "completed", "minutes"}``: all sessions
+    started in it, the completed ones and their focus minutes. ``hours`` has
+    24 buckets (UTC hour), ``weekdays`` 7 (0 = Monday) and ``time_slots``
+    one per task time slot (morning/afternoon/evening/night, Moscow time).
+
+    Recomputed by app.services.productivity_patterns when a focus session
+    ends and periodically as the window moves.
+    """
+
+    __tablename__ = "productivity_patterns"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    period_days = db.Column(db.Integer, default=30, nullable=False)
+    hours = db.Column(db.JSON, nullable=False)
+    weekdays = db.Column(db.JSON, nullable=False)
+    time_slots = db.Column(db.JSON, nullable=False)
+    # Time slot with the most completed sessions (None without enough)
+    best_time_slot = db.Column(db.String(20), nullable=True)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ProductivityPatterns {self.user_id} {self.computed_at}>"
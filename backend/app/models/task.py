@@ -23,10 +23,22 @@ class TaskPriority(str, Enum):
     HIGH = "high"
 
 
+class TaskEnrichmentStatus(str, Enum):
+    """Background AI classification of a new task."""
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class Task(db.Model):
     """Task model."""
 
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Change feed: a user's tasks updated since a timestamp
+        db.Index("ix_tasks_user_updated", "user_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
@@ -52,6 +64,8 @@ class Task(db.Model):
     difficulty = db.Column(
         db.String(20), nullable=True
     )  # easy, medium, hard, very_hard - for card generation
+    # Set while the heuristic classification awaits the AI one (NULL: none)
+    enrichment_status = db.Column(db.String(20), nullable=True)
 
     # Postpone tracking
     postponed_count = db.Column(db.Integer, default=0, nullable=False)
@@ -128,6 +142,7 @@ class Task(db.Model):
             "task_type": self.task_type,
             "preferred_time": self.preferred_time,
             "difficulty": self.difficulty,
+            "enrichment_status": self.enrichment_status,
             "postponed_count": self.postponed_count,
             "original_due_date": (
                 self.original_due_date.isoformat() if self.original_due_date else None
@@ -1,10 +1,19 @@
 """User profile model for onboarding and personalization."""
 
 from datetime import date, datetime
+from enum import Enum
 
 from app import db
 
 
+class WelcomeBundleStatus(str, Enum):
+    """Background part of onboarding (GPT analysis and welcome cards)."""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class UserProfile(db.Model):
     """Extended user profile from onboarding."""
 
@@ -66,6 +75,9 @@ class UserProfile(db.Model):
     # Onboarding
     onboarding_completed = db.Column(db.Boolean, default=False, nullable=False)
     onboarding_completed_at = db.Column(db.DateTime, nullable=True)
+    welcome_bundle_status = db.Column(db.String(20), nullable=True)
+    # Card ids and referral outcome of the welcome bundle
+    welcome_bundle = db.Column(db.JSON, nullable=True)
 
     # Settings based on profile
     notifications_enabled = db.Column(db.Boolean, default=True)
@@ -134,6 +146,7 @@ class UserProfile(db.Model):
             "main_challenges": self.main_challenges,
             "productivity_goals": self.productivity_goals,
             "onboarding_completed": self.onboarding_completed,
+            "welcome_bundle_status": self.welcome_bundle_status,
             "notifications_enabled": self.notifications_enabled,
             "daily_reminder_time": self.daily_reminder_time,
             "preferred_session_duration": self.preferred_session_duration,
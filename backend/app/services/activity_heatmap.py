@@ -0,0 +1,124 @@
+"""Year activity heatmaps: completed tasks and subtasks per day.
+
+Each user has one ``user_activity_years`` row per year holding 366 uint16
+day counts, so the last 365 days are one query over at most two rows. The
+counts are kept by daily_counters in the transaction that completes (or
+reopens) the work, and corrected with the daily counters by ``reconcile``.
+
+``backfill`` rebuilds the rows from ``user_daily_counters`` (the
+``flask activity backfill`` command).
+"""
+
+import struct
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.counters import UserActivityYear, UserDailyCounters
+
+SLOTS = 366
+MAX_COUNT = 0xFFFF
+_FORMAT = struct.Struct(f">{SLOTS}H")
+EMPTY = _FORMAT.pack(*[0] * SLOTS)
+
+
+def encode(counts: list[int]) -> bytes:
+    return _FORMAT.pack(*(min(max(n, 0), MAX_COUNT) for n in counts))
+
+
+def decode(data: bytes) -> list[int]:
+    return list(_FORMAT.unpack(data))
+
+
+def slot(day: date) -> int:
+    """Index of a day in its year's counts (January 1st is 0)."""
+    return day.timetuple().tm_yday - 1
+
+
+def _locked_row(session, user_id: int, year: int) -> UserActivityYear:
+    """The user's row of a year, locked for update (created if missing)."""
+    query = (
+        session.query(UserActivityYear)
+        .filter_by(user_id=user_id, year=year)
+        .with_for_update()
+        .populate_existing()
+    )
+    row = query.first()
+    if row is not None:
+        return row
+    try:
+        with session.begin_nested():
+            row = UserActivityYear(user_id=user_id, year=year, counts=EMPTY)
+            session.add(row)
+        return row
+    except IntegrityError:
+        # Created by a concurrent transaction in the meantime
+        return query.one()
+
+
+def add(session, user_id: int, day: date, n: int) -> None:
+    """Add ``n`` (possibly negative) completions to a day."""
+    row = _locked_row(session, user_id, day.year)
+    counts = decode(row.counts)
+    counts[slot(day)] += n
+    row.counts = encode(counts)
+
+
+def set_day(session, user_id: int, day: date, n: int) -> None:
+    """Overwrite the completions of a day."""
+    row = _locked_row(session, user_id, day.year)
+    counts = decode(row.counts)
+    if counts[slot(day)] != n:
+        counts[slot(day)] = n
+        row.counts = encode(counts)
+
+
+def get_activity(user_id: int, days: int = 365) -> dict[str, int]:
+    """Completions per ISO date over the last ``days`` days (active days only)."""
+    from app.services import daily_counters
+
+    today = daily_counters.today()
+    since = today - timedelta(days=days)
+    rows = UserActivityYear.query.filter(
+        UserActivityYear.user_id == user_id,
+        UserActivityYear.year.between(since.year, today.year),
+    )
+
+    activity = {}
+    for row in rows:
+        first_day = date(row.year, 1, 1)
+        for i, n in enumerate(decode(row.counts)):
+            if not n:
+                continue
+            day = first_day + timedelta(days=i)
+            if since <= day <= today:
+                activity[day.isoformat()] = n
+    return activity
+
+
+def backfill(user_id: int | None = None) -> int:
+    """Rebuild year rows from the daily counters. Returns the rows written."""
+    query = db.session.query(
+        UserDailyCounters.user_id,
+        UserDailyCounters.day,
+        UserDailyCounters.tasks_completed + UserDailyCounters.subtasks_completed,
+    )
+    existing = UserActivityYear.query
+    if user_id is not None:
+        query = query.filter(UserDailyCounters.user_id == user_id)
+        existing = existing.filter(UserActivityYear.user_id == user_id)
+
+    years = defaultdict(lambda: [0] * SLOTS)
+    for row_user_id, day, n in query:
+        if n:
+            years[(row_user_id, day.year)][slot(day)] = n
+
+    existing.delete(synchronize_session=False)
+    db.session.add_all(
+        UserActivityYear(user_id=row_user_id, year=year, counts=encode(counts))
+        for (row_user_id, year), counts in years.items()
+    )
+    db.session.commit()
+    return len(years)
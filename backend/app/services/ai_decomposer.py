@@ -8,6 +8,7 @@ from typing import Any
 
 from flask import current_app
 
+from app.metrics import record_cache_lookup
 from app.services.openai_client import get_openai_client
 
 # Cache key prefix
@@ -15,6 +16,8 @@ AI_CACHE_PREFIX = "ai_cache:decompose:"
 AI_CACHE_STATS_KEY = "ai_cache:stats"
 AI_CACHE_DEFAULT_TTL = 86400  # 24 hours
 
+MAX_AI_STEPS = 10
+
 
 def _normalize_title(title: str) -> str:
     """Normalize task title for cache key generation."""
@@ -33,9 +36,81 @@ def _make_cache_key(
     return f"{AI_CACHE_PREFIX}{h}"
 
 
+class StepStreamParser:
+    """Incremental parser for a decomposition JSON the model is still writing.
+
+    ``feed`` takes text deltas and returns the step objects of the ``steps``
+    array (or of a bare top-level array) whose closing brace has arrived.
+    Text outside the JSON, such as markdown fences, is ignored.
+    """
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._step: list[str] | None = None
+        self._step_depth = 0
+
+    @property
+    def content(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, delta: str) -> list[dict]:
+        self._chunks.append(delta)
+        steps = []
+        for ch in delta:
+            if self._step is not None:
+                self._step.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = bool(self._stack)
+            elif ch in "{[":
+                if ch == "{" and self._stack in (["["], ["{", "["]):
+                    self._step = [ch]
+                    self._step_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if self._step is not None and len(self._stack) == self._step_depth:
+                    try:
+                        steps.append(json.loads("".join(self._step)))
+                    except ValueError:
+                        pass
+                    self._step = None
+        return steps
+
+    def refusal(self) -> dict | None:
+        """The no_new_steps answer, if that is what the model returned."""
+        content = self.content.strip()
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end < start:
+            return None
+        try:
+            parsed = json.loads(content[start : end + 1])
+        except ValueError:
+            return None
+        if isinstance(parsed, dict) and parsed.get("no_new_steps"):
+            return {
+                "subtasks": [],
+                "no_new_steps": True,
+                "reason": parsed.get("reason", "Задача уже достаточно разбита"),
+            }
+        return None
+
+
 class AIDecomposer:
     """Service for AI-powered task decomposition based on mood/energy."""
 
+    # Tried in order; the next one only if a model returns nothing
+    MODELS = ["gpt-5-mini", "gpt-4.1-mini"]
+
     # Decomposition strategies
     STRATEGIES = {
         "micro": {
@@ -194,6 +269,123 @@ class AIDecomposer:
         )
         return {"subtasks": subtasks, "no_new_steps": False}
 
+    def decompose_task_stream(
+        self,
+        task_title: str,
+        task_description: str | None,
+        strategy: str,
+        task_type: str | None = None,
+        mood: int | None = None,
+        energy: int | None = None,
+        existing_subtasks_count: int = 0,
+        user_id: int | None = None,
+    ):
+        """
+        Streaming decompose_task: yields each subtask as soon as it is known.
+
+        Yields ("subtask", subtask_dict) events, then one ("done", info) with
+        info {"no_new_steps": bool, "reason": str | None}. Template and cache
+        hits are replayed at once; AI steps arrive as the model writes them
+        and the full result is cached when the stream completes.
+        """
+        strategy_config = self.STRATEGIES.get(strategy, self.STRATEGIES["standard"])
+        type_context = self.TASK_TYPE_CONTEXT.get(task_type) if task_type else None
+
+        use_cache = not task_description and existing_subtasks_count == 0
+        cache_key = None
+        known = None
+        if use_cache:
+            known = self._match_template(task_title, strategy, mood, energy)
+            if known is None:
+                cache_key = _make_cache_key(task_title, strategy, mood, energy)
+                known = self._get_from_cache(cache_key)
+
+        if known is not None:
+            for subtask in known["subtasks"]:
+                yield "subtask", subtask
+            yield "done", {
+                "no_new_steps": known.get("no_new_steps", False),
+                "reason": known.get("reason"),
+            }
+            return
+
+        if self.client:
+            from app.utils.ai_tracker import tracked_openai_stream
+
+            messages = self._build_messages(
+                task_title,
+                task_description,
+                strategy_config,
+                type_context,
+                strategy,
+                mood,
+                energy,
+                existing_subtasks_count,
+            )
+            subtasks = []
+            try:
+                for model_name in self.MODELS:
+                    parser = StepStreamParser()
+                    deltas = tracked_openai_stream(
+                        self.client,
+                        user_id=user_id,
+                        endpoint="decompose_task",
+                        model=model_name,
+                        messages=messages,
+                        max_completion_tokens=1000,
+                        response_format={"type": "json_object"},
+                    )
+                    for delta in deltas:
+                        for step in parser.feed(delta):
+                            if len(subtasks) >= MAX_AI_STEPS:
+                                continue
+                            subtask = self._format_step(step, len(subtasks) + 1)
+                            if subtask:
+                                subtasks.append(subtask)
+                                yield "subtask", subtask
+                    if parser.content.strip():
+                        break
+                    current_app.logger.warning(
+                        f"AI decomposition stream empty from {model_name}, "
+                        "trying next model"
+                    )
+
+                if subtasks:
+                    result = {"subtasks": subtasks, "no_new_steps": False}
+                else:
+                    result = parser.refusal()
+                if result:
+                    if cache_key:
+                        self._store_in_cache(
+                            cache_key, result, task_title, strategy, mood, energy
+                        )
+                    yield "done", {
+                        "no_new_steps": result["no_new_steps"],
+                        "reason": result.get("reason"),
+                    }
+                    return
+                current_app.logger.warning(
+                    f"AI decomposition stream had no steps for '{task_title}'"
+                )
+            except Exception as e:
+                current_app.logger.error(
+                    f"AI decomposition stream failed for '{task_title}': {e}",
+                    exc_info=True,
+                )
+                if subtasks:
+                    # Keep the streamed steps; incomplete, so not cached
+                    yield "done", {"no_new_steps": False, "reason": None}
+                    return
+
+        current_app.logger.warning(
+            f"AI decomposition falling back to simple for: '{task_title}'"
+        )
+        for subtask in self._simple_decompose(
+            task_title, task_description, strategy_config, task_type
+        ):
+            yield "subtask", subtask
+        yield "done", {"no_new_steps": False, "reason": None}
+
     def _get_from_cache(self, key: str) -> dict | None:
         """Try to get a cached decomposition result from Redis."""
         try:
@@ -201,6 +393,7 @@ class AIDecomposer:
 
             r = get_redis_client()
             data = r.get(key)
+            record_cache_lookup("ai_decompose", bool(data))
             if data:
                 entry = json.loads(data)
                 # Update hit stats
@@ -326,7 +519,7 @@ class AIDecomposer:
         5: "максимальная (на пике)",
     }
 
-    def _ai_decompose(
+    def _build_messages(
         self,
         task_title: str,
         task_description: str | None,
@@ -336,10 +529,8 @@ class AIDecomposer:
         mood: int | None = None,
         energy: int | None = None,
         existing_subtasks_count: int = 0,
-        user_id: int | None = None,
-    ) -> dict[str, Any]:
-        """Use OpenAI to decompose task."""
-        min_minutes, max_minutes = strategy_config["step_range"]
+    ) -> list[dict[str, str]]:
+        """Build the chat messages asking the model to decompose a task."""
 
         # Build context-aware prompt
         type_instructions = ""
@@ -471,10 +662,7 @@ class AIDecomposer:
 Отказ: {{"no_new_steps": true, "reason": "причина"}}
 """
 
-        current_app.logger.info(f"AI decomposing task: {task_title}")
-        from app.utils.ai_tracker import tracked_openai_call
-
-        messages = [
+        return [
             {
                 "role": "system",
                 "content": (
@@ -486,11 +674,37 @@ class AIDecomposer:
             {"role": "user", "content": prompt},
         ]
 
+    def _ai_decompose(
+        self,
+        task_title: str,
+        task_description: str | None,
+        strategy_config: dict,
+        type_context: dict | None = None,
+        strategy: str | None = None,
+        mood: int | None = None,
+        energy: int | None = None,
+        existing_subtasks_count: int = 0,
+        user_id: int | None = None,
+    ) -> dict[str, Any]:
+        """Use OpenAI to decompose task."""
+        messages = self._build_messages(
+            task_title,
+            task_description,
+            strategy_config,
+            type_context,
+            strategy,
+            mood,
+            energy,
+            existing_subtasks_count,
+        )
+
+        current_app.logger.info(f"AI decomposing task: {task_title}")
+        from app.utils.ai_tracker import tracked_openai_call
+
         # Try up to 2 times — first with gpt-5-mini, retry with gpt-4.1-mini on empty
-        models_to_try = ["gpt-5-mini", "gpt-4.1-mini"]
         content = ""
 
-        for model_name in models_to_try:
+        for model_name in self.MODELS:
             response = tracked_openai_call(
                 self.client,
                 user_id=user_id,
@@ -561,24 +775,12 @@ class AIDecomposer:
         else:
             steps = []
 
-        # Validate and format (allow up to 10 steps for complex tasks)
+        # Validate and format (allow up to MAX_AI_STEPS for complex tasks)
         result = []
-        for i, step in enumerate(steps[:10]):
-            if not isinstance(step, dict):
-                continue
-            title = step.get("title")
-            if not title:
-                continue
-            # Allow realistic time estimates from AI (2-180 min range)
-            estimated = int(step.get("estimated_minutes", 15))
-            estimated = max(2, min(180, estimated))  # Clamp to reasonable bounds
-            result.append(
-                {
-                    "title": str(title)[:500],
-                    "estimated_minutes": estimated,
-                    "order": i + 1,
-                }
-            )
+        for i, step in enumerate(steps[:MAX_AI_STEPS]):
+            formatted = self._format_step(step, i + 1)
+            if formatted:
+                result.append(formatted)
 
         # If AI returned empty list, fall back to simple decomposition
         if not result:
@@ -589,6 +791,23 @@ class AIDecomposer:
 
         return {"subtasks": result, "no_new_steps": False}
 
+    @staticmethod
+    def _format_step(step, order: int) -> dict[str, Any] | None:
+        """Validate one AI step; None if it has no title."""
+        if not isinstance(step, dict):
+            return None
+        title = step.get("title")
+        if not title:
+            return None
+        # Allow realistic time estimates from AI (2-180 min range)
+        estimated = int(step.get("estimated_minutes", 15))
+        estimated = max(2, min(180, estimated))  # Clamp to reasonable bounds
+        return {
+            "title": str(title)[:500],
+            "estimated_minutes": estimated,
+            "order": order,
+        }
+
     # Type-specific fallback steps
     FALLBACK_STEPS = {
         "creative": [
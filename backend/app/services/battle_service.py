@@ -5,9 +5,9 @@ from datetime import date
 from typing import Any
 
 from app import db
-from app.models import BattleLog, CharacterStats, DailyMonster, Monster, User
+from app.models import BattleLog, CharacterStats, DailyMonster, Monster
 from app.models.character import GENRE_THEMES
-from app.models.user_profile import UserProfile
+from app.utils.identity import get_profile, get_user
 
 
 class BattleService:
@@ -28,13 +28,13 @@ class BattleService:
         Returns monsters with scaled stats for player level.
         """
         # Get user's genre preference
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         genre = profile.favorite_genre if profile else "fantasy"
         if not genre:
             genre = "fantasy"
 
         # Get user level for scaling
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         user_level = user.level if user else 1
 
         # Try to get today's daily monsters first
@@ -185,7 +185,7 @@ class BattleService:
             return {"error": "no_hp", "message": "Восстанови здоровье!"}
 
         # Get user level for scaling
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         user_level = user.level if user else 1
 
         # Use scaled stats if provided, otherwise get them
@@ -334,13 +334,15 @@ class BattleService:
                 from app.services.card_service import CardService
 
                 card_service = CardService()
-                deck_cards = UserCard.query.filter_by(
-                    user_id=user_id, is_in_deck=True, is_destroyed=False
-                ).all()
-                for card in deck_cards:
-                    result = card_service.add_card_xp(card.id, user_id, 20)
-                    if result.get("success") and result.get("level_up"):
-                        card_xp_results.append(result)
+                deck_card_ids = [
+                    card_id
+                    for (card_id,) in db.session.query(UserCard.id).filter_by(
+                        user_id=user_id, is_in_deck=True, is_destroyed=False
+                    )
+                ]
+                card_xp_results.extend(
+                    card_service.add_cards_xp(user_id, deck_card_ids, 20)
+                )
             except Exception:
                 pass
         else:
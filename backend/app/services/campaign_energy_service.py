@@ -4,6 +4,7 @@ import logging
 
 from app import db
 from app.models.user_profile import UserProfile
+from app.utils.identity import get_profile
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +12,12 @@ logger = logging.getLogger(__name__)
 class CampaignEnergyService:
     def get_energy(self, user_id: int) -> dict:
         """Get user's campaign energy."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
+        return self.energy_from_profile(profile)
+
+    @staticmethod
+    def energy_from_profile(profile: UserProfile | None) -> dict:
+        """Campaign energy for an already loaded profile."""
         if not profile:
             return {"energy": 3, "max_energy": 5}
 
@@ -28,7 +34,7 @@ class CampaignEnergyService:
 
     def add_energy(self, user_id: int, amount: int = 1) -> dict:
         """Add campaign energy (capped at max)."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"success": False, "error": "profile_not_found"}
 
@@ -49,7 +55,7 @@ class CampaignEnergyService:
 
     def increase_max_energy(self, user_id: int, amount: int = 1) -> dict:
         """Increase max campaign energy limit and fill current to new max."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"success": False, "error": "profile_not_found"}
 
@@ -68,7 +74,7 @@ class CampaignEnergyService:
 
     def spend_energy(self, user_id: int) -> dict:
         """Spend 1 campaign energy. Returns success/fail."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"success": False, "error": "no_energy"}
 
@@ -0,0 +1,147 @@
+"""Per-genre campaign chapter/level graph cache.
+
+Chapter and level structure changes only from the admin campaign editor, so
+it is built once per genre and kept in process memory as an immutable
+snapshot. Invalidation goes through a version counter in Redis: the admin
+panel (a separate process) bumps it, and every backend worker rebuilds its
+snapshot on the next read.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from app import db
+from app.metrics import record_cache_lookup
+from app.models.campaign import CampaignChapter, CampaignLevel
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGN_GRAPH_VERSION_KEY = "campaign:graph_version"
+CAMPAIGN_GRAPH_TTL = 600  # Safety net for edits that bypass invalidation
+
+# Languages with distinct chapter payloads (to_dict falls back to ru otherwise)
+GRAPH_LANGS = ("ru", "en")
+
+
+@dataclass(frozen=True)
+class ChapterNode:
+    """A chapter and the ids of its levels, in play order."""
+
+    id: int
+    number: int
+    level_ids: tuple[int, ...]
+    payloads: Mapping[str, Mapping]
+
+    @property
+    def total_levels(self) -> int:
+        return len(self.level_ids)
+
+    def to_dict(self, lang: str = "ru") -> dict:
+        """Fresh copy of the serialized chapter for the given language."""
+        payload = self.payloads.get(lang) or self.payloads["ru"]
+        return dict(payload)
+
+
+@dataclass(frozen=True)
+class CampaignGraph:
+    """Active chapters of one genre, ordered by chapter number."""
+
+    genre: str
+    chapters: tuple[ChapterNode, ...]
+
+    @property
+    def chapter_ids(self) -> tuple[int, ...]:
+        return tuple(c.id for c in self.chapters)
+
+    def chapter_by_number(self, number: int) -> ChapterNode | None:
+        for chapter in self.chapters:
+            if chapter.number == number:
+                return chapter
+        return None
+
+
+# genre -> (version, built_at, graph)
+_graph_cache: dict[str, tuple[str, float, CampaignGraph]] = {}
+
+
+def _current_version() -> str | None:
+    """Read the shared graph version. None if Redis is unavailable."""
+    try:
+        from app.extensions import get_redis_client
+
+        return get_redis_client().get(CAMPAIGN_GRAPH_VERSION_KEY) or "0"
+    except Exception as e:
+        logger.warning(f"Campaign graph version read error: {e}")
+        return None
+
+
+def build_campaign_graph(genre: str) -> CampaignGraph:
+    """Load the chapter/level structure for a genre (two queries)."""
+    chapters = (
+        CampaignChapter.query.filter_by(is_active=True, genre=genre)
+        .order_by(CampaignChapter.number)
+        .all()
+    )
+
+    level_ids: dict[int, list[int]] = {c.id: [] for c in chapters}
+    if chapters:
+        rows = (
+            db.session.query(CampaignLevel.id, CampaignLevel.chapter_id)
+            .filter(CampaignLevel.chapter_id.in_(level_ids.keys()))
+            .order_by(CampaignLevel.chapter_id, CampaignLevel.number)
+            .all()
+        )
+        for level_id, chapter_id in rows:
+            level_ids[chapter_id].append(level_id)
+
+    nodes = []
+    for chapter in chapters:
+        ids = tuple(level_ids[chapter.id])
+        payloads = {
+            lang: MappingProxyType(chapter.to_dict(lang, levels_count=len(ids)))
+            for lang in GRAPH_LANGS
+        }
+        nodes.append(
+            ChapterNode(
+                id=chapter.id,
+                number=chapter.number,
+                level_ids=ids,
+                payloads=MappingProxyType(payloads),
+            )
+        )
+
+    return CampaignGraph(genre=genre, chapters=tuple(nodes))
+
+
+def get_campaign_graph(genre: str) -> CampaignGraph:
+    """Get the cached graph for a genre, rebuilding it if stale."""
+    version = _current_version()
+    if version is None:
+        # Can't tell whether another process invalidated it — don't trust memory
+        return build_campaign_graph(genre)
+
+    cached = _graph_cache.get(genre)
+    if cached:
+        cached_version, built_at, graph = cached
+        if cached_version == version and time.time() - built_at < CAMPAIGN_GRAPH_TTL:
+            record_cache_lookup("campaign_graph", True)
+            return graph
+
+    record_cache_lookup("campaign_graph", False)
+    graph = build_campaign_graph(genre)
+    _graph_cache[genre] = (version, time.time(), graph)
+    return graph
+
+
+def invalidate_campaign_graph() -> None:
+    """Drop cached graphs in this process and tell other processes to rebuild."""
+    _graph_cache.clear()
+    try:
+        from app.extensions import get_redis_client
+
+        get_redis_client().incr(CAMPAIGN_GRAPH_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate campaign graph: {e}")
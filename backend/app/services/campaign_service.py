@@ -5,7 +5,6 @@ from datetime import datetime
 from typing import Any
 
 from app import db
-from app.models import User
 from app.models.campaign import (
     CampaignChapter,
     CampaignLevel,
@@ -16,6 +15,7 @@ from app.models.campaign import (
 from app.models.card import CardRarity
 from app.models.sparks import SparksTransaction
 from app.utils import get_lang
+from app.utils.identity import get_profile, get_user
 
 # Sparks rewards per star earned
 SPARKS_PER_STAR = 5  # 5 sparks per star = 15 max per level
@@ -37,25 +37,53 @@ class CampaignService:
         return progress
 
     def get_campaign_overview(self, user_id: int, lang: str = "ru") -> dict[str, Any]:
-        """Get campaign overview for user."""
+        """Get campaign overview for user.
+
+        Chapter structure comes from the cached per-genre graph and the user's
+        completions are aggregated in one grouped query, so the cost does not
+        depend on the number of chapters.
+        """
+        from app.services.campaign_energy_service import CampaignEnergyService
+        from app.services.campaign_graph import get_campaign_graph
+
         progress = self.get_user_progress(user_id)
 
         # Get user's favorite genre to filter chapters
-        from app.models.user_profile import UserProfile
-
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         genre = profile.favorite_genre if profile else "fantasy"
 
         # Show only chapters matching user's selected genre
-        chapters = (
-            CampaignChapter.query.filter_by(is_active=True, genre=genre)
-            .order_by(CampaignChapter.number)
-            .all()
-        )
+        graph = get_campaign_graph(genre)
+
+        # stars / completions per chapter for this user
+        chapter_totals: dict[int, tuple[int, int]] = {}
+        if graph.chapters:
+            rows = (
+                db.session.query(
+                    CampaignLevel.chapter_id,
+                    db.func.count(CampaignLevelCompletion.id),
+                    db.func.coalesce(
+                        db.func.sum(CampaignLevelCompletion.stars_earned), 0
+                    ),
+                )
+                .join(
+                    CampaignLevel, CampaignLevel.id == CampaignLevelCompletion.level_id
+                )
+                .filter(
+                    CampaignLevelCompletion.progress_id == progress.id,
+                    CampaignLevel.chapter_id.in_(graph.chapter_ids),
+                )
+                .group_by(CampaignLevel.chapter_id)
+                .all()
+            )
+            chapter_totals = {
+                chapter_id: (int(count), int(stars))
+                for chapter_id, count, stars in rows
+            }
 
         chapters_data = []
         completed_chapter_ids = set(progress.chapters_completed or [])
-        for chapter in chapters:
+        for chapter in graph.chapters:
             chapter_data = chapter.to_dict(lang)
 
             # Check if unlocked (genre-aware: ch1 always unlocked,
@@ -63,26 +91,15 @@ class CampaignService:
             if chapter.number == 1:
                 is_unlocked = True
             else:
-                prev_chapter = CampaignChapter.query.filter_by(
-                    number=chapter.number - 1, genre=genre, is_active=True
-                ).first()
+                prev_chapter = graph.chapter_by_number(chapter.number - 1)
                 is_unlocked = (
                     prev_chapter is not None
                     and prev_chapter.id in completed_chapter_ids
                 )
             is_completed = chapter.id in completed_chapter_ids
 
-            # Get level progress for this chapter
-            level_completions = (
-                CampaignLevelCompletion.query.filter_by(progress_id=progress.id)
-                .join(CampaignLevel)
-                .filter(CampaignLevel.chapter_id == chapter.id)
-                .all()
-            )
-
-            stars_earned = sum(c.stars_earned for c in level_completions)
-            levels_completed = len(level_completions)
-            total_levels = chapter.levels.count()
+            levels_completed, stars_earned = chapter_totals.get(chapter.id, (0, 0))
+            total_levels = chapter.total_levels
 
             # Hard mode available if chapter is completed in normal mode
             has_hard_mode = is_completed
@@ -100,10 +117,8 @@ class CampaignService:
             )
             chapters_data.append(chapter_data)
 
-        # Get energy info
-        from app.services.card_service import CardService
-
-        energy_info = CardService().get_energy(user_id)
+        # Energy comes from the profile we already loaded
+        energy_info = CampaignEnergyService.energy_from_profile(profile)
 
         return {
             "progress": progress.to_dict(),
@@ -119,9 +134,7 @@ class CampaignService:
         progress = self.get_user_progress(user_id)
 
         # Filter by genre to get the correct chapter (number is unique per genre)
-        from app.models.user_profile import UserProfile
-
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         genre = profile.favorite_genre if profile else "fantasy"
 
         chapter = CampaignChapter.query.filter_by(
@@ -318,7 +331,7 @@ class CampaignService:
             result["message"] = "Монстр ослаблен на 20%!"
 
         elif choice_action == "bonus_xp":
-            user = User.query.get(user_id)
+            user = get_user(user_id)
             if user:
                 user.add_xp(50)
                 db.session.commit()
@@ -430,7 +443,7 @@ class CampaignService:
                 rewards = self._give_chapter_rewards(user_id, level.chapter)
 
         # Award XP and Sparks
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         xp_earned = level.xp_reward * stars
         sparks_earned = 0
 
@@ -588,7 +601,7 @@ class CampaignService:
 
             elif reward.reward_type == "xp":
                 amount = reward_data.get("amount", 500)
-                user = User.query.get(user_id)
+                user = get_user(user_id)
                 if user:
                     user.add_xp(amount)
                 given_rewards.append(
@@ -601,7 +614,7 @@ class CampaignService:
 
             elif reward.reward_type == "sparks":
                 amount = reward_data.get("amount", 100)
-                user = User.query.get(user_id)
+                user = get_user(user_id)
                 if user:
                     user.add_sparks(amount)
                     # Record transaction
@@ -791,4 +804,8 @@ def seed_campaign_data():
         db.session.add(reward)
 
     db.session.commit()
+
+    from app.services.campaign_graph import invalidate_campaign_graph
+
+    invalidate_campaign_graph()
     logger.info("Campaign data seeded successfully")
@@ -0,0 +1,191 @@
+"""Batched card operations: deck edits and healing in one transaction."""
+
+from sqlalchemy import case, or_
+
+from app import db
+from app.models.card import UserCard
+from app.services.card_stats_service import CardStatsService
+
+OPERATIONS = ("deck_add", "deck_remove", "deck_order", "heal")
+MAX_OPERATIONS = 20
+MAX_CARDS = 100
+
+
+def _deck_order(card: UserCard) -> tuple:
+    return (card.deck_position is None, card.deck_position or 0, card.id)
+
+
+def _failed(error: str, card_ids: list[int], index: int) -> dict:
+    return {"success": False, "error": error, "card_ids": card_ids, "index": index}
+
+
+def _expire_loaded_cards(*attributes: str) -> None:
+    """Drop values a bulk UPDATE changed from the cards in the session."""
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, UserCard):
+            db.session.expire(obj, attributes)
+
+
+class CardBatchService:
+    """Applies a list of card operations with set-based updates.
+
+    Operations (applied in order, all or nothing):
+    - ``{"op": "deck_add", "card_ids": [...]}``: append cards to the deck
+    - ``{"op": "deck_remove", "card_ids": [...]}``: take cards out
+    - ``{"op": "deck_order", "card_ids": [...]}``: the whole deck, reordered
+    - ``{"op": "heal", "card_ids": [...]}``: heal cards (all if no ids)
+    """
+
+    def apply(self, user_id: int, operations: list, max_deck_size: int) -> dict:
+        """Validate and apply operations; does not commit.
+
+        Ownership of every card and the current deck are checked with one
+        query that locks the rows. On error nothing is written and the
+        result names the failing operation (``index``).
+        """
+        error = self._check_shape(operations)
+        if error:
+            return error
+
+        card_ids = {i for op in operations for i in op.get("card_ids") or []}
+        cards = {
+            card.id: card
+            for card in UserCard.query.filter(
+                UserCard.user_id == user_id,
+                or_(UserCard.id.in_(card_ids), UserCard.is_in_deck.is_(True)),
+            )
+            .order_by(UserCard.id)
+            .with_for_update()
+        }
+        missing = sorted(card_ids - cards.keys())
+        if missing:
+            return {"success": False, "error": "card_not_found", "card_ids": missing}
+
+        original_deck = [
+            card.id
+            for card in sorted(cards.values(), key=_deck_order)
+            if card.is_in_deck and not card.is_destroyed
+        ]
+        deck = list(original_deck)
+        heal_ids: set[int] | None = set()
+
+        for index, op in enumerate(operations):
+            ids = op.get("card_ids") or []
+            kind = op["op"]
+            if kind in ("deck_add", "heal"):
+                destroyed = [i for i in ids if cards[i].is_destroyed]
+                if destroyed:
+                    return _failed("card_destroyed", destroyed, index)
+
+            if kind == "deck_add":
+                present = [i for i in ids if i in deck]
+                if present:
+                    return _failed("already_in_deck", present, index)
+                deck.extend(ids)
+            elif kind == "deck_remove":
+                absent = [i for i in ids if i not in deck]
+                if absent:
+                    return _failed("not_in_deck", absent, index)
+                deck = [i for i in deck if i not in ids]
+            elif kind == "deck_order":
+                if sorted(ids) != sorted(deck):
+                    return _failed(
+                        "deck_order_mismatch", sorted(set(ids) ^ set(deck)), index
+                    )
+                deck = list(ids)
+            elif heal_ids is not None:
+                # No ids heals every card
+                heal_ids = heal_ids | set(ids) if ids else None
+
+        if len(deck) > max_deck_size:
+            return {"success": False, "error": "deck_full", "max_size": max_deck_size}
+
+        deck_changed = deck != original_deck
+        if deck_changed:
+            self._write_deck(user_id, set(original_deck) - set(deck), deck)
+            CardStatsService().refresh_card_stats(user_id)
+
+        heal_requested = any(op["op"] == "heal" for op in operations)
+        healed = self.heal_cards(user_id, heal_ids) if heal_requested else 0
+
+        return {
+            "success": True,
+            "deck_ids": deck,
+            "deck_changed": deck_changed,
+            "healed_count": healed,
+        }
+
+    def _check_shape(self, operations) -> dict | None:
+        if not isinstance(operations, list) or not operations:
+            return {"success": False, "error": "no_operations"}
+        if len(operations) > MAX_OPERATIONS:
+            return {
+                "success": False,
+                "error": "too_many_operations",
+                "max_operations": MAX_OPERATIONS,
+            }
+
+        total = 0
+        for index, op in enumerate(operations):
+            ids = op.get("card_ids") if isinstance(op, dict) else None
+            valid = (
+                isinstance(op, dict)
+                and op.get("op") in OPERATIONS
+                and (ids is None or isinstance(ids, list))
+                and all(
+                    isinstance(i, int) and not isinstance(i, bool) for i in ids or []
+                )
+                and len(set(ids or [])) == len(ids or [])
+                and (ids or op.get("op") in ("heal", "deck_order"))
+            )
+            if not valid:
+                return {"success": False, "error": "invalid_operation", "index": index}
+            total += len(ids or [])
+
+        if total > MAX_CARDS:
+            return {"success": False, "error": "too_many_cards", "max_cards": MAX_CARDS}
+        return None
+
+    def _write_deck(self, user_id: int, removed: set[int], deck: list[int]) -> None:
+        """Take removed cards out and store the deck membership and order."""
+        if removed:
+            UserCard.query.filter(
+                UserCard.user_id == user_id, UserCard.id.in_(removed)
+            ).update(
+                {UserCard.is_in_deck: False, UserCard.deck_position: None},
+                synchronize_session=False,
+            )
+        if deck:
+            UserCard.query.filter(
+                UserCard.user_id == user_id, UserCard.id.in_(deck)
+            ).update(
+                {
+                    UserCard.is_in_deck: True,
+                    UserCard.deck_position: case(
+                        {card_id: position for position, card_id in enumerate(deck)},
+                        value=UserCard.id,
+                    ),
+                },
+                synchronize_session=False,
+            )
+        _expire_loaded_cards("is_in_deck", "deck_position")
+
+    def heal_cards(self, user_id: int, card_ids: set[int] | None = None) -> int:
+        """Restore full HP of wounded cards (all if no ids); does not commit.
+
+        Returns the number of cards healed.
+        """
+        query = UserCard.query.filter(
+            UserCard.user_id == user_id,
+            UserCard.is_destroyed.is_(False),
+            UserCard.current_hp < UserCard.hp,
+        )
+        if card_ids is not None:
+            if not card_ids:
+                return 0
+            query = query.filter(UserCard.id.in_(card_ids))
+        healed = query.update(
+            {UserCard.current_hp: UserCard.hp}, synchronize_session=False
+        )
+        _expire_loaded_cards("current_hp")
+        return healed
@@ -22,8 +22,8 @@ from app.models import (
 )
 from app.models.card import CardRarity, UserCard
 from app.models.character import GENRE_THEMES
-from app.models.user_profile import UserProfile
 from app.utils import get_lang
+from app.utils.identity import get_profile
 
 logger = logging.getLogger(__name__)
 
@@ -188,14 +188,20 @@ class CardBattleService:
         self.images_dir.mkdir(parents=True, exist_ok=True)
 
     def get_user_deck(self, user_id: int) -> list[UserCard]:
-        """Get user's active battle deck."""
-        return UserCard.query.filter_by(
-            user_id=user_id, is_in_deck=True, is_destroyed=False
-        ).all()
+        """Get user's active battle deck, in deck order."""
+        return (
+            UserCard.query.filter_by(
+                user_id=user_id, is_in_deck=True, is_destroyed=False
+            )
+            .order_by(
+                UserCard.deck_position.is_(None), UserCard.deck_position, UserCard.id
+            )
+            .all()
+        )
 
     def get_user_genre(self, user_id: int) -> str:
         """Get user's preferred genre."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if profile and profile.favorite_genre:
             return profile.favorite_genre
         return "fantasy"
@@ -369,6 +375,51 @@ class CardBattleService:
             logger.error(f"Failed to generate monster image: {e}", exc_info=True)
             return None
 
+    def generate_missing_monster_image(self, monster_id: int) -> dict[str, Any]:
+        """Generate and save the sprite of a monster that has none yet."""
+        monster = Monster.query.get(monster_id)
+        if not monster:
+            return {"success": False, "error": "monster_not_found"}
+        if monster.sprite_url:
+            return {
+                "success": True,
+                "sprite_url": monster.sprite_url,
+                "already_exists": True,
+            }
+
+        sprite_url = self._generate_monster_image(monster, monster.genre)
+        if not sprite_url:
+            return {"success": False, "error": "generation_failed"}
+
+        monster.sprite_url = sprite_url
+        db.session.commit()
+        return {"success": True, "sprite_url": sprite_url}
+
+    def generate_missing_monster_images(self, progress=None) -> dict[str, int]:
+        """Generate sprites for every monster without one.
+
+        ``progress(done, total)`` is called after each monster.
+        """
+        monsters = Monster.query.filter(
+            (Monster.sprite_url.is_(None)) | (Monster.sprite_url == "")
+        ).all()
+
+        generated = 0
+        failed = 0
+        for i, monster in enumerate(monsters, 1):
+            sprite_url = self._generate_monster_image(monster, monster.genre)
+            if sprite_url:
+                monster.sprite_url = sprite_url
+                # Keep finished images if a later one times out
+                db.session.commit()
+                generated += 1
+            else:
+                failed += 1
+            if progress:
+                progress(i, len(monsters))
+
+        return {"generated": generated, "failed": failed, "total": len(monsters)}
+
     def _create_period_monsters(self, genre: str, period_start: date) -> None:
         """Create/reuse monsters with pre-generated decks for a weekly period.
 
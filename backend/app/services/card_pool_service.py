@@ -0,0 +1,193 @@
+"""Card pool replenishment: generate templates and legendaries ahead of demand.
+
+Card drops used to call OpenAI (and queue Stability images) inside the
+task-completion request whenever a genre's template pool was smaller than
+``get_required_templates`` says it should be, and for every legendary drop.
+The replenisher runs in Celery (beat, every few minutes) and in the
+``replenish-card-pool`` CLI command: it tops up each genre's template pool
+and keeps a reserve of unique legendary cards, so drops are served from
+stock (see ``CardService._create_card_from_stock``).
+"""
+
+import logging
+import random
+
+from flask import current_app
+
+from app import db
+from app.models.card import CardRarity, CardTemplate, LegendaryCardReserve
+from app.models.character import GENRE_THEMES
+from app.services.card_service import (
+    GENRE_CARD_EMOJIS,
+    CardService,
+    get_required_templates,
+)
+from app.services.genre_stats import get_genre_user_count, get_template_counts
+from app.services.template_pool import invalidate_template_pool
+
+logger = logging.getLogger(__name__)
+
+# Rarities whose text comes from OpenAI (common/uncommon use archetypes)
+AI_TEXT_RARITIES = (CardRarity.RARE, CardRarity.EPIC)
+
+
+class CardPoolService:
+    """Tops up template pools and the legendary reserve per genre."""
+
+    def __init__(self):
+        self.card_service = CardService()
+
+    def get_template_deficits(self, genre: str) -> dict[CardRarity, int]:
+        """Missing active templates per rarity (only rarities that are short)."""
+        users_count = get_genre_user_count(genre) or 1
+        active = get_template_counts(genre).active_total
+        deficits = {}
+        for rarity in CardRarity:
+            required = get_required_templates(users_count, rarity)
+            if required is not None and required > active:
+                deficits[rarity] = required - active
+        return deficits
+
+    def get_legendary_reserve_count(self, genre: str) -> int:
+        return LegendaryCardReserve.query.filter_by(genre=genre).count()
+
+    def get_status(self) -> dict:
+        """Pool and reserve state per genre (for admin/CLI output)."""
+        target = current_app.config.get("LEGENDARY_RESERVE_SIZE", 5)
+        return {
+            genre: {
+                "template_deficit": max(
+                    self.get_template_deficits(genre).values(), default=0
+                ),
+                "legendary_reserve": self.get_legendary_reserve_count(genre),
+                "legendary_reserve_target": target,
+            }
+            for genre in GENRE_THEMES
+        }
+
+    def claim_legendary(self, genre: str) -> LegendaryCardReserve | None:
+        """Take one reserved legendary for a drop.
+
+        The row is locked (skipping rows other drops hold) and deleted; the
+        delete commits together with the caller's new card.
+        """
+        reserved = (
+            LegendaryCardReserve.query.filter_by(genre=genre)
+            .order_by(LegendaryCardReserve.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if reserved is not None:
+            db.session.delete(reserved)
+        return reserved
+
+    def replenish(self, batch_size: int | None = None) -> dict:
+        """Generate one batch of templates and legendaries for each genre."""
+        if batch_size is None:
+            batch_size = current_app.config.get("CARD_POOL_BATCH_SIZE", 5)
+
+        summary = {}
+        for genre in GENRE_THEMES:
+            templates = self.replenish_templates(genre, batch_size)
+            legendaries = self.replenish_legendary_reserve(genre, batch_size)
+            if templates or legendaries:
+                summary[genre] = {"templates": templates, "legendaries": legendaries}
+        return summary
+
+    def replenish_templates(self, genre: str, batch_size: int) -> int:
+        """Add up to ``batch_size`` templates to a genre that is short."""
+        deficits = self.get_template_deficits(genre)
+        if not deficits:
+            return 0
+
+        needed = min(max(deficits.values()), batch_size)
+        # Prefer AI-written rarities: archetype names repeat and get skipped
+        rarities = [r for r in deficits if r in AI_TEXT_RARITIES] or list(deficits)
+
+        created = 0
+        # Duplicate names are skipped, so allow a few extra attempts
+        for _ in range(needed * 2):
+            if created >= needed:
+                break
+            rarity = random.choice(rarities)
+            if self._generate_template(genre, rarity):
+                created += 1
+
+        if created:
+            db.session.commit()
+            invalidate_template_pool(genre)
+            logger.info(f"Card pool: added {created} templates to {genre}")
+        return created
+
+    def replenish_legendary_reserve(self, genre: str, batch_size: int) -> int:
+        """Top the legendary reserve of a genre up to LEGENDARY_RESERVE_SIZE."""
+        target = current_app.config.get("LEGENDARY_RESERVE_SIZE", 5)
+        needed = min(target - self.get_legendary_reserve_count(genre), batch_size)
+        if needed <= 0:
+            return 0
+
+        taken = {
+            name
+            for (name,) in db.session.query(LegendaryCardReserve.name).filter_by(
+                genre=genre
+            )
+        }
+        created = 0
+        for _ in range(needed * 2):
+            if created >= needed:
+                break
+            name, description = self._generate_text(genre, CardRarity.LEGENDARY)
+            if name in taken:
+                continue
+            taken.add(name)
+            db.session.add(
+                LegendaryCardReserve(
+                    genre=genre,
+                    name=name,
+                    description=description,
+                    emoji=self._random_emoji(genre),
+                    image_url=self.card_service._generate_card_image(
+                        name, genre, CardRarity.LEGENDARY
+                    ),
+                    base_hp=random.randint(40, 60),
+                    base_attack=random.randint(12, 20),
+                )
+            )
+            # Commit each card: generation is slow, keep finished work
+            db.session.commit()
+            created += 1
+
+        if created:
+            logger.info(f"Card pool: reserved {created} legendaries for {genre}")
+        return created
+
+    def _generate_template(self, genre: str, rarity: CardRarity) -> bool:
+        name, description = self._generate_text(genre, rarity)
+        if CardTemplate.query.filter_by(name=name, genre=genre).first():
+            return False
+
+        db.session.add(
+            CardTemplate(
+                name=name,
+                description=description,
+                genre=genre,
+                base_hp=50,  # Base stats, modified by rarity on drop
+                base_attack=15,
+                image_url=self.card_service._generate_card_image(name, genre, rarity),
+                emoji=self._random_emoji(genre),
+                ai_generated=True,
+                is_active=True,
+            )
+        )
+        db.session.flush()
+        return True
+
+    def _generate_text(self, genre: str, rarity: CardRarity) -> tuple[str, str]:
+        genre_info = GENRE_THEMES.get(genre, GENRE_THEMES["fantasy"])
+        return self.card_service._generate_card_text(
+            genre, genre_info, rarity, "Card pool replenishment"
+        )
+
+    @staticmethod
+    def _random_emoji(genre: str) -> str:
+        return random.choice(GENRE_CARD_EMOJIS.get(genre, GENRE_CARD_EMOJIS["fantasy"]))
@@ -7,6 +7,7 @@ import uuid
 from pathlib import Path
 
 import requests
+from flask import current_app
 
 from app import db
 from app.models.card import (
@@ -20,8 +21,14 @@ from app.models.card import (
     UserCard,
 )
 from app.models.character import GENRE_THEMES
-from app.models.user import User
-from app.models.user_profile import UserProfile
+from app.services.card_stats_service import CardStatsService
+from app.services.genre_stats import get_genre_user_count, get_template_counts
+from app.services.template_pool import (
+    PooledTemplate,
+    get_genre_pool,
+    invalidate_template_pool,
+)
+from app.utils.identity import get_profile, get_user
 
 # Level scaling: each level adds 5% to card stats
 # Level 1 = 1.05x, Level 10 = 1.5x, Level 20 = 2x
@@ -191,6 +198,14 @@ RARITY_POOL_FACTORS = {
 }
 
 
+def get_required_templates(users_count: int, rarity: CardRarity) -> int | None:
+    """Templates a genre needs for this rarity (None = always unique)."""
+    factor = RARITY_POOL_FACTORS.get(rarity)
+    if factor is None:
+        return None
+    return BASE_TEMPLATES_COUNT + int(users_count * factor)
+
+
 def get_random_rarity(
     max_rarity: CardRarity | None = None,
     difficulty: str = "medium",
@@ -460,14 +475,14 @@ class CardService:
 
     def get_user_genre(self, user_id: int) -> str:
         """Get user's preferred genre."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if profile and profile.favorite_genre:
             return profile.favorite_genre
         return "fantasy"
 
     def get_user_level(self, user_id: int) -> int:
         """Get user's level for stat scaling."""
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if user:
             return user.level
         return 1
@@ -478,16 +493,12 @@ class CardService:
 
     def _count_users_in_genre(self, genre: str) -> int:
         """Count how many users have this genre as their favorite."""
-        count = (
-            db.session.query(db.func.count(UserProfile.id))
-            .filter(UserProfile.favorite_genre == genre)
-            .scalar()
-        )
+        count = get_genre_user_count(genre)
         return count or 1  # At least 1 to avoid division issues
 
     def _count_templates_in_genre(self, genre: str) -> int:
         """Count active templates for a genre."""
-        return CardTemplate.query.filter_by(genre=genre, is_active=True).count()
+        return get_template_counts(genre).active_total
 
     def _should_generate_new_card(self, genre: str, rarity: CardRarity) -> bool:
         """
@@ -500,15 +511,14 @@ class CardService:
         - Higher rarity = higher factor = more variety needed
         """
         # Legendary always generates new cards (always unique)
-        rarity_factor = RARITY_POOL_FACTORS.get(rarity)
-        if rarity_factor is None:
+        if RARITY_POOL_FACTORS.get(rarity) is None:
             return True
 
         users_count = self._count_users_in_genre(genre)
         templates_count = self._count_templates_in_genre(genre)
 
         # Required templates = base + users * rarity_factor
-        required_templates = BASE_TEMPLATES_COUNT + int(users_count * rarity_factor)
+        required_templates = get_required_templates(users_count, rarity)
 
         # Generate new if we don't have enough templates
         should_generate = templates_count < required_templates
@@ -644,8 +654,15 @@ class CardService:
 
         # Check if we should generate new or use existing pool
         should_generate = self._should_generate_new_card(genre, rarity)
+        card = None
+        new_template = None
+
+        if should_generate and current_app.config.get("CARD_POOL_PREWARM"):
+            # The pool replenisher grows the pool ahead of demand, so serve
+            # from stock instead of calling OpenAI in this request
+            card = self._create_card_from_stock(user_id, task_id, genre, rarity)
 
-        if should_generate:
+        if card is None and should_generate:
             # Generate new card with AI and save as template
             card = self._generate_card_with_ai(
                 user_id, task_id, genre, rarity, task_title
@@ -653,8 +670,8 @@ class CardService:
             if card:
                 # Save as template for future reuse (except legendary - unique)
                 if rarity != CardRarity.LEGENDARY:
-                    self._save_as_template(card, genre)
-        else:
+                    new_template = self._save_as_template(card, genre)
+        elif card is None:
             # Use existing template from pool (prioritize rarity-specific templates)
             template = self._get_random_template(genre, rarity)
             if template:
@@ -667,11 +684,14 @@ class CardService:
                     user_id, task_id, genre, rarity, task_title
                 )
                 if card:
-                    self._save_as_template(card, genre)
+                    new_template = self._save_as_template(card, genre)
 
         if card:
             db.session.add(card)
+            CardStatsService().refresh_card_stats(user_id)
             db.session.commit()
+            if new_template is not None:
+                invalidate_template_pool(genre)
             logger.info(
                 f"Generated {rarity.value} card for user {user_id}: {card.name} "
                 f"(new={should_generate})"
@@ -679,6 +699,58 @@ class CardService:
 
         return card
 
+    def _create_card_from_stock(
+        self, user_id: int, task_id: int | None, genre: str, rarity: CardRarity
+    ) -> UserCard | None:
+        """Create a card from pre-generated stock, or None if out of stock.
+
+        Legendary cards come from the reserve (each entry is used once),
+        other rarities from the existing template pool.
+        """
+        if rarity == CardRarity.LEGENDARY:
+            from app.services.card_pool_service import CardPoolService
+
+            reserved = CardPoolService().claim_legendary(genre)
+            if reserved is None:
+                logger.warning(f"Legendary reserve empty for genre {genre}")
+                return None
+            card = self._create_card_from_template(user_id, task_id, reserved, rarity)
+            card.template_id = None  # Unique card, not a template instance
+            return card
+
+        template = self._get_random_template(genre, rarity)
+        if template is None:
+            return None
+        return self._create_card_from_template(user_id, task_id, template, rarity)
+
+    def create_card_from_pool(
+        self, user_id: int, task_id: int | None, genre: str, rarity: CardRarity
+    ) -> UserCard:
+        """Create a card from stock without OpenAI calls or pool counts.
+
+        Falls back to a tiered archetype card when the stock is empty.
+        """
+        card = self._create_card_from_stock(user_id, task_id, genre, rarity)
+        if card is not None:
+            return card
+
+        name, description = self._generate_fallback_text(
+            genre, rarity, self.get_user_level(user_id)
+        )
+        archetype = PooledTemplate(
+            id=None,
+            name=name,
+            description=description,
+            genre=genre,
+            base_hp=random.randint(40, 60),
+            base_attack=random.randint(12, 20),
+            image_url=None,
+            emoji=random.choice(
+                GENRE_CARD_EMOJIS.get(genre, GENRE_CARD_EMOJIS["fantasy"])
+            ),
+        )
+        return self._create_card_from_template(user_id, task_id, archetype, rarity)
+
     def _save_as_template(self, card: UserCard, genre: str) -> CardTemplate | None:
         """Save a generated card as a template for future reuse."""
         try:
@@ -717,32 +789,21 @@ class CardService:
 
     def _get_random_template(
         self, genre: str, rarity: CardRarity | None = None
-    ) -> CardTemplate | None:
-        """Get a random active template for the genre.
+    ) -> PooledTemplate | None:
+        """Get a weighted random active template for the genre from the pool.
 
         Priority:
         1. Templates with matching rarity (if any exist)
         2. Universal templates (rarity=NULL)
         """
-        # First, try to find templates specifically for this rarity
-        if rarity:
-            rarity_templates = CardTemplate.query.filter_by(
-                genre=genre, is_active=True, rarity=rarity.value
-            ).all()
-            if rarity_templates:
-                return random.choice(rarity_templates)
-
-        # Fall back to universal templates (no rarity set)
-        universal_templates = CardTemplate.query.filter_by(
-            genre=genre, is_active=True, rarity=None
-        ).all()
-        if universal_templates:
-            return random.choice(universal_templates)
-
-        return None
+        return get_genre_pool(genre).sample(rarity.value if rarity else None)
 
     def _create_card_from_template(
-        self, user_id: int, task_id: int, template: CardTemplate, rarity: CardRarity
+        self,
+        user_id: int,
+        task_id: int,
+        template: CardTemplate | PooledTemplate,
+        rarity: CardRarity,
     ) -> UserCard:
         """Create a user card from a template with rarity and level modifiers."""
         rarity_mult = RARITY_MULTIPLIERS[rarity]
@@ -929,13 +990,17 @@ class CardService:
             card.image_url = image_url
 
             # Also update template if card has one (for future reuse)
+            updated_template = None
             if card.template_id:
                 template = CardTemplate.query.get(card.template_id)
                 if template and not template.image_url:
                     template.image_url = image_url
+                    updated_template = template
                     logger.info(f"Updated template {card.template_id} with image")
 
             db.session.commit()
+            if updated_template is not None:
+                invalidate_template_pool(updated_template.genre)
             logger.info(f"Generated image for card {card_id}: {image_url}")
             return {"success": True, "image_url": image_url}
         else:
@@ -1114,10 +1179,16 @@ class CardService:
         return query.order_by(UserCard.created_at.desc()).all()
 
     def get_user_deck(self, user_id: int) -> list[UserCard]:
-        """Get user's active battle deck."""
-        return UserCard.query.filter_by(
-            user_id=user_id, is_in_deck=True, is_destroyed=False
-        ).all()
+        """Get user's active battle deck, in deck order."""
+        return (
+            UserCard.query.filter_by(
+                user_id=user_id, is_in_deck=True, is_destroyed=False
+            )
+            .order_by(
+                UserCard.deck_position.is_(None), UserCard.deck_position, UserCard.id
+            )
+            .all()
+        )
 
     def add_to_deck(
         self, user_id: int, card_id: int, max_deck_size: int = 5, lang: str = "en"
@@ -1139,7 +1210,13 @@ class CardService:
         if len(current_deck) >= max_deck_size:
             return {"success": False, "error": "deck_full", "max_size": max_deck_size}
 
+        # After the last card, even if removals left gaps in the positions
+        positions = [
+            c.deck_position for c in current_deck if c.deck_position is not None
+        ]
         card.is_in_deck = True
+        card.deck_position = max(positions, default=-1) + 1
+        CardStatsService().refresh_card_stats(user_id)
         db.session.commit()
 
         return {"success": True, "card": card.to_dict(lang)}
@@ -1155,6 +1232,8 @@ class CardService:
             return {"success": False, "error": "not_in_deck"}
 
         card.is_in_deck = False
+        card.deck_position = None
+        CardStatsService().refresh_card_stats(user_id)
         db.session.commit()
 
         return {"success": True}
@@ -1176,14 +1255,9 @@ class CardService:
 
     def heal_all_cards(self, user_id: int) -> int:
         """Heal all user's cards. Returns number of cards healed."""
-        cards = UserCard.query.filter_by(user_id=user_id, is_destroyed=False).all()
-        healed = 0
-
-        for card in cards:
-            if card.current_hp < card.hp:
-                card.heal()
-                healed += 1
+        from app.services.card_batch_service import CardBatchService
 
+        healed = CardBatchService().heal_cards(user_id)
         db.session.commit()
         return healed
 
@@ -1257,8 +1331,13 @@ class CardService:
 
         Cards are max rare, with higher chance for rare and uncommon.
         Distribution: 40% common, 40% uncommon, 20% rare
+
+        Cards come from the genre's existing template pool; only a rarity
+        without any template falls back to generating a card.
         """
+        genre = self.get_user_genre(user_id)
         cards = []
+        from_pool = 0
 
         # Starter deck rarity distribution
         starter_probabilities = [
@@ -1275,16 +1354,27 @@ class CardService:
                     rarity = r
                     break
 
-            card = self.generate_card_for_task(
-                user_id=user_id,
-                task_id=None,
-                task_title=f"Стартовая карта #{i + 1}",
-                difficulty="medium",
-                forced_rarity=rarity,
-            )
+            template = self._get_random_template(genre, rarity)
+            if template:
+                card = self._create_card_from_template(user_id, None, template, rarity)
+                db.session.add(card)
+                from_pool += 1
+            else:
+                card = self.generate_card_for_task(
+                    user_id=user_id,
+                    task_id=None,
+                    task_title=f"Стартовая карта #{i + 1}",
+                    difficulty="medium",
+                    forced_rarity=rarity,
+                    forced_genre=genre,
+                )
             if card:
                 cards.append(card)
 
+        if from_pool:
+            CardStatsService().refresh_card_stats(user_id)
+            db.session.commit()
+
         logger.info(
             f"Generated starter deck for user {user_id}: "
             f"{[c.rarity for c in cards]}"
@@ -1413,6 +1503,7 @@ class CardService:
         card2.is_in_deck = False
 
         db.session.add(new_card)
+        CardStatsService().refresh_card_stats(user_id)
         db.session.commit()
 
         # Get rarity name for message
@@ -1471,7 +1562,7 @@ class CardService:
 
     def get_unlocked_genres(self, user_id: int) -> list[str]:
         """Get list of genres the user has unlocked."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return ["fantasy"]
 
@@ -1488,11 +1579,11 @@ class CardService:
         Returns dict with unlock info including 2 suggested genres
         based on the user's genre sequence, plus all available as fallback.
         """
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if not user:
             return None
 
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return None
 
@@ -1528,11 +1619,11 @@ class CardService:
         if genre not in ALL_GENRES:
             return {"success": False, "error": "invalid_genre"}
 
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if not user:
             return {"success": False, "error": "user_not_found"}
 
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"success": False, "error": "profile_not_found"}
 
@@ -1587,6 +1678,41 @@ class CardService:
         if card.is_destroyed:
             return {"success": False, "error": "card_destroyed"}
 
+        result = self._apply_card_xp(card, xp_amount)
+        if result.get("level_up"):
+            CardStatsService().refresh_card_stats(user_id)
+        db.session.commit()
+
+        if not result.get("already_max"):
+            result["card"] = card.to_dict(lang)
+        return result
+
+    def add_cards_xp(self, user_id: int, card_ids: list[int], xp_amount: int) -> list:
+        """Add XP to several of a user's cards in one transaction.
+
+        Destroyed and foreign cards are skipped. Returns the results of the
+        cards that leveled up (as ``add_card_xp`` returns them).
+        """
+        if not card_ids:
+            return []
+        cards = UserCard.query.filter(
+            UserCard.id.in_(card_ids),
+            UserCard.user_id == user_id,
+            UserCard.is_destroyed.is_(False),
+        ).all()
+        results = [self._apply_card_xp(card, xp_amount) for card in cards]
+        level_ups = [
+            {**result, "card": card.to_dict()}
+            for card, result in zip(cards, results)
+            if result.get("level_up")
+        ]
+        if level_ups:
+            CardStatsService().refresh_card_stats(user_id)
+        db.session.commit()
+        return level_ups
+
+    def _apply_card_xp(self, card: UserCard, xp_amount: int) -> dict:
+        """Add XP to a loaded card and level it up (no commit)."""
         rarity = CardRarity(card.rarity)
         max_level = CARD_MAX_LEVEL.get(rarity, 3)
 
@@ -1615,8 +1741,6 @@ class CardService:
             card.attack = int(card.attack * level_bonus / old_bonus)
             card.current_hp = card.hp  # Full heal on level up
 
-        db.session.commit()
-
         return {
             "success": True,
             "level_up": leveled_up,
@@ -1625,7 +1749,6 @@ class CardService:
             "card_xp": card.card_xp,
             "xp_to_next": new_level * CARD_XP_PER_LEVEL if new_level < max_level else 0,
             "max_level": max_level,
-            "card": card.to_dict(lang),
         }
 
     # ============ Companion System (delegated to CompanionService) ============
@@ -0,0 +1,89 @@
+"""Settlement of cards changing hands: row locks, availability, transfers.
+
+Trades, merges and marketplace listings and purchases lock the
+``user_cards`` rows they touch with ``lock_cards`` before checking them.
+Rows are always locked in id order (``FOR UPDATE``), so two operations on
+overlapping cards wait for each other instead of deadlocking, and the
+checks see the state the winner committed.
+
+A card is unavailable while it is listed on the marketplace or fighting in
+an active battle of its owner. ``transfer`` moves any number of cards to
+new owners with one bulk UPDATE.
+"""
+
+from sqlalchemy import case
+
+from app import db
+from app.models.card import UserCard
+from app.models.character import ActiveBattle
+from app.models.marketplace import MarketListing
+
+
+def lock_query(card_ids):
+    """Query locking the cards in id order (fresh values, not the session's)."""
+    return (
+        UserCard.query.filter(UserCard.id.in_(card_ids))
+        .order_by(UserCard.id)
+        .with_for_update()
+        .populate_existing()
+    )
+
+
+def lock_cards(card_ids) -> dict[int, UserCard]:
+    """Lock the cards until the transaction ends; missing ids are left out."""
+    card_ids = set(card_ids)
+    if not card_ids:
+        return {}
+    return {card.id: card for card in lock_query(card_ids)}
+
+
+def listed_card_ids(card_ids) -> set[int]:
+    """Cards with an active marketplace listing."""
+    return {
+        card_id
+        for (card_id,) in db.session.query(MarketListing.card_id).filter(
+            MarketListing.card_id.in_(card_ids), MarketListing.status == "active"
+        )
+    }
+
+
+def battle_card_ids(user_ids) -> set[int]:
+    """Cards fighting in the active battles of the users."""
+    battles = db.session.query(ActiveBattle.state).filter(
+        ActiveBattle.user_id.in_(user_ids), ActiveBattle.status == "active"
+    )
+    return {
+        card["id"]
+        for (state,) in battles
+        for card in (state or {}).get("player_cards", [])
+    }
+
+
+def unavailable(cards: list[UserCard]) -> dict | None:
+    """Error for listed or battling cards among the (locked) cards, if any."""
+    card_ids = {card.id for card in cards}
+    listed = listed_card_ids(card_ids)
+    if listed:
+        return {"error": "card_listed", "card_ids": sorted(listed)}
+
+    in_battle = card_ids & battle_card_ids({card.user_id for card in cards})
+    if in_battle:
+        return {"error": "card_in_battle", "card_ids": sorted(in_battle)}
+    return None
+
+
+def transfer(new_owners: dict[int, int]) -> None:
+    """Give each card (id -> new owner id) away, out of any deck; no commit."""
+    if not new_owners:
+        return
+    UserCard.query.filter(UserCard.id.in_(new_owners)).update(
+        {
+            UserCard.user_id: case(new_owners, value=UserCard.id),
+            UserCard.is_in_deck: False,
+            UserCard.deck_position: None,
+        },
+        synchronize_session=False,
+    )
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, UserCard) and obj.id in new_owners:
+            db.session.expire(obj, ["user_id", "is_in_deck", "deck_position"])
@@ -0,0 +1,132 @@
+"""Denormalized per-user card stats (deck power, active card count)."""
+
+import logging
+
+from app import db
+from app.models.card import Friendship, UserCard, UserCardStats
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class CardStatsService:
+    """Keeps ``user_card_stats`` in sync and serves rankings from it."""
+
+    def refresh_card_stats(self, *user_ids: int) -> None:
+        """Recompute deck power and active card count for the given users.
+
+        Runs a single aggregate query over ``user_cards`` and writes the result
+        into ``user_card_stats``. Does not commit: call it right before the
+        caller's commit so the stats land in the same transaction as the card
+        change (pending changes are autoflushed into the aggregate).
+        """
+        ids = {uid for uid in user_ids if uid}
+        if not ids:
+            return
+
+        deck_power_expr = db.func.coalesce(
+            db.func.sum(
+                db.case(
+                    (UserCard.is_in_deck.is_(True), UserCard.hp + UserCard.attack),
+                    else_=0,
+                )
+            ),
+            0,
+        )
+        rows = (
+            db.session.query(
+                UserCard.user_id, deck_power_expr, db.func.count(UserCard.id)
+            )
+            .filter(UserCard.user_id.in_(ids), UserCard.is_destroyed.is_(False))
+            .group_by(UserCard.user_id)
+            .all()
+        )
+        aggregates = {uid: (int(power), int(count)) for uid, power, count in rows}
+
+        existing = {
+            s.user_id: s
+            for s in UserCardStats.query.filter(UserCardStats.user_id.in_(ids)).all()
+        }
+        for uid in ids:
+            deck_power, active_cards = aggregates.get(uid, (0, 0))
+            stats = existing.get(uid)
+            if stats is None:
+                stats = UserCardStats(user_id=uid)
+                db.session.add(stats)
+            stats.deck_power = deck_power
+            stats.active_cards_count = active_cards
+
+    def get_card_stats(self, user_id: int) -> UserCardStats | None:
+        """Get the stored card stats for a user."""
+        return UserCardStats.query.get(user_id)
+
+    def get_friends_ranking(self, user_id: int) -> list[dict]:
+        """Rank the user and their accepted friends by deck power.
+
+        A single query over users joined with ``user_card_stats``, so the cost
+        does not grow with the number of friends.
+        """
+        friend_ids = db.select(
+            db.case(
+                (Friendship.user_id == user_id, Friendship.friend_id),
+                else_=Friendship.user_id,
+            )
+        ).where(
+            ((Friendship.user_id == user_id) | (Friendship.friend_id == user_id))
+            & (Friendship.status == "accepted")
+        )
+
+        deck_power = db.func.coalesce(UserCardStats.deck_power, 0)
+        rows = (
+            db.session.query(
+                User,
+                deck_power.label("deck_power"),
+                db.func.coalesce(UserCardStats.active_cards_count, 0).label(
+                    "cards_count"
+                ),
+            )
+            .outerjoin(UserCardStats, UserCardStats.user_id == User.id)
+            .filter((User.id == user_id) | User.id.in_(friend_ids))
+            .order_by(deck_power.desc(), User.id)
+            .all()
+        )
+
+        ranking = []
+        for rank, (user, power, cards_count) in enumerate(rows, start=1):
+            entry = {
+                "user_id": user.id,
+                "username": user.username,
+                "first_name": user.first_name,
+                "level": user.level,
+                "deck_power": power,
+                "cards_count": cards_count,
+                "rank": rank,
+            }
+            if user.id == user_id:
+                entry["is_me"] = True
+            ranking.append(entry)
+
+        return ranking
+
+    def recompute_all_card_stats(self, batch_size: int = 500) -> int:
+        """Rebuild stats for every user (reconciliation). Returns users processed."""
+        processed = 0
+        last_id = 0
+        while True:
+            ids = [
+                uid
+                for (uid,) in db.session.query(User.id)
+                .filter(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+                .all()
+            ]
+            if not ids:
+                break
+            self.refresh_card_stats(*ids)
+            db.session.commit()
+            processed += len(ids)
+            last_id = ids[-1]
+
+        logger.info(f"Recomputed card stats for {processed} users")
+        return processed
@@ -5,6 +5,8 @@ from datetime import datetime
 
 from app import db
 from app.models.card import CardTrade, Friendship, UserCard
+from app.services import card_settlement
+from app.services.card_stats_service import CardStatsService
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,13 @@ class CardTradingService:
         receiver_card_ids: list[int] | None = None,
     ) -> dict:
         """Create a card trade offer (supports single or multiple cards)."""
+        # Friendships are stored once per pair, in either direction
+        pair = (sender_id, receiver_id)
         is_friend = Friendship.query.filter(
-            (
-                (Friendship.user_id == sender_id)
-                & (Friendship.friend_id == receiver_id)
-                | (Friendship.user_id == receiver_id)
-                & (Friendship.friend_id == sender_id)
-            )
-            & (Friendship.status == "accepted")
+            Friendship.user_id.in_(pair),
+            Friendship.friend_id.in_(pair),
+            Friendship.user_id != Friendship.friend_id,
+            Friendship.status == "accepted",
         ).first()
 
         if not is_friend:
@@ -44,26 +45,15 @@ class CardTradingService:
         if not actual_sender_ids:
             return {"success": False, "error": "no_sender_cards"}
 
-        sender_cards = UserCard.query.filter(
-            UserCard.id.in_(actual_sender_ids),
-            UserCard.user_id == sender_id,
-            UserCard.is_tradeable.is_(True),
-            UserCard.is_destroyed.is_(False),
+        # Both sides are validated with one query
+        cards = UserCard.query.filter(
+            UserCard.id.in_(set(actual_sender_ids) | set(actual_receiver_ids))
         ).all()
-
-        if len(sender_cards) != len(actual_sender_ids):
-            return {"success": False, "error": "sender_card_invalid"}
-
-        if actual_receiver_ids:
-            receiver_cards = UserCard.query.filter(
-                UserCard.id.in_(actual_receiver_ids),
-                UserCard.user_id == receiver_id,
-                UserCard.is_tradeable.is_(True),
-                UserCard.is_destroyed.is_(False),
-            ).all()
-
-            if len(receiver_cards) != len(actual_receiver_ids):
-                return {"success": False, "error": "receiver_card_invalid"}
+        error = self._check_cards(
+            cards, sender_id, actual_sender_ids, receiver_id, actual_receiver_ids
+        )
+        if error:
+            return {"success": False, **error}
 
         trade = CardTrade(
             sender_id=sender_id,
@@ -88,9 +78,15 @@ class CardTradingService:
 
     def accept_trade(self, user_id: int, trade_id: int) -> dict:
         """Accept a trade offer (supports multi-card trades)."""
-        trade = CardTrade.query.filter_by(
-            id=trade_id, receiver_id=user_id, status="pending"
-        ).first()
+        # The trade row is locked first so it is settled once, then every
+        # card of both sides in id order
+        trade = (
+            CardTrade.query.filter_by(
+                id=trade_id, receiver_id=user_id, status="pending"
+            )
+            .with_for_update()
+            .first()
+        )
 
         if not trade:
             return {"success": False, "error": "trade_not_found"}
@@ -102,26 +98,56 @@ class CardTradingService:
             [trade.receiver_card_id] if trade.receiver_card_id else []
         )
 
-        if sender_card_ids:
-            sender_cards = UserCard.query.filter(UserCard.id.in_(sender_card_ids)).all()
-            for card in sender_cards:
-                card.user_id = trade.receiver_id
-                card.is_in_deck = False
+        cards = card_settlement.lock_cards(sender_card_ids + receiver_card_ids)
+        error = self._check_cards(
+            list(cards.values()),
+            trade.sender_id,
+            sender_card_ids,
+            trade.receiver_id,
+            receiver_card_ids,
+        )
+        if error:
+            db.session.rollback()
+            return {"success": False, **error}
 
-        if receiver_card_ids:
-            receiver_cards = UserCard.query.filter(
-                UserCard.id.in_(receiver_card_ids)
-            ).all()
-            for card in receiver_cards:
-                card.user_id = trade.sender_id
-                card.is_in_deck = False
+        new_owners = {card_id: trade.receiver_id for card_id in sender_card_ids}
+        new_owners.update({card_id: trade.sender_id for card_id in receiver_card_ids})
+        card_settlement.transfer(new_owners)
 
         trade.status = "accepted"
         trade.completed_at = datetime.utcnow()
+        CardStatsService().refresh_card_stats(trade.sender_id, trade.receiver_id)
         db.session.commit()
 
         return {"success": True, "trade": trade.to_dict()}
 
+    def _check_cards(
+        self,
+        cards: list[UserCard],
+        sender_id: int,
+        sender_card_ids: list[int],
+        receiver_id: int,
+        receiver_card_ids: list[int],
+    ) -> dict | None:
+        """Error if a side's cards are gone, untradeable, listed or battling."""
+        by_id = {card.id: card for card in cards}
+        for error, owner_id, card_ids in (
+            ("sender_card_invalid", sender_id, sender_card_ids),
+            ("receiver_card_invalid", receiver_id, receiver_card_ids),
+        ):
+            invalid = [
+                card_id
+                for card_id in card_ids
+                if card_id not in by_id
+                or by_id[card_id].user_id != owner_id
+                or not by_id[card_id].is_tradeable
+                or by_id[card_id].is_destroyed
+            ]
+            if invalid or len(set(card_ids)) != len(card_ids):
+                return {"error": error, "card_ids": invalid}
+
+        return card_settlement.unavailable(cards)
+
     def reject_trade(self, user_id: int, trade_id: int) -> dict:
         """Reject a trade offer."""
         trade = CardTrade.query.filter_by(
@@ -4,6 +4,7 @@ import json
 import logging
 
 from app import db
+from app.metrics import record_cache_lookup
 from app.models.card import UserCard
 
 logger = logging.getLogger(__name__)
@@ -69,6 +70,7 @@ class CompanionService:
 
             r = get_redis_client()
             cached = r.get(_companion_cache_key(user_id))
+            record_cache_lookup("companion", cached is not None)
             if cached is not None:
                 data = json.loads(cached)
                 if data is None:
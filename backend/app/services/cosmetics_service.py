@@ -9,8 +9,7 @@ import logging
 from sqlalchemy.orm.attributes import flag_modified
 
 from app import db
-from app.models.user import User
-from app.models.user_profile import UserProfile
+from app.utils.identity import get_profile, get_user
 
 logger = logging.getLogger(__name__)
 
@@ -137,7 +136,7 @@ class CosmeticsService:
 
     def get_user_cosmetics(self, user_id: int, lang: str = "ru") -> dict:
         """Get user's owned cosmetics and equipped items."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         owned = profile.owned_cosmetics if profile else []
         equipped_card_frame = profile.equipped_card_frame if profile else None
         equipped_profile_frame = profile.equipped_profile_frame if profile else None
@@ -165,7 +164,7 @@ class CosmeticsService:
         if not cosmetic:
             return {"error": "cosmetic_not_found"}
 
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if not user:
             return {"error": "user_not_found"}
 
@@ -174,7 +173,7 @@ class CosmeticsService:
             return {"error": "level_too_low", "required_level": cosmetic["min_level"]}
 
         # Check if already owned
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"error": "profile_not_found"}
 
@@ -211,7 +210,7 @@ class CosmeticsService:
 
     def equip_cosmetic(self, user_id: int, cosmetic_id: str | None) -> dict:
         """Equip a cosmetic (or unequip if cosmetic_id is None)."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"error": "profile_not_found"}
 
@@ -239,7 +238,7 @@ class CosmeticsService:
 
     def unequip_cosmetic(self, user_id: int, cosmetic_type: str) -> dict:
         """Unequip a cosmetic by type (card_frame or profile_frame)."""
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"error": "profile_not_found"}
 
@@ -0,0 +1,391 @@
+"""Per-user activity counters: today's and all-time completed work.
+
+User stats, daily goals and heal status used to COUNT/SUM tasks, subtasks,
+focus sessions and mood checks on every call. The counts are kept instead
+in ``user_daily_counters`` (one row per user and day) and ``user_counters``
+(one row per user), so each endpoint reads single rows.
+
+Counters follow the rows themselves rather than the endpoints that change
+them: a session listener diffs every flushed Task, Subtask, FocusSession
+and MoodCheck against its previous state (a task reopened or deleted after
+completion counts down again), and the changes are written when the
+transaction commits, in that transaction. Days are those of the row
+timestamps the old queries filtered on (``completed_at``, focus
+``started_at``, mood ``created_at``).
+
+Completed tasks and subtasks also go to the year activity heatmaps
+(app.services.activity_heatmap) in the same write.
+
+Writes outside the ORM update the counters themselves (the bot's focus
+timer) or are repaired by ``reconcile``, which recomputes recent days and
+all totals from the source tables (the ``reconcile_daily_counters`` Celery
+task).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.counters import COUNTER_FIELDS, UserCounters, UserDailyCounters
+from app.models.focus_session import FocusSession, FocusSessionStatus
+from app.models.mood import MoodCheck
+from app.models.subtask import Subtask, SubtaskStatus
+from app.models.task import Task, TaskStatus
+from app.services import activity_heatmap
+
+logger = logging.getLogger(__name__)
+
+# session.info key of the (user_id, day) -> {field: delta} changes to write
+_PENDING_KEY = "daily_counter_deltas"
+
+_listeners_installed = False
+
+
+def today() -> date:
+    """Today in UTC: rows are keyed by the date of naive UTC timestamps."""
+    return datetime.utcnow().date()
+
+
+def _day(timestamp: datetime | None) -> date:
+    return timestamp.date() if timestamp else today()
+
+
+# Counters a row contributes in a given state (``get`` reads an attribute).
+# Returns (user_id, day, {field: amount}) or None if the row counts nothing.
+
+
+def _task_counts(task, get):
+    if get("status") != TaskStatus.COMPLETED.value:
+        return None
+    return get("user_id"), _day(get("completed_at")), {"tasks_completed": 1}
+
+
+def _subtask_counts(subtask, get):
+    if get("status") != SubtaskStatus.COMPLETED.value:
+        return None
+    # Pending subtasks do not load their task
+    task = subtask.task or db.session.get(Task, get("task_id"))
+    if task is None:
+        return None
+    return task.user_id, _day(get("completed_at")), {"subtasks_completed": 1}
+
+
+def _focus_counts(session, get):
+    if get("status") != FocusSessionStatus.COMPLETED.value:
+        return None
+    return (
+        get("user_id"),
+        _day(get("started_at")),
+        {"focus_sessions": 1, "focus_minutes": get("actual_duration_minutes") or 0},
+    )
+
+
+def _mood_counts(check, get):
+    return get("user_id"), _day(get("created_at")), {"mood_checks": 1}
+
+
+_COUNTED = {
+    Task: _task_counts,
+    Subtask: _subtask_counts,
+    FocusSession: _focus_counts,
+    MoodCheck: _mood_counts,
+}
+
+# Attributes the counts depend on; their old value is needed on change
+_TRACKED_ATTRIBUTES = (
+    Task.status,
+    Task.completed_at,
+    Subtask.status,
+    Subtask.completed_at,
+    FocusSession.status,
+    FocusSession.started_at,
+    FocusSession.actual_duration_minutes,
+)
+
+
+def _current(obj):
+    return lambda attr: getattr(obj, attr)
+
+
+def _previous(obj):
+    """Attribute reader for the row as it was loaded (before this flush)."""
+    state = inspect(obj)
+
+    def get(attr):
+        history = state.attrs[attr].history
+        if history.deleted:
+            return history.deleted[0]
+        return getattr(obj, attr)
+
+    return get
+
+
+def _collect(session, flush_context, instances):
+    """before_flush: diff counted rows against their previous state."""
+    pending = session.info.setdefault(
+        _PENDING_KEY, defaultdict(lambda: defaultdict(int))
+    )
+
+    def add(counted, sign):
+        if counted is None:
+            return
+        user_id, day, amounts = counted
+        if user_id is None:
+            return
+        for field, amount in amounts.items():
+            pending[(user_id, day)][field] += sign * amount
+
+    with session.no_autoflush:
+        for obj in session.new:
+            counts = _COUNTED.get(type(obj))
+            if counts:
+                add(counts(obj, _current(obj)), 1)
+        for obj in session.deleted:
+            counts = _COUNTED.get(type(obj))
+            if counts:
+                add(counts(obj, _previous(obj)), -1)
+            if isinstance(obj, Task):
+                # Subtasks are deleted by the cascade later in the flush
+                for day, n in _completed_subtask_days(session, obj):
+                    add((obj.user_id, day, {"subtasks_completed": n}), -1)
+        for obj in session.dirty:
+            counts = _COUNTED.get(type(obj))
+            if counts and session.is_modified(obj, include_collections=False):
+                add(counts(obj, _previous(obj)), -1)
+                add(counts(obj, _current(obj)), 1)
+
+
+def _completed_subtask_days(session, task) -> list[tuple[date, int]]:
+    """Completed subtasks of a task per day, except those already deleted."""
+    skip = [obj.id for obj in session.deleted if isinstance(obj, Subtask)]
+    query = (
+        session.query(func.date(Subtask.completed_at), func.count(Subtask.id))
+        .filter(
+            Subtask.task_id == task.id,
+            Subtask.status == SubtaskStatus.COMPLETED.value,
+            Subtask.id.notin_(skip),
+        )
+        .group_by(func.date(Subtask.completed_at))
+    )
+    return [(_as_date(day), n) for day, n in query]
+
+
+def _as_date(day) -> date:
+    # SQLite returns func.date() as a string
+    if day is None:
+        return today()
+    return date.fromisoformat(day) if isinstance(day, str) else day
+
+
+def _write(session):
+    """before_commit: add the collected changes to the counter rows."""
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for (user_id, day), deltas in pending.items():
+        deltas = {field: n for field, n in deltas.items() if n}
+        if not deltas:
+            continue
+        _add(session, UserDailyCounters, {"user_id": user_id, "day": day}, deltas)
+        for field, n in deltas.items():
+            totals[user_id][field] += n
+        completions = deltas.get("tasks_completed", 0) + deltas.get(
+            "subtasks_completed", 0
+        )
+        if completions:
+            activity_heatmap.add(session, user_id, day, completions)
+
+    for user_id, deltas in totals.items():
+        _add(session, UserCounters, {"user_id": user_id}, deltas)
+    session.flush()
+
+
+def _discard(session, previous_transaction):
+    """after_soft_rollback: drop the changes of the rolled back work."""
+    if session.in_transaction():
+        # A savepoint was rolled back; its rows were collected with the rest
+        # of the transaction and are repaired by reconcile if it commits
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _add(session, model, key: dict, deltas: dict) -> None:
+    if _increment(session, model, key, deltas):
+        return
+    try:
+        with session.begin_nested():
+            session.add(model(**key, **{f: deltas.get(f, 0) for f in COUNTER_FIELDS}))
+    except IntegrityError:
+        # Created by a concurrent transaction in the meantime
+        _increment(session, model, key, deltas)
+
+
+def _increment(session, model, key: dict, deltas: dict) -> bool:
+    """Atomically add to an existing row. False if there is none."""
+    values = {
+        getattr(model, field): getattr(model, field) + n for field, n in deltas.items()
+    }
+    if model is UserCounters:
+        values[UserCounters.updated_at] = datetime.utcnow()
+    updated = (
+        session.query(model).filter_by(**key).update(values, synchronize_session=False)
+    )
+    return bool(updated)
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+
+def install_listeners() -> None:
+    """Track counted rows in every session (idempotent)."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    for attribute in _TRACKED_ATTRIBUTES:
+        # Load the old value when an expired attribute is overwritten
+        event.listen(attribute, "set", _keep_history, active_history=True)
+    event.listen(Session, "before_flush", _collect)
+    event.listen(Session, "before_commit", _write)
+    event.listen(Session, "after_soft_rollback", _discard)
+    _listeners_installed = True
+
+
+def get_today(user_id: int) -> dict[str, int]:
+    """Counters of today (all zero before the first activity)."""
+    row = db.session.get(UserDailyCounters, (user_id, today()))
+    return row.counters() if row else dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def get_totals(user_id: int) -> dict[str, int]:
+    """All-time counters of a user."""
+    row = db.session.get(UserCounters, user_id)
+    return row.counters() if row else dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def _source_counts(since: date | None) -> dict[tuple[int, date], dict[str, int]]:
+    """Counters per (user, day) recomputed from the source tables."""
+    counts = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+    def since_filter(column):
+        if since is None:
+            return []
+        return [column >= datetime.combine(since, datetime.min.time())]
+
+    tasks = (
+        db.session.query(
+            Task.user_id, func.date(Task.completed_at), func.count(Task.id)
+        )
+        .filter(
+            Task.status == TaskStatus.COMPLETED.value,
+            Task.completed_at.isnot(None),
+            *since_filter(Task.completed_at),
+        )
+        .group_by(Task.user_id, func.date(Task.completed_at))
+    )
+    for user_id, day, n in tasks:
+        counts[(user_id, day)]["tasks_completed"] = n
+
+    subtasks = (
+        db.session.query(
+            Task.user_id, func.date(Subtask.completed_at), func.count(Subtask.id)
+        )
+        .join(Task, Subtask.task_id == Task.id)
+        .filter(
+            Subtask.status == SubtaskStatus.COMPLETED.value,
+            Subtask.completed_at.isnot(None),
+            *since_filter(Subtask.completed_at),
+        )
+        .group_by(Task.user_id, func.date(Subtask.completed_at))
+    )
+    for user_id, day, n in subtasks:
+        counts[(user_id, day)]["subtasks_completed"] = n
+
+    focus = (
+        db.session.query(
+            FocusSession.user_id,
+            func.date(FocusSession.started_at),
+            func.count(FocusSession.id),
+            func.coalesce(func.sum(FocusSession.actual_duration_minutes), 0),
+        )
+        .filter(
+            FocusSession.status == FocusSessionStatus.COMPLETED.value,
+            *since_filter(FocusSession.started_at),
+        )
+        .group_by(FocusSession.user_id, func.date(FocusSession.started_at))
+    )
+    for user_id, day, n, minutes in focus:
+        counts[(user_id, day)]["focus_sessions"] = n
+        counts[(user_id, day)]["focus_minutes"] = int(minutes)
+
+    moods = (
+        db.session.query(
+            MoodCheck.user_id, func.date(MoodCheck.created_at), func.count(MoodCheck.id)
+        )
+        .filter(*since_filter(MoodCheck.created_at))
+        .group_by(MoodCheck.user_id, func.date(MoodCheck.created_at))
+    )
+    for user_id, day, n in moods:
+        counts[(user_id, day)]["mood_checks"] = n
+
+    return {(user_id, _as_date(day)): c for (user_id, day), c in counts.items()}
+
+
+def reconcile(days: int = 2) -> dict:
+    """Rewrite the last ``days`` daily rows and all totals from the source tables.
+
+    Returns how many rows were off.
+    """
+    since = today() - timedelta(days=days - 1)
+    recent = _source_counts(since)
+    drift = {"days": 0, "totals": 0}
+
+    stored = {
+        (row.user_id, row.day): row
+        for row in UserDailyCounters.query.filter(UserDailyCounters.day >= since)
+    }
+    for key in stored.keys() | recent.keys():
+        expected = recent.get(key, dict.fromkeys(COUNTER_FIELDS, 0))
+        row = stored.get(key)
+        if row is None:
+            row = UserDailyCounters(user_id=key[0], day=key[1])
+            db.session.add(row)
+        elif row.counters() == expected:
+            continue
+        drift["days"] += 1
+        for field, n in expected.items():
+            setattr(row, field, n)
+        activity_heatmap.set_day(
+            db.session,
+            *key,
+            expected["tasks_completed"] + expected["subtasks_completed"],
+        )
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for (user_id, _), day_counts in _source_counts(None).items():
+        for field, n in day_counts.items():
+            totals[user_id][field] += n
+
+    stored_totals = {row.user_id: row for row in UserCounters.query}
+    for user_id in stored_totals.keys() | totals.keys():
+        expected = totals.get(user_id, dict.fromkeys(COUNTER_FIELDS, 0))
+        row = stored_totals.get(user_id)
+        if row is None:
+            row = UserCounters(user_id=user_id)
+            db.session.add(row)
+        elif row.counters() == expected:
+            continue
+        drift["totals"] += 1
+        for field, n in expected.items():
+            setattr(row, field, n)
+
+    db.session.commit()
+    return drift
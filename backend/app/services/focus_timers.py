@@ -0,0 +1,170 @@
+"""Focus session timers and open-session snapshots in Redis.
+
+Running timed sessions are kept in the ``FOCUS_DEADLINES_KEY`` sorted set,
+scored by the epoch second they run out. The bot's focus timer pops due
+sessions and completes them as they expire (bot/services/focus_timer.py).
+Pausing takes a session out of the set; resuming and extending put it back
+with the deadline moved.
+
+Each user's open (active or paused) sessions are also kept as a hash of
+``FocusSession.to_dict()`` snapshots, so /focus/active is answered without
+the database. A hash without the ``SEEDED_FIELD`` marker is reseeded from
+the database. If Redis is unavailable the endpoints read the database and
+the bot's periodic sweep completes expired sessions.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+
+from app.models.focus_session import FocusSession, FocusSessionStatus
+
+logger = logging.getLogger(__name__)
+
+FOCUS_DEADLINES_KEY = "focus:deadlines"
+FOCUS_USER_KEY = "focus:user:{user_id}"
+SEEDED_FIELD = "_seeded"
+USER_SESSIONS_TTL = 86400
+
+# planned_duration_minutes of "no timer" sessions
+NO_TIMER_MINUTES = 480
+
+OPEN_STATUSES = [FocusSessionStatus.ACTIVE.value, FocusSessionStatus.PAUSED.value]
+
+
+def _redis():
+    from app.extensions import get_redis_client
+
+    return get_redis_client()
+
+
+def _user_key(user_id: int) -> str:
+    return FOCUS_USER_KEY.format(user_id=user_id)
+
+
+def get_deadline(session: FocusSession) -> float | None:
+    """Epoch second a running session runs out (None if it has no timer)."""
+    if (
+        session.status != FocusSessionStatus.ACTIVE.value
+        or session.planned_duration_minutes >= NO_TIMER_MINUTES
+    ):
+        return None
+    started = session.started_at.replace(tzinfo=timezone.utc).timestamp()
+    return (
+        started
+        + (session.total_pause_seconds or 0)
+        + session.planned_duration_minutes * 60
+    )
+
+
+def _snapshot(session: FocusSession) -> str:
+    data = session.to_dict()
+    data["total_pause_seconds"] = session.total_pause_seconds or 0
+    return json.dumps(data)
+
+
+def _from_snapshot(raw: str) -> dict:
+    """Session dict with the time-dependent fields recomputed for now."""
+    data = json.loads(raw)
+    pause_seconds = data.pop("total_pause_seconds", 0)
+    started = datetime.fromisoformat(data["started_at"].rstrip("Z"))
+    # Same as FocusSession.elapsed_minutes
+    elapsed_seconds = (datetime.utcnow() - started).total_seconds() - pause_seconds
+    elapsed = max(0, int(elapsed_seconds / 60))
+    planned = data["planned_duration_minutes"]
+    data["elapsed_minutes"] = elapsed
+    data["remaining_minutes"] = max(0, planned - elapsed)
+    data["is_overtime"] = elapsed > planned
+    return data
+
+
+def track(session: FocusSession) -> None:
+    """Store an open session's snapshot and (re)schedule its timer."""
+    deadline = get_deadline(session)
+    key = _user_key(session.user_id)
+    try:
+        pipe = _redis().pipeline(transaction=True)
+        pipe.hset(key, str(session.id), _snapshot(session))
+        pipe.expire(key, USER_SESSIONS_TTL)
+        if deadline is None:
+            pipe.zrem(FOCUS_DEADLINES_KEY, session.id)
+        else:
+            pipe.zadd(FOCUS_DEADLINES_KEY, {session.id: deadline})
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Focus timer update error: {e}")
+
+
+def untrack(session: FocusSession) -> None:
+    """Forget a completed or cancelled session."""
+    try:
+        pipe = _redis().pipeline(transaction=True)
+        pipe.hdel(_user_key(session.user_id), str(session.id))
+        pipe.zrem(FOCUS_DEADLINES_KEY, session.id)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Focus timer update error: {e}")
+
+
+def stop_timer(session: FocusSession) -> bool:
+    """Take a running session off the timer before pausing it.
+
+    Returns False if its timer already fired (the bot is completing it).
+    """
+    deadline = get_deadline(session)
+    if deadline is None:
+        return True
+    try:
+        removed = _redis().zrem(FOCUS_DEADLINES_KEY, session.id)
+    except Exception as e:
+        logger.warning(f"Focus timer update error: {e}")
+        return True
+    return bool(removed) or deadline > datetime.now(timezone.utc).timestamp()
+
+
+def get_open_sessions(user_id: int) -> list[dict]:
+    """Active and paused sessions of a user, oldest first."""
+    key = _user_key(user_id)
+    try:
+        r = _redis()
+        snapshots = r.hgetall(key)
+        if SEEDED_FIELD in snapshots:
+            del snapshots[SEEDED_FIELD]
+            sessions = [_from_snapshot(raw) for raw in snapshots.values()]
+            return sorted(sessions, key=lambda s: s["id"])
+    except Exception as e:
+        logger.warning(f"Focus sessions read error: {e}")
+        r = None
+
+    sessions = (
+        FocusSession.query.filter(
+            FocusSession.user_id == user_id, FocusSession.status.in_(OPEN_STATUSES)
+        )
+        .order_by(FocusSession.id)
+        .all()
+    )
+    if r is not None:
+        _seed(r, user_id, sessions)
+    return [s.to_dict() for s in sessions]
+
+
+def _seed(r, user_id: int, sessions: list[FocusSession]) -> None:
+    key = _user_key(user_id)
+    try:
+        pipe = r.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(
+            key,
+            mapping={
+                SEEDED_FIELD: "1",
+                **{str(s.id): _snapshot(s) for s in sessions},
+            },
+        )
+        pipe.expire(key, USER_SESSIONS_TTL)
+        for session in sessions:
+            deadline = get_deadline(session)
+            if deadline is not None:
+                pipe.zadd(FOCUS_DEADLINES_KEY, {session.id: deadline})
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Focus sessions seed error: {e}")
@@ -4,7 +4,8 @@ import logging
 from datetime import datetime
 
 from app import db
-from app.models.card import Friendship
+from app.models import User
+from app.models.card import Friendship, PendingReferralReward
 
 logger = logging.getLogger(__name__)
 
@@ -86,3 +87,77 @@ class FriendService:
         db.session.delete(friendship)
         db.session.commit()
         return {"success": True}
+
+    def accept_referral(self, user_id: int, referrer_id: int) -> dict:
+        """Befriend an existing user with the referrer whose invite link they opened.
+
+        Both get rewards, stored as pending referral rewards that the app
+        shows on the next check: a rare+ card for the referrer and a starter
+        deck for the invitee.
+        """
+        if user_id == referrer_id:
+            return {"success": False, "error": "cannot_friend_self"}
+
+        user = db.session.get(User, user_id)
+        referrer = db.session.get(User, referrer_id)
+        if not user or not referrer:
+            return {"success": False, "error": "user_not_found"}
+
+        existing = Friendship.query.filter(
+            ((Friendship.user_id == user_id) & (Friendship.friend_id == referrer_id))
+            | ((Friendship.user_id == referrer_id) & (Friendship.friend_id == user_id))
+        ).first()
+        if existing:
+            return {"success": False, "error": "already_friends"}
+
+        db.session.add(
+            Friendship(
+                user_id=referrer_id,
+                friend_id=user_id,
+                status="accepted",
+                accepted_at=datetime.utcnow(),
+            )
+        )
+        logger.info(
+            f"Created friendship between {referrer_id} and {user_id} via invite link"
+        )
+
+        rewards = {"referrer_card": None, "invitee_cards": 0}
+        try:
+            from app.services.card_service import CardService
+
+            card_service = CardService()
+
+            # Give rare+ card to referrer
+            referrer_card = card_service.generate_referral_reward(referrer_id)
+            if referrer_card:
+                db.session.add(
+                    PendingReferralReward(
+                        user_id=referrer_id,
+                        friend_id=user_id,
+                        friend_name=user.first_name or user.username or "друг",
+                        card_id=referrer_card.id,
+                        is_referrer=True,
+                    )
+                )
+                rewards["referrer_card"] = referrer_card.id
+
+            # Give starter deck to invitee (3 cards, max rare)
+            referrer_name = referrer.first_name or referrer.username or "друг"
+            for card in card_service.generate_starter_deck(user_id):
+                db.session.add(
+                    PendingReferralReward(
+                        user_id=user_id,
+                        friend_id=referrer_id,
+                        friend_name=referrer_name,
+                        card_id=card.id,
+                        is_referrer=False,
+                    )
+                )
+                rewards["invitee_cards"] += 1
+        except Exception as e:
+            # Keep the friendship even if card generation fails
+            logger.error(f"Failed to give referral rewards: {e}")
+
+        db.session.commit()
+        return {"success": True, **rewards}
@@ -0,0 +1,259 @@
+"""Per-genre population counters: users and card templates.
+
+Card drops size the template pool from the number of users in a genre and
+the number of templates it already has; the admin card-pool pages show the
+same numbers. Both are kept as Redis hashes instead of being counted on
+every call:
+
+- ``GENRE_USERS_KEY``: genre -> users with it as favorite_genre, adjusted
+  by ``record_genre_change`` when a user picks a genre;
+- ``GENRE_TEMPLATES_KEY``: ``genre:rarity:state`` -> templates, recounted
+  for a genre by ``refresh_template_counts`` when its templates change
+  (rarity ``any`` for universal templates, state ``active``/``inactive``).
+
+Missing hashes are seeded from the database with one GROUP BY each; they
+expire daily and are reconciled by the ``reconcile_genre_stats`` Celery
+task, so drift from missed updates does not last. Each process keeps a
+short-lived copy of both hashes. If Redis is unavailable the numbers are
+counted from the database.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+
+from app import db
+from app.models.card import CardRarity, CardTemplate
+from app.models.user_profile import UserProfile
+
+logger = logging.getLogger(__name__)
+
+GENRE_USERS_KEY = "genre_stats:users"
+GENRE_TEMPLATES_KEY = "genre_stats:templates"
+STATS_RESEED_TTL = 86400  # Reseed from the database at least daily
+STATS_LOCAL_TTL = 60
+
+# Rarity field value for universal templates (rarity=NULL)
+ANY_RARITY = "any"
+TEMPLATE_RARITIES = [ANY_RARITY] + [r.value for r in CardRarity]
+
+
+@dataclass
+class TemplateCounts:
+    """Templates of one genre by rarity lock (``any`` = universal)."""
+
+    active: dict[str, int] = field(default_factory=dict)
+    inactive: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def active_total(self) -> int:
+        return sum(self.active.values())
+
+    @property
+    def inactive_total(self) -> int:
+        return sum(self.inactive.values())
+
+
+# (loaded_at, counters) snapshots of the Redis hashes
+_users: tuple[float, dict[str, int]] | None = None
+_templates: tuple[float, dict[str, TemplateCounts]] | None = None
+
+
+def drop_local_snapshot() -> None:
+    """Forget this process's copy of the counters."""
+    global _users, _templates
+    _users = None
+    _templates = None
+
+
+def _redis():
+    from app.extensions import get_redis_client
+
+    return get_redis_client()
+
+
+# Database counts
+
+
+def count_users_by_genre() -> dict[str, int]:
+    rows = (
+        db.session.query(UserProfile.favorite_genre, db.func.count(UserProfile.id))
+        .filter(UserProfile.favorite_genre.isnot(None))
+        .group_by(UserProfile.favorite_genre)
+        .all()
+    )
+    return {genre: count for genre, count in rows}
+
+
+def count_templates(genre: str | None = None) -> dict[str, int]:
+    """Template counters as hash fields, for one genre or all of them."""
+    query = db.session.query(
+        CardTemplate.genre,
+        CardTemplate.rarity,
+        CardTemplate.is_active,
+        db.func.count(CardTemplate.id),
+    )
+    if genre is not None:
+        query = query.filter(CardTemplate.genre == genre)
+    rows = query.group_by(
+        CardTemplate.genre, CardTemplate.rarity, CardTemplate.is_active
+    ).all()
+
+    counters = {}
+    for row_genre, rarity, is_active, count in rows:
+        key = _template_field(row_genre, rarity, is_active)
+        counters[key] = counters.get(key, 0) + count
+    return counters
+
+
+def _template_field(genre: str, rarity: str | None, is_active: bool) -> str:
+    state = "active" if is_active else "inactive"
+    return f"{genre}:{rarity or ANY_RARITY}:{state}"
+
+
+def _parse_templates(counters: dict[str, int]) -> dict[str, TemplateCounts]:
+    result: dict[str, TemplateCounts] = {}
+    for key, count in counters.items():
+        genre, rarity, state = key.rsplit(":", 2)
+        counts = result.setdefault(genre, TemplateCounts())
+        getattr(counts, state)[rarity] = int(count)
+    return result
+
+
+# Redis hashes
+
+
+def _load_hash(key: str, seed) -> dict[str, int] | None:
+    """Read a counter hash, seeding it from the database if missing.
+
+    Returns None if Redis is unavailable.
+    """
+    try:
+        r = _redis()
+        counters = r.hgetall(key)
+        if counters:
+            return {name: int(count) for name, count in counters.items()}
+
+        counts = seed()
+        _write_hash(r, key, counts)
+        return counts
+    except Exception as e:
+        logger.warning(f"Genre stats read error: {e}")
+        return None
+
+
+def _write_hash(r, key: str, counts: dict[str, int]) -> None:
+    pipe = r.pipeline()
+    pipe.delete(key)
+    if counts:
+        pipe.hset(key, mapping=counts)
+        pipe.expire(key, STATS_RESEED_TTL)
+    pipe.execute()
+
+
+def get_users_by_genre() -> dict[str, int]:
+    """Users per favorite genre (cached for STATS_LOCAL_TTL)."""
+    global _users
+    if _users is None or time.time() - _users[0] > STATS_LOCAL_TTL:
+        counts = _load_hash(GENRE_USERS_KEY, count_users_by_genre)
+        if counts is None:
+            # No shared counters to keep in sync with — count directly
+            return count_users_by_genre()
+        _users = (time.time(), counts)
+    return _users[1]
+
+
+def get_genre_user_count(genre: str) -> int:
+    return get_users_by_genre().get(genre, 0)
+
+
+def get_templates_by_genre() -> dict[str, TemplateCounts]:
+    """Template counters per genre (cached for STATS_LOCAL_TTL)."""
+    global _templates
+    if _templates is None or time.time() - _templates[0] > STATS_LOCAL_TTL:
+        counters = _load_hash(GENRE_TEMPLATES_KEY, count_templates)
+        if counters is None:
+            return _parse_templates(count_templates())
+        _templates = (time.time(), _parse_templates(counters))
+    return _templates[1]
+
+
+def get_template_counts(genre: str) -> TemplateCounts:
+    return get_templates_by_genre().get(genre) or TemplateCounts()
+
+
+# Updates
+
+
+def record_genre_change(old_genre: str | None, new_genre: str | None) -> None:
+    """Move one user between genre counters after a favorite_genre change."""
+    global _users
+    if old_genre == new_genre:
+        return
+    _users = None
+    try:
+        r = _redis()
+        if not r.exists(GENRE_USERS_KEY):
+            return  # Next read seeds from the database
+        pipe = r.pipeline()
+        if old_genre:
+            pipe.hincrby(GENRE_USERS_KEY, old_genre, -1)
+        if new_genre:
+            pipe.hincrby(GENRE_USERS_KEY, new_genre, 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Genre user counters update error: {e}")
+
+
+def refresh_template_counts(genre: str | None = None) -> None:
+    """Recount templates after they were added, toggled or removed.
+
+    With a genre only that genre's counters are recounted; without one the
+    hash is dropped and reseeded on the next read.
+    """
+    global _templates
+    _templates = None
+    try:
+        r = _redis()
+        if genre is None:
+            r.delete(GENRE_TEMPLATES_KEY)
+            return
+        if not r.exists(GENRE_TEMPLATES_KEY):
+            return  # Next read seeds from the database
+
+        counts = count_templates(genre)
+        # Write every field of the genre so removed combinations go to 0
+        mapping = {
+            _template_field(genre, rarity, is_active): 0
+            for rarity in TEMPLATE_RARITIES
+            for is_active in (True, False)
+        }
+        mapping.update(counts)
+        r.hset(GENRE_TEMPLATES_KEY, mapping=mapping)
+    except Exception as e:
+        logger.warning(f"Genre template counters update error: {e}")
+
+
+def reconcile() -> dict[str, dict[str, int]]:
+    """Rewrite both hashes from the database. Returns the old -> new drift."""
+    users = count_users_by_genre()
+    templates = count_templates()
+    r = _redis()
+    old_users = {k: int(v) for k, v in r.hgetall(GENRE_USERS_KEY).items()}
+    old_templates = {k: int(v) for k, v in r.hgetall(GENRE_TEMPLATES_KEY).items()}
+    _write_hash(r, GENRE_USERS_KEY, users)
+    _write_hash(r, GENRE_TEMPLATES_KEY, templates)
+    drop_local_snapshot()
+
+    return {
+        "users": _drift(old_users, users),
+        "templates": _drift(old_templates, templates),
+    }
+
+
+def _drift(old: dict[str, int], new: dict[str, int]) -> dict[str, int]:
+    return {
+        key: new.get(key, 0) - old.get(key, 0)
+        for key in old.keys() | new.keys()
+        if new.get(key, 0) != old.get(key, 0)
+    }
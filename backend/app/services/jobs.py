@@ -0,0 +1,145 @@
+"""Async jobs: Celery tasks started from request handlers.
+
+``enqueue`` starts a Celery task on behalf of an owner (a user id, or
+"admin" for BOT_SECRET endpoints) and returns a job dict; GET /jobs/<id>
+reports its state from the Celery result backend. Tasks may report progress
+with ``self.update_state(state="PROGRESS", meta={"done": ..., "total": ...})``.
+
+Job owners and the jobs each owner has in flight are kept in Redis:
+
+- ``jobs:owner:{job_id}`` -> "{owner}:{kind}" (expires with the result)
+- ``jobs:active:{owner}`` sorted set of job ids scored by enqueue time
+
+An owner may have at most ``JOBS_MAX_ACTIVE`` jobs queued or running. A job
+leaves the active set when its task finishes (task_postrun in celery_app);
+entries older than the task time limit are pruned on enqueue, so a lost
+worker cannot lock a user out.
+"""
+
+import logging
+import time
+import uuid
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+JOB_OWNER_KEY = "jobs:owner:{job_id}"
+JOB_ACTIVE_KEY = "jobs:active:{owner}"
+JOB_TTL = 3600  # Same as the Celery result_expires
+# Jobs still "active" after this long were lost (hard task limit is 900s)
+ACTIVE_JOB_MAX_AGE = 1200
+
+ADMIN_OWNER = "admin"
+
+# Celery state -> job status
+_STATUSES = {
+    "PENDING": "queued",
+    "RECEIVED": "queued",
+    "STARTED": "running",
+    "PROGRESS": "running",
+    "RETRY": "running",
+    "SUCCESS": "succeeded",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+
+
+class JobLimitExceeded(Exception):
+    """The owner already has the maximum number of jobs in flight."""
+
+
+def _redis():
+    from app.extensions import get_redis_client
+
+    return get_redis_client()
+
+
+def jobs_enabled() -> bool:
+    """Whether request handlers should hand work to Celery."""
+    return bool(current_app.config.get("ASYNC_JOBS"))
+
+
+def enqueue(task, *args, owner, kind: str) -> dict | None:
+    """Start ``task`` with ``args`` as a job of ``owner``.
+
+    Returns the job dict, or None if Redis or the broker is unavailable
+    (callers then do the work inline). Raises JobLimitExceeded.
+    """
+    job_id = uuid.uuid4().hex
+    active_key = JOB_ACTIVE_KEY.format(owner=owner)
+    limit = current_app.config.get("JOBS_MAX_ACTIVE", 3)
+    now = time.time()
+
+    try:
+        r = _redis()
+        pipe = r.pipeline(transaction=True)
+        pipe.zremrangebyscore(active_key, "-inf", now - ACTIVE_JOB_MAX_AGE)
+        pipe.zadd(active_key, {job_id: now})
+        pipe.zcard(active_key)
+        pipe.expire(active_key, ACTIVE_JOB_MAX_AGE)
+        in_flight = pipe.execute()[2]
+        if in_flight > limit:
+            r.zrem(active_key, job_id)
+            raise JobLimitExceeded(f"{owner} has {limit} jobs in flight")
+        r.set(JOB_OWNER_KEY.format(job_id=job_id), f"{owner}:{kind}", ex=JOB_TTL)
+    except JobLimitExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"Job registry error, running {kind} inline: {e}")
+        return None
+
+    try:
+        task.apply_async(args=args, task_id=job_id)
+    except Exception as e:
+        logger.warning(f"Failed to queue {kind} job, running inline: {e}")
+        release(job_id)
+        return None
+
+    return {"id": job_id, "kind": kind, "status": "queued"}
+
+
+def release(job_id: str) -> None:
+    """Free the owner's slot of a finished job."""
+    try:
+        r = _redis()
+        entry = r.get(JOB_OWNER_KEY.format(job_id=job_id))
+        if entry:
+            owner = entry.rsplit(":", 1)[0]
+            r.zrem(JOB_ACTIVE_KEY.format(owner=owner), job_id)
+    except Exception as e:
+        logger.warning(f"Failed to release job {job_id}: {e}")
+
+
+def get_job(job_id: str, owner) -> dict | None:
+    """State of a job, or None if it does not exist or belongs to someone else."""
+    try:
+        entry = _redis().get(JOB_OWNER_KEY.format(job_id=job_id))
+    except Exception as e:
+        logger.warning(f"Job registry error: {e}")
+        return None
+    if not entry:
+        return None
+    job_owner, kind = entry.rsplit(":", 1)
+    if job_owner != str(owner):
+        return None
+
+    from app.celery_app import celery
+
+    result = celery.AsyncResult(job_id)
+    state = result.state
+    job = {"id": job_id, "kind": kind, "status": _STATUSES.get(state, "running")}
+
+    if state == "PROGRESS" and isinstance(result.info, dict):
+        job["progress"] = result.info
+    elif state == "SUCCESS":
+        payload = result.result
+        # Tasks report handled failures as {"success": False, "error": ...}
+        if isinstance(payload, dict) and payload.get("success") is False:
+            job["status"] = "failed"
+            job["error"] = payload.get("error")
+        else:
+            job["result"] = payload
+    elif state in ("FAILURE", "REVOKED"):
+        job["error"] = str(result.info) if result.info else state.lower()
+    return job
@@ -7,6 +7,7 @@ from app.models.card import CardRarity
 from app.models.level_reward import LevelReward
 from app.models.user import User
 from app.models.user_profile import UserProfile
+from app.utils.identity import get_profile, get_user
 
 logger = logging.getLogger(__name__)
 
@@ -54,11 +55,11 @@ class LevelService:
 
         Returns a summary of granted rewards for the frontend modal.
         """
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if not user:
             return {"granted": False, "rewards": []}
 
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         if not profile:
             return {"granted": False, "rewards": []}
 
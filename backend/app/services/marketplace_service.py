@@ -9,6 +9,9 @@ from app.models.card import UserCard
 from app.models.marketplace import MIN_PRICES, MarketListing
 from app.models.sparks import SparksTransaction
 from app.models.user import User
+from app.services import card_settlement
+from app.services.card_stats_service import CardStatsService
+from app.utils.identity import get_user
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +27,14 @@ class MarketplaceService:
 
     def get_user_sparks(self, user_id: int) -> int:
         """Get user's Sparks balance."""
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         return user.sparks if user else 0
 
     def list_card(self, user_id: int, card_id: int, price: int) -> dict[str, Any]:
         """List a card for sale on the marketplace."""
-        card = UserCard.query.filter_by(id=card_id, user_id=user_id).first()
-        if not card:
+        # Locked so a concurrent trade or merge of the card waits for us
+        card = card_settlement.lock_cards([card_id]).get(card_id)
+        if not card or card.user_id != user_id:
             return {"error": "card_not_found"}
 
         if card.is_destroyed:
@@ -48,12 +52,16 @@ class MarketplaceService:
         if not card.is_tradeable:
             return {"error": "card_not_tradeable"}
 
-        # Check if already listed
-        existing = MarketListing.query.filter_by(
-            card_id=card_id, status="active"
-        ).first()
-        if existing:
-            return {"error": "already_listed"}
+        # Check if already listed or fighting
+        error = card_settlement.unavailable([card])
+        if error:
+            return {
+                "error": (
+                    "already_listed"
+                    if error["error"] == "card_listed"
+                    else error["error"]
+                )
+            }
 
         # Check minimum price
         min_price = MIN_PRICES.get(card.rarity, 1)
@@ -148,7 +156,12 @@ class MarketplaceService:
 
     def purchase_with_sparks(self, buyer_id: int, listing_id: int) -> dict[str, Any]:
         """Purchase a listing directly with Sparks."""
-        listing = MarketListing.query.filter_by(id=listing_id, status="active").first()
+        # The listing, then its card, stay locked until the sale commits
+        listing = (
+            MarketListing.query.filter_by(id=listing_id, status="active")
+            .with_for_update()
+            .first()
+        )
         if not listing:
             return {"error": "listing_not_found"}
 
@@ -177,8 +190,10 @@ class MarketplaceService:
                 "message": f"Недостаточно Sparks. Нужно: {price}, у вас: {buyer.sparks}",
             }
 
-        card = listing.card
         seller_id = listing.seller_id
+        card = card_settlement.lock_cards([listing.card_id]).get(listing.card_id)
+        if not card or card.user_id != seller_id or card.is_destroyed:
+            return {"error": "listing_not_found"}
 
         # Calculate seller revenue (after commission)
         commission = int(price * COMMISSION_RATE)
@@ -191,8 +206,7 @@ class MarketplaceService:
         seller.add_sparks(seller_revenue)
 
         # Transfer card ownership
-        card.user_id = buyer_id
-        card.is_in_deck = False
+        card_settlement.transfer({card.id: buyer_id})
 
         # Update listing
         listing.status = "sold"
@@ -220,6 +234,7 @@ class MarketplaceService:
         )
         db.session.add(seller_tx)
 
+        CardStatsService().refresh_card_stats(buyer_id, seller_id)
         db.session.commit()
 
         logger.info(
@@ -249,7 +264,7 @@ class MarketplaceService:
         if not card.is_on_cooldown():
             return {"error": "not_on_cooldown"}
 
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if not user:
             return {"error": "user_not_found"}
 
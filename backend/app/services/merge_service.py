@@ -2,11 +2,14 @@
 
 import logging
 import random
+from itertools import product
 from typing import Any
 
 from app import db
 from app.models.card import CardRarity, MergeLog, UserCard
+from app.services import card_settlement
 from app.services.card_service import CardService
+from app.services.card_stats_service import CardStatsService
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +89,65 @@ RARITY_ORDER = {
     CardRarity.LEGENDARY: 4,
 }
 
+# Bonuses shifting chances towards higher rarities (applied in this order)
+MERGE_BONUSES = (
+    ("same_genre", 0.05),
+    ("both_abilities", 0.03),
+    ("high_attack", 0.02),
+)
+
+
+def _shift_chances_up(
+    chances: dict[CardRarity, float], shift: float
+) -> dict[CardRarity, float]:
+    """Shift probability distribution towards higher rarities."""
+    result = dict(chances)
+    rarities = sorted(result.keys(), key=lambda x: RARITY_ORDER[x])
+
+    if len(rarities) < 2:
+        return result
+
+    # Take from lowest rarity, give to others proportionally
+    lowest = rarities[0]
+    take_amount = min(result[lowest], shift)
+    result[lowest] -= take_amount
+
+    # Distribute to higher rarities
+    higher_rarities = rarities[1:]
+    if higher_rarities:
+        per_rarity = take_amount / len(higher_rarities)
+        for r in higher_rarities:
+            result[r] += per_rarity
+
+    return result
+
+
+def _build_chance_tables() -> dict:
+    """Final chances for every rarity pair and combination of bonuses.
+
+    Key: (sorted rarity pair, same_genre, both_abilities, high_attack).
+    Value: (chances, bonuses, chances in percent for clients).
+    """
+    tables = {}
+    for pair, base_chances in MERGE_RESULT_CHANCES.items():
+        for flags in product((False, True), repeat=len(MERGE_BONUSES)):
+            chances = dict(base_chances)
+            bonuses = []
+            for (bonus, shift), applies in zip(MERGE_BONUSES, flags):
+                if applies:
+                    chances = _shift_chances_up(chances, shift)
+                    bonuses.append({"type": bonus, "value": f"+{round(shift * 100)}%"})
+            formatted = {
+                rarity.value: round(prob * 100, 1)
+                for rarity, prob in chances.items()
+                if prob > 0
+            }
+            tables[(pair, *flags)] = (chances, bonuses, formatted)
+    return tables
+
+
+MERGE_CHANCE_TABLES = _build_chance_tables()
+
 
 class MergeService:
     """Service for card merging mechanics."""
@@ -103,48 +165,34 @@ class MergeService:
         if error:
             return {"error": error}
 
-        # Get base chances
-        r1 = CardRarity(card1.rarity)
-        r2 = CardRarity(card2.rarity)
-        sorted_rarities = tuple(sorted([r1, r2], key=lambda x: RARITY_ORDER[x]))
-
-        base_chances = MERGE_RESULT_CHANCES.get(sorted_rarities)
-        if not base_chances:
+        table = self._chance_table(card1, card2)
+        if not table:
             return {"error": "invalid_rarity_combination"}
 
-        # Apply bonuses
-        chances = dict(base_chances)
-        bonuses = []
-
-        # Bonus for same genre (+5% to higher rarities)
-        if card1.genre == card2.genre:
-            chances = self._shift_chances_up(chances, 0.05)
-            bonuses.append({"type": "same_genre", "value": "+5%"})
-
-        # Bonus for both having abilities (+3%)
-        if card1.ability and card2.ability:
-            chances = self._shift_chances_up(chances, 0.03)
-            bonuses.append({"type": "both_abilities", "value": "+3%"})
-
-        # Bonus for high combined attack (+2% if > 60)
-        combined_attack = card1.attack + card2.attack
-        if combined_attack > 60:
-            chances = self._shift_chances_up(chances, 0.02)
-            bonuses.append({"type": "high_attack", "value": "+2%"})
-
-        # Format chances for response
-        formatted_chances = {
-            rarity.value: round(prob * 100, 1)
-            for rarity, prob in chances.items()
-            if prob > 0
-        }
-
+        _, bonuses, formatted_chances = table
         return {
             "chances": formatted_chances,
             "bonuses": bonuses,
             "can_merge": True,
         }
 
+    def _chance_table(self, card1: UserCard, card2: UserCard) -> tuple | None:
+        """Precomputed chances for the pair (None for unknown rarities)."""
+        pair = tuple(
+            sorted(
+                (CardRarity(card1.rarity), CardRarity(card2.rarity)),
+                key=lambda x: RARITY_ORDER[x],
+            )
+        )
+        return MERGE_CHANCE_TABLES.get(
+            (
+                pair,
+                card1.genre == card2.genre,
+                bool(card1.ability and card2.ability),
+                card1.attack + card2.attack > 60,
+            )
+        )
+
     def merge_cards(
         self, user_id: int, card1_id: int, card2_id: int, lang: str = "en"
     ) -> dict[str, Any]:
@@ -153,10 +201,13 @@ class MergeService:
 
         Returns the new card or error.
         """
-        card1 = UserCard.query.filter_by(id=card1_id, user_id=user_id).first()
-        card2 = UserCard.query.filter_by(id=card2_id, user_id=user_id).first()
+        # Both inputs are locked (in id order) until the merge commits, so a
+        # concurrent merge, trade or listing of either card waits for it
+        cards = card_settlement.lock_cards([card1_id, card2_id])
+        card1 = cards.get(card1_id)
+        card2 = cards.get(card2_id)
 
-        if not card1 or not card2:
+        if not card1 or not card2 or {card1.user_id, card2.user_id} != {user_id}:
             return {"error": "card_not_found"}
 
         # Validate merge
@@ -164,29 +215,16 @@ class MergeService:
         if error:
             return {"error": error}
 
-        # Get base chances
-        r1 = CardRarity(card1.rarity)
-        r2 = CardRarity(card2.rarity)
-        sorted_rarities = tuple(sorted([r1, r2], key=lambda x: RARITY_ORDER[x]))
+        unavailable = card_settlement.unavailable([card1, card2])
+        if unavailable:
+            return unavailable
 
-        base_chances = MERGE_RESULT_CHANCES.get(sorted_rarities)
-        if not base_chances:
+        table = self._chance_table(card1, card2)
+        if not table:
             return {"error": "invalid_rarity_combination"}
 
-        # Apply bonuses
-        chances = dict(base_chances)
-
-        if card1.genre == card2.genre:
-            chances = self._shift_chances_up(chances, 0.05)
-
-        if card1.ability and card2.ability:
-            chances = self._shift_chances_up(chances, 0.03)
-
-        if card1.attack + card2.attack > 60:
-            chances = self._shift_chances_up(chances, 0.02)
-
         # Roll for result rarity
-        result_rarity = self._roll_rarity(chances)
+        result_rarity = self._roll_rarity(table[0])
 
         # Determine genre (50/50 if different, same if same)
         if card1.genre == card2.genre:
@@ -194,19 +232,12 @@ class MergeService:
         else:
             result_genre = random.choice([card1.genre, card2.genre])
 
-        # Generate new card with correct genre
-        card_service = CardService()
-        new_card = card_service.generate_card_for_task(
-            user_id=user_id,
-            task_id=None,
-            task_title=f"Слияние: {card1.name} + {card2.name}",
-            difficulty="merge",
-            forced_rarity=result_rarity,
-            forced_genre=result_genre,
+        # Draw the result from the template pool (no pool counts, no OpenAI)
+        new_card = CardService().create_card_from_pool(
+            user_id, None, result_genre, result_rarity
         )
-
-        if not new_card:
-            return {"error": "card_generation_failed"}
+        db.session.add(new_card)
+        db.session.flush()
 
         # Create merge log
         merge_log = MergeLog(
@@ -228,6 +259,15 @@ class MergeService:
         card1.is_in_deck = False
         card2.is_in_deck = False
 
+        # Check if rarity improved
+        max_input_rarity = max(
+            RARITY_ORDER[CardRarity(card1.rarity)],
+            RARITY_ORDER[CardRarity(card2.rarity)],
+        )
+        rarity_upgrade = RARITY_ORDER[result_rarity] > max_input_rarity
+        merged_cards = [card1.name, card2.name]
+
+        CardStatsService().refresh_card_stats(user_id)
         db.session.commit()
 
         # Check quests for merge
@@ -240,15 +280,10 @@ class MergeService:
         except Exception:
             pass  # Don't fail merge on quest errors
 
-        # Check if rarity improved
-        max_input_rarity = max(RARITY_ORDER[r1], RARITY_ORDER[r2])
-        result_rarity_order = RARITY_ORDER[result_rarity]
-        rarity_upgrade = result_rarity_order > max_input_rarity
-
         return {
             "success": True,
             "new_card": new_card.to_dict(lang),
-            "merged_cards": [card1.name, card2.name],
+            "merged_cards": merged_cards,
             "rarity_upgrade": rarity_upgrade,
             "message": self._get_merge_message(rarity_upgrade, result_rarity),
         }
@@ -281,30 +316,6 @@ class MergeService:
 
         return None
 
-    def _shift_chances_up(
-        self, chances: dict[CardRarity, float], shift: float
-    ) -> dict[CardRarity, float]:
-        """Shift probability distribution towards higher rarities."""
-        result = dict(chances)
-        rarities = sorted(result.keys(), key=lambda x: RARITY_ORDER[x])
-
-        if len(rarities) < 2:
-            return result
-
-        # Take from lowest rarity, give to others proportionally
-        lowest = rarities[0]
-        take_amount = min(result[lowest], shift)
-        result[lowest] -= take_amount
-
-        # Distribute to higher rarities
-        higher_rarities = rarities[1:]
-        if higher_rarities:
-            per_rarity = take_amount / len(higher_rarities)
-            for r in higher_rarities:
-                result[r] += per_rarity
-
-        return result
-
     def _roll_rarity(self, chances: dict[CardRarity, float]) -> CardRarity:
         """Roll for a rarity based on probability distribution."""
         roll = random.random()
@@ -3,10 +3,16 @@
 import logging
 import os
 import random
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import requests
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
 from app import db
 from app.models import DailyMonster, Monster
@@ -48,6 +54,48 @@ GENRE_EMOJIS = {
 }
 
 
+MONSTERS_PER_GENRE = 6
+
+
+class ProviderLimit:
+    """Caps concurrent calls to one provider and spaces their start times."""
+
+    def __init__(self, max_concurrent: int, per_minute: int | None = None):
+        self._slots = threading.BoundedSemaphore(max(max_concurrent, 1))
+        self._interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self._interval
+            if wait > 0:
+                time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+@dataclass
+class GenerationReport:
+    """Outcome and timing of one generate_daily_monsters run."""
+
+    created: dict[str, int] = field(default_factory=dict)
+    skipped: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    text_fallbacks: list[str] = field(default_factory=list)
+    images_generated: int = 0
+    images_failed: int = 0
+    # Stage -> wall-clock seconds (text, images, commit, total)
+    timings: dict[str, float] = field(default_factory=dict)
+
+
 class MonsterGeneratorService:
     """Service for generating monsters using AI."""
 
@@ -78,6 +126,14 @@ class MonsterGeneratorService:
             logger.warning("OpenAI client not initialized, using fallback monsters")
             return self._generate_fallback_monsters(genre, count)
 
+        try:
+            return self._request_monsters_text(genre, count)
+        except Exception as e:
+            logger.error(f"Failed to generate monsters via AI: {e}")
+            return self._generate_fallback_monsters(genre, count)
+
+    def _request_monsters_text(self, genre: str, count: int) -> list[dict]:
+        """Ask OpenAI for monster descriptions. Raises on any failure."""
         genre_info = GENRE_THEMES.get(genre, GENRE_THEMES["fantasy"])
 
         prompt = f"""Generate {count} unique monsters for a {genre_info['name']} themed game.
@@ -102,42 +158,39 @@ Return as JSON array with format:
 Make monsters thematic to {genre_info['name']}. Include 3-4 normal, 2 elite, and 1 boss monster.
 Be creative with names - avoid generic names. Each monster should feel unique and memorable."""
 
-        try:
-            system_msg = (
-                "You are a creative game designer specializing in monster design. "
-                "Always respond with valid JSON only."
-            )
-            from app.utils.ai_tracker import tracked_openai_call
-
-            response = tracked_openai_call(
-                self.openai_client,
-                user_id=None,
-                endpoint="generate_monsters",
-                model="gpt-5-mini",
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.9,
-                max_completion_tokens=1500,
-            )
+        system_msg = (
+            "You are a creative game designer specializing in monster design. "
+            "Always respond with valid JSON only."
+        )
+        from app.utils.ai_tracker import tracked_openai_call
+
+        response = tracked_openai_call(
+            self.openai_client,
+            user_id=None,
+            endpoint="generate_monsters",
+            model="gpt-5-mini",
+            messages=[
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.9,
+            max_completion_tokens=1500,
+        )
 
-            content = response.choices[0].message.content.strip()
-            # Clean up markdown if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-                content = content.strip()
+        content = response.choices[0].message.content.strip()
+        # Clean up markdown if present
+        if content.startswith("```"):
+            content = content.split("```")[1]
+            if content.startswith("json"):
+                content = content[4:]
+            content = content.strip()
 
-            import json
+        import json
 
-            monsters_data = json.loads(content)
-            return monsters_data
-
-        except Exception as e:
-            logger.error(f"Failed to generate monsters via AI: {e}")
-            return self._generate_fallback_monsters(genre, count)
+        monsters_data = json.loads(content)
+        if not isinstance(monsters_data, list) or not monsters_data:
+            raise ValueError("Expected a non-empty JSON array of monsters")
+        return monsters_data
 
     def _generate_fallback_monsters(self, genre: str, count: int) -> list[dict]:
         """Generate fallback monsters without AI."""
@@ -307,58 +360,201 @@ Be creative with names - avoid generic names. Each monster should feel unique an
 
         Returns dict of genre -> count of monsters generated.
         """
+        return self.run_generation(generate_images=generate_images).created
+
+    def run_generation(
+        self, generate_images: bool = True, progress=None
+    ) -> GenerationReport:
+        """
+        Generate the current period's monsters for every genre that lacks them.
+
+        Stages run concurrently on a bounded thread pool: one OpenAI call per
+        genre, then one image per monster as soon as its genre's text is in.
+        Provider calls are capped by ProviderLimit (MONSTER_*_CONCURRENCY /
+        _PER_MINUTE config) and retried up to MONSTER_GENERATION_ATTEMPTS
+        times; a genre whose text still fails uses fallback monsters, a
+        monster whose image fails is saved without one. Each genre is
+        committed on its own and skipped if another run already filled it.
+
+        ``progress`` is called with a short message after each step.
+        """
+        config = current_app.config
+        app = current_app._get_current_object()
+        report = GenerationReport()
+        started = time.monotonic()
+        notify = progress or (lambda message: None)
+
         period_start = DailyMonster.get_current_period_start()
-        results = {}
-
-        for genre in GENRE_THEMES.keys():
-            try:
-                # Check if monsters already generated for this period
-                existing = DailyMonster.query.filter_by(
-                    genre=genre, period_start=period_start
-                ).first()
-                if existing:
-                    logger.info(
-                        f"Monsters for {genre} already exist for period {period_start}"
-                    )
-                    results[genre] = 0
-                    continue
-
-                # Generate monster descriptions
-                monsters_data = self.generate_monsters_for_genre(genre, count=6)
-
-                # Create monsters
-                created_count = 0
-                for i, monster_data in enumerate(monsters_data):
-                    # Create monster
-                    monster = self.create_monster_from_data(
-                        monster_data, genre, generate_image=generate_images
-                    )
-                    db.session.add(monster)
-                    db.session.flush()  # Get monster ID
-
-                    # Create daily monster entry with period_start
-                    daily = DailyMonster(
-                        monster_id=monster.id,
-                        genre=genre,
-                        period_start=period_start,
-                        date=period_start,  # Legacy compatibility
-                        slot_number=i + 1,
+        existing = {
+            genre
+            for (genre,) in db.session.query(DailyMonster.genre)
+            .filter_by(period_start=period_start)
+            .distinct()
+        }
+        pending = [genre for genre in GENRE_THEMES if genre not in existing]
+        report.skipped = [genre for genre in GENRE_THEMES if genre in existing]
+        for genre in report.skipped:
+            logger.info(f"Monsters for {genre} already exist for period {period_start}")
+            report.created[genre] = 0
+        if not pending:
+            report.timings["total"] = time.monotonic() - started
+            return report
+
+        attempts = max(config.get("MONSTER_GENERATION_ATTEMPTS", 2), 1)
+        text_limit = ProviderLimit(
+            config.get("MONSTER_OPENAI_CONCURRENCY", 3),
+            config.get("MONSTER_OPENAI_PER_MINUTE"),
+        )
+        image_limit = ProviderLimit(
+            config.get("MONSTER_IMAGE_CONCURRENCY", 2),
+            config.get("MONSTER_IMAGE_PER_MINUTE"),
+        )
+        use_images = generate_images and bool(self.stability_api_key)
+        if generate_images and not use_images:
+            logger.warning("Stability API key not set, skipping image generation")
+        use_ai = self.openai_client is not None  # Initialize before threads start
+
+        def generate_text(genre: str) -> tuple[list[dict], bool]:
+            if not use_ai:
+                return self._generate_fallback_monsters(genre, MONSTERS_PER_GENRE), True
+            # tracked_openai_call logs usage through db.session
+            with app.app_context():
+                for attempt in range(1, attempts + 1):
+                    try:
+                        with text_limit:
+                            return (
+                                self._request_monsters_text(genre, MONSTERS_PER_GENRE),
+                                False,
+                            )
+                    except Exception as e:
+                        logger.warning(
+                            f"Monster text for {genre} failed "
+                            f"(attempt {attempt}/{attempts}): {e}"
+                        )
+                        if attempt < attempts:
+                            time.sleep(2**attempt)
+            return self._generate_fallback_monsters(genre, MONSTERS_PER_GENRE), True
+
+        def generate_image(genre: str, data: dict) -> str | None:
+            for attempt in range(1, attempts + 1):
+                with image_limit:
+                    url = self.generate_monster_image(
+                        data["name"], data.get("visual", ""), genre
                     )
-                    db.session.add(daily)
-                    created_count += 1
+                if url:
+                    return url
+                if attempt < attempts:
+                    time.sleep(2**attempt)
+            return None
 
-                db.session.commit()
-                results[genre] = created_count
-                logger.info(
-                    f"Generated {created_count} monsters for {genre} (period {period_start})"
+        texts: dict[str, list[dict]] = {}
+        images: dict[str, dict[int, str | None]] = {genre: {} for genre in pending}
+        text_done_at = started
+        workers = max(config.get("MONSTER_GENERATION_WORKERS", 6), 1)
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="monster-gen"
+        ) as pool:
+            text_futures = {pool.submit(generate_text, g): g for g in pending}
+            image_futures = {}
+            for future in as_completed(text_futures):
+                genre = text_futures[future]
+                monsters_data, fallback = future.result()
+                texts[genre] = monsters_data
+                if fallback:
+                    report.text_fallbacks.append(genre)
+                notify(
+                    f"{genre}: {len(monsters_data)} monster descriptions"
+                    + (" (fallback)" if fallback else "")
+                )
+                if use_images:
+                    for i, data in enumerate(monsters_data):
+                        image_futures[pool.submit(generate_image, genre, data)] = (
+                            genre,
+                            i,
+                        )
+            text_done_at = time.monotonic()
+
+            for future in as_completed(image_futures):
+                genre, i = image_futures[future]
+                url = future.result()
+                images[genre][i] = url
+                if url:
+                    report.images_generated += 1
+                else:
+                    report.images_failed += 1
+            if image_futures:
+                notify(
+                    f"images: {report.images_generated} generated, "
+                    f"{report.images_failed} failed"
                 )
 
-            except Exception as e:
-                logger.error(f"Failed to generate monsters for {genre}: {e}")
-                db.session.rollback()
-                results[genre] = 0
+        images_done_at = time.monotonic()
+        report.timings["text"] = text_done_at - started
+        report.timings["images"] = images_done_at - text_done_at
 
-        return results
+        for genre in pending:
+            report.created[genre] = self._save_genre_monsters(
+                genre, period_start, texts.get(genre, []), images[genre], report
+            )
+            notify(f"{genre}: {report.created[genre]} monsters saved")
+
+        report.timings["commit"] = time.monotonic() - images_done_at
+        report.timings["total"] = time.monotonic() - started
+        return report
+
+    def _save_genre_monsters(
+        self,
+        genre: str,
+        period_start,
+        monsters_data: list[dict],
+        sprite_urls: dict[int, str | None],
+        report: GenerationReport,
+    ) -> int:
+        """Insert one genre's monsters and daily slots in its own transaction."""
+        try:
+            # Another run may have filled this genre while we were generating
+            if DailyMonster.query.filter_by(
+                genre=genre, period_start=period_start
+            ).first():
+                report.skipped.append(genre)
+                return 0
+
+            for i, monster_data in enumerate(monsters_data):
+                monster = self.create_monster_from_data(
+                    monster_data, genre, generate_image=False
+                )
+                monster.sprite_url = sprite_urls.get(i)
+                db.session.add(monster)
+                db.session.flush()  # Get monster ID
+
+                # Create daily monster entry with period_start
+                daily = DailyMonster(
+                    monster_id=monster.id,
+                    genre=genre,
+                    period_start=period_start,
+                    date=period_start,  # Legacy compatibility
+                    slot_number=i + 1,
+                )
+                db.session.add(daily)
+
+            db.session.commit()
+            logger.info(
+                f"Generated {len(monsters_data)} monsters for {genre} "
+                f"(period {period_start})"
+            )
+            return len(monsters_data)
+
+        except IntegrityError:
+            # unique_period_monster: a concurrent run committed first
+            db.session.rollback()
+            report.skipped.append(genre)
+            return 0
+        except Exception as e:
+            logger.error(f"Failed to generate monsters for {genre}: {e}")
+            db.session.rollback()
+            report.failed.append(genre)
+            return 0
 
     def get_daily_monsters_for_user(
         self, user_id: int, genre: str, player_level: int
@@ -0,0 +1,194 @@
+"""Mood rollups: per-day and per-user aggregates of mood checks.
+
+Every logged check is added to its day's ``mood_daily_rollups`` row and to
+the user's ``user_mood_stats`` row, so mood stats, history averages and
+time series read a handful of aggregate rows instead of every check.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.mood import MoodCheck, MoodDailyRollup, UserMoodStats
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """First day of the bucket a day falls in (weeks start on Monday)."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: date, bucket: str) -> date:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+class MoodStatsService:
+    """Maintains mood rollups and answers stats/series queries from them."""
+
+    def record_check(self, check: MoodCheck) -> None:
+        """Add a new check to its day's rollup and the user's totals.
+
+        Does not commit: the rollups land in the caller's transaction.
+        """
+        day = (check.created_at or datetime.utcnow()).date()
+        self._add(MoodDailyRollup, {"user_id": check.user_id, "day": day}, check)
+        self._add(UserMoodStats, {"user_id": check.user_id}, check)
+
+    def _add(self, model, key: dict, check: MoodCheck) -> None:
+        if self._increment(model, key, check):
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(
+                    model(
+                        **key,
+                        checks=1,
+                        mood_sum=check.mood,
+                        mood_min=check.mood,
+                        mood_max=check.mood,
+                        energy_sum=check.energy,
+                        energy_min=check.energy,
+                        energy_max=check.energy,
+                    )
+                )
+        except IntegrityError:
+            # Created by a concurrent check in the meantime
+            self._increment(model, key, check)
+
+    @staticmethod
+    def _increment(model, key: dict, check: MoodCheck) -> bool:
+        """Atomically add a check to an existing row. False if there is none."""
+        updated = model.query.filter_by(**key).update(
+            {
+                model.checks: model.checks + 1,
+                model.mood_sum: model.mood_sum + check.mood,
+                model.mood_min: db.case(
+                    (model.mood_min > check.mood, check.mood),
+                    else_=model.mood_min,
+                ),
+                model.mood_max: db.case(
+                    (model.mood_max < check.mood, check.mood),
+                    else_=model.mood_max,
+                ),
+                model.energy_sum: model.energy_sum + check.energy,
+                model.energy_min: db.case(
+                    (model.energy_min > check.energy, check.energy),
+                    else_=model.energy_min,
+                ),
+                model.energy_max: db.case(
+                    (model.energy_max < check.energy, check.energy),
+                    else_=model.energy_max,
+                ),
+            },
+            synchronize_session=False,
+        )
+        return bool(updated)
+
+    def get_daily_rollups(
+        self, user_id: int, start: date, end: date | None = None
+    ) -> list[MoodDailyRollup]:
+        """Rollups of a user from ``start`` to ``end`` (inclusive), oldest first."""
+        query = MoodDailyRollup.query.filter(
+            MoodDailyRollup.user_id == user_id, MoodDailyRollup.day >= start
+        )
+        if end is not None:
+            query = query.filter(MoodDailyRollup.day <= end)
+        return query.order_by(MoodDailyRollup.day).all()
+
+    def get_stats(self, user_id: int) -> dict:
+        """Overall and last-7-days averages (two small reads)."""
+        overall = db.session.get(UserMoodStats, user_id)
+        # Rollups are keyed by UTC day
+        weekly = self.get_daily_rollups(
+            user_id, datetime.utcnow().date() - timedelta(days=6)
+        )
+
+        checks = sum(r.checks for r in weekly)
+        return {
+            "overall": {
+                "average_mood": overall.average_mood if overall else 0.0,
+                "average_energy": overall.average_energy if overall else 0.0,
+                "total_checks": overall.checks if overall else 0,
+            },
+            "weekly": {
+                "average_mood": (
+                    round(sum(r.mood_sum for r in weekly) / checks, 1)
+                    if checks
+                    else 0.0
+                ),
+                "average_energy": (
+                    round(sum(r.energy_sum for r in weekly) / checks, 1)
+                    if checks
+                    else 0.0
+                ),
+                "total_checks": checks,
+            },
+        }
+
+    def get_series(self, user_id: int, bucket: str, start: date, end: date) -> list:
+        """Mood/energy per bucket from ``start`` to ``end``, oldest first.
+
+        Every bucket in the range is listed; buckets without checks have
+        ``checks`` 0 and null averages.
+        """
+        buckets: dict[date, dict] = {}
+        cursor = bucket_start(start, bucket)
+        while cursor <= end:
+            buckets[cursor] = {
+                "checks": 0,
+                "mood_sum": 0,
+                "energy_sum": 0,
+                "mood_min": None,
+                "mood_max": None,
+                "energy_min": None,
+                "energy_max": None,
+            }
+            cursor = _next_bucket(cursor, bucket)
+
+        for rollup in self.get_daily_rollups(user_id, start, end):
+            acc = buckets[bucket_start(rollup.day, bucket)]
+            acc["checks"] += rollup.checks
+            acc["mood_sum"] += rollup.mood_sum
+            acc["energy_sum"] += rollup.energy_sum
+            for field, pick in (
+                ("mood_min", min),
+                ("mood_max", max),
+                ("energy_min", min),
+                ("energy_max", max),
+            ):
+                value = getattr(rollup, field)
+                if value is not None:
+                    acc[field] = (
+                        value if acc[field] is None else pick(acc[field], value)
+                    )
+
+        series = []
+        for bucket_day, acc in buckets.items():
+            checks = acc.pop("checks")
+            mood_sum = acc.pop("mood_sum")
+            energy_sum = acc.pop("energy_sum")
+            series.append(
+                {
+                    "start": bucket_day.isoformat(),
+                    "checks": checks,
+                    "average_mood": round(mood_sum / checks, 2) if checks else None,
+                    "average_energy": (
+                        round(energy_sum / checks, 2) if checks else None
+                    ),
+                    **acc,
+                }
+            )
+        return series
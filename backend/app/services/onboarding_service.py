@@ -0,0 +1,250 @@
+"""Onboarding completion: an instant profile and a background welcome bundle.
+
+``complete_onboarding`` saves the profile with the rule-based analysis
+(``ProfileAnalyzer.rule_based_analyze``) and marks the welcome bundle
+"pending". ``build_welcome_bundle`` then runs in Celery: it replaces the
+analysis with the GPT one, gives the onboarding companion card and, for
+referred users, the starter deck (from the template pool) and the
+referrer's reward. Clients poll GET /onboarding/welcome-bundle until it is
+"ready".
+
+Each step records its outcome in ``UserProfile.welcome_bundle`` as it
+finishes, so a retried bundle does not hand out cards twice.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any
+
+from flask import current_app
+
+from app import db
+from app.models import ActivityType, User, UserActivityLog
+from app.models.card import UserCard
+from app.models.user_profile import UserProfile, WelcomeBundleStatus
+from app.services.card_service import CardService
+from app.services.profile_analyzer import ProfileAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_analysis(
+    profile: UserProfile, analysis: dict[str, Any], responses: dict[str, Any]
+) -> None:
+    profile.productivity_type = analysis.get("productivity_type")
+    profile.preferred_time = analysis.get(
+        "preferred_time", responses.get("productive_time")
+    )
+    profile.work_style = analysis.get("work_style")
+    profile.favorite_task_types = analysis.get(
+        "favorite_task_types", responses.get("favorite_tasks")
+    )
+    profile.main_challenges = analysis.get(
+        "main_challenges", responses.get("challenges")
+    )
+    profile.gpt_analysis = analysis
+
+
+def complete_onboarding(user_id: int, responses: dict[str, Any]) -> UserProfile:
+    """Save the profile with the rule-based analysis and queue the bundle."""
+    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    if not profile:
+        profile = UserProfile(user_id=user_id)
+        db.session.add(profile)
+
+    analysis = ProfileAnalyzer().rule_based_analyze(responses)
+    _apply_analysis(profile, analysis, responses)
+    profile.productivity_goals = responses.get("goals")
+    profile.preferred_session_duration = analysis["recommended_session_duration"]
+    profile.onboarding_completed = True
+    profile.onboarding_completed_at = datetime.utcnow()
+    profile.welcome_bundle_status = WelcomeBundleStatus.PENDING.value
+    profile.welcome_bundle = {}
+
+    UserActivityLog.log(
+        user_id=user_id,
+        action_type=ActivityType.ONBOARDING_COMPLETE,
+        action_details=f"Type: {profile.productivity_type}, Style: {profile.work_style}",
+    )
+    db.session.commit()
+
+    queue_welcome_bundle(user_id, responses)
+    return profile
+
+
+def queue_welcome_bundle(user_id: int, responses: dict[str, Any]) -> None:
+    """Build the welcome bundle in Celery.
+
+    Runs inline if the bundle is not deferred or queueing fails.
+    """
+    if current_app.config.get("DEFER_WELCOME_BUNDLE"):
+        try:
+            from app.tasks.onboarding_tasks import build_welcome_bundle_async
+
+            build_welcome_bundle_async.delay(user_id, responses)
+            return
+        except Exception as e:
+            logger.warning(f"Failed to queue welcome bundle, building inline: {e}")
+
+    try:
+        build_welcome_bundle(user_id, responses)
+    except Exception as e:
+        logger.error(f"Welcome bundle failed: {e}")
+        db.session.rollback()
+        mark_welcome_bundle_failed(user_id)
+
+
+def build_welcome_bundle(user_id: int, responses: dict[str, Any]) -> dict:
+    """GPT analysis, companion card and referral rewards of a new user.
+
+    Raises if a step fails (the Celery task retries; finished steps are
+    skipped on the retry).
+    """
+    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    if (
+        not profile
+        or profile.welcome_bundle_status != WelcomeBundleStatus.PENDING.value
+    ):
+        return {"success": False, "error": "Welcome bundle not pending"}
+
+    bundle = dict(profile.welcome_bundle or {})
+    card_service = CardService()
+
+    if "analysis" not in bundle:
+        analyzer = ProfileAnalyzer()
+        if analyzer.client:
+            rule_based = profile.gpt_analysis or {}
+            analysis = analyzer.analyze_onboarding(responses, user_id=user_id)
+            _apply_analysis(profile, analysis, responses)
+            # Keep a session length the user already changed in settings
+            if profile.preferred_session_duration == rule_based.get(
+                "recommended_session_duration"
+            ):
+                profile.preferred_session_duration = analysis.get(
+                    "recommended_session_duration", 25
+                )
+        bundle["analysis"] = True
+        _save_progress(profile, bundle)
+
+    if "onboarding_card_id" not in bundle:
+        card = card_service.generate_onboarding_card(user_id)
+        bundle["onboarding_card_id"] = card.id if card else None
+        _save_progress(profile, bundle)
+
+    if "referral" not in bundle:
+        bundle["referral"] = _give_starter_deck(card_service, user_id)
+        _save_progress(profile, bundle)
+
+    # The referrer's card is its own step: the starter deck is already
+    # saved if generating it fails
+    referral = bundle["referral"]
+    if referral and "referrer_rewarded" not in referral:
+        bundle["referral"] = {
+            **referral,
+            **_give_referrer_reward(card_service, referral["referrer_id"]),
+        }
+        _save_progress(profile, bundle)
+
+    profile.welcome_bundle_status = WelcomeBundleStatus.READY.value
+    db.session.commit()
+    return {"success": True, "bundle": bundle}
+
+
+def _save_progress(profile: UserProfile, bundle: dict) -> None:
+    profile.welcome_bundle = dict(bundle)
+    db.session.commit()
+
+
+def _give_starter_deck(card_service: CardService, user_id: int) -> dict | None:
+    """Starter deck for a referred user (None if not referred or given)."""
+    # Claim the reward in the same transaction as the starter deck, so two
+    # bundle runs cannot both give it
+    claimed = User.query.filter(
+        User.id == user_id,
+        User.referred_by.isnot(None),
+        User.referral_reward_given.is_(False),
+    ).update({User.referral_reward_given: True}, synchronize_session=False)
+    if not claimed:
+        return None
+
+    referrer_id = db.session.get(User, user_id).referred_by
+    starter_deck = card_service.generate_starter_deck(user_id)
+    db.session.commit()
+    logger.info(f"Gave starter deck to user {user_id}: {len(starter_deck)} cards")
+
+    return {
+        "starter_deck_ids": [c.id for c in starter_deck],
+        "referrer_id": referrer_id,
+    }
+
+
+def _give_referrer_reward(card_service: CardService, referrer_id: int) -> dict:
+    """A rare+ card for the referrer of a new user."""
+    referrer_card = card_service.generate_referral_reward(referrer_id)
+    if not referrer_card:
+        return {"referrer_rewarded": False}
+
+    logger.info(
+        f"Gave referral reward to user {referrer_id}: "
+        f"{referrer_card.name} ({referrer_card.rarity})"
+    )
+    return {"referrer_rewarded": True, "referrer_card_rarity": referrer_card.rarity}
+
+
+def mark_welcome_bundle_failed(user_id: int) -> None:
+    """Give up on the bundle; the user keeps the rule-based profile."""
+    UserProfile.query.filter_by(
+        user_id=user_id, welcome_bundle_status=WelcomeBundleStatus.PENDING.value
+    ).update(
+        {UserProfile.welcome_bundle_status: WelcomeBundleStatus.FAILED.value},
+        synchronize_session=False,
+    )
+    db.session.commit()
+
+
+def get_welcome_bundle(profile: UserProfile) -> dict:
+    """Onboarding result for clients, with the bundle cards once it is ready."""
+    bundle = profile.welcome_bundle or {}
+    analysis = profile.gpt_analysis or {}
+    data = {
+        "welcome_bundle_status": profile.welcome_bundle_status,
+        "profile": profile.to_dict(),
+        "analysis": {
+            "productivity_type": analysis.get("productivity_type"),
+            "work_style": analysis.get("work_style"),
+            "personalized_tips": analysis.get("personalized_tips", []),
+            "motivation_style": analysis.get("motivation_style", "gentle"),
+            "recommended_session_duration": analysis.get(
+                "recommended_session_duration", 25
+            ),
+        },
+        "welcome_message": ProfileAnalyzer.get_personalized_message(analysis),
+    }
+    if profile.welcome_bundle_status != WelcomeBundleStatus.READY.value:
+        return data
+
+    referral = bundle.get("referral") or {}
+    card_ids = [bundle.get("onboarding_card_id"), *referral.get("starter_deck_ids", [])]
+    cards = {
+        card.id: card
+        for card in UserCard.query.filter(
+            UserCard.user_id == profile.user_id,
+            UserCard.id.in_([i for i in card_ids if i]),
+        )
+    }
+
+    onboarding_card = cards.get(bundle.get("onboarding_card_id"))
+    if onboarding_card:
+        data["onboarding_card"] = onboarding_card.to_dict()
+    if referral:
+        data["referral_rewards"] = {
+            "starter_deck": [
+                cards[i].to_dict() for i in referral["starter_deck_ids"] if i in cards
+            ],
+            **{
+                k: v
+                for k, v in referral.items()
+                if k not in ("starter_deck_ids", "referrer_id")
+            },
+        }
+    return data
@@ -0,0 +1,161 @@
+"""Focus productivity patterns: when a user starts and completes sessions.
+
+The hour, weekday and time slot histograms of the last 30 days are
+computed with one ``GROUP BY extract(hour), extract(dow)`` query and kept
+in ``productivity_patterns`` (one row per user), so GET
+/user/productivity-patterns and smart sort read a single row.
+
+The row is refreshed when a focus session is completed or cancelled in the
+API. Sessions the bot's timer completes, and the moving 30-day window, are
+caught up by ``refresh_stale`` (the ``refresh_productivity_patterns``
+Celery task).
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, extract, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.focus_session import FocusSession, FocusSessionStatus
+from app.models.productivity import ProductivityPatterns
+from app.services.task_service import time_slot_for_utc_hour
+
+logger = logging.getLogger(__name__)
+
+PERIOD_DAYS = 30
+TIME_SLOTS = ("morning", "afternoon", "evening", "night")
+# Sessions a bucket needs before it can be the best one
+MIN_SESSIONS = 2
+# Snapshots older than this are recomputed by refresh_stale
+MAX_AGE = timedelta(days=1)
+
+
+def _bucket() -> dict[str, int]:
+    return {"sessions": 0, "completed": 0, "minutes": 0}
+
+
+def _histograms(user_id: int, since: datetime) -> dict:
+    """Hour, weekday and time slot buckets of the sessions started since."""
+    hour = extract("hour", FocusSession.started_at)
+    dow = extract("dow", FocusSession.started_at)
+    is_completed = FocusSession.status == FocusSessionStatus.COMPLETED.value
+    rows = (
+        db.session.query(
+            hour,
+            dow,
+            func.count(FocusSession.id),
+            func.sum(case((is_completed, 1), else_=0)),
+            func.sum(
+                case(
+                    (
+                        is_completed,
+                        func.coalesce(FocusSession.actual_duration_minutes, 0),
+                    ),
+                    else_=0,
+                )
+            ),
+        )
+        .filter(FocusSession.user_id == user_id, FocusSession.started_at >= since)
+        .group_by(hour, dow)
+    )
+
+    hours = [_bucket() for _ in range(24)]
+    weekdays = [_bucket() for _ in range(7)]
+    time_slots = {slot: _bucket() for slot in TIME_SLOTS}
+    for h, d, sessions, completed, minutes in rows:
+        h = int(h)
+        # dow is 0 = Sunday; weekdays are 0 = Monday like date.weekday()
+        d = (int(d) + 6) % 7
+        counts = {
+            "sessions": sessions,
+            "completed": int(completed or 0),
+            "minutes": int(minutes or 0),
+        }
+        for bucket in (hours[h], weekdays[d], time_slots[time_slot_for_utc_hour(h)]):
+            for key, n in counts.items():
+                bucket[key] += n
+
+    return {"hours": hours, "weekdays": weekdays, "time_slots": time_slots}
+
+
+def _best_time_slot(time_slots: dict[str, dict]) -> str | None:
+    """Slot with the most completed sessions (then the best completion rate)."""
+    candidates = [
+        (b["completed"], b["completed"] / b["sessions"], slot)
+        for slot, b in time_slots.items()
+        if b["sessions"] >= MIN_SESSIONS and b["completed"]
+    ]
+    return max(candidates)[2] if candidates else None
+
+
+def refresh(user_id: int) -> ProductivityPatterns:
+    """Recompute and store the patterns of a user (commits)."""
+    now = datetime.utcnow()
+    values = _histograms(user_id, now - timedelta(days=PERIOD_DAYS))
+    values["best_time_slot"] = _best_time_slot(values["time_slots"])
+    values["period_days"] = PERIOD_DAYS
+    values["computed_at"] = now
+
+    patterns = db.session.get(ProductivityPatterns, user_id)
+    if patterns is None:
+        try:
+            with db.session.begin_nested():
+                patterns = ProductivityPatterns(user_id=user_id, **values)
+                db.session.add(patterns)
+            db.session.commit()
+            return patterns
+        except IntegrityError:
+            # Created by a concurrent refresh in the meantime
+            patterns = db.session.get(ProductivityPatterns, user_id)
+
+    for key, value in values.items():
+        setattr(patterns, key, value)
+    db.session.commit()
+    return patterns
+
+
+def refresh_quietly(user_id: int) -> None:
+    """Refresh after a focus session ended; never breaks the caller."""
+    try:
+        refresh(user_id)
+    except Exception as e:
+        logger.warning(f"Failed to refresh productivity patterns: {e}")
+        db.session.rollback()
+
+
+def get_patterns(user_id: int) -> ProductivityPatterns:
+    """Stored patterns of a user (computed on the first read)."""
+    return db.session.get(ProductivityPatterns, user_id) or refresh(user_id)
+
+
+def get_best_time_slot(user_id: int) -> str | None:
+    """The user's most productive time slot, if known (never computes)."""
+    patterns = db.session.get(ProductivityPatterns, user_id)
+    return patterns.best_time_slot if patterns else None
+
+
+def refresh_stale() -> int:
+    """Recompute snapshots older than MAX_AGE or missing later sessions.
+
+    Returns how many were refreshed.
+    """
+    now = datetime.utcnow()
+    later_session = (
+        db.session.query(FocusSession.id)
+        .filter(
+            FocusSession.user_id == ProductivityPatterns.user_id,
+            FocusSession.ended_at > ProductivityPatterns.computed_at,
+        )
+        .exists()
+    )
+    user_ids = [
+        user_id
+        for (user_id,) in db.session.query(ProductivityPatterns.user_id).filter(
+            or_(ProductivityPatterns.computed_at < now - MAX_AGE, later_session)
+        )
+    ]
+    for user_id in user_ids:
+        refresh(user_id)
+    return len(user_ids)
@@ -34,7 +34,7 @@ class ProfileAnalyzer:
                 current_app.logger.error(f"GPT analysis failed: {e}")
 
         # Fallback to rule-based analysis
-        return self._rule_based_analyze(responses)
+        return self.rule_based_analyze(responses)
 
     def _gpt_analyze(
         self, responses: dict[str, Any], user_id: int | None = None
@@ -104,8 +104,8 @@ Return ONLY valid JSON, no other text.
 
         return result
 
-    def _rule_based_analyze(self, responses: dict[str, Any]) -> dict[str, Any]:
-        """Rule-based fallback analysis."""
+    def rule_based_analyze(self, responses: dict[str, Any]) -> dict[str, Any]:
+        """Rule-based analysis (instant; also the fallback for GPT)."""
         productive_time = responses.get("productive_time", "morning")
         challenges = responses.get("challenges", [])
 
@@ -144,7 +144,8 @@ Return ONLY valid JSON, no other text.
             "motivation_style": "gentle",
         }
 
-    def get_personalized_message(self, profile: dict[str, Any]) -> str:
+    @staticmethod
+    def get_personalized_message(profile: dict[str, Any]) -> str:
         """Generate a personalized welcome message based on profile."""
         productivity_type = profile.get("productivity_type", "steady_pace")
         # work_style can be used for more personalized messages in the future
@@ -6,11 +6,11 @@ from datetime import date, datetime
 from flask import current_app
 
 from app import db
-from app.models import DailyQuest, User
+from app.models import DailyQuest
 from app.models.character import GENRE_THEMES
 from app.models.quest import QUEST_NAME_PROMPTS, QUEST_TEMPLATES
-from app.models.user_profile import UserProfile
 from app.services.openai_client import get_openai_client
+from app.utils.identity import get_profile, get_user
 
 
 class QuestService:
@@ -103,7 +103,7 @@ class QuestService:
             return existing
 
         # Get user's genre preference
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        profile = get_profile(user_id)
         genre = profile.favorite_genre if profile else "fantasy"
         if not genre:
             genre = "fantasy"
@@ -311,7 +311,7 @@ class QuestService:
             return None
 
         # Apply rewards
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         if user:
             xp_info = user.add_xp(reward["xp"])
             reward["xp_info"] = xp_info
@@ -28,6 +28,15 @@ class TaskClassifier:
 
     VALID_DIFFICULTIES = ["easy", "medium", "hard", "very_hard"]
 
+    # Task priority for a difficulty and back (card generation uses difficulty)
+    DIFFICULTY_TO_PRIORITY = {
+        "easy": "low",
+        "medium": "medium",
+        "hard": "high",
+        "very_hard": "high",
+    }
+    PRIORITY_TO_DIFFICULTY = {"low": "easy", "medium": "medium", "high": "hard"}
+
     # Urgency keywords — force hard difficulty
     URGENCY_KEYWORDS = [
         "срочно",
@@ -156,34 +165,53 @@ class TaskClassifier:
         - task_type: str (one of TASK_TYPES)
         - preferred_time: str (one of TIME_SLOTS)
         """
-        text_lower = f"{task_title} {task_description or ''}".lower()
-
-        # Fast pre-check: urgency keywords force hard difficulty
-        forced_difficulty = None
-        for keyword in self.URGENCY_KEYWORDS:
-            if keyword in text_lower:
-                forced_difficulty = "hard"
-                break
-
         # Try AI classification
         if self.client:
             try:
-                result = self._ai_classify_and_rate(
+                return self.ai_classify_and_rate(
                     task_title, task_description, user_id=user_id
                 )
-                # Override difficulty if urgency keyword detected
-                if forced_difficulty:
-                    result["difficulty"] = forced_difficulty
-                return result
             except Exception as e:
                 current_app.logger.error(f"AI classify_and_rate failed: {e}")
 
         # Fallback to keyword/heuristic classification
-        fallback = self._keyword_classify(task_title, task_description)
-        fallback["difficulty"] = forced_difficulty or self._heuristic_difficulty(
+        return self.heuristic_classify(task_title, task_description)
+
+    def heuristic_classify(
+        self, task_title: str, task_description: str | None = None
+    ) -> dict[str, Any]:
+        """Instant keyword/length classification, same keys as the AI one."""
+        text_lower = f"{task_title} {task_description or ''}".lower()
+        result = self._keyword_classify(task_title, task_description)
+        result["difficulty"] = self._urgent_difficulty(
             text_lower
+        ) or self._heuristic_difficulty(text_lower)
+        return result
+
+    def ai_classify_and_rate(
+        self,
+        task_title: str,
+        task_description: str | None = None,
+        user_id: int | None = None,
+    ) -> dict[str, Any]:
+        """AI classification with the urgency override. Raises on AI errors."""
+        result = self._ai_classify_and_rate(
+            task_title, task_description, user_id=user_id
+        )
+        # Urgency keywords force hard difficulty
+        forced_difficulty = self._urgent_difficulty(
+            f"{task_title} {task_description or ''}".lower()
         )
-        return fallback
+        if forced_difficulty:
+            result["difficulty"] = forced_difficulty
+        return result
+
+    @classmethod
+    def _urgent_difficulty(cls, text_lower: str) -> str | None:
+        for keyword in cls.URGENCY_KEYWORDS:
+            if keyword in text_lower:
+                return "hard"
+        return None
 
     def _ai_classify_and_rate(
         self,
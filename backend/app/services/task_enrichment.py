@@ -0,0 +1,103 @@
+"""Background AI classification of new tasks.
+
+Tasks are created with the instant heuristic classification
+(``TaskClassifier.heuristic_classify``) and ``enrichment_status`` "pending".
+The AI classification then runs in Celery and patches type, preferred time,
+difficulty and priority into the row. A field the user set (in the request
+or by editing the task meanwhile) no longer holds its heuristic value and is
+left alone. Clients pick the result up from the next fetch or /tasks/changes.
+
+Every enrichment also counts, per field, whether the heuristic agreed with
+the AI (``moodsprint_task_classifications_total``).
+"""
+
+import logging
+
+from flask import current_app
+
+from app import db
+from app.metrics import record_classification_agreement
+from app.models.task import Task, TaskEnrichmentStatus
+from app.services.task_classifier import TaskClassifier
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIED_FIELDS = ("task_type", "preferred_time", "difficulty")
+
+
+def queue_enrichment(task: Task, heuristic: dict, replaceable: list[str]) -> None:
+    """Run the AI classification of a just-created task in Celery.
+
+    ``replaceable`` lists the task fields still holding heuristic values.
+    Runs inline if enrichment is not deferred or queueing fails.
+    """
+    if current_app.config.get("DEFER_TASK_ENRICHMENT"):
+        try:
+            from app.tasks.ai_tasks import enrich_task_async
+
+            enrich_task_async.delay(task.id, task.user_id, heuristic, replaceable)
+            return
+        except Exception as e:
+            logger.warning(f"Failed to queue task enrichment, running inline: {e}")
+
+    try:
+        enrich_task(task.id, task.user_id, heuristic, replaceable)
+    except Exception as e:
+        logger.error(f"Task enrichment failed: {e}")
+        db.session.rollback()
+        mark_enrichment_failed(task.id)
+
+
+def enrich_task(
+    task_id: int, user_id: int, heuristic: dict, replaceable: list[str]
+) -> dict:
+    """Classify a task with AI and patch the fields that are still heuristic.
+
+    Raises if the AI call fails (the Celery task retries).
+    """
+    task = db.session.get(Task, task_id)
+    if not task or task.enrichment_status != TaskEnrichmentStatus.PENDING.value:
+        return {"success": False, "error": "Task not pending enrichment"}
+
+    ai = TaskClassifier().ai_classify_and_rate(
+        task.title, task.description, user_id=user_id
+    )
+    for field in CLASSIFIED_FIELDS:
+        record_classification_agreement(field, heuristic[field] == ai[field])
+
+    expected = {
+        **{field: heuristic[field] for field in CLASSIFIED_FIELDS},
+        "priority": TaskClassifier.DIFFICULTY_TO_PRIORITY[heuristic["difficulty"]],
+    }
+    patched = {
+        **{field: ai[field] for field in CLASSIFIED_FIELDS},
+        "priority": TaskClassifier.DIFFICULTY_TO_PRIORITY[ai["difficulty"]],
+    }
+    # Only fields still holding their heuristic value, checked in the UPDATE
+    # itself so an edit racing with it wins
+    values = {
+        getattr(Task, field): db.case(
+            (getattr(Task, field) == expected[field], patched[field]),
+            else_=getattr(Task, field),
+        )
+        for field in replaceable
+    }
+    updated = Task.query.filter_by(
+        id=task_id, enrichment_status=TaskEnrichmentStatus.PENDING.value
+    ).update(
+        {**values, Task.enrichment_status: TaskEnrichmentStatus.DONE.value},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return {"success": bool(updated), "classification": ai}
+
+
+def mark_enrichment_failed(task_id: int) -> None:
+    """Give up on a task's AI classification and keep the heuristic one."""
+    Task.query.filter_by(
+        id=task_id, enrichment_status=TaskEnrichmentStatus.PENDING.value
+    ).update(
+        {Task.enrichment_status: TaskEnrichmentStatus.FAILED.value},
+        synchronize_session=False,
+    )
+    db.session.commit()
@@ -7,8 +7,9 @@ import logging
 from datetime import date, datetime
 
 from app import db
-from app.models import PostponeLog, Task
+from app.models import MoodCheck, PostponeLog, Subtask, Task
 from app.models.task import TaskPriority, TaskStatus
+from app.services.ai_decomposer import AIDecomposer
 
 logger = logging.getLogger(__name__)
 
@@ -33,8 +34,13 @@ def should_skip_time_check_for_card(user_id: int) -> bool:
 
 def get_current_time_slot() -> str:
     """Get current time slot based on hour (Moscow time, UTC+3)."""
+    return time_slot_for_utc_hour(datetime.utcnow().hour)
+
+
+def time_slot_for_utc_hour(utc_hour: int) -> str:
+    """Time slot of a UTC hour (slots follow Moscow time, UTC+3)."""
     # Server is UTC, Moscow is UTC+3
-    hour = (datetime.utcnow().hour + 3) % 24
+    hour = (utc_hour + 3) % 24
     if 6 <= hour < 12:
         return "morning"
     elif 12 <= hour < 18:
@@ -123,8 +129,13 @@ def calculate_task_score(
     current_time_slot: str,
     user_favorite_types: list[str] | None,
     today: date,
+    productive_time_slot: str | None = None,
 ) -> int:
-    """Calculate sorting score for a task."""
+    """Calculate sorting score for a task.
+
+    ``productive_time_slot`` is the slot the user completes most focus
+    sessions in (their productivity patterns).
+    """
     score = 0
 
     # Priority weight (HIGH=100, MEDIUM=50, LOW=0)
@@ -134,6 +145,9 @@ def calculate_task_score(
     # Time match (+30 if preferred time matches current time slot)
     if task.preferred_time and task.preferred_time == current_time_slot:
         score += 30
+    # Tasks without a preferred time lean to the user's productive slot (+15)
+    elif not task.preferred_time and productive_time_slot == current_time_slot:
+        score += 15
 
     # Type match (+20 if task type is in user's favorites)
     if user_favorite_types and task.task_type in user_favorite_types:
@@ -151,3 +165,135 @@ def calculate_task_score(
         score += 50
 
     return score
+
+
+def _decomposition_context(user_id: int, mood_id: int | None):
+    """Strategy, mood and energy from the given mood check (or the latest)."""
+    if mood_id:
+        mood_check = MoodCheck.query.filter_by(id=mood_id, user_id=user_id).first()
+    else:
+        mood_check = (
+            MoodCheck.query.filter_by(user_id=user_id)
+            .order_by(MoodCheck.created_at.desc())
+            .first()
+        )
+
+    if not mood_check:
+        # Use default strategy if no mood
+        return "standard", None, None
+    return (
+        mood_check.decomposition_strategy,
+        mood_check.mood,
+        mood_check.energy,
+    )
+
+
+def decompose_into_subtasks(task: Task, user_id: int, mood_id: int | None = None):
+    """AI-decompose a task into subtasks, replacing its current ones.
+
+    Uses the given mood check (or the user's latest) to pick the strategy.
+    Returns the /tasks/<id>/decompose response payload.
+    """
+    strategy, mood_value, energy_value = _decomposition_context(user_id, mood_id)
+
+    # Count existing subtasks
+    existing_subtasks = Subtask.query.filter_by(task_id=task.id).all()
+
+    # Decompose task with type context and user state
+    decomposer = AIDecomposer()
+    result = decomposer.decompose_task(
+        task.title,
+        task.description,
+        strategy,
+        task.task_type,
+        mood=mood_value,
+        energy=energy_value,
+        existing_subtasks_count=len(existing_subtasks),
+        user_id=user_id,
+    )
+
+    # Handle no_new_steps response
+    if result.get("no_new_steps"):
+        return {
+            "subtasks": [s.to_dict() for s in existing_subtasks],
+            "strategy": strategy,
+            "no_new_steps": True,
+            "message": result.get(
+                "reason", "Задача уже разбита на достаточное количество шагов"
+            ),
+        }
+
+    # Clear existing subtasks and create new ones
+    Subtask.query.filter_by(task_id=task.id).delete()
+
+    subtasks = []
+    for subtask_info in result["subtasks"]:
+        subtask = Subtask(
+            task_id=task.id,
+            title=subtask_info["title"],
+            estimated_minutes=subtask_info["estimated_minutes"],
+            order=subtask_info["order"],
+        )
+        db.session.add(subtask)
+        subtasks.append(subtask)
+
+    db.session.commit()
+
+    return {
+        "subtasks": [s.to_dict() for s in subtasks],
+        "strategy": strategy,
+        "message": decomposer.get_strategy_message(strategy),
+    }
+
+
+def stream_decomposition(task: Task, user_id: int, mood_id: int | None = None):
+    """Streaming decompose_into_subtasks: yields (event, payload) pairs.
+
+    Each "subtask" event carries a subtask that is already saved; the
+    task's previous subtasks are replaced when the first new one arrives.
+    The final "done" event carries the rest of the decompose payload
+    (strategy, message, no_new_steps).
+    """
+    strategy, mood_value, energy_value = _decomposition_context(user_id, mood_id)
+    existing_subtasks = Subtask.query.filter_by(task_id=task.id).all()
+
+    decomposer = AIDecomposer()
+    events = decomposer.decompose_task_stream(
+        task.title,
+        task.description,
+        strategy,
+        task.task_type,
+        mood=mood_value,
+        energy=energy_value,
+        existing_subtasks_count=len(existing_subtasks),
+        user_id=user_id,
+    )
+
+    replaced = False
+    for event, payload in events:
+        if event == "subtask":
+            if not replaced:
+                Subtask.query.filter_by(task_id=task.id).delete()
+                replaced = True
+            subtask = Subtask(
+                task_id=task.id,
+                title=payload["title"],
+                estimated_minutes=payload["estimated_minutes"],
+                order=payload["order"],
+            )
+            db.session.add(subtask)
+            db.session.commit()
+            yield "subtask", subtask.to_dict()
+        elif payload["no_new_steps"]:
+            yield "done", {
+                "subtasks": [s.to_dict() for s in existing_subtasks],
+                "strategy": strategy,
+                "no_new_steps": True,
+                "message": payload.get("reason")
+                or "Задача уже разбита на достаточное количество шагов",
+            }
+        else:
+            yield "done", {
+                "strategy": strategy,
+                "message": decomposer.get_strategy_message(strategy),
+            }
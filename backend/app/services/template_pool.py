@@ -0,0 +1,219 @@
+"""In-process card template pool with O(1) weighted sampling.
+
+Card drops pick a template for (genre, rarity) on every task completion.
+Active templates of a genre are loaded once into an immutable snapshot with
+one alias table per rarity (plus universal templates), so a drop from an
+existing template needs no database reads.
+
+Template edits (admin card-pool pages, newly saved AI templates) publish on
+``CARD_POOL_CHANNEL``; every worker process listens in a background thread
+and drops its snapshot. If the listener is not connected, snapshots are not
+trusted and each lookup rebuilds from the database. Template counters in
+app.services.genre_stats are refreshed together with the snapshots.
+"""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from app.metrics import record_cache_lookup
+from app.models.card import CardTemplate
+from app.services import genre_stats
+
+logger = logging.getLogger(__name__)
+
+CARD_POOL_CHANNEL = "card_pool:invalidate"
+CARD_POOL_TTL = 600  # Safety net for edits that bypass invalidation
+
+# Pool key for universal templates (rarity=NULL)
+UNIVERSAL = None
+
+
+class AliasTable:
+    """Vose's alias method: O(n) build, O(1) weighted sampling."""
+
+    __slots__ = ("prob", "alias")
+
+    def __init__(self, weights: list[float]):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one weight")
+        total = float(sum(weights))
+        if total <= 0:
+            weights, total = [1.0] * n, float(n)
+
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] = scaled[g] + scaled[s] - 1.0
+            (small if scaled[g] < 1.0 else large).append(g)
+
+        # Leftovers are 1.0 up to float error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random) -> int:
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+@dataclass(frozen=True)
+class PooledTemplate:
+    """Immutable copy of the CardTemplate fields a card drop needs."""
+
+    id: int
+    name: str
+    description: str | None
+    genre: str
+    base_hp: int
+    base_attack: int
+    image_url: str | None
+    emoji: str | None
+    weight: float = 1.0
+
+    @classmethod
+    def from_model(cls, template: CardTemplate) -> "PooledTemplate":
+        return cls(
+            id=template.id,
+            name=template.name,
+            description=template.description,
+            genre=template.genre,
+            base_hp=template.base_hp,
+            base_attack=template.base_attack,
+            image_url=template.image_url,
+            emoji=template.emoji,
+            weight=template.weight if template.weight is not None else 1.0,
+        )
+
+
+@dataclass(frozen=True)
+class GenrePool:
+    """Active templates of one genre, grouped by rarity lock."""
+
+    genre: str
+    active_count: int
+    # rarity value (or UNIVERSAL) -> (templates, alias table)
+    buckets: dict
+
+    def sample(self, rarity: str | None, rng=random) -> PooledTemplate | None:
+        """Weighted pick: rarity-locked templates first, then universal ones."""
+        for key in (rarity, UNIVERSAL) if rarity else (UNIVERSAL,):
+            bucket = self.buckets.get(key)
+            if bucket:
+                templates, table = bucket
+                return templates[table.sample(rng)]
+        return None
+
+
+def build_genre_pool(genre: str) -> GenrePool:
+    """Load the active templates of a genre (one query)."""
+    grouped: dict[str | None, list[PooledTemplate]] = {}
+    templates = CardTemplate.query.filter_by(genre=genre, is_active=True).all()
+    for template in templates:
+        grouped.setdefault(template.rarity, []).append(
+            PooledTemplate.from_model(template)
+        )
+
+    buckets = {
+        key: (tuple(items), AliasTable([t.weight for t in items]))
+        for key, items in grouped.items()
+    }
+    return GenrePool(genre=genre, active_count=len(templates), buckets=buckets)
+
+
+# genre -> (built_at, pool)
+_pools: dict[str, tuple[float, GenrePool]] = {}
+# Bumped on every invalidation so a build racing with one is not stored
+_generation = 0
+
+_subscriber_lock = threading.Lock()
+_subscriber_thread: threading.Thread | None = None
+_subscriber_connected = threading.Event()
+
+
+def _drop_local(genre: str | None) -> None:
+    global _generation
+    _generation += 1
+    if genre:
+        _pools.pop(genre, None)
+    else:
+        _pools.clear()
+
+
+def _listen_for_invalidations() -> None:
+    """Background listener: drop local snapshots on invalidation messages."""
+    from app.extensions import get_redis_client
+
+    backoff = 1
+    while True:
+        try:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CARD_POOL_CHANNEL)
+            # Anything cached before we were listening may be stale
+            _drop_local(None)
+            _subscriber_connected.set()
+            backoff = 1
+            for message in pubsub.listen():
+                genre = message.get("data")
+                _drop_local(None if genre == "*" else genre)
+                genre_stats.drop_local_snapshot()
+        except Exception as e:
+            logger.warning(f"Card pool listener error: {e}")
+        _subscriber_connected.clear()
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60)
+
+
+def _ensure_subscriber() -> bool:
+    """Start the listener thread once per process. True if it is connected."""
+    global _subscriber_thread
+    if _subscriber_thread is None:
+        with _subscriber_lock:
+            if _subscriber_thread is None:
+                _subscriber_thread = threading.Thread(
+                    target=_listen_for_invalidations,
+                    name="card-pool-invalidation",
+                    daemon=True,
+                )
+                _subscriber_thread.start()
+    return _subscriber_connected.is_set()
+
+
+def get_genre_pool(genre: str) -> GenrePool:
+    """Get the template pool of a genre, rebuilding it if stale."""
+    if not _ensure_subscriber():
+        # Can't hear invalidations — don't trust memory
+        return build_genre_pool(genre)
+
+    cached = _pools.get(genre)
+    if cached and time.time() - cached[0] < CARD_POOL_TTL:
+        record_cache_lookup("card_pool", True)
+        return cached[1]
+
+    record_cache_lookup("card_pool", False)
+    generation = _generation
+    pool = build_genre_pool(genre)
+    if generation == _generation:
+        _pools[genre] = (time.time(), pool)
+    return pool
+
+
+def invalidate_template_pool(genre: str | None = None) -> None:
+    """Drop pool snapshots here and in every other worker process."""
+    _drop_local(genre)
+    genre_stats.refresh_template_counts(genre)
+    try:
+        from app.extensions import get_redis_client
+
+        get_redis_client().publish(CARD_POOL_CHANNEL, genre or "*")
+    except Exception as e:
+        logger.warning(f"Failed to publish card pool invalidation: {e}")
@@ -0,0 +1,193 @@
+"""Opt-in SQL query instrumentation and N+1 detection.
+
+Counts statements and DB time per request via SQLAlchemy cursor events,
+groups statements by fingerprint (the statement with literals and bound
+parameters stripped) and flags fingerprints that repeat within one request,
+which is what an N+1 loop looks like from the database side.
+
+Enable with ``SQL_INSTRUMENTATION=1``. ``collect_queries()`` works without it
+and is what the ``query_budget`` pytest marker builds on.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import structlog
+from prometheus_client import Counter as PromCounter
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_QUERIES_PER_REQUEST = Histogram(
+    "moodsprint_sql_queries_per_request",
+    "SQL statements issued per request",
+    ["endpoint"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+SQL_TIME_PER_REQUEST = Histogram(
+    "moodsprint_sql_time_per_request_seconds",
+    "Total SQL time per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SQL_N_PLUS_ONE = PromCounter(
+    "moodsprint_sql_n_plus_one_total",
+    "Requests where one statement fingerprint repeated past the threshold",
+    ["endpoint"],
+)
+
+_LITERAL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # string literals
+    (re.compile(r"%\(\w+\)s|:\w+|\$\d+|%s"), "?"),  # bound parameters
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),  # numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),  # IN lists
+    (re.compile(r"\s+"), " "),
+)
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so repeats with different parameters match."""
+    for pattern, replacement in _LITERAL_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass(eq=False)
+class QueryStats:
+    """Statements seen while a collector was active."""
+
+    count: int = 0
+    total_time: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Fingerprints issued at least ``threshold`` times, most frequent first."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+# Active collectors for this thread (request + any nested collect_queries)
+_local = threading.local()
+_listeners_installed = False
+
+
+def _active_collectors() -> list[QueryStats]:
+    if not hasattr(_local, "collectors"):
+        _local.collectors = []
+    return _local.collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    started = start_times.pop()
+    collectors = _active_collectors()
+    if not collectors:
+        return
+    duration = time.perf_counter() - started
+    for stats in collectors:
+        stats.record(statement, duration)
+
+
+def install_listeners() -> None:
+    """Attach the cursor listeners to all engines (idempotent)."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_installed = True
+
+
+@contextmanager
+def collect_queries():
+    """Collect the SQL statements executed inside the block on this thread.
+
+    Usage:
+        with collect_queries() as stats:
+            service.do_something()
+        assert stats.count <= 5
+    """
+    install_listeners()
+    stats = QueryStats()
+    collectors = _active_collectors()
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+def setup_sql_instrumentation(app):
+    """Register per-request SQL stats if ``SQL_INSTRUMENTATION`` is enabled.
+
+    Must run after setup_logging() so the stats are bound to the log context
+    before ``request_completed`` is written (after_request runs in reverse).
+    """
+    if not app.config.get("SQL_INSTRUMENTATION"):
+        return app
+
+    install_listeners()
+    threshold = app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 5)
+
+    @app.before_request
+    def start_sql_stats():
+        from flask import g
+
+        g.sql_stats = QueryStats()
+        _active_collectors().append(g.sql_stats)
+
+    @app.after_request
+    def record_sql_stats(response):
+        from flask import g, request
+
+        stats = g.get("sql_stats")
+        if stats is None:
+            return response
+
+        endpoint = request.endpoint or "unmatched"
+        SQL_QUERIES_PER_REQUEST.labels(endpoint=endpoint).observe(stats.count)
+        SQL_TIME_PER_REQUEST.labels(endpoint=endpoint).observe(stats.total_time)
+
+        structlog.contextvars.bind_contextvars(
+            sql_queries=stats.count,
+            sql_time_ms=round(stats.total_time * 1000, 2),
+        )
+
+        repeated = stats.repeated(threshold)
+        if repeated:
+            SQL_N_PLUS_ONE.labels(endpoint=endpoint).inc()
+            logger = structlog.get_logger()
+            for statement, count in repeated[:3]:
+                logger.warning(
+                    "sql_n_plus_one",
+                    endpoint=endpoint,
+                    count=count,
+                    statement=statement[:300],
+                )
+
+        return response
+
+    @app.teardown_request
+    def stop_sql_stats(exc):
+        from flask import g
+
+        stats = g.pop("sql_stats", None)
+        collectors = _active_collectors()
+        if stats is not None and stats in collectors:
+            collectors.remove(stats)
+
+    return app
@@ -1,12 +1,27 @@
 """Celery tasks package."""
 
-from app.tasks.ai_tasks import decompose_task_async, generate_suggestions_async
-from app.tasks.card_tasks import generate_card_image_async
+from app.tasks.ai_tasks import (
+    decompose_task_async,
+    enrich_task_async,
+    generate_suggestions_async,
+)
+from app.tasks.card_tasks import (
+    generate_card_image_async,
+    generate_monster_image_async,
+    generate_monster_images_async,
+)
+from app.tasks.friend_tasks import process_referral_async
 from app.tasks.notification_tasks import send_reminder_async
+from app.tasks.onboarding_tasks import build_welcome_bundle_async
 
 __all__ = [
     "decompose_task_async",
+    "enrich_task_async",
     "generate_suggestions_async",
     "generate_card_image_async",
+    "generate_monster_image_async",
+    "generate_monster_images_async",
+    "process_referral_async",
     "send_reminder_async",
+    "build_welcome_bundle_async",
 ]
@@ -8,51 +8,57 @@ logger = structlog.get_logger()
 
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=60)
-def decompose_task_async(self, task_id: int, user_id: int, mood_level: int = None):
+def decompose_task_async(self, task_id: int, user_id: int, mood_id: int = None):
     """Decompose a task into subtasks asynchronously."""
     from app import db
-    from app.models import Subtask, Task
-    from app.services.ai_decomposer import AIDecomposer
+    from app.models import Task
+    from app.services.task_service import decompose_into_subtasks
 
     try:
         logger.info("decompose_task_started", task_id=task_id, user_id=user_id)
 
-        task = db.session.get(Task, task_id)
+        task = Task.query.filter_by(id=task_id, user_id=user_id).first()
         if not task:
             logger.warning("task_not_found", task_id=task_id)
             return {"success": False, "error": "Task not found"}
 
-        decomposer = AIDecomposer()
-        subtasks_data = decomposer.decompose(
-            task_title=task.title,
-            mood_level=mood_level,
-        )
-
-        # Create subtasks
-        for i, subtask_data in enumerate(subtasks_data):
-            subtask = Subtask(
-                task_id=task_id,
-                title=subtask_data.get("title", f"Step {i + 1}"),
-                description=subtask_data.get("description"),
-                estimated_minutes=subtask_data.get("estimated_minutes", 15),
-                order=i + 1,
-            )
-            db.session.add(subtask)
-
-        db.session.commit()
+        result = decompose_into_subtasks(task, user_id, mood_id)
         logger.info(
             "decompose_task_completed",
             task_id=task_id,
-            subtasks_count=len(subtasks_data),
+            subtasks_count=len(result["subtasks"]),
         )
 
-        return {"success": True, "subtasks_count": len(subtasks_data)}
+        return result
 
     except Exception as e:
+        db.session.rollback()
         logger.error("decompose_task_failed", task_id=task_id, error=str(e))
         raise self.retry(exc=e)
 
 
+@celery.task(bind=True, max_retries=2, default_retry_delay=30)
+def enrich_task_async(
+    self, task_id: int, user_id: int, heuristic: dict, replaceable: list
+):
+    """Patch the AI classification into a task created with the heuristic one."""
+    from app import db
+    from app.services.task_enrichment import enrich_task, mark_enrichment_failed
+
+    try:
+        result = enrich_task(task_id, user_id, heuristic, replaceable)
+        logger.info("enrich_task_completed", task_id=task_id, result=result)
+        return result
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("enrich_task_failed", task_id=task_id, error=str(e))
+        if self.request.retries >= self.max_retries:
+            mark_enrichment_failed(task_id)
+            return {"success": False, "error": str(e)}
+        raise self.retry(exc=e)
+
+
 @celery.task(bind=True, max_retries=3, default_retry_delay=60)
 def generate_suggestions_async(self, user_id: int, context: str = None):
     """Generate task suggestions for user asynchronously."""
@@ -8,39 +8,69 @@ logger = structlog.get_logger()
 
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=120)
-def generate_card_image_async(self, card_id: int):
+def generate_card_image_async(self, card_id: int, user_id: int):
     """Generate card image using AI asynchronously."""
     from app import db
-    from app.models import Card
     from app.services.card_service import CardService
 
     try:
         logger.info("generate_card_image_started", card_id=card_id)
 
-        card = db.session.get(Card, card_id)
-        if not card:
-            logger.warning("card_not_found", card_id=card_id)
-            return {"success": False, "error": "Card not found"}
-
-        service = CardService()
-        image_url = service.generate_image_for_card(card)
-
-        if image_url:
-            card.image_url = image_url
-            db.session.commit()
+        result = CardService().generate_card_image_async(card_id, user_id)
+        if result.get("success"):
             logger.info(
-                "generate_card_image_completed", card_id=card_id, image_url=image_url
+                "generate_card_image_completed",
+                card_id=card_id,
+                image_url=result.get("image_url"),
             )
-            return {"success": True, "image_url": image_url}
         else:
-            logger.warning("generate_card_image_no_result", card_id=card_id)
-            return {"success": False, "error": "Image generation returned no result"}
+            logger.warning(
+                "generate_card_image_no_result",
+                card_id=card_id,
+                error=result.get("error"),
+            )
+        return result
 
     except Exception as e:
+        db.session.rollback()
         logger.error("generate_card_image_failed", card_id=card_id, error=str(e))
         raise self.retry(exc=e)
 
 
+@celery.task(bind=True, max_retries=2, default_retry_delay=60)
+def generate_monster_image_async(self, monster_id: int):
+    """Generate the sprite of a monster that has none yet."""
+    from app import db
+    from app.services.card_battle_service import CardBattleService
+
+    try:
+        result = CardBattleService().generate_missing_monster_image(monster_id)
+        logger.info(
+            "generate_monster_image_completed", monster_id=monster_id, result=result
+        )
+        return result
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(
+            "generate_monster_image_failed", monster_id=monster_id, error=str(e)
+        )
+        raise self.retry(exc=e)
+
+
+@celery.task(bind=True, soft_time_limit=840, time_limit=900)
+def generate_monster_images_async(self):
+    """Generate sprites for all monsters without one, reporting progress."""
+    from app.services.card_battle_service import CardBattleService
+
+    def report(done: int, total: int):
+        self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    result = CardBattleService().generate_missing_monster_images(progress=report)
+    logger.info("generate_monster_images_completed", **result)
+    return {"success": True, **result}
+
+
 @celery.task(bind=True, max_retries=2, default_retry_delay=60)
 def regenerate_card_stats_async(self, card_id: int):
     """Regenerate card stats based on template."""
@@ -68,3 +98,45 @@ def regenerate_card_stats_async(self, card_id: int):
     except Exception as e:
         logger.error("regenerate_card_stats_failed", card_id=card_id, error=str(e))
         raise self.retry(exc=e)
+
+
+# Only one replenishment run at a time (beat + manual triggers)
+REPLENISH_LOCK_KEY = "card_pool:replenish_lock"
+REPLENISH_LOCK_TTL = 900
+
+
+@celery.task(bind=True, soft_time_limit=840, time_limit=900)
+def replenish_card_pool(self, batch_size: int | None = None):
+    """Generate card templates and legendaries ahead of demand."""
+    from app.extensions import get_redis_client
+    from app.services.card_pool_service import CardPoolService
+
+    redis = get_redis_client()
+    if not redis.set(
+        REPLENISH_LOCK_KEY, self.request.id or "1", nx=True, ex=REPLENISH_LOCK_TTL
+    ):
+        logger.info("replenish_card_pool_skipped", reason="already_running")
+        return {"success": False, "error": "Already running"}
+
+    try:
+        summary = CardPoolService().replenish(batch_size)
+        logger.info("replenish_card_pool_completed", summary=summary)
+        return {"success": True, "summary": summary}
+    except Exception as e:
+        logger.error("replenish_card_pool_failed", error=str(e))
+        raise
+    finally:
+        redis.delete(REPLENISH_LOCK_KEY)
+
+
+@celery.task
+def reconcile_genre_stats():
+    """Rewrite genre user/template counters from the database."""
+    from app.services import genre_stats
+
+    drift = genre_stats.reconcile()
+    if drift["users"] or drift["templates"]:
+        logger.warning("genre_stats_drift", **drift)
+    else:
+        logger.info("genre_stats_reconciled")
+    return {"success": True, "drift": drift}
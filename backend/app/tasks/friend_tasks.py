@@ -0,0 +1,31 @@
+"""Friend and referral async tasks."""
+
+import structlog
+
+from app.celery_app import celery
+
+logger = structlog.get_logger()
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def process_referral_async(self, user_id: int, referrer_id: int):
+    """Befriend and reward an existing user who opened an invite link."""
+    from app.services.friend_service import FriendService
+
+    try:
+        result = FriendService().accept_referral(user_id, referrer_id)
+        logger.info(
+            "process_referral_completed",
+            user_id=user_id,
+            referrer_id=referrer_id,
+            result=result,
+        )
+        return result
+    except Exception as e:
+        logger.error(
+            "process_referral_failed",
+            user_id=user_id,
+            referrer_id=referrer_id,
+            error=str(e),
+        )
+        raise self.retry(exc=e)
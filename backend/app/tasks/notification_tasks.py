@@ -12,7 +12,7 @@ def send_reminder_async(self, user_id: int, task_id: int, message: str = None):
     """Send task reminder notification to user."""
     from app import db
     from app.models import Task, User
-    from app.utils.notifications import send_telegram_notification
+    from app.utils.notifications import send_telegram_message
 
     try:
         logger.info("send_reminder_started", user_id=user_id, task_id=task_id)
@@ -38,7 +38,7 @@ def send_reminder_async(self, user_id: int, task_id: int, message: str = None):
         if not message:
             message = f"Напоминание о задаче: {task.title}"
 
-        success = send_telegram_notification(user.telegram_id, message)
+        success = send_telegram_message(user.telegram_id, message)
 
         if success:
             logger.info("send_reminder_completed", user_id=user_id, task_id=task_id)
@@ -65,11 +65,11 @@ def send_batch_reminders(self, user_ids: list, message: str):
         try:
             from app import db
             from app.models import User
-            from app.utils.notifications import send_telegram_notification
+            from app.utils.notifications import send_telegram_message
 
             user = db.session.get(User, user_id)
             if user and user.telegram_id:
-                if send_telegram_notification(user.telegram_id, message):
+                if send_telegram_message(user.telegram_id, message):
                     results["success"] += 1
                 else:
                     results["failed"] += 1
@@ -0,0 +1,30 @@
+"""Onboarding async tasks."""
+
+import structlog
+
+from app.celery_app import celery
+
+logger = structlog.get_logger()
+
+
+@celery.task(bind=True, max_retries=2, default_retry_delay=30)
+def build_welcome_bundle_async(self, user_id: int, responses: dict):
+    """GPT profile analysis and welcome cards of a user who finished onboarding."""
+    from app import db
+    from app.services.onboarding_service import (
+        build_welcome_bundle,
+        mark_welcome_bundle_failed,
+    )
+
+    try:
+        result = build_welcome_bundle(user_id, responses)
+        logger.info("welcome_bundle_completed", user_id=user_id, result=result)
+        return result
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error("welcome_bundle_failed", user_id=user_id, error=str(e))
+        if self.request.retries >= self.max_retries:
+            mark_welcome_bundle_failed(user_id)
+            return {"success": False, "error": str(e)}
+        raise self.retry(exc=e)
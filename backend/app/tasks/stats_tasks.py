@@ -0,0 +1,30 @@
+"""User statistics async tasks."""
+
+import structlog
+
+from app.celery_app import celery
+
+logger = structlog.get_logger()
+
+
+@celery.task
+def reconcile_daily_counters(days: int = 2):
+    """Rewrite recent daily activity counters and all totals from the database."""
+    from app.services import daily_counters
+
+    drift = daily_counters.reconcile(days)
+    if drift["days"] or drift["totals"]:
+        logger.warning("daily_counters_drift", **drift)
+    else:
+        logger.info("daily_counters_reconciled")
+    return {"success": True, "drift": drift}
+
+
+@celery.task
+def refresh_productivity_patterns():
+    """Recompute stale productivity pattern snapshots."""
+    from app.services import productivity_patterns
+
+    refreshed = productivity_patterns.refresh_stale()
+    logger.info("productivity_patterns_refreshed", count=refreshed)
+    return {"success": True, "refreshed": refreshed}
@@ -8,10 +8,15 @@ from app.utils.response import (
     not_found,
     server_error,
     success_response,
+    too_many_jobs,
     unauthorized,
     validation_error,
 )
-from app.utils.telegram import parse_telegram_user, validate_telegram_data
+from app.utils.telegram import (
+    parse_telegram_user,
+    validate_telegram_data,
+    verify_init_data,
+)
 
 __all__ = [
     "success_response",
@@ -22,8 +27,10 @@ __all__ = [
     "validation_error",
     "conflict",
     "server_error",
+    "too_many_jobs",
     "validate_telegram_data",
     "parse_telegram_user",
+    "verify_init_data",
     "get_lang",
     "get_request_language",
     "is_english",
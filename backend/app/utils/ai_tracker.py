@@ -4,6 +4,7 @@ import logging
 import time
 
 from app import db
+from app.metrics import OPENAI_ERRORS, record_openai_call
 from app.models.ai_usage_log import AIUsageLog
 
 logger = logging.getLogger(__name__)
@@ -46,6 +47,15 @@ def track_ai_usage(
 
         cost = calculate_cost(model, prompt_tokens, completion_tokens)
 
+        record_openai_call(
+            endpoint=endpoint,
+            model=model,
+            duration=latency_ms / 1000,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=cost,
+        )
+
         log_entry = AIUsageLog(
             user_id=user_id,
             service_name=service_name,
@@ -79,7 +89,11 @@ def tracked_openai_call(client, user_id, endpoint: str, **kwargs):
     model = kwargs.get("model", "unknown")
 
     start = time.time()
-    response = client.chat.completions.create(**kwargs)
+    try:
+        response = client.chat.completions.create(**kwargs)
+    except Exception:
+        OPENAI_ERRORS.labels(endpoint=endpoint, model=model).inc()
+        raise
     latency_ms = int((time.time() - start) * 1000)
 
     track_ai_usage(
@@ -92,3 +106,39 @@ def tracked_openai_call(client, user_id, endpoint: str, **kwargs):
     )
 
     return response
+
+
+def tracked_openai_stream(client, user_id, endpoint: str, **kwargs):
+    """Streaming variant of tracked_openai_call: yields content deltas.
+
+    Usage is tracked from the final chunk once the stream is consumed.
+    """
+    model = kwargs.get("model", "unknown")
+
+    start = time.time()
+    try:
+        stream = client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **kwargs
+        )
+        usage_chunk = None
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage_chunk = chunk
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    except Exception:
+        OPENAI_ERRORS.labels(endpoint=endpoint, model=model).inc()
+        raise
+    latency_ms = int((time.time() - start) * 1000)
+
+    if usage_chunk is not None:
+        track_ai_usage(
+            user_id=user_id,
+            service_name=model,
+            model=model,
+            response=usage_chunk,
+            latency_ms=latency_ms,
+            endpoint=endpoint,
+        )
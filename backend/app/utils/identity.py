@@ -0,0 +1,106 @@
+"""Request-scoped identity: the authenticated User and UserProfile.
+
+Most endpoints need the current user and their profile, often several times
+through nested services. ``get_user``/``get_profile`` load both with one
+joined query the first time they are asked for the JWT identity and memoize
+them on ``flask.g`` for the rest of the request. Lookups for other users, or
+calls outside a request (Celery, CLI), fall through to a plain query.
+"""
+
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+
+from app import db
+from app.models.user import User
+from app.models.user_profile import UserProfile
+
+# Sentinel for "profile looked up and not found"
+_MISSING = object()
+
+
+def get_current_user_id() -> int | None:
+    """JWT identity of the current request, or None if unauthenticated."""
+    if not has_request_context():
+        return None
+    if g.get("identity_user_id") is None:
+        try:
+            identity = get_jwt_identity()
+        except Exception:
+            # No verified JWT (yet) in this request
+            return None
+        if identity is None:
+            return None
+        g.identity_user_id = int(identity)
+    return g.identity_user_id
+
+
+def _load_identity(user_id: int) -> None:
+    """Load User and UserProfile in one query and memoize them on ``g``."""
+    row = (
+        db.session.query(User, UserProfile)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    user, profile = row if row else (None, None)
+    g.identity_user = user
+    g.identity_profile = profile if profile is not None else _MISSING
+    g.identity_lookups_saved = 0
+    # Read by get_request_language()
+    g.current_user = user
+
+
+def _is_current(user_id: int | None) -> bool:
+    if user_id is None or not has_request_context():
+        return False
+    return user_id == get_current_user_id()
+
+
+def _record_saved_lookup() -> None:
+    g.identity_lookups_saved = g.get("identity_lookups_saved", 0) + 1
+
+
+def get_user(user_id: int | None) -> User | None:
+    """Get a user, served from the request identity when it is the caller."""
+    if not _is_current(user_id):
+        return User.query.get(user_id) if user_id is not None else None
+
+    if "identity_user" not in g:
+        _load_identity(user_id)
+    else:
+        _record_saved_lookup()
+    return g.identity_user
+
+
+def get_profile(user_id: int | None) -> UserProfile | None:
+    """Get a user's profile, served from the request identity when possible.
+
+    A profile that did not exist at load time is looked up again, so
+    get-or-create code paths see profiles created later in the request.
+    """
+    if not _is_current(user_id):
+        if user_id is None:
+            return None
+        return UserProfile.query.filter_by(user_id=user_id).first()
+
+    if "identity_user" not in g:
+        _load_identity(user_id)
+    elif g.identity_profile is not _MISSING:
+        _record_saved_lookup()
+
+    if g.identity_profile is _MISSING:
+        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        if profile is None:
+            return None
+        g.identity_profile = profile
+    return g.identity_profile
+
+
+def get_current_user() -> User | None:
+    """The authenticated user of the current request."""
+    return get_user(get_current_user_id())
+
+
+def get_current_profile() -> UserProfile | None:
+    """The authenticated user's profile for the current request."""
+    return get_profile(get_current_user_id())
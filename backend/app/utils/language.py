@@ -1,6 +1,6 @@
 """Language/localization utilities."""
 
-from flask import g, request
+from flask import request
 
 # Supported languages
 SUPPORTED_LANGUAGES = ["ru", "en"]
@@ -13,7 +13,7 @@ def get_request_language() -> str:
     Priority:
     1. Query parameter `lang` (for testing)
     2. X-Language header (set by frontend)
-    3. User's language_code from profile (if authenticated)
+    3. User's language from profile (if authenticated)
     4. Accept-Language header
     5. Default to Russian
     """
@@ -27,9 +27,12 @@ def get_request_language() -> str:
     if lang and lang in SUPPORTED_LANGUAGES:
         return lang
 
-    # 3. Check user's language_code if authenticated
-    if hasattr(g, "current_user") and g.current_user:
-        user_lang = getattr(g.current_user, "language_code", None)
+    # 3. Check user's profile language if authenticated (memoized per request)
+    from app.utils.identity import get_current_profile
+
+    profile = get_current_profile()
+    if profile is not None:
+        user_lang = getattr(profile, "language", None)
         if user_lang and user_lang in SUPPORTED_LANGUAGES:
             return user_lang
 
@@ -60,6 +60,11 @@ def conflict(message: str = "Resource conflict"):
     return error_response("CONFLICT", message, status_code=409)
 
 
+def too_many_jobs(message: str = "Too many background jobs in progress"):
+    """429 response when a user hits the async job cap."""
+    return error_response("TOO_MANY_JOBS", message, status_code=429)
+
+
 def server_error(message: str = "Internal server error"):
     """500 Internal Server Error response."""
     return error_response("SERVER_ERROR", message, status_code=500)
@@ -3,65 +3,113 @@
 import hashlib
 import hmac
 import json
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
-from urllib.parse import parse_qs
+from urllib.parse import parse_qs, parse_qsl
 
 from flask import current_app
 
+logger = logging.getLogger(__name__)
 
-def validate_telegram_data(init_data: str) -> bool:
+# initData already exchanged for a token -> user id (replay fast path)
+INIT_DATA_SESSION_KEY = "telegram_auth:{auth_date}:{hash}"
+
+
+@dataclass(frozen=True)
+class TelegramInitData:
+    """Verified Telegram WebApp initData."""
+
+    hash: str
+    auth_date: int | None
+    user: dict[str, Any] | None
+
+
+@lru_cache(maxsize=4)
+def _webapp_secret(bot_token: str) -> bytes:
+    """Secret key: HMAC-SHA256 of the bot token with "WebAppData" as key."""
+    return hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+
+
+def verify_init_data(init_data: str) -> TelegramInitData | None:
     """
-    Validate Telegram WebApp initData.
+    Verify Telegram WebApp initData and parse it (in one pass).
 
     The validation process:
     1. Parse the init_data query string
     2. Extract the hash
     3. Create data-check-string from remaining params (sorted alphabetically)
-    4. Create HMAC-SHA256 of data-check-string using secret key
+    4. Create HMAC-SHA256 of data-check-string using the (cached) secret key
     5. Compare with provided hash
+    6. Reject auth_date older than TELEGRAM_AUTH_MAX_AGE seconds
+
+    Returns None if the data is invalid or expired.
     """
     try:
-        # Parse init_data as query string
-        parsed = parse_qs(init_data)
+        params = dict(parse_qsl(init_data))
 
-        # Extract hash
-        received_hash = parsed.get("hash", [None])[0]
+        received_hash = params.pop("hash", None)
         if not received_hash:
-            return False
-
-        # Build data-check-string (all params except hash, sorted)
-        data_check_parts = []
-        for key in sorted(parsed.keys()):
-            if key != "hash":
-                value = parsed[key][0]
-                data_check_parts.append(f"{key}={value}")
+            return None
 
-        data_check_string = "\n".join(data_check_parts)
+        auth_date = params.get("auth_date")
+        parsed = TelegramInitData(
+            hash=received_hash,
+            auth_date=int(auth_date) if auth_date else None,
+            user=_parse_user(params.get("user")),
+        )
 
-        # Get bot token
         bot_token = current_app.config.get("TELEGRAM_BOT_TOKEN", "")
         if not bot_token:
             # In development, allow bypass if no token configured
             current_app.logger.warning(
                 "No TELEGRAM_BOT_TOKEN configured, skipping validation"
             )
-            return True
-
-        # Create secret key: HMAC-SHA256 of bot token with "WebAppData" as key
-        secret_key = hmac.new(
-            b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256
-        ).digest()
+            return parsed
 
-        # Calculate hash
+        # Build data-check-string (all params except hash, sorted)
+        data_check_string = "\n".join(f"{key}={params[key]}" for key in sorted(params))
         calculated_hash = hmac.new(
-            secret_key, data_check_string.encode("utf-8"), hashlib.sha256
+            _webapp_secret(bot_token),
+            data_check_string.encode("utf-8"),
+            hashlib.sha256,
         ).hexdigest()
+        if not hmac.compare_digest(calculated_hash, received_hash):
+            return None
 
-        return hmac.compare_digest(calculated_hash, received_hash)
+        max_age = current_app.config.get("TELEGRAM_AUTH_MAX_AGE")
+        if max_age and (
+            parsed.auth_date is None or time.time() - parsed.auth_date > max_age
+        ):
+            return None
+
+        return parsed
 
     except Exception as e:
         current_app.logger.error(f"Telegram validation error: {e}")
-        return False
+        return None
+
+
+def validate_telegram_data(init_data: str) -> bool:
+    """Validate Telegram WebApp initData (see verify_init_data)."""
+    return verify_init_data(init_data) is not None
+
+
+def _parse_user(user_json: str | None) -> dict[str, Any] | None:
+    if not user_json:
+        return None
+
+    user_data = json.loads(user_json)
+
+    return {
+        "id": user_data.get("id"),
+        "first_name": user_data.get("first_name"),
+        "last_name": user_data.get("last_name"),
+        "username": user_data.get("username"),
+        "photo_url": user_data.get("photo_url"),
+    }
 
 
 def parse_telegram_user(init_data: str) -> dict[str, Any] | None:
@@ -77,20 +125,7 @@ def parse_telegram_user(init_data: str) -> dict[str, Any] | None:
     """
     try:
         parsed = parse_qs(init_data)
-        user_json = parsed.get("user", [None])[0]
-
-        if not user_json:
-            return None
-
-        user_data = json.loads(user_json)
-
-        return {
-            "id": user_data.get("id"),
-            "first_name": user_data.get("first_name"),
-            "last_name": user_data.get("last_name"),
-            "username": user_data.get("username"),
-            "photo_url": user_data.get("photo_url"),
-        }
+        return _parse_user(parsed.get("user", [None])[0])
 
     except (json.JSONDecodeError, KeyError) as e:
         current_app.logger.error(f"Error parsing Telegram user: {e}")
@@ -105,3 +140,34 @@ def get_auth_date(init_data: str) -> int | None:
         return int(auth_date) if auth_date else None
     except (ValueError, TypeError):
         return None
+
+
+def _session_key(init: TelegramInitData) -> str:
+    return INIT_DATA_SESSION_KEY.format(auth_date=init.auth_date, hash=init.hash)
+
+
+def get_init_data_session(init: TelegramInitData) -> int | None:
+    """User id an identical initData was already exchanged for, if any."""
+    from app.extensions import get_redis_client
+
+    try:
+        user_id = get_redis_client().get(_session_key(init))
+        return int(user_id) if user_id else None
+    except Exception as e:
+        logger.warning(f"Telegram auth session read error: {e}")
+        return None
+
+
+def remember_init_data_session(init: TelegramInitData, user_id: int) -> None:
+    """Remember the user an initData was exchanged for, until it expires."""
+    from app.extensions import get_redis_client
+
+    ttl = current_app.config.get("TELEGRAM_AUTH_MAX_AGE") or 86400
+    if init.auth_date:
+        ttl = int(init.auth_date + ttl - time.time())
+    if ttl <= 0:
+        return
+    try:
+        get_redis_client().set(_session_key(init), user_id, ex=ttl)
+    except Exception as e:
+        logger.warning(f"Telegram auth session write error: {e}")
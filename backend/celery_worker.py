@@ -0,0 +1,16 @@
+"""Celery entry point for the worker and beat processes.
+
+``celery -A celery_worker:celery worker`` creates the Flask app first, so
+tasks run in its app context (``init_celery``) with the session listeners
+installed.
+"""
+
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get("FLASK_ENV", "production"))
+
+from app.celery_app import celery  # noqa: E402
+
+__all__ = ["app", "celery"]
@@ -95,5 +95,11 @@ with engine.connect() as conn:
     exit 1
 }
 
+# Stale per-process metric files from a previous run would be double counted
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "=== Starting application ==="
 exec "$@"
@@ -0,0 +1,11 @@
+"""Gunicorn settings picked up automatically from the working directory."""
+
+import os
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the Prometheus multiprocess dir."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,46 @@
+"""Add denormalized user_card_stats table for friends ranking.
+
+Revision ID: 20261018_000001
+Revises: 20260222_000001
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000001"
+down_revision = "20260222_000001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_card_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("deck_power", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "active_cards_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    # Backfill from existing cards
+    op.execute(
+        """
+        INSERT INTO user_card_stats (user_id, deck_power, active_cards_count, updated_at)
+        SELECT u.id,
+               COALESCE(SUM(CASE WHEN uc.is_in_deck THEN uc.hp + uc.attack ELSE 0 END), 0),
+               COUNT(uc.id),
+               NOW()
+        FROM users u
+        LEFT JOIN user_cards uc ON uc.user_id = u.id AND uc.is_destroyed = false
+        GROUP BY u.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("user_card_stats")
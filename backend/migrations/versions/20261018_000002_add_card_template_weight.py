@@ -0,0 +1,25 @@
+"""Add drop weight to card templates.
+
+Revision ID: 20261018_000002
+Revises: 20261018_000001
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000002"
+down_revision = "20261018_000001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "card_templates",
+        sa.Column("weight", sa.Float(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_column("card_templates", "weight")
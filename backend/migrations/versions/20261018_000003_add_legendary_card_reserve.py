@@ -0,0 +1,40 @@
+"""Add legendary_card_reserve table for pre-generated legendary drops.
+
+Revision ID: 20261018_000003
+Revises: 20261018_000002
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000003"
+down_revision = "20261018_000002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "legendary_card_reserve",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("genre", sa.String(length=50), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("emoji", sa.String(length=10), nullable=True),
+        sa.Column("image_url", sa.String(length=512), nullable=True),
+        sa.Column("base_hp", sa.Integer(), nullable=False, server_default="50"),
+        sa.Column("base_attack", sa.Integer(), nullable=False, server_default="15"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_legendary_card_reserve_genre", "legendary_card_reserve", ["genre"]
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_legendary_card_reserve_genre", table_name="legendary_card_reserve"
+    )
+    op.drop_table("legendary_card_reserve")
@@ -0,0 +1,72 @@
+"""Add mood_daily_rollups and user_mood_stats aggregate tables.
+
+Revision ID: 20261018_000004
+Revises: 20261018_000003
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000004"
+down_revision = "20261018_000003"
+branch_labels = None
+depends_on = None
+
+
+def _aggregate_columns():
+    return [
+        sa.Column("checks", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("mood_sum", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("mood_min", sa.SmallInteger(), nullable=True),
+        sa.Column("mood_max", sa.SmallInteger(), nullable=True),
+        sa.Column("energy_sum", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("energy_min", sa.SmallInteger(), nullable=True),
+        sa.Column("energy_max", sa.SmallInteger(), nullable=True),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "mood_daily_rollups",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *_aggregate_columns(),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+    op.create_table(
+        "user_mood_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        *_aggregate_columns(),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    # Backfill from existing mood checks
+    op.execute(
+        """
+        INSERT INTO mood_daily_rollups (user_id, day, checks, mood_sum, mood_min,
+            mood_max, energy_sum, energy_min, energy_max)
+        SELECT user_id, CAST(created_at AS date), COUNT(*), SUM(mood), MIN(mood),
+               MAX(mood), SUM(energy), MIN(energy), MAX(energy)
+        FROM mood_checks
+        GROUP BY user_id, CAST(created_at AS date)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO user_mood_stats (user_id, checks, mood_sum, mood_min, mood_max,
+            energy_sum, energy_min, energy_max, updated_at)
+        SELECT user_id, SUM(checks), SUM(mood_sum), MIN(mood_min), MAX(mood_max),
+               SUM(energy_sum), MIN(energy_min), MAX(energy_max), NOW()
+        FROM mood_daily_rollups
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("user_mood_stats")
+    op.drop_table("mood_daily_rollups")
@@ -0,0 +1,24 @@
+"""Add tasks.enrichment_status and the (user_id, updated_at) change feed index.
+
+Revision ID: 20261018_000005
+Revises: 20261018_000004
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000005"
+down_revision = "20261018_000004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("enrichment_status", sa.String(20), nullable=True))
+    op.create_index("ix_tasks_user_updated", "tasks", ["user_id", "updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_tasks_user_updated", table_name="tasks")
+    op.drop_column("tasks", "enrichment_status")
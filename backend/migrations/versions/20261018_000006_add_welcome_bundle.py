@@ -0,0 +1,27 @@
+"""Add the onboarding welcome bundle to user_profiles.
+
+Revision ID: 20261018_000006
+Revises: 20261018_000005
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000006"
+down_revision = "20261018_000005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "user_profiles",
+        sa.Column("welcome_bundle_status", sa.String(20), nullable=True),
+    )
+    op.add_column("user_profiles", sa.Column("welcome_bundle", sa.JSON, nullable=True))
+
+
+def downgrade():
+    op.drop_column("user_profiles", "welcome_bundle")
+    op.drop_column("user_profiles", "welcome_bundle_status")
@@ -0,0 +1,96 @@
+"""Add user_daily_counters and user_counters activity counters.
+
+Revision ID: 20261018_000007
+Revises: 20261018_000006
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000007"
+down_revision = "20261018_000006"
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    "tasks_completed",
+    "subtasks_completed",
+    "focus_sessions",
+    "focus_minutes",
+    "mood_checks",
+)
+
+
+def _counter_columns():
+    return [
+        sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+        for name in COUNTERS
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "user_daily_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *_counter_columns(),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+    op.create_table(
+        "user_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        *_counter_columns(),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    # Backfill from the source tables
+    op.execute(
+        """
+        INSERT INTO user_daily_counters (user_id, day, tasks_completed,
+            subtasks_completed, focus_sessions, focus_minutes, mood_checks)
+        SELECT user_id, day, SUM(tasks), SUM(subtasks), SUM(sessions),
+               SUM(minutes), SUM(moods)
+        FROM (
+            SELECT user_id, CAST(completed_at AS date) AS day, COUNT(*) AS tasks,
+                   0 AS subtasks, 0 AS sessions, 0 AS minutes, 0 AS moods
+            FROM tasks
+            WHERE status = 'completed' AND completed_at IS NOT NULL
+            GROUP BY user_id, CAST(completed_at AS date)
+            UNION ALL
+            SELECT t.user_id, CAST(s.completed_at AS date), 0, COUNT(*), 0, 0, 0
+            FROM subtasks s JOIN tasks t ON t.id = s.task_id
+            WHERE s.status = 'completed' AND s.completed_at IS NOT NULL
+            GROUP BY t.user_id, CAST(s.completed_at AS date)
+            UNION ALL
+            SELECT user_id, CAST(started_at AS date), 0, 0, COUNT(*),
+                   COALESCE(SUM(actual_duration_minutes), 0), 0
+            FROM focus_sessions
+            WHERE status = 'completed'
+            GROUP BY user_id, CAST(started_at AS date)
+            UNION ALL
+            SELECT user_id, CAST(created_at AS date), 0, 0, 0, 0, COUNT(*)
+            FROM mood_checks
+            GROUP BY user_id, CAST(created_at AS date)
+        ) per_source
+        GROUP BY user_id, day
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO user_counters (user_id, tasks_completed, subtasks_completed,
+            focus_sessions, focus_minutes, mood_checks, updated_at)
+        SELECT user_id, SUM(tasks_completed), SUM(subtasks_completed),
+               SUM(focus_sessions), SUM(focus_minutes), SUM(mood_checks), NOW()
+        FROM user_daily_counters
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("user_counters")
+    op.drop_table("user_daily_counters")
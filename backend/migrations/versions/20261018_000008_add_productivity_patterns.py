@@ -0,0 +1,34 @@
+"""Add productivity_patterns focus session snapshots.
+
+Revision ID: 20261018_000008
+Revises: 20261018_000007
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000008"
+down_revision = "20261018_000007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are computed on the first read or focus session of each user
+    op.create_table(
+        "productivity_patterns",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("period_days", sa.Integer(), nullable=False, server_default="30"),
+        sa.Column("hours", sa.JSON(), nullable=False),
+        sa.Column("weekdays", sa.JSON(), nullable=False),
+        sa.Column("time_slots", sa.JSON(), nullable=False),
+        sa.Column("best_time_slot", sa.String(20), nullable=True),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("productivity_patterns")
@@ -0,0 +1,58 @@
+"""Add user_activity_years heatmap arrays.
+
+Revision ID: 20261018_000009
+Revises: 20261018_000008
+Create Date: 2026-10-18
+"""
+
+import struct
+from collections import defaultdict
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000009"
+down_revision = "20261018_000008"
+branch_labels = None
+depends_on = None
+
+SLOTS = 366
+
+
+def upgrade():
+    activity_years = op.create_table(
+        "user_activity_years",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("counts", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "year"),
+    )
+
+    # Backfill from the daily counters (same as `flask activity backfill`)
+    years = defaultdict(lambda: [0] * SLOTS)
+    rows = op.get_bind().execute(
+        sa.text(
+            "SELECT user_id, day, tasks_completed + subtasks_completed "
+            "FROM user_daily_counters"
+        )
+    )
+    for user_id, day, n in rows:
+        if n:
+            years[(user_id, day.year)][day.timetuple().tm_yday - 1] = min(n, 0xFFFF)
+    if years:
+        op.bulk_insert(
+            activity_years,
+            [
+                {
+                    "user_id": user_id,
+                    "year": year,
+                    "counts": struct.pack(f">{SLOTS}H", *counts),
+                }
+                for (user_id, year), counts in years.items()
+            ],
+        )
+
+
+def downgrade():
+    op.drop_table("user_activity_years")
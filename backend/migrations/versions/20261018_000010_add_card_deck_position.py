@@ -0,0 +1,35 @@
+"""Add user_cards.deck_position.
+
+Revision ID: 20261018_000010
+Revises: 20261018_000009
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261018_000010"
+down_revision = "20261018_000009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("user_cards", sa.Column("deck_position", sa.Integer(), nullable=True))
+    # Existing decks keep the order they were listed in (by id)
+    op.execute(
+        """
+        UPDATE user_cards SET deck_position = ranked.position
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id) - 1
+                AS position
+            FROM user_cards
+            WHERE is_in_deck
+        ) AS ranked
+        WHERE user_cards.id = ranked.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("user_cards", "deck_position")
@@ -4,6 +4,48 @@ import pytest
 
 from app import create_app, db
 from app.models import User
+from app.sql_instrumentation import collect_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, max_repeats=None): fail the test if its body "
+        "issues more SQL statements than allowed, or repeats one statement "
+        "fingerprint max_repeats times or more (N+1)",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """Enforce @pytest.mark.query_budget on the test body (not fixtures)."""
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    max_queries = marker.args[0] if marker.args else marker.kwargs["max_queries"]
+    max_repeats = marker.kwargs.get("max_repeats")
+
+    with collect_queries() as stats:
+        result = yield
+
+    if stats.count > max_queries:
+        top = "\n".join(
+            f"  {n}x {fp[:200]}" for fp, n in stats.fingerprints.most_common(5)
+        )
+        pytest.fail(
+            f"Query budget exceeded: {stats.count} > {max_queries}\n{top}",
+            pytrace=False,
+        )
+    if max_repeats:
+        repeated = stats.repeated(max_repeats)
+        if repeated:
+            fp, n = repeated[0]
+            pytest.fail(
+                f"N+1 detected: statement repeated {n}x\n  {fp[:200]}",
+                pytrace=False,
+            )
+    return result
 
 
 @pytest.fixture
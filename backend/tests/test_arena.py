@@ -128,3 +128,42 @@ class TestBattleHistory:
         response = client.get("/api/v1/arena/history")
 
         assert response.status_code == 401
+
+
+class TestMonsterGeneration:
+    """Tests for the daily monster generation pipeline."""
+
+    def test_generation_is_idempotent_per_period(self, app, monkeypatch):
+        """Genres are filled once per period; a second run skips them."""
+        from app.models.character import GENRE_THEMES, DailyMonster
+        from app.services.monster_generator import MonsterGeneratorService
+
+        monkeypatch.setenv("STABILITY_API_KEY", "test-key")
+        service = MonsterGeneratorService()
+        image_calls = []
+
+        def fake_image(name, visual, genre):
+            image_calls.append(name)
+            # Every second call fails once, the retry succeeds
+            return None if len(image_calls) % 2 else f"/media/{name}.jpg"
+
+        monkeypatch.setattr(service, "generate_monster_image", fake_image)
+        monkeypatch.setattr("app.services.monster_generator.time.sleep", lambda s: 0)
+
+        messages = []
+        report = service.run_generation(progress=messages.append)
+
+        period_start = DailyMonster.get_current_period_start()
+        assert set(report.created) == set(GENRE_THEMES)
+        assert set(report.text_fallbacks) == set(GENRE_THEMES)  # No OpenAI key
+        assert report.images_failed == 0
+        assert report.images_generated == sum(report.created.values())
+        assert DailyMonster.query.filter_by(period_start=period_start).count() == sum(
+            report.created.values()
+        )
+        assert {"text", "images", "commit", "total"} <= set(report.timings)
+        assert messages
+
+        second = MonsterGeneratorService().run_generation(generate_images=False)
+        assert sum(second.created.values()) == 0
+        assert set(second.skipped) == set(GENRE_THEMES)
@@ -1,5 +1,28 @@
 """Authentication API tests."""
 
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+BOT_TOKEN = "123456:test-token"
+
+
+def sign_init_data(user: dict, auth_date: int | None = None) -> str:
+    """Build initData signed the way Telegram signs it."""
+    params = {
+        "auth_date": str(auth_date or int(time.time())),
+        "query_id": "AAE-test",
+        "user": json.dumps(user),
+    }
+    data_check_string = "\n".join(f"{k}={params[k]}" for k in sorted(params))
+    secret = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    params["hash"] = hmac.new(
+        secret, data_check_string.encode(), hashlib.sha256
+    ).hexdigest()
+    return urlencode(params)
+
 
 class TestDevAuth:
     """Tests for development authentication endpoint."""
@@ -80,3 +103,86 @@ class TestTelegramAuth:
 
         # Should be unauthorized due to invalid hash
         assert response.status_code == 401
+
+    def test_telegram_auth_signed_data(self, app, client, test_user):
+        """Signed initData logs in and syncs changed profile fields."""
+        app.config["TELEGRAM_BOT_TOKEN"] = BOT_TOKEN
+        init_data = sign_init_data(
+            {"id": test_user["telegram_id"], "first_name": "Renamed"}
+        )
+
+        response = client.post("/api/v1/auth/telegram", json={"init_data": init_data})
+
+        assert response.status_code == 200
+        user = response.json["data"]["user"]
+        assert user["id"] == test_user["id"]
+        assert user["first_name"] == "Renamed"
+        assert user["username"] is None
+
+    def test_telegram_auth_rejects_tampered_and_expired(self, app, client, test_user):
+        """initData with a wrong hash or an old auth_date is rejected."""
+        app.config["TELEGRAM_BOT_TOKEN"] = BOT_TOKEN
+        user = {"id": test_user["telegram_id"]}
+        tampered = sign_init_data(user).replace("AAE-test", "AAE-other")
+        expired = sign_init_data(
+            user, auth_date=int(time.time()) - app.config["TELEGRAM_AUTH_MAX_AGE"] - 60
+        )
+
+        for init_data in (tampered, expired):
+            response = client.post(
+                "/api/v1/auth/telegram", json={"init_data": init_data}
+            )
+            assert response.status_code == 401
+
+    def test_telegram_auth_referral_for_existing_user(self, app, client, test_user):
+        """An invite link befriends existing users and stores pending rewards."""
+        from app import db
+        from app.models import User
+        from app.models.card import Friendship
+
+        app.config["TELEGRAM_BOT_TOKEN"] = BOT_TOKEN
+        referrer = User(telegram_id=777, first_name="Ref")
+        db.session.add(referrer)
+        db.session.commit()
+
+        response = client.post(
+            "/api/v1/auth/telegram",
+            json={
+                "init_data": sign_init_data({"id": test_user["telegram_id"]}),
+                "referrer_id": referrer.id,
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json["data"]["friendship_created"] is True
+        assert (
+            Friendship.query.filter_by(
+                user_id=referrer.id, friend_id=test_user["id"], status="accepted"
+            ).count()
+            == 1
+        )
+
+
+class TestRequestIdentity:
+    """Tests for the per-request User/UserProfile memoization."""
+
+    def test_profile_loaded_once_per_request(self, app, auth_headers, test_user):
+        """Repeated lookups for the caller reuse the first load."""
+        from flask import g
+        from flask_jwt_extended import verify_jwt_in_request
+
+        from app import db
+        from app.models import UserProfile
+        from app.utils.identity import get_profile, get_user
+        from app.utils.language import get_request_language
+
+        db.session.add(UserProfile(user_id=test_user["id"], language="en"))
+        db.session.commit()
+
+        with app.test_request_context(headers=auth_headers):
+            verify_jwt_in_request()
+
+            assert get_user(test_user["id"]).id == test_user["id"]
+            assert get_profile(test_user["id"]) is get_profile(test_user["id"])
+            assert get_request_language() == "en"
+            assert g.identity_lookups_saved >= 2
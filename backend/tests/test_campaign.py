@@ -131,6 +131,49 @@ class TestCampaignOverview:
         assert data["success"] is True
         assert len(data["data"]["chapters"]) >= 1
 
+    def test_overview_counts_completed_levels(self, app, auth_client, test_level):
+        """Completed levels and stars should be aggregated per chapter."""
+        auth_client.post(f"/api/v1/campaign/levels/{test_level['id']}/start")
+        auth_client.post(
+            f"/api/v1/campaign/levels/{test_level['id']}/complete",
+            json={"won": True, "rounds": 3, "hp_remaining": 80, "cards_lost": 0},
+        )
+
+        response = auth_client.get("/api/v1/campaign")
+        chapter = response.json["data"]["chapters"][0]
+        assert chapter["is_unlocked"] is True
+        assert chapter["total_levels"] == 1
+        assert chapter["levels_count"] == 1
+        assert chapter["levels_completed"] == 1
+        assert chapter["stars_earned"] >= 1
+
+
+class TestCampaignGraph:
+    """Tests for the per-genre chapter graph cache."""
+
+    def test_graph_cached_until_invalidated(self, app, test_chapter, monkeypatch):
+        """Graph should be reused while the version is unchanged."""
+        from app.services import campaign_graph
+
+        version = {"value": "1"}
+        monkeypatch.setattr(
+            campaign_graph, "_current_version", lambda: version["value"]
+        )
+        monkeypatch.setattr(campaign_graph, "_graph_cache", {})
+
+        with app.app_context():
+            graph = campaign_graph.get_campaign_graph("fantasy")
+            assert graph.chapter_ids == (test_chapter["id"],)
+            assert campaign_graph.get_campaign_graph("fantasy") is graph
+
+            chapter = db.session.get(CampaignChapter, test_chapter["id"])
+            chapter.is_active = False
+            db.session.commit()
+            assert campaign_graph.get_campaign_graph("fantasy") is graph
+
+            version["value"] = "2"
+            assert campaign_graph.get_campaign_graph("fantasy").chapters == ()
+
 
 class TestCampaignProgress:
     """Tests for campaign progress endpoint."""
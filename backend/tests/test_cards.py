@@ -4,6 +4,7 @@ import pytest
 
 from app import db
 from app.models.card import UserCard
+from app.models.user import User
 
 
 @pytest.fixture
@@ -155,3 +156,565 @@ class TestDeckManagement:
         # Verify deck size decreased
         deck_response = auth_client.get("/api/v1/deck")
         assert deck_response.json["data"]["size"] == 2
+
+    def test_added_card_goes_last_after_removal(
+        self, auth_client, test_card, deck_cards
+    ):
+        """A removal gap does not give the added (older) card a used position."""
+        first, second, third = (c["id"] for c in deck_cards)
+        for position, card_id in enumerate([first, second, third]):
+            db.session.get(UserCard, card_id).deck_position = position
+        db.session.commit()
+
+        auth_client.post("/api/v1/deck/remove", json={"card_id": first})
+        auth_client.post("/api/v1/deck/add", json={"card_id": test_card["id"]})
+
+        deck = auth_client.get("/api/v1/deck").json["data"]["deck"]
+        assert [c["id"] for c in deck] == [second, third, test_card["id"]]
+        assert [c["deck_position"] for c in deck] == [1, 2, 3]
+
+
+class TestCardBatch:
+    """Tests for batched deck and healing operations."""
+
+    def test_deck_edit_and_heal_in_one_request(
+        self, auth_client, deck_cards, test_card
+    ):
+        """Operations apply in order; the deck keeps the given order."""
+        first, second, third = (c["id"] for c in deck_cards)
+        wounded = db.session.get(UserCard, second)
+        wounded.current_hp = 1
+        db.session.commit()
+
+        response = auth_client.post(
+            "/api/v1/cards/batch",
+            json={
+                "operations": [
+                    {"op": "deck_remove", "card_ids": [first]},
+                    {"op": "deck_add", "card_ids": [test_card["id"]]},
+                    {"op": "deck_order", "card_ids": [test_card["id"], third, second]},
+                    {"op": "heal", "card_ids": [second]},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json["data"]
+        assert [c["id"] for c in data["deck"]] == [test_card["id"], third, second]
+        assert [c["deck_position"] for c in data["deck"]] == [0, 1, 2]
+        assert data["healed_count"] == 1
+        assert data["heals_today"] == 1
+        assert data["deck"][2]["current_hp"] == data["deck"][2]["hp"]
+
+        deck = auth_client.get("/api/v1/deck").json["data"]["deck"]
+        assert [c["id"] for c in deck] == [test_card["id"], third, second]
+
+    def test_failed_operation_changes_nothing(
+        self, app, auth_client, deck_cards, test_card
+    ):
+        """A card the user does not own rejects the whole batch."""
+        with app.app_context():
+            other = User(telegram_id=777001, username="other")
+            db.session.add(other)
+            db.session.flush()
+            foreign = UserCard(user_id=other.id, name="Foreign", genre="magic")
+            db.session.add(foreign)
+            db.session.commit()
+            foreign_id = foreign.id
+
+        response = auth_client.post(
+            "/api/v1/cards/batch",
+            json={
+                "operations": [
+                    {"op": "deck_remove", "card_ids": [deck_cards[0]["id"]]},
+                    {"op": "deck_add", "card_ids": [test_card["id"], foreign_id]},
+                ]
+            },
+        )
+
+        assert response.status_code == 400
+        details = response.json["error"]["details"]
+        assert details["error"] == "card_not_found"
+        assert details["card_ids"] == [foreign_id]
+        deck = auth_client.get("/api/v1/deck").json["data"]["deck"]
+        assert sorted(c["id"] for c in deck) == sorted(c["id"] for c in deck_cards)
+
+    def test_deck_size_is_checked_after_all_operations(
+        self, app, auth_client, test_user
+    ):
+        """Adding more cards than the deck holds is rejected."""
+        with app.app_context():
+            cards = [
+                UserCard(user_id=test_user["id"], name=f"Card {i}", genre="magic")
+                for i in range(6)
+            ]
+            db.session.add_all(cards)
+            db.session.commit()
+            card_ids = [c.id for c in cards]
+
+        response = auth_client.post(
+            "/api/v1/cards/batch",
+            json={"operations": [{"op": "deck_add", "card_ids": card_ids}]},
+        )
+        assert response.status_code == 400
+        assert response.json["error"]["details"]["error"] == "deck_full"
+
+        response = auth_client.post(
+            "/api/v1/cards/batch",
+            json={"operations": [{"op": "shuffle", "card_ids": card_ids}]},
+        )
+        assert response.json["error"]["details"]["error"] == "invalid_operation"
+
+
+class TestCardMerge:
+    """Tests for merging two cards into one from the template pool."""
+
+    def _cards(self, user_id, *rarities):
+        cards = [
+            UserCard(
+                user_id=user_id,
+                name=f"Merge {i}",
+                rarity=rarity,
+                genre="fantasy",
+                hp=50,
+                attack=15,
+                current_hp=50,
+            )
+            for i, rarity in enumerate(rarities)
+        ]
+        db.session.add_all(cards)
+        db.session.commit()
+        return [card.id for card in cards]
+
+    def test_preview_from_chance_tables(self, auth_client, test_user):
+        """Preview answers from the tables with one ownership query."""
+        from app.sql_instrumentation import collect_queries
+
+        card1, card2 = self._cards(test_user["id"], "common", "common")
+
+        with collect_queries() as stats:
+            response = auth_client.post(
+                "/api/v1/cards/merge/preview",
+                json={"card1_id": card1, "card2_id": card2},
+            )
+
+        assert response.status_code == 200
+        data = response.json["data"]
+        # Same genre shifts 5% from common to the higher rarities
+        assert data["chances"] == {"common": 65.0, "uncommon": 28.5, "rare": 6.5}
+        assert data["bonuses"] == [{"type": "same_genre", "value": "+5%"}]
+        card_queries = [fp for fp in stats.fingerprints if "FROM user_cards" in fp]
+        assert len(card_queries) == 1
+
+    def test_merge_draws_from_pool(self, app, auth_client, test_user, monkeypatch):
+        """The result is a pool template instance; no AI generation."""
+        from app.models.card import CardRarity, CardTemplate, MergeLog
+        from app.services import template_pool
+        from app.services.card_service import CardService
+        from app.services.merge_service import MergeService
+
+        monkeypatch.setattr(template_pool, "_ensure_subscriber", lambda: True)
+        monkeypatch.setattr(template_pool, "_pools", {})
+        monkeypatch.setattr(
+            MergeService, "_roll_rarity", lambda self, chances: CardRarity.UNCOMMON
+        )
+        monkeypatch.setattr(
+            CardService,
+            "generate_card_for_task",
+            lambda *args, **kwargs: pytest.fail("merge must not generate cards"),
+        )
+        template = CardTemplate(
+            name="Pool Knight", genre="fantasy", base_hp=50, base_attack=15
+        )
+        db.session.add(template)
+        db.session.commit()
+        card1, card2 = self._cards(test_user["id"], "common", "common")
+
+        response = auth_client.post(
+            "/api/v1/cards/merge", json={"card1_id": card1, "card2_id": card2}
+        )
+
+        assert response.status_code == 200
+        data = response.json["data"]
+        assert data["new_card"]["name"] == "Pool Knight"
+        assert data["new_card"]["rarity"] == "uncommon"
+        assert data["rarity_upgrade"] is True
+        assert db.session.get(UserCard, card1).is_destroyed
+        assert db.session.get(UserCard, card2).is_destroyed
+        log = MergeLog.query.filter_by(user_id=test_user["id"]).one()
+        assert log.result_card_id == data["new_card"]["id"]
+
+        # Destroyed inputs cannot be merged again
+        response = auth_client.post(
+            "/api/v1/cards/merge", json={"card1_id": card1, "card2_id": card2}
+        )
+        assert response.status_code == 400
+
+    def test_merge_falls_back_to_archetype(self, app, test_user, monkeypatch):
+        """An empty pool yields an archetype card instead of an AI call."""
+        from app.services import template_pool
+        from app.services.merge_service import MergeService
+
+        monkeypatch.setattr(template_pool, "_ensure_subscriber", lambda: True)
+        monkeypatch.setattr(template_pool, "_pools", {})
+        card1, card2 = self._cards(test_user["id"], "common", "uncommon")
+
+        result = MergeService().merge_cards(test_user["id"], card1, card2)
+
+        assert result["success"]
+        assert result["new_card"]["template_id"] is None
+        assert result["new_card"]["genre"] == "fantasy"
+
+
+class TestCardSettlement:
+    """Trades, merges and listings racing for overlapping cards.
+
+    SQLite ignores FOR UPDATE, so these replay the interleavings the row
+    locks serialize: whichever operation commits second must see the first.
+    """
+
+    @pytest.fixture
+    def trade(self, app, test_user):
+        """Accepted friends, two cards each and a pending 2-for-1 trade."""
+        from app.models.card import CardTrade, Friendship
+
+        friend = User(telegram_id=777002, username="friend")
+        db.session.add(friend)
+        db.session.flush()
+        db.session.add(
+            Friendship(user_id=friend.id, friend_id=test_user["id"], status="accepted")
+        )
+        cards = [
+            UserCard(
+                user_id=owner_id,
+                name=f"Card {i}",
+                rarity="rare",
+                genre="fantasy",
+                hp=50,
+                attack=15,
+                current_hp=50,
+            )
+            for i, owner_id in enumerate(
+                [test_user["id"], test_user["id"], friend.id, friend.id]
+            )
+        ]
+        db.session.add_all(cards)
+        db.session.commit()
+        mine = [cards[0].id, cards[1].id]
+        theirs = [cards[2].id, cards[3].id]
+
+        from app.services.card_trading_service import CardTradingService
+
+        result = CardTradingService().create_trade_offer(
+            test_user["id"], friend.id, sender_card_ids=mine, receiver_card_id=theirs[0]
+        )
+        assert result["success"]
+        return {
+            "id": result["trade"]["id"],
+            "sender_id": test_user["id"],
+            "receiver_id": friend.id,
+            "sender_card_ids": mine,
+            "receiver_card_ids": theirs,
+            "model": CardTrade,
+        }
+
+    def _owners(self, card_ids):
+        return [db.session.get(UserCard, card_id).user_id for card_id in card_ids]
+
+    def test_lock_in_id_order(self, app):
+        """Cards are locked FOR UPDATE in id order whatever the request order."""
+        from sqlalchemy.dialects import postgresql
+
+        from app.services.card_settlement import lock_query
+
+        sql = str(lock_query([3, 1, 2]).statement.compile(dialect=postgresql.dialect()))
+        assert "ORDER BY user_cards.id" in sql
+        assert sql.endswith("FOR UPDATE")
+
+    def test_accept_swaps_owners_with_one_update(self, app, trade):
+        """Both sides change hands in a single UPDATE of user_cards."""
+        from app.services.card_trading_service import CardTradingService
+        from app.sql_instrumentation import collect_queries
+
+        with collect_queries() as stats:
+            result = CardTradingService().accept_trade(
+                trade["receiver_id"], trade["id"]
+            )
+
+        assert result["success"]
+        updates = [
+            fp for fp in stats.fingerprints if fp.startswith("UPDATE user_cards")
+        ]
+        assert len(updates) == 1
+        assert self._owners(trade["sender_card_ids"]) == [trade["receiver_id"]] * 2
+        assert self._owners(trade["receiver_card_ids"][:1]) == [trade["sender_id"]]
+
+        # Settled once: a second accept finds no pending trade
+        again = CardTradingService().accept_trade(trade["receiver_id"], trade["id"])
+        assert again["error"] == "trade_not_found"
+
+    def test_listing_before_accept_blocks_trade(self, app, trade):
+        """A card listed after the offer keeps its owner; the trade stays open."""
+        from app.services.card_trading_service import CardTradingService
+        from app.services.marketplace_service import MarketplaceService
+
+        listed = trade["sender_card_ids"][1]
+        assert MarketplaceService().list_card(trade["sender_id"], listed, 100)[
+            "success"
+        ]
+
+        result = CardTradingService().accept_trade(trade["receiver_id"], trade["id"])
+
+        assert result == {
+            "success": False,
+            "error": "card_listed",
+            "card_ids": [listed],
+        }
+        assert self._owners(trade["sender_card_ids"]) == [trade["sender_id"]] * 2
+        assert db.session.get(trade["model"], trade["id"]).status == "pending"
+
+    def test_merge_before_accept_blocks_trade(self, app, trade):
+        """Merged cards are gone by the time the trade settles."""
+        from app.services.card_trading_service import CardTradingService
+        from app.services.merge_service import MergeService
+
+        assert MergeService().merge_cards(
+            trade["sender_id"], *trade["sender_card_ids"]
+        )["success"]
+
+        result = CardTradingService().accept_trade(trade["receiver_id"], trade["id"])
+
+        assert result["error"] == "sender_card_invalid"
+        assert result["card_ids"] == trade["sender_card_ids"]
+
+    def test_accept_before_merge_and_listing(self, app, trade):
+        """Once traded, the old owner can neither merge nor list the cards."""
+        from app.services.card_trading_service import CardTradingService
+        from app.services.marketplace_service import MarketplaceService
+        from app.services.merge_service import MergeService
+
+        assert CardTradingService().accept_trade(trade["receiver_id"], trade["id"])[
+            "success"
+        ]
+
+        merge = MergeService().merge_cards(
+            trade["sender_id"], *trade["sender_card_ids"]
+        )
+        listing = MarketplaceService().list_card(
+            trade["sender_id"], trade["sender_card_ids"][0], 100
+        )
+
+        assert merge == {"error": "card_not_found"}
+        assert listing == {"error": "card_not_found"}
+
+    def test_battle_cards_cannot_change_hands(self, app, trade):
+        """Cards fighting in an active battle cannot be traded, merged or listed."""
+        from app.models.character import ActiveBattle, Monster
+        from app.services.card_trading_service import CardTradingService
+        from app.services.marketplace_service import MarketplaceService
+        from app.services.merge_service import MergeService
+
+        fighting = trade["sender_card_ids"][0]
+        monster = Monster(name="Slime", genre="fantasy")
+        db.session.add(monster)
+        db.session.flush()
+        db.session.add(
+            ActiveBattle(
+                user_id=trade["sender_id"],
+                monster_id=monster.id,
+                state={"player_cards": [{"id": fighting}]},
+                status="active",
+            )
+        )
+        db.session.commit()
+
+        accept = CardTradingService().accept_trade(trade["receiver_id"], trade["id"])
+        merge = MergeService().merge_cards(
+            trade["sender_id"], *trade["sender_card_ids"]
+        )
+        listing = MarketplaceService().list_card(trade["sender_id"], fighting, 100)
+
+        assert accept["error"] == "card_in_battle"
+        assert merge["error"] == "card_in_battle"
+        assert listing["error"] == "card_in_battle"
+        assert self._owners([fighting]) == [trade["sender_id"]]
+
+
+class TestFriendsRanking:
+    """Tests for the deck power ranking served from user_card_stats."""
+
+    def test_ranking_reflects_deck_changes(
+        self, app, auth_client, test_user, test_card
+    ):
+        """Deck add/remove should keep the denormalized deck power current."""
+        from app.models.card import UserCardStats
+
+        auth_client.post("/api/v1/deck/add", json={"card_id": test_card["id"]})
+
+        with app.app_context():
+            stats = db.session.get(UserCardStats, test_user["id"])
+            assert stats.deck_power == 125
+            assert stats.active_cards_count == 1
+
+        response = auth_client.get("/api/v1/friends/ranking")
+        assert response.status_code == 200
+        ranking = response.json["data"]["ranking"]
+        assert len(ranking) == 1
+        assert ranking[0]["is_me"] is True
+        assert ranking[0]["deck_power"] == 125
+        assert ranking[0]["rank"] == 1
+
+        auth_client.post("/api/v1/deck/remove", json={"card_id": test_card["id"]})
+        response = auth_client.get("/api/v1/friends/ranking")
+        assert response.json["data"]["ranking"][0]["deck_power"] == 0
+
+    def test_ranking_includes_friends(self, app, auth_client, test_user):
+        """Accepted friends should be ranked by their stored deck power."""
+        from app.models.card import Friendship
+        from app.models.user import User
+        from app.services.card_stats_service import CardStatsService
+
+        with app.app_context():
+            friend = User(telegram_id=54321, username="friend", first_name="F")
+            db.session.add(friend)
+            db.session.flush()
+            db.session.add(
+                UserCard(
+                    user_id=friend.id,
+                    name="Friend Card",
+                    rarity="common",
+                    genre="magic",
+                    hp=40,
+                    attack=10,
+                    current_hp=40,
+                    is_in_deck=True,
+                )
+            )
+            db.session.add(
+                Friendship(
+                    user_id=test_user["id"], friend_id=friend.id, status="accepted"
+                )
+            )
+            CardStatsService().refresh_card_stats(friend.id)
+            db.session.commit()
+            friend_id = friend.id
+
+        response = auth_client.get("/api/v1/friends/ranking")
+        ranking = response.json["data"]["ranking"]
+        assert [r["user_id"] for r in ranking] == [friend_id, test_user["id"]]
+        assert ranking[0]["deck_power"] == 50
+        assert ranking[0]["cards_count"] == 1
+        assert "is_me" not in ranking[0]
+
+
+class TestTemplatePool:
+    """Tests for the in-memory card template pool."""
+
+    def test_alias_table_follows_weights(self):
+        """Sampling frequency should follow template weights."""
+        import random
+
+        from app.services.template_pool import AliasTable
+
+        table = AliasTable([1, 3, 0])
+        rng = random.Random(42)
+        counts = [0, 0, 0]
+        for _ in range(8000):
+            counts[table.sample(rng)] += 1
+
+        assert counts[2] == 0
+        assert 2.6 < counts[1] / counts[0] < 3.4
+
+    def test_drop_served_from_cached_pool(self, app, test_user, monkeypatch):
+        """Cached pool serves drops without template reads until invalidated."""
+        from app.models.card import CardRarity, CardTemplate
+        from app.services import template_pool
+        from app.services.card_service import CardService
+        from app.sql_instrumentation import collect_queries
+
+        monkeypatch.setattr(template_pool, "_ensure_subscriber", lambda: True)
+        monkeypatch.setattr(template_pool, "_pools", {})
+
+        template = CardTemplate(
+            name="Pool Knight", genre="fantasy", base_hp=50, base_attack=15
+        )
+        db.session.add(template)
+        db.session.commit()
+
+        service = CardService()
+        assert service._get_random_template("fantasy", CardRarity.RARE).id == (
+            template.id
+        )
+
+        with collect_queries() as stats:
+            pooled = service._get_random_template("fantasy", CardRarity.RARE)
+        assert pooled.name == "Pool Knight"
+        assert stats.count == 0
+
+        template.is_active = False
+        db.session.commit()
+        template_pool.invalidate_template_pool("fantasy")
+        assert service._get_random_template("fantasy", CardRarity.RARE) is None
+
+    def test_legendary_drop_served_from_reserve(self, app, test_user):
+        """With pre-warming on, legendary drops use the reserve, not OpenAI."""
+        from app.models.card import CardRarity, LegendaryCardReserve
+        from app.services.card_service import CardService
+
+        app.config["CARD_POOL_PREWARM"] = True
+        db.session.add(
+            LegendaryCardReserve(
+                genre="fantasy",
+                name="Reserved Phoenix",
+                description="Pre-generated",
+                emoji="🔥",
+                base_hp=50,
+                base_attack=15,
+            )
+        )
+        db.session.commit()
+
+        try:
+            card = CardService().generate_card_for_task(
+                test_user["id"], None, "Task", forced_rarity=CardRarity.LEGENDARY
+            )
+        finally:
+            app.config["CARD_POOL_PREWARM"] = False
+
+        assert card.name == "Reserved Phoenix"
+        assert card.rarity == CardRarity.LEGENDARY.value
+        assert card.template_id is None
+        assert LegendaryCardReserve.query.count() == 0
+
+
+class TestGenreStats:
+    """Tests for genre user/template counters."""
+
+    def test_counts_by_genre_and_rarity(self, app, test_user):
+        """Counters split templates by rarity lock and active state."""
+        from app.models.card import CardTemplate
+        from app.services import genre_stats
+
+        db.session.add_all(
+            [
+                CardTemplate(name="A", genre="anime", base_hp=50, base_attack=15),
+                CardTemplate(
+                    name="B", genre="anime", rarity="epic", base_hp=50, base_attack=15
+                ),
+                CardTemplate(
+                    name="C",
+                    genre="anime",
+                    base_hp=50,
+                    base_attack=15,
+                    is_active=False,
+                ),
+            ]
+        )
+        db.session.commit()
+        genre_stats.drop_local_snapshot()
+
+        counts = genre_stats.get_template_counts("anime")
+        assert counts.active == {"any": 1, "epic": 1}
+        assert counts.active_total == 2
+        assert counts.inactive_total == 1
+        assert genre_stats.get_template_counts("scifi").active_total == 0
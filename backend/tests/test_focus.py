@@ -1,6 +1,6 @@
 """Tests for focus sessions API endpoints."""
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from app import db
 from app.models import FocusSession, Subtask, Task
@@ -182,3 +182,47 @@ class TestFocusSessionsAPI:
         response = auth_client.get("/api/v1/focus/history?limit=2")
         assert response.status_code == 200
         assert len(response.json["data"]["sessions"]) == 2
+
+
+class TestFocusTimers:
+    """Tests for the Redis focus timer helpers."""
+
+    def test_deadline_moves_with_pauses(self, app, test_user):
+        """Deadline = start + planned + pauses; paused or untimed have none."""
+        from app.services import focus_timers
+
+        started = datetime(2026, 1, 1, 12, 0, 0)
+        session = FocusSession(
+            user_id=test_user["id"],
+            status=FocusSessionStatus.ACTIVE.value,
+            planned_duration_minutes=25,
+            started_at=started,
+            total_pause_seconds=90,
+        )
+        start_ts = started.replace(tzinfo=timezone.utc).timestamp()
+        assert focus_timers.get_deadline(session) == start_ts + 25 * 60 + 90
+
+        session.status = FocusSessionStatus.PAUSED.value
+        assert focus_timers.get_deadline(session) is None
+
+        session.status = FocusSessionStatus.ACTIVE.value
+        session.planned_duration_minutes = focus_timers.NO_TIMER_MINUTES
+        assert focus_timers.get_deadline(session) is None
+
+    def test_snapshot_matches_model(self, app, test_user):
+        """Sessions read back from a snapshot match FocusSession.to_dict()."""
+        from app.services import focus_timers
+
+        session = FocusSession(
+            user_id=test_user["id"],
+            planned_duration_minutes=25,
+            started_at=datetime.utcnow() - timedelta(minutes=30),
+            total_pause_seconds=120,
+        )
+        db.session.add(session)
+        db.session.commit()
+
+        restored = focus_timers._from_snapshot(focus_timers._snapshot(session))
+        assert restored == session.to_dict()
+        assert restored["elapsed_minutes"] == 28
+        assert restored["is_overtime"] is True
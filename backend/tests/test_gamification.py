@@ -1,11 +1,16 @@
 """Tests for gamification API endpoints."""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
 
 from app import db
-from app.models import Achievement, FocusSession, Task
+from app.models import Achievement, FocusSession, Subtask, Task, UserActivityYear
 from app.models.focus_session import FocusSessionStatus
 from app.models.task import TaskStatus
+from app.services import activity_heatmap, daily_counters, productivity_patterns
+from app.services.task_service import calculate_task_score
 
 
 class TestUserStatsAPI:
@@ -65,6 +70,150 @@ class TestDailyGoalsAPI:
         assert len(data["goals"]) == 3  # focus, subtasks, mood check
 
 
+class TestActivityCounters:
+    """Stats, goals and heal status are read from the activity counters."""
+
+    def _create_task(self, user_id, subtasks=2):
+        task = Task(user_id=user_id, title="Counted task")
+        db.session.add(task)
+        db.session.flush()
+        for order in range(subtasks):
+            db.session.add(Subtask(task_id=task.id, title=f"Step {order}", order=order))
+        db.session.commit()
+        return task.id
+
+    def test_counters_follow_completions(self, app, auth_client, test_user):
+        """Completing, reopening and deleting work moves the counters."""
+        task_id = self._create_task(test_user["id"])
+        subtask_ids = [
+            s.id for s in Subtask.query.filter_by(task_id=task_id).order_by("order")
+        ]
+
+        auth_client.put(
+            f"/api/v1/subtasks/{subtask_ids[0]}", json={"status": "completed"}
+        )
+        auth_client.post("/api/v1/mood", json={"mood": 4, "energy": 3})
+
+        goals = auth_client.get("/api/v1/user/daily-goals").json["data"]["goals"]
+        current = {g["type"]: g["current"] for g in goals}
+        assert current == {"focus_minutes": 0, "subtasks": 1, "mood_check": 1}
+
+        # Completing the task completes its remaining subtask
+        auth_client.put(f"/api/v1/tasks/{task_id}", json={"status": "completed"})
+        stats = auth_client.get("/api/v1/user/stats").json["data"]
+        assert stats["total_tasks_completed"] == 1
+        assert stats["total_subtasks_completed"] == 2
+        assert stats["today"]["tasks_completed"] == 1
+        assert stats["today"]["mood_checks"] == 1
+
+        heal = auth_client.get("/api/v1/cards/heal-status").json["data"]
+        assert heal["completed_tasks"] == 1
+
+        auth_client.put(f"/api/v1/tasks/{task_id}", json={"status": "pending"})
+        stats = auth_client.get("/api/v1/user/stats").json["data"]
+        assert stats["total_tasks_completed"] == 0
+        assert stats["total_subtasks_completed"] == 2
+
+        auth_client.delete(f"/api/v1/tasks/{task_id}")
+        stats = auth_client.get("/api/v1/user/stats").json["data"]
+        assert stats["total_subtasks_completed"] == 0
+        assert stats["today"]["subtasks_completed"] == 0
+
+    def test_reconcile_repairs_counters(self, app, test_user):
+        """Drift from writes outside the ORM is recomputed from the sources."""
+        with app.app_context():
+            db.session.add(
+                FocusSession(
+                    user_id=test_user["id"],
+                    status=FocusSessionStatus.COMPLETED.value,
+                    planned_duration_minutes=25,
+                    actual_duration_minutes=20,
+                    started_at=datetime.utcnow(),
+                )
+            )
+            db.session.commit()
+            assert daily_counters.get_totals(test_user["id"])["focus_minutes"] == 20
+
+            # A completion the listener did not see (e.g. raw SQL)
+            db.session.execute(
+                sa.text(
+                    "UPDATE focus_sessions SET actual_duration_minutes = 45 "
+                    "WHERE user_id = :user_id"
+                ),
+                {"user_id": test_user["id"]},
+            )
+            db.session.commit()
+
+            assert daily_counters.reconcile() == {"days": 1, "totals": 1}
+            assert daily_counters.get_today(test_user["id"])["focus_minutes"] == 45
+            assert daily_counters.get_totals(test_user["id"])["focus_sessions"] == 1
+            assert daily_counters.reconcile() == {"days": 0, "totals": 0}
+
+    @pytest.mark.query_budget(4)
+    def test_user_stats_reads_counter_rows(self, auth_client, test_user):
+        """User stats costs the identity lookup and the two counter rows."""
+        response = auth_client.get("/api/v1/user/stats")
+        assert response.status_code == 200
+
+
+class TestActivityHeatmap:
+    """The completion heatmap is read from the per-year day count arrays."""
+
+    def test_heatmap_follows_completions(self, auth_client, test_user):
+        """Completions are counted per day; reopening counts down again."""
+        user_id = test_user["id"]
+        earlier = datetime.utcnow() - timedelta(days=10)
+        db.session.add(
+            Task(
+                user_id=user_id,
+                title="Done before",
+                status=TaskStatus.COMPLETED.value,
+                completed_at=earlier,
+            )
+        )
+        task = Task(user_id=user_id, title="Done today")
+        db.session.add(task)
+        db.session.flush()
+        db.session.add(Subtask(task_id=task.id, title="Step", order=0))
+        db.session.commit()
+
+        auth_client.put(f"/api/v1/tasks/{task.id}", json={"status": "completed"})
+        response = auth_client.get(f"/api/v1/admin/activity/{user_id}")
+        assert response.status_code == 200
+        today = date.today().isoformat()
+        assert response.json["data"]["activity"] == {
+            earlier.date().isoformat(): 1,
+            today: 2,  # The task and its subtask
+        }
+
+        auth_client.put(f"/api/v1/tasks/{task.id}", json={"status": "pending"})
+        assert activity_heatmap.get_activity(user_id)[today] == 1
+
+    def test_backfill_rebuilds_from_daily_counters(self, app, test_user):
+        """The backfill writes the same arrays the listeners keep."""
+        user_id = test_user["id"]
+        for days_ago in (0, 0, 3, 400):
+            db.session.add(
+                Task(
+                    user_id=user_id,
+                    title="Done",
+                    status=TaskStatus.COMPLETED.value,
+                    completed_at=datetime.utcnow() - timedelta(days=days_ago),
+                )
+            )
+        db.session.commit()
+        kept = {row.year: row.counts for row in UserActivityYear.query}
+
+        UserActivityYear.query.delete()
+        db.session.commit()
+        assert activity_heatmap.get_activity(user_id) == {}
+
+        assert activity_heatmap.backfill() == len(kept)
+        assert {row.year: row.counts for row in UserActivityYear.query} == kept
+        activity = activity_heatmap.get_activity(user_id)
+        assert sorted(activity.values()) == [1, 2]  # 400 days ago is not shown
+
+
 class TestDailyBonusAPI:
     """Test cases for daily bonus endpoints."""
 
@@ -235,3 +384,73 @@ class TestProductivityPatternsAPI:
         assert "total_sessions" in data
         assert "productivity_time" in data
         assert "day_distribution" in data
+
+    def test_patterns_are_grouped_and_stored(self, auth_client, test_user):
+        """Sessions are bucketed by hour, weekday and time slot into a snapshot."""
+        morning = (datetime.utcnow() - timedelta(days=2)).replace(hour=7, minute=0)
+        night = morning.replace(hour=20)
+        sessions = [
+            (morning, FocusSessionStatus.COMPLETED.value, 25),
+            (morning, FocusSessionStatus.COMPLETED.value, 30),
+            (morning, FocusSessionStatus.COMPLETED.value, 20),
+            (morning, FocusSessionStatus.CANCELLED.value, 5),
+            (night, FocusSessionStatus.COMPLETED.value, 50),
+            # Outside the 30-day window
+            (morning - timedelta(days=40), FocusSessionStatus.COMPLETED.value, 25),
+        ]
+        for started_at, status, minutes in sessions:
+            db.session.add(
+                FocusSession(
+                    user_id=test_user["id"],
+                    started_at=started_at,
+                    status=status,
+                    actual_duration_minutes=minutes,
+                )
+            )
+        db.session.commit()
+
+        data = auth_client.get("/api/v1/user/productivity-patterns").json["data"]
+        assert data["total_sessions"] == 5
+        assert data["total_completed"] == 4
+        assert data["total_focus_minutes"] == 125
+        assert data["best_hours"] == [
+            {
+                "hour": 7,
+                "sessions": 4,
+                "completed": 3,
+                "success_rate": 75,
+                "avg_minutes": 25,
+            }
+        ]
+        assert data["productivity_time"] == "morning"
+        day = data["day_distribution"][morning.weekday()]
+        assert (day["sessions"], day["completed"]) == (5, 4)
+        # Time slots are in Moscow time: 07 UTC is morning, 20 UTC is night
+        assert data["time_slots"]["morning"]["completed"] == 3
+        assert data["time_slots"]["night"]["minutes"] == 50
+        assert data["best_time_slot"] == "morning"
+        assert productivity_patterns.get_best_time_slot(test_user["id"]) == "morning"
+
+    def test_focus_completion_refreshes_patterns(self, auth_client, test_user):
+        """Reads serve the snapshot; ending a session recomputes it."""
+        data = auth_client.get("/api/v1/user/productivity-patterns").json["data"]
+        assert data["total_sessions"] == 0
+
+        auth_client.post("/api/v1/focus/start", json={"planned_duration_minutes": 25})
+        auth_client.post("/api/v1/focus/complete", json={})
+
+        data = auth_client.get("/api/v1/user/productivity-patterns").json["data"]
+        assert (data["total_sessions"], data["total_completed"]) == (1, 1)
+        hour = datetime.utcnow().hour
+        assert data["hour_distribution"][hour]["completed"] == 1
+
+    def test_productive_slot_feeds_smart_sort(self):
+        """Tasks without a preferred time lean to the user's productive slot."""
+        today = datetime.utcnow().date()
+        task = Task(title="Anytime", priority="medium")
+        assert calculate_task_score(task, "morning", None, today) == 50
+        assert calculate_task_score(task, "morning", None, today, "morning") == 65
+        assert calculate_task_score(task, "evening", None, today, "morning") == 50
+
+        timed = Task(title="Mornings", priority="medium", preferred_time="morning")
+        assert calculate_task_score(timed, "morning", None, today, "morning") == 80
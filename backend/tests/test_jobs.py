@@ -0,0 +1,74 @@
+"""Tests for async jobs and the job status API."""
+
+from app import db
+from app.models import Task
+from app.services.ai_decomposer import AIDecomposer
+
+
+class TestJobsAPI:
+    """Test cases for /jobs and endpoints that start jobs."""
+
+    def test_job_status_requires_auth(self, client):
+        response = client.get("/api/v1/jobs/abc123")
+        assert response.status_code == 401
+
+    def test_unknown_job_not_found(self, auth_client, monkeypatch):
+        def no_redis():
+            raise ConnectionError("Redis unavailable")
+
+        monkeypatch.setattr("app.services.jobs._redis", no_redis)
+
+        response = auth_client.get("/api/v1/jobs/abc123")
+        assert response.status_code == 404
+
+    def test_decompose_runs_inline_without_job_registry(
+        self, app, auth_client, test_user, monkeypatch
+    ):
+        def no_redis():
+            raise ConnectionError("Redis unavailable")
+
+        def decompose(self, *args, **kwargs):
+            return {
+                "subtasks": [
+                    {"title": "Step one", "estimated_minutes": 5, "order": 1},
+                    {"title": "Step two", "estimated_minutes": 10, "order": 2},
+                ]
+            }
+
+        app.config["ASYNC_JOBS"] = True
+        monkeypatch.setattr("app.services.jobs._redis", no_redis)
+        monkeypatch.setattr(AIDecomposer, "decompose_task", decompose)
+
+        with app.app_context():
+            task = Task(user_id=test_user["id"], title="Write the report")
+            db.session.add(task)
+            db.session.commit()
+            task_id = task.id
+
+        response = auth_client.post(f"/api/v1/tasks/{task_id}/decompose", json={})
+        assert response.status_code == 200
+        assert "job" not in response.json["data"]
+        assert [s["title"] for s in response.json["data"]["subtasks"]] == [
+            "Step one",
+            "Step two",
+        ]
+
+    def test_job_slot_released_only_in_final_states(self, app, monkeypatch):
+        """A retrying attempt keeps its slot; success and failure free it."""
+        from celery.signals import task_failure, task_postrun, task_success
+
+        from app.tasks.ai_tasks import decompose_task_async as job
+
+        released = []
+        monkeypatch.setattr("app.services.jobs.release", released.append)
+
+        job.push_request(id="job-1")
+        try:
+            task_postrun.send(sender=job, task_id="job-1", task=job, state="RETRY")
+            assert released == []
+            task_success.send(sender=job, result=None)
+        finally:
+            job.pop_request()
+        task_failure.send(sender=job, task_id="job-2", exception=RuntimeError())
+
+        assert released == ["job-1", "job-2"]
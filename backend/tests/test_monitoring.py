@@ -0,0 +1,74 @@
+"""SQL instrumentation tests."""
+
+import pytest
+
+from app import db
+from app.models import User
+from app.sql_instrumentation import collect_queries, fingerprint
+
+
+class TestSqlInstrumentation:
+    """Tests for statement collection and N+1 fingerprints."""
+
+    def test_fingerprint_strips_parameters(self):
+        """Statements differing only in parameters share a fingerprint."""
+        a = fingerprint("SELECT * FROM users WHERE id = 1 AND name = 'x'")
+        b = fingerprint("SELECT *  FROM users\nWHERE id = 42 AND name = 'y'")
+        assert a == b
+        assert fingerprint("WHERE id IN (?, ?, ?)") == fingerprint("WHERE id IN (?)")
+
+    def test_collect_queries_counts_repeats(self, app, test_user):
+        """Repeated per-row lookups show up as one repeated fingerprint."""
+        with collect_queries() as stats:
+            for _ in range(3):
+                db.session.expunge_all()
+                db.session.get(User, test_user["id"])
+
+        assert stats.count == 3
+        assert stats.repeated(3)[0][1] == 3
+        assert stats.total_time > 0
+
+    @pytest.mark.query_budget(10, max_repeats=3)
+    def test_friends_ranking_query_budget(self, auth_client):
+        """Friends ranking stays within a fixed query budget."""
+        response = auth_client.get("/api/v1/friends/ranking")
+        assert response.status_code == 200
+
+
+class TestMetricsEndpoint:
+    """Tests for the Prometheus /metrics endpoint."""
+
+    def test_metrics_reports_request_counts(self, client):
+        """Served requests show up in the RED metrics by route name."""
+        client.get("/ready")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert 'moodsprint_http_requests_total{endpoint="ready"' in body
+        assert "moodsprint_http_request_duration_seconds_bucket" in body
+        assert "moodsprint_celery_queue_depth" in body
+
+    def test_cache_lookups_are_counted(self):
+        """record_cache_lookup splits hits and misses per cache."""
+        from prometheus_client import REGISTRY
+
+        from app.metrics import record_cache_lookup
+
+        def value(result):
+            return (
+                REGISTRY.get_sample_value(
+                    "moodsprint_cache_requests_total",
+                    {"cache": "test", "result": result},
+                )
+                or 0
+            )
+
+        hits, misses = value("hit"), value("miss")
+        record_cache_lookup("test", True)
+        record_cache_lookup("test", False)
+        record_cache_lookup("test", False)
+
+        assert value("hit") == hits + 1
+        assert value("miss") == misses + 2
@@ -1,5 +1,19 @@
 """Tests for onboarding API endpoints."""
 
+import pytest
+
+from app import db
+from app.models import User
+from app.models.card import CardTemplate, UserCard
+from app.services.onboarding_service import build_welcome_bundle
+
+ONBOARDING_ANSWERS = {
+    "productive_time": "evening",
+    "favorite_tasks": ["creative"],
+    "challenges": ["focus"],
+    "goals": "Finish what I start",
+}
+
 
 class TestOnboardingAPI:
     """Test cases for onboarding endpoints."""
@@ -59,6 +73,129 @@ class TestOnboardingAPI:
         assert response.json["data"]["completed"] is True
 
 
+class TestWelcomeBundle:
+    """Onboarding completion and the background welcome bundle."""
+
+    def test_complete_saves_rule_based_profile_and_bundle(self, auth_client, test_user):
+        """Without a worker the bundle is built before the response."""
+        response = auth_client.post(
+            "/api/v1/onboarding/complete", json=ONBOARDING_ANSWERS
+        )
+        assert response.status_code == 200
+        data = response.json["data"]
+        assert data["profile"]["onboarding_completed"] is True
+        assert data["profile"]["productivity_type"] == "night_owl"
+        assert data["analysis"]["work_style"] == "pomodoro"
+        assert data["welcome_bundle_status"] == "ready"
+        assert data["onboarding_card"]["rarity"] == "uncommon"
+        assert "referral_rewards" not in data
+
+    def test_deferred_bundle_is_pollable(
+        self, app, auth_client, test_user, monkeypatch
+    ):
+        """The response only waits for the profile; the bundle is polled."""
+        queued = []
+        monkeypatch.setattr(
+            "app.services.onboarding_service.queue_welcome_bundle",
+            lambda *args: queued.append(args),
+        )
+
+        response = auth_client.post(
+            "/api/v1/onboarding/complete", json=ONBOARDING_ANSWERS
+        )
+        assert response.status_code == 200
+        assert response.json["data"]["welcome_bundle_status"] == "pending"
+        assert "onboarding_card" not in response.json["data"]
+        assert queued == [(test_user["id"], ONBOARDING_ANSWERS)]
+
+        bundle = auth_client.get("/api/v1/onboarding/welcome-bundle").json["data"]
+        assert bundle["welcome_bundle_status"] == "pending"
+
+        # What the worker does (in the session the requests above used)
+        assert build_welcome_bundle(*queued[0])["success"] is True
+        # Already built: a duplicate run gives nothing
+        assert build_welcome_bundle(*queued[0])["success"] is False
+        assert UserCard.query.filter_by(user_id=test_user["id"]).count() == 1
+
+        bundle = auth_client.get("/api/v1/onboarding/welcome-bundle").json["data"]
+        assert bundle["welcome_bundle_status"] == "ready"
+        assert bundle["onboarding_card"]["rarity"] == "uncommon"
+
+    def test_referred_user_gets_starter_deck_from_pool(
+        self, app, auth_client, test_user
+    ):
+        """Starter deck cards are instances of existing templates."""
+        with app.app_context():
+            referrer = User(telegram_id=54321, username="referrer")
+            db.session.add(referrer)
+            for rarity in ("common", "uncommon", "rare"):
+                db.session.add(
+                    CardTemplate(
+                        name=f"Pooled {rarity}",
+                        genre="fantasy",
+                        rarity=rarity,
+                        base_hp=50,
+                        base_attack=15,
+                    )
+                )
+            db.session.flush()
+            db.session.get(User, test_user["id"]).referred_by = referrer.id
+            db.session.commit()
+            referrer_id = referrer.id
+
+        response = auth_client.post(
+            "/api/v1/onboarding/complete", json=ONBOARDING_ANSWERS
+        )
+        rewards = response.json["data"]["referral_rewards"]
+        assert len(rewards["starter_deck"]) == 3
+        assert all(c["name"].startswith("Pooled") for c in rewards["starter_deck"])
+        assert rewards["referrer_rewarded"] is True
+
+        with app.app_context():
+            assert db.session.get(User, test_user["id"]).referral_reward_given
+            assert UserCard.query.filter_by(user_id=referrer_id).count() == 1
+
+    def test_referrer_reward_retried_after_failure(
+        self, app, auth_client, test_user, monkeypatch
+    ):
+        """A failed referrer card is retried; the starter deck is kept."""
+        from app.services.card_service import CardService
+
+        monkeypatch.setattr(
+            "app.services.onboarding_service.queue_welcome_bundle", lambda *args: None
+        )
+        referrer = User(telegram_id=54322, username="referrer")
+        db.session.add(referrer)
+        db.session.flush()
+        db.session.get(User, test_user["id"]).referred_by = referrer.id
+        db.session.commit()
+        referrer_id = referrer.id
+        auth_client.post("/api/v1/onboarding/complete", json=ONBOARDING_ANSWERS)
+
+        generate = CardService.generate_referral_reward
+        calls = []
+
+        def fail_once(self, user_id):
+            calls.append(user_id)
+            if len(calls) == 1:
+                raise RuntimeError("OpenAI unavailable")
+            return generate(self, user_id)
+
+        monkeypatch.setattr(CardService, "generate_referral_reward", fail_once)
+
+        with pytest.raises(RuntimeError):
+            build_welcome_bundle(test_user["id"], ONBOARDING_ANSWERS)
+        db.session.rollback()
+        assert build_welcome_bundle(test_user["id"], ONBOARDING_ANSWERS)["success"]
+
+        assert calls == [referrer_id, referrer_id]
+        bundle = auth_client.get("/api/v1/onboarding/welcome-bundle").json["data"]
+        rewards = bundle["referral_rewards"]
+        assert len(rewards["starter_deck"]) == 3
+        assert rewards["referrer_rewarded"] is True
+        assert UserCard.query.filter_by(user_id=referrer_id).count() == 1
+
+
 class TestMoodAPI:
     """Test cases for mood endpoints."""
 
@@ -132,3 +269,31 @@ class TestMoodAPI:
         assert response.status_code == 200
         data = response.json["data"]
         assert "average_mood" in data or "stats" in data
+
+    def test_mood_rollups_feed_stats_and_series(self, auth_client, test_user):
+        """Logged checks are rolled up and served by stats and the series."""
+        for mood, energy in [(2, 5), (4, 3), (5, 1)]:
+            response = auth_client.post(
+                "/api/v1/mood", json={"mood": mood, "energy": energy}
+            )
+            assert response.status_code == 201
+
+        stats = auth_client.get("/api/v1/mood/stats").json["data"]
+        assert stats["overall"]["total_checks"] == 3
+        assert stats["overall"]["average_mood"] == 3.7
+        assert stats["weekly"]["average_energy"] == 3.0
+
+        response = auth_client.get("/api/v1/mood/series?bucket=week&days=14")
+        assert response.status_code == 200
+        series = response.json["data"]["series"]
+        assert len(series) in (2, 3)  # 14 days span 2-3 Monday-based weeks
+        current = series[-1]
+        assert current["checks"] == 3
+        assert (current["mood_min"], current["mood_max"]) == (2, 5)
+        assert (current["energy_min"], current["energy_max"]) == (1, 5)
+        assert all(b["average_mood"] is None for b in series[:-1])
+
+    def test_mood_series_rejects_unknown_bucket(self, auth_client, test_user):
+        """Only day, week and month buckets are accepted."""
+        response = auth_client.get("/api/v1/mood/series?bucket=hour")
+        assert response.status_code == 400
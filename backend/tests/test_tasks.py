@@ -1,9 +1,17 @@
 """Tests for tasks API endpoints."""
 
+import json
+from types import SimpleNamespace
+
+import pytest
+
 from app import db
 from app.models import Subtask, Task
 from app.models.subtask import SubtaskStatus
-from app.models.task import TaskStatus
+from app.models.task import TaskEnrichmentStatus, TaskStatus
+from app.services.ai_decomposer import AIDecomposer, StepStreamParser
+from app.services.task_classifier import TaskClassifier
+from app.services.task_enrichment import enrich_task
 
 
 class TestTasksAPI:
@@ -155,6 +163,253 @@ class TestTasksAPI:
         assert response.json["success"] is True
 
 
+class TestTaskEnrichment:
+    """Heuristic-first task creation and background AI classification."""
+
+    AI_RESULT = {
+        "task_type": "writing",
+        "preferred_time": "evening",
+        "difficulty": "very_hard",
+    }
+
+    @pytest.fixture
+    def fake_ai(self, monkeypatch):
+        calls = []
+
+        def classify(self, title, description, user_id=None):
+            calls.append(title)
+            return dict(TestTaskEnrichment.AI_RESULT)
+
+        monkeypatch.setattr(
+            "app.services.task_classifier.get_openai_client", lambda: object()
+        )
+        monkeypatch.setattr(TaskClassifier, "_ai_classify_and_rate", classify)
+        return calls
+
+    def test_created_from_heuristics_without_ai(self, auth_client):
+        response = auth_client.post(
+            "/api/v1/tasks", json={"title": "Срочно fix the login bug"}
+        )
+        task = response.json["data"]["task"]
+        assert task["task_type"] == "coding"
+        assert task["difficulty"] == "hard"
+        assert task["priority"] == "high"
+        assert task["preferred_time"] == "afternoon"
+        assert task["enrichment_status"] is None
+
+    def test_ai_patches_fields_the_user_did_not_set(self, auth_client, fake_ai):
+        response = auth_client.post(
+            "/api/v1/tasks",
+            json={"title": "Fix the login bug", "preferred_time": "night"},
+        )
+        task = response.json["data"]["task"]
+        assert fake_ai == ["Fix the login bug"]
+        assert task["enrichment_status"] == "done"
+        assert task["task_type"] == "writing"
+        assert task["difficulty"] == "very_hard"
+        assert task["priority"] == "high"
+        assert task["preferred_time"] == "night"
+
+    def test_user_priority_is_kept(self, auth_client, fake_ai):
+        response = auth_client.post(
+            "/api/v1/tasks", json={"title": "Fix the login bug", "priority": "low"}
+        )
+        task = response.json["data"]["task"]
+        assert task["enrichment_status"] == "done"
+        assert task["priority"] == "low"
+        assert task["difficulty"] == "easy"
+        assert task["preferred_time"] == "evening"
+
+    def test_edits_made_before_enrichment_win(self, app, test_user, fake_ai):
+        with app.app_context():
+            classifier = TaskClassifier()
+            heuristic = classifier.heuristic_classify("Fix the login bug")
+            task = Task(
+                user_id=test_user["id"],
+                title="Fix the login bug",
+                task_type="physical",  # Edited by the user meanwhile
+                preferred_time=heuristic["preferred_time"],
+                difficulty=heuristic["difficulty"],
+                priority=TaskClassifier.DIFFICULTY_TO_PRIORITY[heuristic["difficulty"]],
+                enrichment_status=TaskEnrichmentStatus.PENDING.value,
+            )
+            db.session.add(task)
+            db.session.commit()
+
+            result = enrich_task(
+                task.id,
+                test_user["id"],
+                heuristic,
+                ["task_type", "preferred_time", "difficulty", "priority"],
+            )
+            assert result["success"] is True
+
+            task = db.session.get(Task, task.id)
+            assert task.task_type == "physical"
+            assert task.preferred_time == "evening"
+            assert task.difficulty == "very_hard"
+            assert task.enrichment_status == "done"
+
+            # Only pending tasks are enriched
+            assert (
+                enrich_task(task.id, test_user["id"], heuristic, [])["success"] is False
+            )
+
+    def test_failed_enrichment_keeps_heuristics(self, auth_client, monkeypatch):
+        def fail(self, title, description, user_id=None):
+            raise ValueError("Empty response from AI classifier")
+
+        monkeypatch.setattr(
+            "app.services.task_classifier.get_openai_client", lambda: object()
+        )
+        monkeypatch.setattr(TaskClassifier, "_ai_classify_and_rate", fail)
+
+        response = auth_client.post(
+            "/api/v1/tasks", json={"title": "Fix the login bug"}
+        )
+        task = response.json["data"]["task"]
+        assert task["enrichment_status"] == "failed"
+        assert task["task_type"] == "coding"
+
+    def test_change_feed(self, auth_client):
+        since = "2000-01-01T00:00:00Z"
+        created = auth_client.post("/api/v1/tasks", json={"title": "Feed task"})
+        task_id = created.json["data"]["task"]["id"]
+
+        response = auth_client.get(f"/api/v1/tasks/changes?since={since}")
+        data = response.json["data"]
+        assert [t["id"] for t in data["tasks"]] == [task_id]
+        assert data["has_more"] is False
+
+        response = auth_client.get(
+            "/api/v1/tasks/changes", query_string={"since": data["cursor"]}
+        )
+        assert response.json["data"]["tasks"] == []
+
+        response = auth_client.get("/api/v1/tasks/changes")
+        assert response.status_code == 400
+
+
+def _sse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class _FakeStreamingClient:
+    """OpenAI client stand-in streaming a fixed answer in small deltas."""
+
+    def __init__(self, answer: str, size: int = 7):
+        deltas = [answer[i : i + size] for i in range(0, len(answer), size)]
+        chunks = [
+            SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=d))],
+                usage=None,
+            )
+            for d in deltas
+        ]
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **kwargs: iter(chunks))
+        )
+
+
+class TestStreamingDecomposition:
+    """Decomposition streamed as server-sent events."""
+
+    ANSWER = json.dumps(
+        {
+            "steps": [
+                {"title": 'Open the "draft" {v1}', "estimated_minutes": 5},
+                {"title": "Write the intro", "estimated_minutes": 500},
+                {"estimated_minutes": 5},
+                {"title": "Proofread", "estimated_minutes": 10},
+            ]
+        },
+        ensure_ascii=False,
+    )
+
+    def test_parser_emits_steps_as_they_close(self):
+        parser = StepStreamParser()
+        text = "```json\n" + self.ANSWER + "\n```"
+        seen = []
+        for i in range(0, len(text), 5):
+            for step in parser.feed(text[i : i + 5]):
+                seen.append((i, step))
+
+        assert [step.get("title") for _, step in seen] == [
+            'Open the "draft" {v1}',
+            "Write the intro",
+            None,
+            "Proofread",
+        ]
+        # The first step is out long before the answer is complete
+        assert seen[0][0] < len(text) // 2
+
+    def test_stream_persists_and_caches_subtasks(
+        self, app, auth_client, test_user, monkeypatch
+    ):
+        cached = []
+        monkeypatch.setattr(
+            "app.services.ai_decomposer.get_openai_client",
+            lambda: _FakeStreamingClient(self.ANSWER),
+        )
+        monkeypatch.setattr(
+            AIDecomposer,
+            "_store_in_cache",
+            lambda self, key, result, *args: cached.append(result),
+        )
+        with app.app_context():
+            task = Task(user_id=test_user["id"], title="Write the blog post")
+            db.session.add(task)
+            db.session.commit()
+            task_id = task.id
+
+        response = auth_client.post(f"/api/v1/tasks/{task_id}/decompose/stream")
+        assert response.mimetype == "text/event-stream"
+        events = _sse_events(response.get_data(as_text=True))
+
+        assert [e for e, _ in events] == ["subtask", "subtask", "subtask", "done"]
+        subtasks = [payload for e, payload in events if e == "subtask"]
+        assert [s["order"] for s in subtasks] == [1, 2, 3]
+        assert subtasks[1]["estimated_minutes"] == 180
+        assert events[-1][1]["strategy"] == "standard"
+
+        with app.app_context():
+            saved = Subtask.query.filter_by(task_id=task_id).order_by("order").all()
+            assert [s.id for s in saved] == [s["id"] for s in subtasks]
+            assert saved[0].title == 'Open the "draft" {v1}'
+
+        assert len(cached) == 1
+        assert [s["title"] for s in cached[0]["subtasks"]] == [
+            s["title"] for s in subtasks
+        ]
+
+        # Decomposing again replaces the saved subtasks (and skips the cache)
+        response = auth_client.post(f"/api/v1/tasks/{task_id}/decompose/stream")
+        events = _sse_events(response.get_data(as_text=True))
+        new_ids = [payload["id"] for e, payload in events if e == "subtask"]
+        with app.app_context():
+            saved = Subtask.query.filter_by(task_id=task_id).all()
+            assert sorted(s.id for s in saved) == sorted(new_ids)
+        assert len(cached) == 1
+
+    def test_stream_falls_back_without_ai(self, app, auth_client, test_user):
+        with app.app_context():
+            task = Task(user_id=test_user["id"], title="Fix login", task_type="coding")
+            db.session.add(task)
+            db.session.commit()
+            task_id = task.id
+
+        response = auth_client.post(f"/api/v1/tasks/{task_id}/decompose/stream")
+        events = _sse_events(response.get_data(as_text=True))
+
+        assert events[-1][0] == "done"
+        titles = [payload["title"] for e, payload in events if e == "subtask"]
+        assert titles == AIDecomposer.FALLBACK_STEPS["coding"][:5]
+
+
 class TestSubtasksAPI:
     """Test cases for subtasks endpoints."""
 
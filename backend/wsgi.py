@@ -47,15 +47,33 @@ def generate_monsters_command(no_images):
 
     click.echo("Starting daily monster generation...")
     service = MonsterGeneratorService()
-    results = service.generate_daily_monsters(generate_images=not no_images)
+    report = service.run_generation(
+        generate_images=not no_images,
+        progress=lambda message: click.echo(f"  ... {message}"),
+    )
 
-    for genre, count in results.items():
+    for genre, count in report.created.items():
         if count > 0:
             click.echo(f"  {genre}: {count} monsters generated")
+        elif genre in report.failed:
+            click.echo(f"  {genre}: failed (see logs)")
         else:
-            click.echo(f"  {genre}: skipped (already exist or error)")
-
-    total = sum(results.values())
+            click.echo(f"  {genre}: skipped (already exist)")
+
+    if report.text_fallbacks:
+        click.echo(f"Fallback monsters used for: {', '.join(report.text_fallbacks)}")
+    if report.images_generated or report.images_failed:
+        click.echo(
+            f"Images: {report.images_generated} generated, "
+            f"{report.images_failed} failed"
+        )
+
+    timings = ", ".join(
+        f"{stage} {seconds:.1f}s" for stage, seconds in report.timings.items()
+    )
+    click.echo(f"Timing: {timings}")
+
+    total = sum(report.created.values())
     click.echo(f"Done! Total monsters generated: {total}")
 
 
@@ -114,6 +132,7 @@ def init_card_templates_command(genre):
     """Initialize base card templates for all genres (10 per genre)."""
     from app.models.card import CardTemplate
     from app.models.character import GENRE_THEMES
+    from app.services.template_pool import invalidate_template_pool
 
     # Base card templates for each genre
     CARD_TEMPLATES = {
@@ -521,6 +540,41 @@ def init_card_templates_command(genre):
         db.session.commit()
         click.echo(f"  {g}: {created} templates created")
 
+    invalidate_template_pool()
+    click.echo("Done!")
+
+
+@app.cli.command("recompute-card-stats")
+@click.option("--batch-size", default=500, help="Users per transaction")
+def recompute_card_stats_command(batch_size):
+    """Rebuild denormalized deck power / card counts from user_cards."""
+    from app.services.card_stats_service import CardStatsService
+
+    click.echo("Recomputing card stats...")
+    processed = CardStatsService().recompute_all_card_stats(batch_size=batch_size)
+    click.echo(f"Done! Users processed: {processed}")
+
+
+@app.cli.command("replenish-card-pool")
+@click.option("--batch-size", default=None, type=int, help="Cards per genre per run")
+def replenish_card_pool_command(batch_size):
+    """Generate card templates and reserved legendaries ahead of demand."""
+    from app.services.card_pool_service import CardPoolService
+
+    service = CardPoolService()
+    click.echo("Replenishing card pool...")
+    summary = service.replenish(batch_size)
+    for genre, created in summary.items():
+        click.echo(
+            f"  {genre}: +{created['templates']} templates, "
+            f"+{created['legendaries']} legendaries"
+        )
+    for genre, status in service.get_status().items():
+        click.echo(
+            f"  {genre}: deficit={status['template_deficit']}, "
+            f"legendary reserve={status['legendary_reserve']}"
+            f"/{status['legendary_reserve_target']}"
+        )
     click.echo("Done!")
 
 
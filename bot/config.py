@@ -58,6 +58,15 @@ class Config:
         default_factory=lambda: os.environ.get("OPENAI_PROXY", "")
     )
 
+    # Scheduled jobs (see scheduler.py): user-id shards per sharded run and
+    # concurrent shard workers per bot replica
+    SCHEDULER_SHARDS: int = field(
+        default_factory=lambda: int(os.environ.get("SCHEDULER_SHARDS", 4))
+    )
+    SCHEDULER_WORKERS: int = field(
+        default_factory=lambda: int(os.environ.get("SCHEDULER_WORKERS", 4))
+    )
+
     def __post_init__(self):
         admin_ids_str = os.environ.get("ADMIN_IDS", "")
         if admin_ids_str:
@@ -1,6 +1,7 @@
 """Database connection for bot."""
 
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
 from config import config
 from sqlalchemy import text
@@ -9,6 +10,31 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 engine = create_async_engine(config.DATABASE_URL, echo=False)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Inclusive users.id range of the scheduler shard being run (see scheduler.py).
+# Queries of sharded jobs add shard_filter(); None means all users.
+user_shard: ContextVar[tuple[int, int] | None] = ContextVar("user_shard", default=None)
+
+
+def shard_filter(column: str) -> tuple[str, dict]:
+    """SQL condition and params limiting a users.id column to the current shard."""
+    shard = user_shard.get()
+    if shard is None:
+        return "TRUE", {}
+    return (
+        f"{column} BETWEEN :shard_lo AND :shard_hi",
+        {"shard_lo": shard[0], "shard_hi": shard[1]},
+    )
+
+
+async def get_user_id_bounds() -> tuple[int, int] | None:
+    """Smallest and largest users.id, for splitting a job into shards."""
+    async with async_session() as session:
+        result = await session.execute(text("SELECT MIN(id), MAX(id) FROM users"))
+        low, high = result.fetchone()
+        if low is None:
+            return None
+        return low, high
+
 
 @asynccontextmanager
 async def get_session() -> AsyncSession:
@@ -157,10 +183,11 @@ async def get_users_tasks_for_today() -> dict[int, list[dict]]:
     Returns dict grouped by user_id: {user_id: [{task_title, priority}, ...]}
     Batched query to avoid N+1.
     """
+    shard, params = shard_filter("t.user_id")
     async with async_session() as session:
         result = await session.execute(
             text(
-                """
+                f"""
                 SELECT t.user_id, t.title, t.priority, u.telegram_id,
                        u.first_name, COALESCE(up.language, 'ru') as language
                 FROM tasks t
@@ -169,11 +196,13 @@ async def get_users_tasks_for_today() -> dict[int, list[dict]]:
                 WHERE t.due_date = (CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow')::date
                 AND t.status NOT IN ('completed', 'archived')
                 AND COALESCE(up.notifications_enabled, true) = true
+                AND {shard}
                 ORDER BY t.user_id,
                     CASE t.priority WHEN 'high' THEN 0 WHEN 'medium' THEN 1 ELSE 2 END,
                     t.created_at ASC
             """
-            )
+            ),
+            params,
         )
         rows = result.fetchall()
 
@@ -188,25 +217,93 @@ async def get_users_tasks_for_today() -> dict[int, list[dict]]:
         return users_tasks
 
 
-async def get_all_users() -> list[dict]:
-    """Get all users for broadcast."""
+# User level from XP, as in the backend's User.level
+USER_LEVEL_SQL = "CASE WHEN xp < 100 THEN 1 ELSE FLOOR(SQRT(xp / 100.0))::int + 1 END"
+
+
+async def get_users_count() -> int:
+    """Count all users."""
+    async with async_session() as session:
+        result = await session.execute(text("SELECT COUNT(*) FROM users"))
+        return result.scalar() or 0
+
+
+async def get_platform_stats() -> dict:
+    """Aggregate user stats for the admin panel."""
+    async with async_session() as session:
+        result = await session.execute(
+            text(
+                f"""
+                SELECT COUNT(*) AS total_users,
+                       COALESCE(SUM(xp), 0) AS total_xp,
+                       COALESCE(AVG({USER_LEVEL_SQL}), 1) AS avg_level
+                FROM users
+            """
+            )
+        )
+        return dict(result.fetchone()._mapping)
+
+
+async def get_recently_active_users(limit: int = 10) -> list[dict]:
+    """Most recently active users (by last activity, then sign-up date)."""
     async with async_session() as session:
-        result = await session.execute(text("SELECT * FROM users"))
+        result = await session.execute(
+            text(
+                f"""
+                SELECT telegram_id, username, first_name, xp, streak_days,
+                       {USER_LEVEL_SQL} AS level
+                FROM users
+                ORDER BY COALESCE(last_activity_date, created_at::date) DESC
+                         NULLS LAST
+                LIMIT :limit
+            """
+            ),
+            {"limit": limit},
+        )
         return [dict(row._mapping) for row in result.fetchall()]
 
 
+async def count_broadcast_recipients() -> int:
+    """Count users a broadcast would be sent to."""
+    async with async_session() as session:
+        result = await session.execute(
+            text("SELECT COUNT(*) FROM users WHERE telegram_id IS NOT NULL")
+        )
+        return result.scalar() or 0
+
+
+async def iter_broadcast_recipient_ids(chunk_size: int = 500):
+    """Yield telegram_ids of broadcast recipients in chunks.
+
+    Rows come from a server-side cursor, so only one chunk of ids is held
+    in memory at a time.
+    """
+    async with async_session() as session:
+        result = await session.stream(
+            text(
+                "SELECT telegram_id FROM users "
+                "WHERE telegram_id IS NOT NULL ORDER BY id"
+            ).execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            yield [row[0] for row in rows]
+
+
 async def get_users_with_notifications_enabled() -> list[dict]:
     """Get users who have notifications enabled."""
+    shard, params = shard_filter("u.id")
     async with async_session() as session:
         result = await session.execute(
             text(
-                """
+                f"""
                 SELECT u.*, up.notifications_enabled
                 FROM users u
                 LEFT JOIN user_profiles up ON up.user_id = u.id
                 WHERE COALESCE(up.notifications_enabled, true) = true
+                AND {shard}
             """
-            )
+            ),
+            params,
         )
         return [dict(row._mapping) for row in result.fetchall()]
 
@@ -344,15 +441,20 @@ async def get_weekly_digest_stats(telegram_id: int) -> dict | None:
         )
         focus_tw = dict(focus_result.fetchone()._mapping)
 
-        # Mood this week
+        # Mood this week (daily rollups, last 7 days including today)
         mood_result = await session.execute(
             text(
-                f"""
+                """
                 SELECT
-                    COUNT(*) as checks,
-                    COALESCE(AVG(mood), 0) as avg_mood,
-                    COALESCE(AVG(energy), 0) as avg_energy
-                FROM mood_checks WHERE user_id = :uid {tw}
+                    COALESCE(SUM(checks), 0) as checks,
+                    COALESCE(CAST(SUM(mood_sum) AS float) / NULLIF(SUM(checks), 0), 0)
+                        as avg_mood,
+                    COALESCE(
+                        CAST(SUM(energy_sum) AS float) / NULLIF(SUM(checks), 0), 0
+                    ) as avg_energy
+                FROM mood_daily_rollups
+                WHERE user_id = :uid
+                AND day > CAST(NOW() AT TIME ZONE 'UTC' AS date) - 7
             """
             ),
             {"uid": user_id},
@@ -397,13 +499,11 @@ async def get_weekly_digest_stats(telegram_id: int) -> dict | None:
         mood_daily_result = await session.execute(
             text(
                 """
-                SELECT
-                    DATE(created_at) as day,
-                    AVG(mood) as avg_mood
-                FROM mood_checks
+                SELECT day, CAST(mood_sum AS float) / checks as avg_mood
+                FROM mood_daily_rollups
                 WHERE user_id = :uid
-                AND created_at >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '7 days'
-                GROUP BY DATE(created_at)
+                AND day > CAST(NOW() AT TIME ZONE 'UTC' AS date) - 7
+                AND checks > 0
                 ORDER BY day
             """
             ),
@@ -478,136 +578,120 @@ async def get_weekly_digest_stats(telegram_id: int) -> dict | None:
         }
 
 
-async def get_overdue_tasks_by_user() -> dict[int, list[dict]]:
-    """Get all overdue tasks grouped by user_id."""
-    async with async_session() as session:
-        result = await session.execute(
-            text(
-                """
-                SELECT t.id, t.user_id, t.title, t.description, t.priority,
-                       t.postponed_count, t.due_date, u.telegram_id
-                FROM tasks t
-                JOIN users u ON t.user_id = u.id
-                WHERE t.due_date < (CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow')::date
-                AND t.status NOT IN ('completed', 'archived')
-                ORDER BY t.user_id
-            """
-            )
-        )
-        rows = result.fetchall()
-
-        # Group by user_id
-        users_tasks: dict[int, list[dict]] = {}
-        for row in rows:
-            data = dict(row._mapping)
-            user_id = data["user_id"]
-            if user_id not in users_tasks:
-                users_tasks[user_id] = []
-            users_tasks[user_id].append(data)
-
-        return users_tasks
+async def postpone_overdue_tasks() -> dict:
+    """
+    Postpone all overdue tasks to today (Moscow time) in one transaction.
 
+    One UPDATE moves due dates, increments postponed_count, auto-archives
+    tasks at 5 postponements and raises priority at 3-4 (low -> medium,
+    medium -> high). Per-user postpone logs are built from the returned
+    rows and written with one INSERT.
 
-async def postpone_task(task_id: int) -> int:
+    Returns counts: postponed, archived, escalated, users.
     """
-    Postpone a task to today (Moscow time) and increment postponed_count.
-    Auto-archives task after 5 postponements.
+    import json
 
-    Returns new postponed_count.
-    """
+    shard, params = shard_filter("user_id")
     async with async_session() as session:
-        # Update task - use Moscow timezone for date
-        await session.execute(
+        result = await session.execute(
             text(
-                """
-                UPDATE tasks
+                f"""
+                WITH overdue AS (
+                    SELECT id, priority AS old_priority
+                    FROM tasks
+                    WHERE due_date < (CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow')::date
+                    AND status NOT IN ('completed', 'archived')
+                    AND {shard}
+                )
+                UPDATE tasks t
                 SET due_date = (CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow')::date,
-                    postponed_count = COALESCE(postponed_count, 0) + 1,
+                    original_due_date = COALESCE(t.original_due_date, t.due_date),
+                    postponed_count = COALESCE(t.postponed_count, 0) + 1,
+                    status = CASE
+                        WHEN COALESCE(t.postponed_count, 0) + 1 >= 5 THEN 'archived'
+                        ELSE t.status
+                    END,
+                    priority = CASE
+                        WHEN COALESCE(t.postponed_count, 0) + 1 NOT IN (3, 4)
+                            THEN t.priority
+                        WHEN t.priority = 'medium' THEN 'high'
+                        WHEN t.priority = 'low' THEN 'medium'
+                        ELSE t.priority
+                    END,
                     updated_at = NOW()
-                WHERE id = :task_id
+                FROM overdue o
+                WHERE t.id = o.id
+                RETURNING t.id, t.user_id, t.title, t.status, t.postponed_count,
+                          o.old_priority, t.priority AS new_priority
             """
             ),
-            {"task_id": task_id},
+            params,
         )
-        await session.commit()
-
-        # Get new postponed_count
-        result = await session.execute(
-            text("SELECT postponed_count FROM tasks WHERE id = :task_id"),
-            {"task_id": task_id},
-        )
-        row = result.fetchone()
-        new_count = row._mapping["postponed_count"] if row else 0
+        rows = [dict(row._mapping) for row in result.fetchall()]
+        if not rows:
+            return {"postponed": 0, "archived": 0, "escalated": 0, "users": 0}
 
-        # Auto-archive after 5 postponements
-        if new_count >= 5:
-            await session.execute(
-                text(
-                    """
-                    UPDATE tasks SET status = 'archived', updated_at = NOW()
-                    WHERE id = :task_id
-                """
-                ),
-                {"task_id": task_id},
+        # Build one log entry per user from the returned rows
+        logs: dict[int, dict] = {}
+        archived = escalated = 0
+        for row in rows:
+            log = logs.setdefault(
+                row["user_id"],
+                {"user_id": row["user_id"], "tasks_postponed": 0, "changes": []},
             )
-            await session.commit()
-
-        return new_count
-
-
-async def update_task_priority(task_id: int, new_priority: str):
-    """Update task priority."""
-    async with async_session() as session:
-        await session.execute(
-            text(
-                """
-                UPDATE tasks
-                SET priority = :priority,
-                    updated_at = NOW()
-                WHERE id = :task_id
-            """
-            ),
-            {"task_id": task_id, "priority": new_priority},
-        )
-        await session.commit()
-
-
-async def create_postpone_log(
-    user_id: int,
-    tasks_postponed: int,
-    priority_changes: list[dict] | None = None,
-):
-    """Create a postpone log entry for today."""
-    async with async_session() as session:
-        import json
-
-        priority_changes_json = (
-            json.dumps(priority_changes) if priority_changes else None
-        )
+            log["tasks_postponed"] += 1
+            if row["status"] == "archived":
+                archived += 1
+            if row["new_priority"] != row["old_priority"]:
+                escalated += 1
+                log["changes"].append(
+                    {
+                        "task_id": row["id"],
+                        "task_title": row["title"][:50],
+                        "old_priority": row["old_priority"],
+                        "new_priority": row["new_priority"],
+                        "postponed_count": row["postponed_count"],
+                    }
+                )
 
         await session.execute(
             text(
                 """
                 INSERT INTO postpone_logs
                     (user_id, date, tasks_postponed, priority_changes, notified, created_at)
-                VALUES
-                    (:user_id, CURRENT_DATE, :tasks_postponed,
-                     :priority_changes::jsonb, false, NOW())
+                SELECT r.user_id, CURRENT_DATE, r.tasks_postponed,
+                       r.priority_changes, false, NOW()
+                FROM jsonb_to_recordset(CAST(:logs AS jsonb))
+                    AS r(user_id int, tasks_postponed int, priority_changes jsonb)
                 ON CONFLICT (user_id, date)
                 DO UPDATE SET
-                    tasks_postponed = :tasks_postponed,
-                    priority_changes = :priority_changes::jsonb,
+                    tasks_postponed = EXCLUDED.tasks_postponed,
+                    priority_changes = EXCLUDED.priority_changes,
                     notified = false
             """
             ),
             {
-                "user_id": user_id,
-                "tasks_postponed": tasks_postponed,
-                "priority_changes": priority_changes_json,
+                "logs": json.dumps(
+                    [
+                        {
+                            "user_id": log["user_id"],
+                            "tasks_postponed": log["tasks_postponed"],
+                            "priority_changes": log["changes"] or None,
+                        }
+                        for log in logs.values()
+                    ]
+                )
             },
         )
         await session.commit()
 
+        return {
+            "postponed": len(rows),
+            "archived": archived,
+            "escalated": escalated,
+            "users": len(logs),
+        }
+
 
 async def get_user_preferred_time(user_id: int) -> str:
     """
@@ -646,10 +730,11 @@ async def get_unnotified_postpone_logs_for_time(time_slot: str) -> list[dict]:
     - Have notifications enabled
     - Prefer the given time slot based on their tasks
     """
+    shard, params = shard_filter("u.id")
     async with async_session() as session:
         result = await session.execute(
             text(
-                """
+                f"""
                 WITH user_preferred_times AS (
                     SELECT
                         u.id as user_id,
@@ -666,6 +751,7 @@ async def get_unnotified_postpone_logs_for_time(time_slot: str) -> list[dict]:
                     FROM users u
                     LEFT JOIN user_profiles up ON up.user_id = u.id
                     WHERE COALESCE(up.notifications_enabled, true) = true
+                    AND {shard}
                 )
                 SELECT
                     pl.id as log_id,
@@ -684,7 +770,7 @@ async def get_unnotified_postpone_logs_for_time(time_slot: str) -> list[dict]:
                 AND upt.preferred_time = :time_slot
             """
             ),
-            {"time_slot": time_slot},
+            {"time_slot": time_slot, **params},
         )
         return [dict(row._mapping) for row in result.fetchall()]
 
@@ -841,10 +927,11 @@ async def get_users_for_daily_suggestion(time_slot: str) -> list[dict]:
     - Prefer the given time slot based on their tasks
     - Haven't received a daily suggestion today
     """
+    shard, params = shard_filter("u.id")
     async with async_session() as session:
         result = await session.execute(
             text(
-                """
+                f"""
                 WITH user_preferred_times AS (
                     SELECT
                         u.id as user_id,
@@ -863,6 +950,7 @@ async def get_users_for_daily_suggestion(time_slot: str) -> list[dict]:
                     FROM users u
                     LEFT JOIN user_profiles up ON up.user_id = u.id
                     WHERE COALESCE(up.notifications_enabled, true) = true
+                    AND {shard}
                 )
                 SELECT
                     upt.user_id,
@@ -878,7 +966,7 @@ async def get_users_for_daily_suggestion(time_slot: str) -> list[dict]:
                 )
             """
             ),
-            {"time_slot": time_slot},
+            {"time_slot": time_slot, **params},
         )
         return [dict(row._mapping) for row in result.fetchall()]
 
@@ -1184,6 +1272,24 @@ async def get_card_cooldown_info(card_id: int, user_id: int) -> dict | None:
         }
 
 
+# Mirrors CardStatsService.refresh_card_stats in the backend
+REFRESH_CARD_STATS_SQL = """
+    INSERT INTO user_card_stats (user_id, deck_power, active_cards_count, updated_at)
+    SELECT u.id,
+           COALESCE(SUM(CASE WHEN uc.is_in_deck THEN uc.hp + uc.attack ELSE 0 END), 0),
+           COUNT(uc.id),
+           NOW()
+    FROM users u
+    LEFT JOIN user_cards uc ON uc.user_id = u.id AND uc.is_destroyed = false
+    WHERE u.id = ANY(:user_ids)
+    GROUP BY u.id
+    ON CONFLICT (user_id) DO UPDATE SET
+        deck_power = EXCLUDED.deck_power,
+        active_cards_count = EXCLUDED.active_cards_count,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
 async def complete_marketplace_purchase(
     listing_id: int, buyer_id: int, telegram_payment_id: str
 ) -> dict:
@@ -1316,6 +1422,11 @@ async def complete_marketplace_purchase(
             {"user_id": buyer_id, "amount": price},
         )
 
+        # Keep denormalized deck power / card counts in sync (friends ranking)
+        await session.execute(
+            text(REFRESH_CARD_STATS_SQL), {"user_ids": [buyer_id, seller_id]}
+        )
+
         await session.commit()
 
         return {
@@ -1544,10 +1655,11 @@ async def mark_friend_activities_notified(activity_ids: list[int]):
 
 async def get_inactive_users(days: int = 2) -> list[dict]:
     """Get users inactive for N+ days who haven't been sent a comeback message yet."""
+    shard, params = shard_filter("u.id")
     async with async_session() as session:
         result = await session.execute(
             text(
-                """
+                f"""
                 SELECT u.id, u.telegram_id, u.first_name,
                        COALESCE(up.language, 'ru') as language
                 FROM users u
@@ -1557,9 +1669,10 @@ async def get_inactive_users(days: int = 2) -> list[dict]:
                 )::date - :days
                 AND u.comeback_card_pending = false
                 AND COALESCE(up.notifications_enabled, true) = true
+                AND {shard}
             """
             ),
-            {"days": days},
+            {"days": days, **params},
         )
         return [dict(row._mapping) for row in result.fetchall()]
 
@@ -1579,58 +1692,85 @@ async def set_comeback_card_pending(user_id: int):
         await session.commit()
 
 
-async def get_expired_focus_sessions():
-    """Get active focus sessions that have exceeded their planned duration."""
-    async with async_session() as session:
-        result = await session.execute(
-            text(
-                """
-                SELECT fs.id, fs.user_id, fs.planned_duration_minutes,
-                       fs.started_at, fs.total_pause_seconds,
-                       u.telegram_id
-                FROM focus_sessions fs
-                JOIN users u ON u.id = fs.user_id
-                WHERE fs.status = 'active'
-                  AND fs.planned_duration_minutes < 480
-                  AND (
-                    EXTRACT(EPOCH FROM (NOW() - fs.started_at))
-                    - fs.total_pause_seconds
-                  ) / 60 > fs.planned_duration_minutes
-            """
-            )
-        )
-        rows = result.fetchall()
-        return [dict(r._mapping) for r in rows]
+async def complete_focus_sessions(session_ids: list[int] | None = None):
+    """Complete expired active focus sessions and award XP, in one statement.
 
-
-async def auto_complete_focus_session(session_id: int, actual_minutes: int):
-    """Mark a focus session as completed and award XP to the user."""
+    With ``session_ids`` only those sessions are considered (the focus timer
+    passes the ones whose deadline fired); without, every expired session
+    (the periodic sweep). XP is 1 per planned minute, summed per user, and
+    the sessions are added to the users' activity counters (see the
+    backend's app.services.daily_counters).
+    Returns the completed sessions with the users' telegram_id.
+    """
+    id_filter = "AND fs.id = ANY(:ids)" if session_ids is not None else ""
     async with async_session() as session:
-        # Complete the session
-        await session.execute(
-            text(
-                """
-                UPDATE focus_sessions
-                SET status = 'completed',
-                    ended_at = NOW(),
-                    actual_duration_minutes = :actual_minutes
-                WHERE id = :session_id AND status = 'active'
-            """
-            ),
-            {"session_id": session_id, "actual_minutes": actual_minutes},
-        )
-        # Award XP (1 XP per minute of focus)
-        xp = max(1, actual_minutes)
-        await session.execute(
+        result = await session.execute(
             text(
-                """
-                UPDATE users SET xp = xp + :xp
-                WHERE id = (
-                    SELECT user_id FROM focus_sessions WHERE id = :session_id
+                f"""
+                WITH done AS (
+                    UPDATE focus_sessions fs
+                    SET status = 'completed',
+                        ended_at = NOW(),
+                        actual_duration_minutes = fs.planned_duration_minutes
+                    WHERE fs.status = 'active'
+                      AND fs.planned_duration_minutes < 480
+                      -- A few seconds of slack for clock skew with the timer
+                      AND EXTRACT(EPOCH FROM (NOW() - fs.started_at))
+                          - fs.total_pause_seconds
+                          >= fs.planned_duration_minutes * 60 - 5
+                      {id_filter}
+                    RETURNING fs.id, fs.user_id, fs.planned_duration_minutes,
+                              fs.started_at
+                ),
+                daily_counters AS (
+                    INSERT INTO user_daily_counters (user_id, day, focus_sessions,
+                        focus_minutes, tasks_completed, subtasks_completed,
+                        mood_checks)
+                    SELECT user_id, CAST(started_at AS date), COUNT(*),
+                           SUM(planned_duration_minutes), 0, 0, 0
+                    FROM done
+                    GROUP BY user_id, CAST(started_at AS date)
+                    ON CONFLICT (user_id, day) DO UPDATE
+                    SET focus_sessions = user_daily_counters.focus_sessions
+                            + EXCLUDED.focus_sessions,
+                        focus_minutes = user_daily_counters.focus_minutes
+                            + EXCLUDED.focus_minutes
+                ),
+                counters AS (
+                    INSERT INTO user_counters (user_id, focus_sessions,
+                        focus_minutes, tasks_completed, subtasks_completed,
+                        mood_checks, updated_at)
+                    SELECT user_id, COUNT(*), SUM(planned_duration_minutes),
+                           0, 0, 0, NOW()
+                    FROM done
+                    GROUP BY user_id
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET focus_sessions = user_counters.focus_sessions
+                            + EXCLUDED.focus_sessions,
+                        focus_minutes = user_counters.focus_minutes
+                            + EXCLUDED.focus_minutes,
+                        updated_at = NOW()
+                ),
+                xp AS (
+                    UPDATE users u
+                    SET xp = u.xp + per_user.xp
+                    FROM (
+                        SELECT user_id,
+                               SUM(GREATEST(planned_duration_minutes, 1)) AS xp
+                        FROM done
+                        GROUP BY user_id
+                    ) per_user
+                    WHERE u.id = per_user.user_id
                 )
+                SELECT d.id, d.user_id, d.planned_duration_minutes,
+                       GREATEST(d.planned_duration_minutes, 1) AS xp,
+                       u.telegram_id
+                FROM done d
+                JOIN users u ON u.id = d.user_id
             """
             ),
-            {"session_id": session_id, "xp": xp},
+            {"ids": session_ids} if session_ids is not None else {},
         )
+        rows = [dict(r._mapping) for r in result.fetchall()]
         await session.commit()
-        return xp
+        return rows
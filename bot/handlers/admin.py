@@ -1,16 +1,41 @@
 """Admin handlers for broadcast and management."""
 
-from aiogram import Router, F
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+
+from aiogram import Bot, Router, F
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from config import config
-from keyboards import get_admin_keyboard, get_broadcast_confirm_keyboard
-from database import get_all_users
+from keyboards import (
+    get_admin_keyboard,
+    get_broadcast_confirm_keyboard,
+    get_broadcast_progress_keyboard,
+)
+from database import (
+    count_broadcast_recipients,
+    get_platform_stats,
+    get_recently_active_users,
+    get_users_count,
+    iter_broadcast_recipient_ids,
+)
 
 router = Router()
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHUNK_SIZE = 500
+BROADCAST_SEND_DELAY = 0.05  # Stay under Telegram's ~30 messages/second
+BROADCAST_PROGRESS_INTERVAL = 3.0  # Seconds between progress edits
 
 
 class BroadcastStates(StatesGroup):
@@ -25,6 +50,132 @@ def is_admin(user_id: int) -> bool:
     return user_id in config.ADMIN_IDS
 
 
+class BroadcastJob:
+    """A broadcast sent in the background with progress in the admin's chat."""
+
+    def __init__(self, data: dict, status_message: Message, total: int):
+        self.data = data
+        self.status_message = status_message
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.blocked = 0
+        self.started_at = time.monotonic()
+        self._cancelled = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def start(self, bot: Bot):
+        self.task = asyncio.create_task(self.run(bot))
+
+    async def run(self, bot: Bot):
+        """Send to every recipient, editing the status message as it goes."""
+        global _active_broadcast
+        last_progress = time.monotonic()
+        try:
+            # aclosing: release the DB cursor right away on cancellation
+            recipients = iter_broadcast_recipient_ids(BROADCAST_CHUNK_SIZE)
+            async with aclosing(recipients) as chunks:
+                async for chunk in chunks:
+                    for telegram_id in chunk:
+                        if self.cancelled:
+                            break
+                        await self._send(bot, telegram_id)
+                        await asyncio.sleep(BROADCAST_SEND_DELAY)
+
+                        if (
+                            time.monotonic() - last_progress
+                            >= BROADCAST_PROGRESS_INTERVAL
+                        ):
+                            last_progress = time.monotonic()
+                            await self._edit_status(
+                                self._progress_text(),
+                                get_broadcast_progress_keyboard(),
+                            )
+                    if self.cancelled:
+                        break
+        except Exception as e:
+            logger.error(f"Broadcast stopped by error: {e}")
+            await self._edit_status(
+                self._report_text(f"⚠️ Рассылка прервана ошибкой: {e}"),
+                get_admin_keyboard(),
+            )
+            return
+        finally:
+            _active_broadcast = None
+
+        title = "⏹ Рассылка остановлена" if self.cancelled else "✅ Рассылка завершена!"
+        logger.info(
+            f"Broadcast finished: {self.sent} sent, {self.failed} failed "
+            f"({self.blocked} blocked), cancelled={self.cancelled}"
+        )
+        await self._edit_status(self._report_text(title), get_admin_keyboard())
+
+    async def _send(self, bot: Bot, telegram_id: int):
+        for _ in range(2):
+            try:
+                await send_broadcast_message(bot, telegram_id, self.data)
+                self.sent += 1
+                return
+            except TelegramRetryAfter as e:
+                # Flood control: wait as told, then retry once
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                self.blocked += 1
+                break
+            except Exception:
+                break
+        self.failed += 1
+
+    async def _edit_status(self, text: str, reply_markup):
+        try:
+            await self.status_message.edit_text(text, reply_markup=reply_markup)
+        except TelegramBadRequest:
+            pass  # Message unchanged or deleted
+
+    def _progress_text(self) -> str:
+        percent = self.done * 100 // max(self.total, 1)
+        return (
+            f"📤 Отправляю рассылку... {self.done}/{self.total} ({percent}%)\n\n"
+            f"📬 Отправлено: {self.sent}\n"
+            f"❌ Не доставлено: {self.failed}"
+        )
+
+    def _report_text(self, title: str) -> str:
+        elapsed = int(time.monotonic() - self.started_at)
+        return (
+            f"{title}\n\n"
+            f"📬 Отправлено: {self.sent}\n"
+            f"❌ Не доставлено: {self.failed} (заблокировали бота: {self.blocked})\n"
+            f"⏳ Не отправлено: {max(self.total - self.done, 0)}\n"
+            f"⏱ Время: {elapsed // 60} мин {elapsed % 60} сек"
+        )
+
+
+# One broadcast at a time
+_active_broadcast: BroadcastJob | None = None
+
+
+async def send_broadcast_message(bot: Bot, telegram_id: int, data: dict):
+    """Send the stored broadcast message to one user."""
+    if data["message_type"] == "text":
+        await bot.send_message(telegram_id, data["text"])
+    elif data["message_type"] == "photo":
+        await bot.send_photo(telegram_id, data["photo_id"], caption=data.get("text"))
+    elif data["message_type"] == "video":
+        await bot.send_video(telegram_id, data["video_id"], caption=data.get("text"))
+
+
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
     """Admin panel."""
@@ -32,12 +183,12 @@ async def cmd_admin(message: Message):
         await message.answer("⛔ Доступ запрещён.")
         return
 
-    users = await get_all_users()
+    users_count = await get_users_count()
 
     text = (
         f"🔐 Панель администратора\n"
         f"{'─' * 20}\n\n"
-        f"👥 Всего пользователей: {len(users)}\n\n"
+        f"👥 Всего пользователей: {users_count}\n\n"
         "Выбери действие:"
     )
 
@@ -51,19 +202,14 @@ async def admin_stats(callback: CallbackQuery):
         await callback.answer("⛔ Доступ запрещён.")
         return
 
-    users = await get_all_users()
-
-    # Calculate some basic stats
-    total_users = len(users)
-    total_xp = sum(u.get("xp", 0) for u in users)
-    avg_level = sum(u.get("level", 1) for u in users) / max(total_users, 1)
+    stats = await get_platform_stats()
 
     text = (
         f"📊 Статистика платформы\n"
         f"{'─' * 20}\n\n"
-        f"👥 Всего пользователей: {total_users}\n"
-        f"✨ Всего XP заработано: {total_xp}\n"
-        f"📈 Средний уровень: {avg_level:.1f}\n"
+        f"👥 Всего пользователей: {stats['total_users']}\n"
+        f"✨ Всего XP заработано: {stats['total_xp']}\n"
+        f"📈 Средний уровень: {float(stats['avg_level']):.1f}\n"
     )
 
     await callback.message.edit_text(text, reply_markup=get_admin_keyboard())
@@ -113,10 +259,10 @@ async def receive_broadcast_message(message: Message, state: FSMContext):
         video_id=message.video.file_id if message.video else None,
     )
 
-    users = await get_all_users()
+    recipients = await count_broadcast_recipients()
 
     await message.answer(
-        f"📨 Готово к отправке {len(users)} пользователям.\n" "Подтвердить?",
+        f"📨 Готово к отправке {recipients} пользователям.\n" "Подтвердить?",
         reply_markup=get_broadcast_confirm_keyboard(),
     )
     await state.set_state(BroadcastStates.confirm)
@@ -124,42 +270,42 @@ async def receive_broadcast_message(message: Message, state: FSMContext):
 
 @router.callback_query(F.data == "broadcast:confirm", BroadcastStates.confirm)
 async def confirm_broadcast(callback: CallbackQuery, state: FSMContext):
-    """Confirm and send broadcast."""
+    """Confirm and start the broadcast in the background."""
+    global _active_broadcast
     if not is_admin(callback.from_user.id):
         await callback.answer("⛔ Доступ запрещён.")
         return
 
+    if _active_broadcast is not None:
+        await callback.answer("⏳ Предыдущая рассылка ещё идёт.", show_alert=True)
+        return
+
     data = await state.get_data()
-    users = await get_all_users()
+    await state.clear()
+    total = await count_broadcast_recipients()
 
-    await callback.message.edit_text("📤 Отправляю рассылку...")
+    await callback.message.edit_text(
+        f"📤 Отправляю рассылку... 0/{total}",
+        reply_markup=get_broadcast_progress_keyboard(),
+    )
+    _active_broadcast = BroadcastJob(data, callback.message, total)
+    _active_broadcast.start(callback.bot)
+    await callback.answer()
 
-    sent = 0
-    failed = 0
 
-    for user in users:
-        try:
-            if data["message_type"] == "text":
-                await callback.bot.send_message(user["telegram_id"], data["text"])
-            elif data["message_type"] == "photo":
-                await callback.bot.send_photo(
-                    user["telegram_id"], data["photo_id"], caption=data.get("text")
-                )
-            elif data["message_type"] == "video":
-                await callback.bot.send_video(
-                    user["telegram_id"], data["video_id"], caption=data.get("text")
-                )
-            sent += 1
-        except Exception:
-            failed += 1
+@router.callback_query(F.data == "broadcast:stop")
+async def stop_broadcast(callback: CallbackQuery):
+    """Stop the running broadcast."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ Доступ запрещён.")
+        return
 
-    await state.clear()
-    await callback.message.edit_text(
-        f"✅ Рассылка завершена!\n\n"
-        f"📬 Отправлено: {sent}\n"
-        f"❌ Не доставлено: {failed}",
-        reply_markup=get_admin_keyboard(),
-    )
+    if _active_broadcast is None:
+        await callback.answer("Рассылка уже завершена.")
+        return
+
+    _active_broadcast.cancel()
+    await callback.answer("⏹ Останавливаю рассылку...")
 
 
 @router.callback_query(F.data == "broadcast:cancel", BroadcastStates.confirm)
@@ -179,18 +325,11 @@ async def show_active_users(callback: CallbackQuery):
         await callback.answer("⛔ Доступ запрещён.")
         return
 
-    users = await get_all_users()
-
-    # Sort by last activity (if available) or creation date
-    sorted_users = sorted(
-        users,
-        key=lambda x: x.get("last_activity_date") or x.get("created_at") or "",
-        reverse=True,
-    )[:10]
+    recent_users = await get_recently_active_users(10)
 
     text = "👥 Недавно активные пользователи\n" + "─" * 20 + "\n\n"
 
-    for i, user in enumerate(sorted_users, 1):
+    for i, user in enumerate(recent_users, 1):
         username = (
             user.get("username")
             or user.get("first_name")
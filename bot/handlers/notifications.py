@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 
 import psutil
@@ -9,8 +10,6 @@ from aiogram import Bot, Router
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from config import config
 from database import (
-    create_postpone_log,
-    get_overdue_tasks_by_user,
     get_scheduled_tasks_for_reminder,
     get_task_suggestions,
     get_unnotified_postpone_logs_for_time,
@@ -21,8 +20,7 @@ from database import (
     mark_daily_suggestion_sent,
     mark_postpone_log_notified,
     mark_reminder_sent,
-    postpone_task,
-    update_task_priority,
+    postpone_overdue_tasks,
 )
 from keyboards import (
     get_morning_reminder_keyboard,
@@ -125,6 +123,7 @@ class NotificationService:
             await asyncio.sleep(0.05)
 
         logger.info(f"Morning reminders: {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def send_streak_reminder(self):
         """Send reminder to users who might lose their streak.
@@ -190,6 +189,7 @@ class NotificationService:
                 await asyncio.sleep(0.05)
 
         logger.info(f"Streak reminders: {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def send_weekly_summary(self):
         """Send weekly summary as a visual digest image to users."""
@@ -248,6 +248,7 @@ class NotificationService:
             await asyncio.sleep(0.1)  # Slightly slower for photo uploads
 
         logger.info(f"Weekly summaries (image): {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def send_achievement_notification(
         self, telegram_id: int, achievement_title: str, xp_reward: int
@@ -303,40 +304,25 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Failed to send focus notification to {telegram_id}: {e}")
 
-    async def auto_complete_expired_focus_sessions(self):
-        """Auto-complete focus sessions that have exceeded their planned duration."""
-        from database import auto_complete_focus_session, get_expired_focus_sessions
-
-        try:
-            expired = await get_expired_focus_sessions()
-            if not expired:
-                return
-
-            logger.info(f"Found {len(expired)} expired focus sessions to auto-complete")
-
-            for sess in expired:
-                try:
-                    planned = sess["planned_duration_minutes"]
-                    xp = await auto_complete_focus_session(sess["id"], planned)
-
-                    telegram_id = sess.get("telegram_id")
-                    if telegram_id:
-                        await self.bot.send_message(
-                            telegram_id,
-                            f"✅ Фокус-сессия завершена!\n\n"
-                            f"⏱️ Длительность: {planned} мин\n"
-                            f"✨ +{xp} XP\n\n"
-                            "Отличная работа! Сделай перерыв. ☕",
-                            reply_markup=get_webapp_button(),
-                        )
-                except (TelegramForbiddenError, TelegramBadRequest):
-                    pass
-                except Exception as e:
-                    logger.error(
-                        f"Failed to auto-complete focus session {sess['id']}: {e}"
-                    )
-        except Exception as e:
-            logger.error(f"Error in auto_complete_expired_focus_sessions: {e}")
+    async def notify_focus_completed(self, sessions: list[dict]):
+        """Tell users their focus sessions were completed by the timer."""
+        for sess in sessions:
+            telegram_id = sess.get("telegram_id")
+            if not telegram_id:
+                continue
+            try:
+                await self.bot.send_message(
+                    telegram_id,
+                    f"✅ Фокус-сессия завершена!\n\n"
+                    f"⏱️ Длительность: {sess['planned_duration_minutes']} мин\n"
+                    f"✨ +{sess['xp']} XP\n\n"
+                    "Отличная работа! Сделай перерыв. ☕",
+                    reply_markup=get_webapp_button(),
+                )
+            except (TelegramForbiddenError, TelegramBadRequest):
+                pass
+            except Exception as e:
+                logger.error(f"Failed to notify about focus session {sess['id']}: {e}")
 
     async def postpone_overdue_tasks(self):
         """
@@ -346,54 +332,21 @@ class NotificationService:
         This runs as a cron job at midnight.
         """
         logger.info("Starting overdue tasks postponement...")
+        started = time.monotonic()
 
-        # Get all overdue tasks grouped by user
-        users_tasks = await get_overdue_tasks_by_user()
+        stats = await postpone_overdue_tasks()
+        duration_ms = (time.monotonic() - started) * 1000
 
-        if not users_tasks:
-            logger.info("No overdue tasks found.")
+        if not stats["postponed"]:
+            logger.info(f"No overdue tasks found ({duration_ms:.0f} ms).")
             return
 
-        total_postponed = 0
-
-        for user_id, tasks in users_tasks.items():
-            priority_changes = []
-
-            for task in tasks:
-                task_id = task["id"]
-                old_priority = task["priority"]
-
-                # Postpone task
-                new_postponed_count = await postpone_task(task_id)
-                total_postponed += 1
-
-                # Check if priority should be increased (after 2+ postponements)
-                if new_postponed_count >= 2 and old_priority != "high":
-                    # Simple rule-based priority increase
-                    if new_postponed_count >= 3:
-                        new_priority = "high" if old_priority == "medium" else "medium"
-                        await update_task_priority(task_id, new_priority)
-
-                        priority_changes.append(
-                            {
-                                "task_id": task_id,
-                                "task_title": task["title"][:50],
-                                "old_priority": old_priority,
-                                "new_priority": new_priority,
-                                "postponed_count": new_postponed_count,
-                            }
-                        )
-
-            # Create postpone log (notification will be sent later)
-            await create_postpone_log(
-                user_id=user_id,
-                tasks_postponed=len(tasks),
-                priority_changes=priority_changes if priority_changes else None,
-            )
-
         logger.info(
-            f"Postponement complete: {total_postponed} tasks for {len(users_tasks)} users."
+            f"Postponement complete: {stats['postponed']} tasks for "
+            f"{stats['users']} users ({stats['archived']} archived, "
+            f"{stats['escalated']} priority raised) in {duration_ms:.0f} ms."
         )
+        return stats
 
     async def send_daily_task_suggestion(self, time_slot: str):
         """
@@ -493,6 +446,7 @@ class NotificationService:
             await asyncio.sleep(0.05)  # Rate limiting
 
         logger.info(f"Daily suggestions sent: {suggestions_sent} for {time_slot}")
+        return {"sent": suggestions_sent}
 
     async def send_postpone_notifications(self, time_slot: str):
         """
@@ -590,6 +544,7 @@ class NotificationService:
         logger.info(
             f"Postpone notifications sent: {users_notified} users for {time_slot}."
         )
+        return {"sent": users_notified}
 
     async def send_scheduled_task_reminders(self):
         """
@@ -660,6 +615,7 @@ class NotificationService:
             await asyncio.sleep(0.05)  # Rate limiting
 
         logger.info(f"Task reminders: {reminders_sent} sent, {reminders_failed} failed")
+        return {"sent": reminders_sent, "failed": reminders_failed}
 
     async def rotate_monsters(self):
         """
@@ -756,6 +712,7 @@ class NotificationService:
             await asyncio.sleep(0.05)
 
         logger.info(f"Referral notifications: {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def check_resource_usage(self):
         """
@@ -922,6 +879,7 @@ class NotificationService:
         await mark_friend_activities_notified(notified_ids)
 
         logger.info(f"Friend activity notifications: {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def send_comeback_messages(self):
         """Send comeback messages to users inactive for 3+ days.
@@ -987,6 +945,7 @@ class NotificationService:
             await asyncio.sleep(0.05)
 
         logger.info(f"Comeback messages: {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
 
     async def send_event_notifications(self):
         """Send notifications about event start/ending soon.
@@ -1091,3 +1050,4 @@ class NotificationService:
             await asyncio.sleep(0.05)
 
         logger.info(f"Event notifications ({template}): {sent} sent, {failed} failed")
+        return {"sent": sent, "failed": failed}
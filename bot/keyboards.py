@@ -123,6 +123,19 @@ def get_broadcast_confirm_keyboard() -> InlineKeyboardMarkup:
     )
 
 
+def get_broadcast_progress_keyboard() -> InlineKeyboardMarkup:
+    """Keyboard shown while a broadcast is being sent."""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="⏹ Остановить", callback_data="broadcast:stop"
+                ),
+            ]
+        ]
+    )
+
+
 def get_freetime_keyboard(lang: str = "ru") -> InlineKeyboardMarkup:
     """Keyboard for selecting available free time."""
     return InlineKeyboardMarkup(
@@ -7,12 +7,14 @@ from zoneinfo import ZoneInfo
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from config import config
 from handlers import main_router
 from handlers.notifications import NotificationService
+from scheduler import JobScheduler
 from services.deposit_service import check_deposits
+from services.focus_timer import FocusTimer
 from services.guild_quest_service import (
     expire_guild_quests,
     generate_guild_weekly_quests,
@@ -42,192 +44,170 @@ async def main():
     # Initialize notification service
     notification_service = NotificationService(bot)
 
-    # Initialize scheduler
-    scheduler = AsyncIOScheduler()
+    # Focus session timer (fires completions from the Redis deadline set)
+    focus_timer = FocusTimer(
+        config.REDIS_URL, notification_service.notify_focus_completed
+    )
+    focus_timer.start()
+
+    # Scheduled jobs: dispatched by the leader replica, shards run on all of them
+    scheduler = JobScheduler(
+        config.REDIS_URL,
+        shards=config.SCHEDULER_SHARDS,
+        workers=config.SCHEDULER_WORKERS,
+    )
 
     # Morning reminder at 9:00 AM Moscow time
     scheduler.add_job(
+        "morning_reminder",
         notification_service.send_morning_reminder,
         CronTrigger(hour=9, minute=0, timezone=MOSCOW_TZ),
-        id="morning_reminder",
+        sharded=True,
     )
 
     # Streak reminder at 8:00 PM Moscow time
     scheduler.add_job(
+        "streak_reminder",
         notification_service.send_streak_reminder,
         CronTrigger(hour=20, minute=0, timezone=MOSCOW_TZ),
-        id="streak_reminder",
+        sharded=True,
     )
 
     # Weekly summary on Sunday at 6:00 PM Moscow time
     scheduler.add_job(
+        "weekly_summary",
         notification_service.send_weekly_summary,
         CronTrigger(day_of_week="sun", hour=18, minute=0, timezone=MOSCOW_TZ),
-        id="weekly_summary",
+        sharded=True,
+        catch_up=3 * 3600,
     )
 
     # Postpone overdue tasks at 00:05 AM Moscow time daily
+    # (caught up after restarts, replacing the old startup run)
     scheduler.add_job(
+        "postpone_overdue_tasks",
         notification_service.postpone_overdue_tasks,
         CronTrigger(hour=0, minute=5, timezone=MOSCOW_TZ),
-        id="postpone_overdue_tasks",
+        sharded=True,
+        catch_up=24 * 3600,
     )
 
     # Send postpone notifications based on user's preferred time (Moscow time)
-    # Morning users at 9:10 AM
-    scheduler.add_job(
-        notification_service.send_postpone_notifications,
-        CronTrigger(hour=9, minute=10, timezone=MOSCOW_TZ),
-        args=["morning"],
-        id="postpone_notify_morning",
-    )
-
-    # Afternoon users at 13:00
-    scheduler.add_job(
-        notification_service.send_postpone_notifications,
-        CronTrigger(hour=13, minute=0, timezone=MOSCOW_TZ),
-        args=["afternoon"],
-        id="postpone_notify_afternoon",
-    )
-
-    # Evening users at 18:10
-    scheduler.add_job(
-        notification_service.send_postpone_notifications,
-        CronTrigger(hour=18, minute=10, timezone=MOSCOW_TZ),
-        args=["evening"],
-        id="postpone_notify_evening",
-    )
-
-    # Night users at 21:00
-    scheduler.add_job(
-        notification_service.send_postpone_notifications,
-        CronTrigger(hour=21, minute=0, timezone=MOSCOW_TZ),
-        args=["night"],
-        id="postpone_notify_night",
-    )
+    for period, hour, minute in (
+        ("morning", 9, 10),
+        ("afternoon", 13, 0),
+        ("evening", 18, 10),
+        ("night", 21, 0),
+    ):
+        scheduler.add_job(
+            f"postpone_notify_{period}",
+            notification_service.send_postpone_notifications,
+            CronTrigger(hour=hour, minute=minute, timezone=MOSCOW_TZ),
+            args=(period,),
+            sharded=True,
+        )
 
     # Daily task suggestions based on user's preferred time (Moscow time)
-    # Morning users at 9:30 AM
-    scheduler.add_job(
-        notification_service.send_daily_task_suggestion,
-        CronTrigger(hour=9, minute=30, timezone=MOSCOW_TZ),
-        args=["morning"],
-        id="daily_suggestion_morning",
-    )
-
-    # Afternoon users at 13:30
-    scheduler.add_job(
-        notification_service.send_daily_task_suggestion,
-        CronTrigger(hour=13, minute=30, timezone=MOSCOW_TZ),
-        args=["afternoon"],
-        id="daily_suggestion_afternoon",
-    )
-
-    # Evening users at 18:30
-    scheduler.add_job(
-        notification_service.send_daily_task_suggestion,
-        CronTrigger(hour=18, minute=30, timezone=MOSCOW_TZ),
-        args=["evening"],
-        id="daily_suggestion_evening",
-    )
-
-    # Night users at 21:30
-    scheduler.add_job(
-        notification_service.send_daily_task_suggestion,
-        CronTrigger(hour=21, minute=30, timezone=MOSCOW_TZ),
-        args=["night"],
-        id="daily_suggestion_night",
-    )
+    for period, hour, minute in (
+        ("morning", 9, 30),
+        ("afternoon", 13, 30),
+        ("evening", 18, 30),
+        ("night", 21, 30),
+    ):
+        scheduler.add_job(
+            f"daily_suggestion_{period}",
+            notification_service.send_daily_task_suggestion,
+            CronTrigger(hour=hour, minute=minute, timezone=MOSCOW_TZ),
+            args=(period,),
+            sharded=True,
+        )
 
     # Task reminders - check every minute (timezone doesn't matter for every-minute jobs)
     scheduler.add_job(
+        "scheduled_task_reminders",
         notification_service.send_scheduled_task_reminders,
         CronTrigger(minute="*"),
-        id="scheduled_task_reminders",
     )
 
-    # Auto-complete expired focus sessions - check every minute
+    # Focus sessions are completed by the timer as they expire;
+    # sweep up the ones it missed every 10 minutes
     scheduler.add_job(
-        notification_service.auto_complete_expired_focus_sessions,
-        "interval",
-        minutes=1,
-        id="auto_complete_focus",
+        "focus_sweep",
+        focus_timer.sweep,
+        IntervalTrigger(minutes=10),
     )
 
     # Monster rotation - run daily at 00:10, actual generation happens on period start days
     scheduler.add_job(
+        "monster_rotation",
         notification_service.rotate_monsters,
         CronTrigger(hour=0, minute=10, timezone=MOSCOW_TZ),
-        id="monster_rotation",
+        catch_up=24 * 3600,
     )
 
     # New referral notifications - check every hour
     scheduler.add_job(
+        "referral_notifications",
         notification_service.send_new_referral_notifications,
         CronTrigger(minute=15, timezone=MOSCOW_TZ),  # Every hour at :15
-        id="referral_notifications",
     )
 
     # Friend activity notifications - every hour at :45
+    # Not sharded: activity is marked notified per actor, across receivers' shards
     scheduler.add_job(
+        "friend_activity_notifications",
         notification_service.send_friend_activity_notifications,
         CronTrigger(minute=45, timezone=MOSCOW_TZ),
-        id="friend_activity_notifications",
     )
 
     # Comeback messages for inactive users - daily at 14:00
     scheduler.add_job(
+        "comeback_messages",
         notification_service.send_comeback_messages,
         CronTrigger(hour=14, minute=0, timezone=MOSCOW_TZ),
-        id="comeback_messages",
+        sharded=True,
     )
 
     # TON deposit monitoring - check every 30 seconds
     scheduler.add_job(
+        "ton_deposit_monitor",
         check_deposits,
-        "interval",
-        seconds=30,
-        id="ton_deposit_monitor",
+        IntervalTrigger(seconds=30),
     )
 
     # Resource usage monitoring - check every 5 minutes
     scheduler.add_job(
+        "resource_monitor",
         notification_service.check_resource_usage,
-        "interval",
-        minutes=5,
-        id="resource_monitor",
+        IntervalTrigger(minutes=5),
     )
 
     # Guild weekly quests - generate on Monday at 00:15
     scheduler.add_job(
+        "guild_weekly_quests",
         generate_guild_weekly_quests,
         CronTrigger(day_of_week="mon", hour=0, minute=15, timezone=MOSCOW_TZ),
-        id="guild_weekly_quests",
+        catch_up=24 * 3600,
     )
 
     # Expire old guild quests - daily at 00:20
     scheduler.add_job(
+        "expire_guild_quests",
         expire_guild_quests,
         CronTrigger(hour=0, minute=20, timezone=MOSCOW_TZ),
-        id="expire_guild_quests",
+        catch_up=24 * 3600,
     )
 
     # Event notifications - daily at 12:00 Moscow
+    # Not sharded: sent-once flags are per event, not per user
     scheduler.add_job(
+        "event_notifications",
         notification_service.send_event_notifications,
         CronTrigger(hour=12, minute=0, timezone=MOSCOW_TZ),
-        id="event_notifications",
     )
 
     scheduler.start()
 
-    # Run postpone check on startup (catches missed midnight cron after restarts)
-    try:
-        await notification_service.postpone_overdue_tasks()
-        logger.info("Startup postpone check completed.")
-    except Exception as e:
-        logger.error(f"Startup postpone check failed: {e}")
-
     # Set bot commands
     from aiogram.types import BotCommand
 
@@ -246,7 +226,8 @@ async def main():
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
-        scheduler.shutdown()
+        await scheduler.shutdown()
+        await focus_timer.stop()
         await bot.session.close()
 
 
@@ -0,0 +1,400 @@
+"""Persisted, sharded scheduled jobs shared by all bot replicas.
+
+Every replica registers the same triggers with APScheduler, but a trigger
+only dispatches a run on the replica holding the leader lock in Redis.
+Dispatching splits the run into shards (contiguous users.id ranges for
+per-user jobs, a single shard otherwise) and pushes them onto a Redis
+queue. Worker loops on every replica claim shards into a per-replica
+processing list, run the job with ``database.user_shard`` set to the
+shard's range, and record duration and row counts in the run's hash.
+
+Runs, the queue and last fire times live in Redis, so they survive
+restarts. The leader requeues shards held by a replica whose heartbeat
+expired, and on taking over it catches up jobs whose fire time passed
+while no leader was running.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis_async
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from database import get_user_id_bounds, user_shard
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "bot:scheduler"
+LEADER_KEY = f"{KEY_PREFIX}:leader"
+QUEUE_KEY = f"{KEY_PREFIX}:queue"
+LEADER_TTL = 30  # Leader lease and replica heartbeat lifetime
+HEARTBEAT_INTERVAL = 10
+RUN_TTL = 7 * 86400  # Keep run records for a week
+RUN_HISTORY = 50  # Run ids listed per job
+ACTIVE_RUN_TTL = 6 * 3600  # Safety net if a run never finishes
+
+# Renew / release the leader lease only while we still hold it
+_RENEW_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_DELETE_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class ScheduledJob:
+    """A registered job: what to call and how to split it."""
+
+    job_id: str
+    func: Callable[..., Awaitable[Any]]
+    trigger: Any
+    args: tuple = ()
+    # Split runs into users.id ranges (the job's queries use shard_filter)
+    sharded: bool = False
+    # Run a fire missed while no leader was up, if at most this many seconds ago
+    catch_up: int = 0
+
+
+def _row_counts(result) -> dict[str, int]:
+    """Row counts reported by a job: a dict of ints, or a single int."""
+    if isinstance(result, bool):
+        return {}
+    if isinstance(result, int):
+        return {"rows": result}
+    if isinstance(result, dict):
+        return {
+            key: value
+            for key, value in result.items()
+            if isinstance(value, int) and not isinstance(value, bool)
+        }
+    return {}
+
+
+class JobScheduler:
+    """Leader-dispatched, shard-executed scheduled jobs."""
+
+    def __init__(self, redis_url: str, shards: int = 4, workers: int = 4):
+        self.replica_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.redis = redis_async.from_url(redis_url, decode_responses=True)
+        self.shards = max(shards, 1)
+        self.workers = max(workers, 1)
+        self.jobs: dict[str, ScheduledJob] = {}
+        self.is_leader = False
+        self._scheduler = AsyncIOScheduler()
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(
+        self,
+        job_id: str,
+        func: Callable[..., Awaitable[Any]],
+        trigger,
+        args: tuple = (),
+        sharded: bool = False,
+        catch_up: int = 0,
+    ):
+        """Register a job. ``trigger`` is an APScheduler trigger."""
+        self.jobs[job_id] = ScheduledJob(job_id, func, trigger, args, sharded, catch_up)
+        self._scheduler.add_job(
+            self.dispatch,
+            trigger,
+            args=[job_id],
+            id=job_id,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=60,
+        )
+
+    def start(self):
+        """Start triggers, the heartbeat and this replica's shard workers."""
+        self._scheduler.start()
+        self._tasks = [asyncio.create_task(self._heartbeat_loop())]
+        self._tasks += [
+            asyncio.create_task(self._worker_loop()) for _ in range(self.workers)
+        ]
+        logger.info(
+            f"Scheduler started on replica {self.replica_id} "
+            f"({len(self.jobs)} jobs, {self.workers} workers)"
+        )
+
+    async def shutdown(self):
+        """Stop workers. Shards in progress are requeued by the next leader."""
+        self._scheduler.shutdown(wait=False)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        try:
+            if self.is_leader:
+                await self.redis.eval(_DELETE_IF_OWNER, 1, LEADER_KEY, self.replica_id)
+            await self.redis.delete(self._replica_key(self.replica_id))
+        except Exception as e:
+            logger.warning(f"Scheduler shutdown error: {e}")
+        await self.redis.aclose()
+
+    # Keys
+
+    @staticmethod
+    def _replica_key(replica_id: str) -> str:
+        return f"{KEY_PREFIX}:replica:{replica_id}"
+
+    @staticmethod
+    def _processing_key(replica_id: str) -> str:
+        return f"{KEY_PREFIX}:processing:{replica_id}"
+
+    @staticmethod
+    def _run_key(run_id: str) -> str:
+        return f"{KEY_PREFIX}:run:{run_id}"
+
+    @staticmethod
+    def _active_key(job_id: str) -> str:
+        return f"{KEY_PREFIX}:active:{job_id}"
+
+    @staticmethod
+    def _last_fire_key(job_id: str) -> str:
+        return f"{KEY_PREFIX}:last_fire:{job_id}"
+
+    @staticmethod
+    def _history_key(job_id: str) -> str:
+        return f"{KEY_PREFIX}:runs:{job_id}"
+
+    # Leadership
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.redis.set(
+                    self._replica_key(self.replica_id), "1", ex=LEADER_TTL
+                )
+                await self._update_leadership()
+                if self.is_leader:
+                    await self._requeue_orphaned_shards()
+            except Exception as e:
+                # Can't prove we still hold the lease
+                self.is_leader = False
+                logger.warning(f"Scheduler heartbeat error: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _update_leadership(self):
+        if self.is_leader:
+            renewed = await self.redis.eval(
+                _RENEW_IF_OWNER, 1, LEADER_KEY, self.replica_id, LEADER_TTL
+            )
+            if not renewed:
+                self.is_leader = False
+                logger.warning(f"Replica {self.replica_id} lost scheduler leadership")
+
+        if not self.is_leader and await self.redis.set(
+            LEADER_KEY, self.replica_id, nx=True, ex=LEADER_TTL
+        ):
+            self.is_leader = True
+            logger.info(f"Replica {self.replica_id} is now the scheduler leader")
+            await self._catch_up_missed_runs()
+
+    async def _requeue_orphaned_shards(self):
+        """Put shards claimed by replicas that stopped back on the queue."""
+        async for key in self.redis.scan_iter(match=self._processing_key("*")):
+            owner = key.rsplit(":", 1)[1]
+            if owner == self.replica_id or await self.redis.exists(
+                self._replica_key(owner)
+            ):
+                continue
+            moved = 0
+            while await self.redis.lmove(key, QUEUE_KEY, "RIGHT", "LEFT"):
+                moved += 1
+            if moved:
+                logger.warning(f"Requeued {moved} shards from stopped replica {owner}")
+
+    async def _catch_up_missed_runs(self):
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            if not job.catch_up:
+                continue
+            last_fire = await self.redis.get(self._last_fire_key(job.job_id))
+            if not last_fire:
+                continue
+            missed = job.trigger.get_next_fire_time(
+                datetime.fromisoformat(last_fire), now
+            )
+            if missed and missed <= now:
+                if (now - missed).total_seconds() <= job.catch_up:
+                    logger.info(f"Catching up {job.job_id} missed at {missed}")
+                    await self.dispatch(job.job_id, fire_time=missed)
+                else:
+                    logger.warning(f"Skipping {job.job_id} missed at {missed}")
+
+    # Dispatch
+
+    async def dispatch(self, job_id: str, fire_time: datetime | None = None):
+        """Split a job run into shards and queue them (leader only)."""
+        if not self.is_leader:
+            return
+
+        job = self.jobs[job_id]
+        now = datetime.now(timezone.utc)
+        fire_time = fire_time or now
+        run_id = f"{job_id}:{int(fire_time.timestamp())}"
+        active_key = self._active_key(job_id)
+
+        # One run of a job at a time, across replicas
+        if not await self.redis.set(active_key, run_id, nx=True, ex=ACTIVE_RUN_TTL):
+            logger.warning(f"Skipping {job_id}: previous run still in progress")
+            return
+
+        try:
+            ranges = await self._user_ranges() if job.sharded else [None]
+            run_key = self._run_key(run_id)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(
+                run_key,
+                mapping={
+                    "job_id": job_id,
+                    "status": "running",
+                    "shards": len(ranges),
+                    "shards_done": 0,
+                    "dispatched_at": now.isoformat(),
+                    "dispatched_by": self.replica_id,
+                },
+            )
+            pipe.expire(run_key, RUN_TTL)
+            pipe.set(self._last_fire_key(job_id), fire_time.isoformat())
+            pipe.lpush(self._history_key(job_id), run_id)
+            pipe.ltrim(self._history_key(job_id), 0, RUN_HISTORY - 1)
+            for index, user_range in enumerate(ranges):
+                pipe.rpush(
+                    QUEUE_KEY,
+                    json.dumps(
+                        {
+                            "run_id": run_id,
+                            "job_id": job_id,
+                            "shard": index,
+                            "range": user_range,
+                        }
+                    ),
+                )
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to dispatch {job_id}: {e}")
+            await self.redis.delete(active_key)
+
+    async def _user_ranges(self) -> list[list[int] | None]:
+        """Split users.id into up to ``shards`` contiguous inclusive ranges."""
+        bounds = await get_user_id_bounds()
+        if bounds is None:
+            return [None]
+        low, high = bounds
+        size = math.ceil((high - low + 1) / self.shards)
+        return [
+            [start, min(start + size - 1, high)] for start in range(low, high + 1, size)
+        ]
+
+    # Execution
+
+    async def _worker_loop(self):
+        processing_key = self._processing_key(self.replica_id)
+        while True:
+            try:
+                entry = await self.redis.blmove(
+                    QUEUE_KEY, processing_key, 5, "LEFT", "RIGHT"
+                )
+                if entry is None:
+                    continue
+                await self._run_shard(json.loads(entry))
+                await self.redis.lrem(processing_key, 1, entry)
+            except Exception as e:
+                logger.error(f"Scheduler worker error: {e}")
+                await asyncio.sleep(5)
+
+    async def _run_shard(self, shard: dict):
+        job_id, run_id, index = shard["job_id"], shard["run_id"], shard["shard"]
+        job = self.jobs.get(job_id)
+        status = "done"
+        result = None
+        started = time.monotonic()
+
+        if job is None:
+            # Dispatched by a replica running a different set of jobs
+            status = "unknown_job"
+            logger.warning(f"Dropping shard of unknown job {job_id}")
+        else:
+            token = user_shard.set(tuple(shard["range"]) if shard["range"] else None)
+            try:
+                result = await job.func(*job.args)
+            except Exception as e:
+                status = "failed"
+                logger.error(f"Scheduled job {job_id} shard {index} failed: {e}")
+            finally:
+                user_shard.reset(token)
+
+        duration = time.monotonic() - started
+        rows = _row_counts(result)
+        run_key = self._run_key(run_id)
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(
+            run_key,
+            f"shard:{index}",
+            json.dumps(
+                {
+                    "status": status,
+                    "range": shard["range"],
+                    "duration_ms": round(duration * 1000),
+                    "rows": rows,
+                    "replica": self.replica_id,
+                }
+            ),
+        )
+        pipe.hincrbyfloat(run_key, "duration_s", duration)
+        for key, value in rows.items():
+            pipe.hincrby(run_key, f"rows:{key}", value)
+        if status != "done":
+            pipe.hincrby(run_key, "shards_failed", 1)
+        pipe.hincrby(run_key, "shards_done", 1)
+        pipe.hget(run_key, "shards")
+        results = await pipe.execute()
+
+        shards_done, shards_total = results[-2], int(results[-1] or 0)
+        if shards_done >= shards_total:
+            await self._finish_run(job_id, run_id)
+
+    async def _finish_run(self, job_id: str, run_id: str):
+        run_key = self._run_key(run_id)
+        run = await self.redis.hgetall(run_key)
+        finished_at = datetime.now(timezone.utc)
+        elapsed = (
+            finished_at - datetime.fromisoformat(run["dispatched_at"])
+        ).total_seconds()
+        status = "failed" if int(run.get("shards_failed", 0)) else "done"
+
+        await self.redis.hset(
+            run_key,
+            mapping={
+                "status": status,
+                "finished_at": finished_at.isoformat(),
+                "elapsed_s": round(elapsed, 3),
+            },
+        )
+        await self.redis.eval(_DELETE_IF_OWNER, 1, self._active_key(job_id), run_id)
+
+        rows = {
+            key.removeprefix("rows:"): int(value)
+            for key, value in run.items()
+            if key.startswith("rows:")
+        }
+        logger.info(
+            f"Scheduled job {job_id} {status}: {run['shards']} shards in "
+            f"{elapsed:.1f}s (work {float(run.get('duration_s', 0)):.1f}s), "
+            f"rows {rows}"
+        )
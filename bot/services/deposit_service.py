@@ -317,5 +317,6 @@ async def check_deposits():
         processed = await deposit_service.process_deposits()
         if processed > 0:
             logger.info(f"Processed {processed} new deposits")
+        return {"deposits": processed}
     except Exception as e:
         logger.error(f"Error checking deposits: {e}")
@@ -0,0 +1,112 @@
+"""Focus session timer: completes sessions as soon as they run out.
+
+The backend keeps running timed focus sessions in the ``focus:deadlines``
+sorted set, scored by the epoch second they end, and each user's open
+sessions in ``focus:user:{user_id}`` (backend/app/services/focus_timers.py).
+The timer sleeps until the earliest deadline, pops the due sessions
+atomically and completes them with one statement. Every bot replica runs
+it; a session is popped by exactly one of them.
+
+Sessions the timer never saw (Redis flushed or unavailable, a replica died
+between pop and completion) are picked up by ``sweep``, which the
+scheduler runs every few minutes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis_async
+from database import complete_focus_sessions
+
+logger = logging.getLogger(__name__)
+
+FOCUS_DEADLINES_KEY = "focus:deadlines"
+FOCUS_USER_KEY = "focus:user:{user_id}"
+MAX_SLEEP = 1.0  # Deadlines added meanwhile are noticed within this
+POP_BATCH = 100
+
+# Pop up to ARGV[2] sessions whose deadline is <= ARGV[1]
+_POP_DUE = """
+local due = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('zrem', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+class FocusTimer:
+    """Fires focus session completions from the Redis deadline set."""
+
+    def __init__(
+        self,
+        redis_url: str,
+        on_completed: Callable[[list[dict]], Awaitable[None]],
+    ):
+        self.redis = redis_async.from_url(redis_url, decode_responses=True)
+        self.on_completed = on_completed
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.redis.aclose()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.fire_due()
+                await asyncio.sleep(await self._time_to_next_deadline())
+            except Exception as e:
+                logger.error(f"Focus timer error: {e}")
+                await asyncio.sleep(5)
+
+    async def _time_to_next_deadline(self) -> float:
+        earliest = await self.redis.zrange(FOCUS_DEADLINES_KEY, 0, 0, withscores=True)
+        if not earliest:
+            return MAX_SLEEP
+        return min(max(earliest[0][1] - time.time(), 0), MAX_SLEEP)
+
+    async def fire_due(self) -> int:
+        """Complete every session whose deadline has passed."""
+        completed_count = 0
+        while True:
+            due = await self.redis.eval(
+                _POP_DUE, 1, FOCUS_DEADLINES_KEY, time.time(), POP_BATCH
+            )
+            if not due:
+                return completed_count
+
+            completed = await complete_focus_sessions([int(i) for i in due])
+            await self._finish(completed)
+            completed_count += len(completed)
+            if len(due) < POP_BATCH:
+                return completed_count
+
+    async def sweep(self):
+        """Complete expired sessions the timer missed (scheduled job)."""
+        completed = await complete_focus_sessions()
+        await self._finish(completed)
+        if completed:
+            logger.info(f"Focus sweep completed {len(completed)} missed sessions")
+        return {"completed": len(completed)}
+
+    async def _finish(self, completed: list[dict]):
+        if not completed:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for sess in completed:
+                key = FOCUS_USER_KEY.format(user_id=sess["user_id"])
+                pipe.hdel(key, str(sess["id"]))
+                pipe.zrem(FOCUS_DEADLINES_KEY, sess["id"])
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to drop completed focus sessions: {e}")
+        await self.on_completed(completed)
@@ -25,6 +25,7 @@ async def generate_guild_weekly_quests():
                     count = data.get("data", {}).get("generated", 0)
                     if count > 0:
                         logger.info(f"Generated weekly quests for {count} guilds")
+                    return {"guilds": count}
                 else:
                     logger.error(f"Guild quest generation failed: {response.status}")
     except Exception as e:
@@ -48,6 +49,7 @@ async def expire_guild_quests():
                     count = data.get("data", {}).get("expired", 0)
                     if count > 0:
                         logger.info(f"Expired {count} old guild quests")
+                    return {"quests": count}
                 else:
                     logger.error(f"Guild quest expiration failed: {response.status}")
     except Exception as e:
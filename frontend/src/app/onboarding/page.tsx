@@ -8,7 +8,7 @@ import { Button, Card } from '@/components/ui';
 import { onboardingService, gamificationService } from '@/services';
 import { useAppStore } from '@/lib/store';
 import { hapticFeedback } from '@/lib/telegram';
-import type { OnboardingInput, ReferralRewardCard } from '@/domain/types';
+import type { OnboardingInput, OnboardingResponse, ReferralRewardCard } from '@/domain/types';
 import type { Genre } from '@/services/gamification';
 
 const RARITY_COLORS: Record<string, string> = {
@@ -110,6 +110,7 @@ export default function OnboardingPage() {
   } | null>(null);
   const [starterDeck, setStarterDeck] = useState<ReferralRewardCard[]>([]);
   const [onboardingCard, setOnboardingCard] = useState<ReferralRewardCard | null>(null);
+  const [bundlePending, setBundlePending] = useState(false);
 
   // Check if onboarding is already completed
   const { data: statusData } = useQuery({
@@ -140,26 +141,46 @@ export default function OnboardingPage() {
     },
     onSuccess: (response) => {
       if (response.success && response.data) {
-        setResult({
-          message: response.data.welcome_message,
-          tips: response.data.analysis.personalized_tips,
-        });
-        // Save starter deck if present (from referral)
-        if (response.data.referral_rewards?.starter_deck) {
-          setStarterDeck(response.data.referral_rewards.starter_deck);
-        }
-        // Save onboarding companion card
-        if (response.data.onboarding_card) {
-          setOnboardingCard(response.data.onboarding_card);
-        }
         setOnboardingCompleted(true);
+        hapticFeedback('success');
+        if (response.data.welcome_bundle_status === 'pending') {
+          // Show the profile now; cards and GPT tips arrive with the bundle
+          applyOnboardingResult(response.data);
+          setStep('result');
+          setBundlePending(true);
+          onboardingService.waitForWelcomeBundle().then((bundle) => {
+            setBundlePending(false);
+            if (bundle.success && bundle.data?.welcome_bundle_status === 'ready') {
+              applyOnboardingResult(bundle.data);
+              if (bundle.data.onboarding_card) {
+                setStep('card');
+              }
+            }
+          });
+          return;
+        }
+        applyOnboardingResult(response.data);
         // Go to card step if we got a card, otherwise straight to result
         setStep(response.data.onboarding_card ? 'card' : 'result');
-        hapticFeedback('success');
       }
     },
   });
 
+  const applyOnboardingResult = (data: OnboardingResponse) => {
+    setResult({
+      message: data.welcome_message,
+      tips: data.analysis.personalized_tips,
+    });
+    // Save starter deck if present (from referral)
+    if (data.referral_rewards?.starter_deck) {
+      setStarterDeck(data.referral_rewards.starter_deck);
+    }
+    // Save onboarding companion card
+    if (data.onboarding_card) {
+      setOnboardingCard(data.onboarding_card);
+    }
+  };
+
   const handleTimeSelect = (time: OnboardingInput['productive_time']) => {
     setData({ ...data, productive_time: time });
     hapticFeedback('light');
@@ -457,6 +478,11 @@ export default function OnboardingPage() {
               <span className="text-5xl mb-4 block">🎉</span>
               <h1 className="text-2xl font-bold text-white mb-2">Готово!</h1>
               <p className="text-gray-400">{result.message}</p>
+              {bundlePending && (
+                <p className="text-sm text-purple-400 mt-2 animate-pulse">
+                  Готовим вашего компаньона...
+                </p>
+              )}
             </div>
 
             {/* Starter deck from referral */}
@@ -16,7 +16,7 @@ import { hapticFeedback, showBackButton, hideBackButton } from '@/lib/telegram';
 import { useLanguage, type TranslationKey } from '@/lib/i18n';
 import { PRIORITY_COLORS, TASK_TYPE_EMOJIS, TASK_TYPE_LABELS, TASK_TYPE_COLORS, DEFAULT_FOCUS_DURATION } from '@/domain/constants';
 import { playFocusCompleteSound } from '@/lib/sounds';
-import type { MoodLevel, EnergyLevel, TaskType, UpdateTaskInput } from '@/domain/types';
+import type { MoodLevel, EnergyLevel, Subtask, TaskType, UpdateTaskInput } from '@/domain/types';
 
 const TASK_TYPES: TaskType[] = [
   'creative', 'analytical', 'communication', 'physical',
@@ -341,8 +341,16 @@ export default function TaskDetailPage() {
   const [showNoNewStepsMessage, setShowNoNewStepsMessage] = useState(false);
   const [noNewStepsReason, setNoNewStepsReason] = useState('');
 
+  // Subtasks received so far while a decomposition is streaming
+  const [streamedSubtasks, setStreamedSubtasks] = useState<Subtask[]>([]);
+
   const decomposeMutation = useMutation({
-    mutationFn: (moodId?: number) => tasksService.decomposeTask(taskId, moodId),
+    mutationFn: (moodId?: number) => {
+      setStreamedSubtasks([]);
+      return tasksService.decomposeTaskStream(taskId, moodId, (subtask) =>
+        setStreamedSubtasks((prev) => [...prev, subtask])
+      );
+    },
     onSuccess: (result) => {
       refetch();
       if (result.data?.no_new_steps) {
@@ -1086,10 +1094,21 @@ export default function TaskDetailPage() {
           </div>
 
           <div className="space-y-2">
-            {/* Skeleton loaders while decomposing */}
+            {/* Streamed subtasks, then skeleton loaders while decomposing */}
             {decomposeMutation.isPending && (
               <>
-                {[1, 2, 3].map((i) => (
+                {streamedSubtasks.map((subtask) => (
+                  <div key={`streamed-${subtask.id}`} className="bg-gray-800/50 rounded-xl p-3">
+                    <div className="flex items-center gap-3">
+                      <div className="w-5 h-5 rounded-full border-2 border-gray-600" />
+                      <div className="flex-1">
+                        <div className="text-sm text-white">{subtask.title}</div>
+                        <div className="text-xs text-gray-500">{subtask.estimated_minutes} {t('min')}</div>
+                      </div>
+                    </div>
+                  </div>
+                ))}
+                {[1, 2, 3].slice(Math.min(streamedSubtasks.length, 2)).map((i) => (
                   <div
                     key={`skeleton-${i}`}
                     className="bg-gray-800/50 rounded-xl p-3 animate-pulse"
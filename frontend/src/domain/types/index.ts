@@ -256,6 +256,12 @@ export interface DayStats {
   avg_minutes: number;
 }
 
+export interface TimeSlotStats {
+  sessions: number;
+  completed: number;
+  minutes: number;
+}
+
 export interface ProductivityPatterns {
   period_days: number;
   total_sessions: number;
@@ -268,6 +274,9 @@ export interface ProductivityPatterns {
   best_day: DayStats | null;
   day_distribution: DayStats[];
   hour_distribution: HourStats[];
+  time_slots: Record<PreferredTime, TimeSlotStats>;
+  best_time_slot: PreferredTime | null;
+  computed_at: string;
 }
 
 export interface LeaderboardEntry {
@@ -300,6 +309,7 @@ export interface UserProfile {
   daily_reminder_time: string | null;
   onboarding_completed: boolean;
   onboarding_completed_at: string | null;
+  welcome_bundle_status?: WelcomeBundleStatus | null;
   gpt_analysis: GptAnalysis | null;
   // Work schedule preferences
   work_start_time: string | null;
@@ -352,6 +362,8 @@ export interface ReferralRewards {
   referrer_card_rarity?: string;
 }
 
+export type WelcomeBundleStatus = 'pending' | 'ready' | 'failed';
+
 export interface OnboardingResponse {
   profile: UserProfile;
   analysis: {
@@ -362,6 +374,8 @@ export interface OnboardingResponse {
     recommended_session_duration: number;
   };
   welcome_message: string;
+  // Cards and GPT analysis are built in the background while "pending"
+  welcome_bundle_status: WelcomeBundleStatus | null;
   onboarding_card?: ReferralRewardCard;
   referral_rewards?: ReferralRewards;
 }
@@ -37,21 +37,26 @@ class ApiClient {
     return 'ru';
   }
 
-  private async request<T>(
-    endpoint: string,
-    options: RequestInit = {}
-  ): Promise<ApiResponse<T>> {
+  private buildHeaders(extra?: HeadersInit): HeadersInit {
     const token = this.getToken();
 
     const headers: HeadersInit = {
       'Content-Type': 'application/json',
       'Accept-Language': this.getLanguage(),
-      ...options.headers,
+      ...extra,
     };
 
     if (token) {
       (headers as Record<string, string>)['Authorization'] = `Bearer ${token}`;
     }
+    return headers;
+  }
+
+  private async request<T>(
+    endpoint: string,
+    options: RequestInit = {}
+  ): Promise<ApiResponse<T>> {
+    const headers = this.buildHeaders(options.headers);
 
     try {
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
@@ -118,6 +123,15 @@ class ApiClient {
   async delete<T>(endpoint: string): Promise<ApiResponse<T>> {
     return this.request<T>(endpoint, { method: 'DELETE' });
   }
+
+  /** POST and return the raw response, for streamed (text/event-stream) bodies. */
+  async postStream(endpoint: string, body?: unknown): Promise<Response> {
+    return fetch(`${API_BASE_URL}${endpoint}`, {
+      method: 'POST',
+      headers: this.buildHeaders({ Accept: 'text/event-stream' }),
+      body: JSON.stringify(body ?? {}),
+    });
+  }
 }
 
 export const api = new ApiClient();
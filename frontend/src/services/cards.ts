@@ -4,6 +4,7 @@
 
 import type { ApiResponse } from '@/domain/types';
 import { api } from './api';
+import { jobsService, type Job } from './jobs';
 
 // Card types
 export interface AbilityInfo {
@@ -36,6 +37,7 @@ export interface Card {
   is_showcase: boolean;
   showcase_slot: number | null;
   is_in_deck: boolean;
+  deck_position: number | null;
   is_tradeable: boolean;
   is_alive: boolean;
   is_on_cooldown: boolean;
@@ -110,6 +112,18 @@ interface DeckResponse {
   stats: DeckStats;
 }
 
+export type CardOperation =
+  | { op: 'deck_add' | 'deck_remove' | 'deck_order'; card_ids: number[] }
+  | { op: 'heal'; card_ids?: number[] };
+
+interface CardBatchResponse {
+  deck: Card[];
+  size: number;
+  max_size: number;
+  healed_count: number;
+  heals_today?: number;
+}
+
 interface FriendsResponse {
   friends: Friend[];
   total: number;
@@ -177,6 +191,11 @@ class CardsService {
     return api.post<{ message: string }>('/deck/remove', { card_id: cardId });
   }
 
+  // Several deck edits and heals in one atomic request
+  async applyCardOperations(operations: CardOperation[]): Promise<ApiResponse<CardBatchResponse>> {
+    return api.post<CardBatchResponse>('/cards/batch', { operations });
+  }
+
   // Card healing
   async getHealStatus(): Promise<ApiResponse<HealStatus>> {
     return api.get<HealStatus>('/cards/heal-status');
@@ -267,7 +286,9 @@ class CardsService {
 
   // Image generation (async, called after card is shown)
   async generateCardImage(cardId: number): Promise<ApiResponse<{ image_url?: string; already_exists?: boolean }>> {
-    return api.post<{ image_url?: string; already_exists?: boolean }>(`/cards/${cardId}/generate-image`);
+    type ImageResult = { image_url?: string; already_exists?: boolean };
+    const response = await api.post<ImageResult | { job: Job<ImageResult> }>(`/cards/${cardId}/generate-image`);
+    return jobsService.resolveJob<ImageResult>(response);
   }
 
   // Card merging
@@ -16,3 +16,4 @@ export { guildsService } from './guilds';
 export { campaignService } from './campaign';
 export { sparksService } from './sparks';
 export { cosmeticsService } from './cosmetics';
+export { jobsService } from './jobs';
@@ -0,0 +1,64 @@
+/**
+ * Background jobs service.
+ *
+ * Slow endpoints (AI decomposition, image generation) answer 202 with
+ * `{ job }` when the backend runs them in Celery; `resolveJob` polls
+ * `/jobs/<id>` until the job finishes and returns its result as if the
+ * endpoint had answered synchronously.
+ */
+
+import { api } from './api';
+import type { ApiResponse } from '@/domain/types';
+
+export interface Job<T = unknown> {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress?: { done: number; total: number };
+  result?: T;
+  error?: string;
+}
+
+const POLL_INTERVAL_MS = 1000;
+const MAX_WAIT_MS = 5 * 60 * 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const jobsService = {
+  async getJob<T>(jobId: string): Promise<ApiResponse<{ job: Job<T> }>> {
+    return api.get<{ job: Job<T> }>(`/jobs/${jobId}`);
+  },
+
+  /** Wait for a job to finish; `onProgress` gets every polled state. */
+  async waitForJob<T>(job: Job<T>, onProgress?: (job: Job<T>) => void): Promise<ApiResponse<T>> {
+    const deadline = Date.now() + MAX_WAIT_MS;
+    let current = job;
+
+    while (current.status === 'queued' || current.status === 'running') {
+      if (Date.now() > deadline) {
+        return { success: false, error: { code: 'JOB_TIMEOUT', message: 'Job is taking too long' } };
+      }
+      await sleep(POLL_INTERVAL_MS);
+      const response = await this.getJob<T>(current.id);
+      if (!response.success || !response.data) {
+        return { success: false, error: response.error };
+      }
+      current = response.data.job;
+      onProgress?.(current);
+    }
+
+    if (current.status === 'failed') {
+      return { success: false, error: { code: 'JOB_FAILED', message: current.error || 'Job failed' } };
+    }
+    return { success: true, data: current.result };
+  },
+
+  /** Pass synchronous responses through; wait for the job of 202 ones. */
+  async resolveJob<T>(response: ApiResponse<T | { job: Job<T> }>): Promise<ApiResponse<T>> {
+    const data = response.data as { job?: Job<T> } | undefined;
+    if (!response.success || !data?.job) {
+      return response as ApiResponse<T>;
+    }
+    return this.waitForJob<T>(data.job);
+  },
+};
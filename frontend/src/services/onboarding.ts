@@ -4,6 +4,7 @@
 
 import { api } from './api';
 import type {
+  ApiResponse,
   UserProfile,
   OnboardingInput,
   OnboardingResponse,
@@ -18,6 +19,11 @@ interface ProfileResponse {
   profile: UserProfile;
 }
 
+const BUNDLE_POLL_INTERVAL_MS = 1500;
+const BUNDLE_MAX_WAIT_MS = 60 * 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export const onboardingService = {
   /**
    * Get onboarding status for current user.
@@ -33,6 +39,31 @@ export const onboardingService = {
     return api.post<OnboardingResponse>('/onboarding/complete', input);
   },
 
+  /**
+   * Get the onboarding result with the welcome bundle built in the background.
+   */
+  async getWelcomeBundle() {
+    return api.get<OnboardingResponse>('/onboarding/welcome-bundle');
+  },
+
+  /**
+   * Poll the welcome bundle until it is no longer "pending".
+   */
+  async waitForWelcomeBundle(): Promise<ApiResponse<OnboardingResponse>> {
+    const deadline = Date.now() + BUNDLE_MAX_WAIT_MS;
+    for (;;) {
+      const response = await this.getWelcomeBundle();
+      if (
+        !response.success ||
+        response.data?.welcome_bundle_status !== 'pending' ||
+        Date.now() > deadline
+      ) {
+        return response;
+      }
+      await sleep(BUNDLE_POLL_INTERVAL_MS);
+    }
+  },
+
   /**
    * Get user's productivity profile.
    */
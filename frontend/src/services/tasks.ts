@@ -3,6 +3,7 @@
  */
 
 import { api } from './api';
+import { jobsService, type Job } from './jobs';
 import type {
   Task,
   Subtask,
@@ -211,9 +212,63 @@ export const tasksService = {
   },
 
   async decomposeTask(taskId: number, moodId?: number): Promise<ApiResponse<DecomposeResponse>> {
-    return api.post<DecomposeResponse>(`/tasks/${taskId}/decompose`, {
-      mood_id: moodId,
-    });
+    const response = await api.post<DecomposeResponse | { job: Job<DecomposeResponse> }>(
+      `/tasks/${taskId}/decompose`,
+      { mood_id: moodId }
+    );
+    return jobsService.resolveJob<DecomposeResponse>(response);
+  },
+
+  /**
+   * Decompose with server-sent events: `onSubtask` gets each saved subtask as
+   * soon as the model writes it. Resolves like decomposeTask (with the
+   * streamed subtasks).
+   */
+  async decomposeTaskStream(
+    taskId: number,
+    moodId: number | undefined,
+    onSubtask: (subtask: Subtask) => void
+  ): Promise<ApiResponse<DecomposeResponse>> {
+    let response: Response;
+    try {
+      response = await api.postStream(`/tasks/${taskId}/decompose/stream`, { mood_id: moodId });
+    } catch {
+      return { success: false, error: { code: 'NETWORK_ERROR', message: 'Failed to connect to server' } };
+    }
+    if (!response.ok || !response.body) {
+      // Not streamable (e.g. proxy or error status): use the regular endpoint
+      return this.decomposeTask(taskId, moodId);
+    }
+
+    const subtasks: Subtask[] = [];
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value, { stream: !done });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? '{}');
+        if (event === 'subtask') {
+          subtasks.push(data);
+          onSubtask(data);
+        } else if (event === 'done') {
+          return { success: true, data: { subtasks, ...data } };
+        } else if (event === 'error') {
+          return { success: false, error: { code: 'DECOMPOSE_FAILED', message: data.message } };
+        }
+      }
+      if (done) break;
+    }
+    return { success: false, error: { code: 'STREAM_ENDED', message: 'Decomposition stream ended early' } };
   },
 
   async createSubtask(